@@ -0,0 +1,446 @@
+# SPDX-License-Identifier: Apache-2.0
+"""
+Simulate the v1 scheduler and KV cache manager on the CPU.
+
+This script drives the real v1 Scheduler (and so the real KVCacheManager)
+with a simulated executor that returns synthetic ModelRunnerOutputs instead
+of running a model, and advances a simulated clock by a simple cost model
+of the GPU step time. It needs no GPU and no model weights (only the model
+config and tokenizer), so it can be used to tune the scheduler knobs (e.g.,
+--max-num-batched-tokens, --long-prefill-token-threshold,
+--prefix-caching-eviction-policy, --scheduling-policy) on a laptop, and to
+catch CPU regressions of the scheduler that would hide behind the GPU time
+in an end-to-end benchmark.
+
+It reports the wall-clock overhead of the scheduler per step, the prefix
+cache hit rate, the number of preemptions and the simulated TTFT/TPOT.
+
+Example usage:
+    # Synthetic requests sharing a 512-token prefix, arriving at 20 req/s.
+    python benchmarks/benchmark_scheduler_simulator.py \
+        --model meta-llama/Llama-3.1-8B-Instruct \
+        --dataset-name random --random-prefix-len 512 \
+        --input-len 1024 --output-len 128 --num-prompts 1000 \
+        --request-rate 20 --num-gpu-blocks 4096 --enable-prefix-caching
+
+    # Replay ShareGPT with all requests arriving at once.
+    python benchmarks/benchmark_scheduler_simulator.py \
+        --model meta-llama/Llama-3.1-8B-Instruct \
+        --dataset-name sharegpt \
+        --dataset-path ShareGPT_V3_unfiltered_cleaned_split.json \
+        --num-prompts 1000 --max-num-batched-tokens 4096
+"""
+import argparse
+import dataclasses
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Optional
+
+import numpy as np
+
+from vllm.benchmarks.datasets import (BurstGPTDataset, RandomDataset,
+                                      SampleRequest, ShareGPTDataset)
+from vllm.engine.arg_utils import EngineArgs
+from vllm.sampling_params import SamplingParams
+from vllm.transformers_utils.tokenizer import get_tokenizer
+from vllm.utils import (STR_DTYPE_TO_TORCH_DTYPE, FlexibleArgumentParser,
+                        GiB_bytes)
+from vllm.v1.core.sched.output import SchedulerOutput
+from vllm.v1.core.sched.scheduler import Scheduler
+from vllm.v1.engine import EngineCoreEventType
+from vllm.v1.kv_cache_interface import (FullAttentionSpec, KVCacheConfig,
+                                        KVCacheGroupSpec)
+from vllm.v1.outputs import ModelRunnerOutput
+from vllm.v1.request import Request
+from vllm.v1.structured_output import StructuredOutputManager
+
+
+@dataclasses.dataclass
+class RequestTrace:
+    arrival_time: float
+    prompt_len: int
+    output_len: int
+    first_token_time: Optional[float] = None
+    finish_time: Optional[float] = None
+    num_output_tokens: int = 0
+    num_preemptions: int = 0
+
+
+class SimulatedExecutor:
+    """Stands in for the model executor: samples a random token for each
+    request that completes its prefill in the step, and estimates the time
+    the step would take on the GPU as
+
+        step_latency + token_latency * num_scheduled_tokens
+        + context_token_latency * num_context_tokens + swap time
+
+    where the context tokens are the tokens attended to by the scheduled
+    requests.
+    """
+
+    def __init__(self, scheduler: Scheduler, args: argparse.Namespace,
+                 vocab_size: int):
+        self.scheduler = scheduler
+        self.vocab_size = vocab_size
+        self.step_latency = args.sim_step_latency_ms * 1e-3
+        self.token_latency = args.sim_token_latency_us * 1e-6
+        self.context_token_latency = args.sim_context_token_latency_ns * 1e-9
+
+    def execute_model(self,
+                      scheduler_output: SchedulerOutput) -> ModelRunnerOutput:
+        req_ids = list(scheduler_output.num_scheduled_tokens)
+        sampled_token_ids: list[list[int]] = []
+        for req_id in req_ids:
+            request = self.scheduler.requests[req_id]
+            # NOTE: The scheduler has already advanced num_computed_tokens,
+            # so the requests still in their prefill sample nothing.
+            if request.num_computed_tokens < request.num_tokens:
+                sampled_token_ids.append([])
+            else:
+                sampled_token_ids.append(
+                    [random.randint(0, self.vocab_size - 1)])
+        return ModelRunnerOutput(
+            req_ids=req_ids,
+            req_id_to_index={
+                req_id: i
+                for i, req_id in enumerate(req_ids)
+            },
+            sampled_token_ids=sampled_token_ids,
+            spec_token_ids=None,
+            logprobs=None,
+            prompt_logprobs_dict={},
+        )
+
+    def get_step_time(self, scheduler_output: SchedulerOutput) -> float:
+        num_context_tokens = sum(
+            self.scheduler.requests[req_id].num_computed_tokens
+            for req_id in scheduler_output.num_scheduled_tokens)
+        step_time = (
+            self.step_latency +
+            self.token_latency * scheduler_output.total_num_scheduled_tokens +
+            self.context_token_latency * num_context_tokens)
+        swap_manager = self.scheduler.swap_manager
+        if swap_manager is not None:
+            # swap_time_per_block covers both directions.
+            num_swapped_blocks = (len(scheduler_output.blocks_to_swap_out) +
+                                  len(scheduler_output.blocks_to_swap_in))
+            step_time += (num_swapped_blocks *
+                          swap_manager.swap_time_per_block / 2)
+        return step_time
+
+
+def get_requests(args: argparse.Namespace, tokenizer) -> list[SampleRequest]:
+    common_kwargs = {
+        "dataset_path": args.dataset_path,
+        "random_seed": args.seed or 0,
+    }
+    sample_kwargs = {
+        "tokenizer": tokenizer,
+        "num_requests": args.num_prompts,
+        "input_len": args.input_len,
+        "output_len": args.output_len,
+    }
+    if args.dataset_name == "random":
+        sample_kwargs["prefix_len"] = args.random_prefix_len
+        sample_kwargs["range_ratio"] = args.random_range_ratio
+        dataset_cls = RandomDataset
+    elif args.dataset_name == "sharegpt":
+        dataset_cls = ShareGPTDataset
+    elif args.dataset_name == "burstgpt":
+        dataset_cls = BurstGPTDataset
+    else:
+        raise ValueError(f"Unknown dataset name: {args.dataset_name}")
+    sample_kwargs = {k: v for k, v in sample_kwargs.items() if v is not None}
+    return dataset_cls(**common_kwargs).sample(**sample_kwargs)
+
+
+def create_scheduler(args: argparse.Namespace) -> Scheduler:
+    engine_args = EngineArgs.from_cli_args(args)
+    vllm_config = engine_args.create_engine_config()
+    model_config = vllm_config.model_config
+    cache_config = vllm_config.cache_config
+
+    if cache_config.cache_dtype == "auto":
+        kv_cache_dtype = model_config.dtype
+    else:
+        kv_cache_dtype = STR_DTYPE_TO_TORCH_DTYPE[cache_config.cache_dtype]
+    kv_cache_spec = FullAttentionSpec(
+        block_size=cache_config.block_size,
+        num_kv_heads=model_config.get_num_kv_heads(
+            vllm_config.parallel_config),
+        head_size=model_config.get_head_size(),
+        dtype=kv_cache_dtype,
+        use_mla=model_config.use_mla,
+    )
+    num_gpu_blocks = args.num_gpu_blocks
+    if num_gpu_blocks is None:
+        num_layers = model_config.get_num_layers(vllm_config.parallel_config)
+        num_gpu_blocks = int(args.kv_cache_memory_gb * GiB_bytes //
+                             (kv_cache_spec.page_size_bytes * num_layers))
+    cache_config.num_gpu_blocks = num_gpu_blocks
+    kv_cache_config = KVCacheConfig(
+        num_blocks=num_gpu_blocks,
+        # The tensors are only used by the workers.
+        tensors={},
+        kv_cache_groups=[KVCacheGroupSpec(["layer"], kv_cache_spec)],
+    )
+    return Scheduler(
+        vllm_config=vllm_config,
+        kv_cache_config=kv_cache_config,
+        structured_output_manager=StructuredOutputManager(vllm_config),
+        log_stats=True,
+    )
+
+
+def get_arrival_times(num_requests: int, request_rate: float) -> list[float]:
+    if request_rate == float("inf"):
+        return [0.0] * num_requests
+    intervals = np.random.exponential(1.0 / request_rate, size=num_requests)
+    return np.cumsum(intervals).tolist()
+
+
+def summarize(values: list[float], scale: float = 1e3) -> dict[str, float]:
+    if not values:
+        return {"mean": 0.0, "median": 0.0, "p99": 0.0}
+    array = np.array(values) * scale
+    return {
+        "mean": float(np.mean(array)),
+        "median": float(np.median(array)),
+        "p99": float(np.percentile(array, 99)),
+    }
+
+
+def simulate(args: argparse.Namespace) -> dict[str, Any]:
+    random.seed(args.seed or 0)
+    np.random.seed(args.seed or 0)
+
+    tokenizer = get_tokenizer(args.tokenizer or args.model,
+                              trust_remote_code=args.trust_remote_code)
+    samples = get_requests(args, tokenizer)
+    scheduler = create_scheduler(args)
+    executor = SimulatedExecutor(scheduler, args, len(tokenizer))
+    print(f"Simulating {len(samples)} requests with "
+          f"{scheduler.cache_config.num_gpu_blocks} KV cache blocks.")
+
+    # Tokenize all the prompts ahead, so that it is not counted as the
+    # scheduler overhead.
+    pending: deque[tuple[float, Request]] = deque()
+    traces: dict[str, RequestTrace] = {}
+    arrival_times = get_arrival_times(len(samples), args.request_rate)
+    for i, (sample, arrival_time) in enumerate(zip(samples, arrival_times)):
+        prompt_token_ids = tokenizer(sample.prompt).input_ids
+        request = Request(
+            request_id=str(i),
+            prompt=None,
+            prompt_token_ids=prompt_token_ids,
+            multi_modal_inputs=None,
+            multi_modal_hashes=None,
+            multi_modal_placeholders=None,
+            sampling_params=SamplingParams(
+                max_tokens=sample.expected_output_len, ignore_eos=True),
+            eos_token_id=None,
+            arrival_time=arrival_time,
+        )
+        pending.append((arrival_time, request))
+        traces[request.request_id] = RequestTrace(
+            arrival_time=arrival_time,
+            prompt_len=len(prompt_token_ids),
+            output_len=sample.expected_output_len)
+
+    schedule_times: list[float] = []
+    update_times: list[float] = []
+    num_queries = num_hits = num_evictions = 0
+    sim_time = 0.0
+    num_steps = num_empty_steps = 0
+    while pending or scheduler.has_requests():
+        while pending and pending[0][0] <= sim_time:
+            scheduler.add_request(pending.popleft()[1])
+        if not scheduler.has_requests():
+            # Idle until the next arrival.
+            sim_time = pending[0][0]
+            continue
+
+        start = time.perf_counter()
+        scheduler_output = scheduler.schedule()
+        schedule_time = time.perf_counter() - start
+        model_runner_output = executor.execute_model(scheduler_output)
+        start = time.perf_counter()
+        engine_core_outputs = scheduler.update_from_output(
+            scheduler_output, model_runner_output)
+        update_time = time.perf_counter() - start
+
+        schedule_times.append(schedule_time)
+        update_times.append(update_time)
+        sim_time += executor.get_step_time(scheduler_output)
+        if not args.exclude_scheduler_overhead:
+            # The scheduler runs between the steps on the GPU.
+            sim_time += schedule_time + update_time
+        num_steps += 1
+        if scheduler_output.total_num_scheduled_tokens == 0:
+            num_empty_steps += 1
+            if num_empty_steps > 100 and not pending:
+                raise RuntimeError(
+                    "The scheduler cannot make progress. Try increasing "
+                    "--num-gpu-blocks or --max-num-batched-tokens.")
+        else:
+            num_empty_steps = 0
+
+        stats = engine_core_outputs.scheduler_stats
+        if stats is not None:
+            num_queries += stats.prefix_cache_stats.queries
+            num_hits += stats.prefix_cache_stats.hits
+            num_evictions += stats.prefix_cache_stats.evictions
+        for output in engine_core_outputs.get_all_outputs():
+            trace = traces[output.request_id]
+            if output.new_token_ids:
+                if trace.first_token_time is None:
+                    trace.first_token_time = sim_time
+                trace.num_output_tokens += len(output.new_token_ids)
+            if output.finished:
+                trace.finish_time = sim_time
+            for event in output.events or ():
+                if event.type == EngineCoreEventType.PREEMPTED:
+                    trace.num_preemptions += 1
+
+    ttfts = [
+        trace.first_token_time - trace.arrival_time
+        for trace in traces.values() if trace.first_token_time is not None
+    ]
+    tpots = [(trace.finish_time - trace.first_token_time) /
+             (trace.num_output_tokens - 1) for trace in traces.values()
+             if trace.finish_time is not None and trace.num_output_tokens > 1]
+    step_times = [s + u for s, u in zip(schedule_times, update_times)]
+    num_output_tokens = sum(trace.num_output_tokens
+                            for trace in traces.values())
+    return {
+        "num_requests": len(traces),
+        "num_steps": num_steps,
+        "simulated_duration": sim_time,
+        "request_throughput": len(traces) / sim_time,
+        "output_throughput": num_output_tokens / sim_time,
+        "prefix_cache_hit_rate": num_hits / num_queries if num_queries else 0,
+        "num_preemptions":
+        sum(trace.num_preemptions for trace in traces.values()),
+        "num_evicted_blocks": num_evictions,
+        "schedule_ms": summarize(schedule_times),
+        "update_from_output_ms": summarize(update_times),
+        "scheduler_overhead_ms": summarize(step_times),
+        "ttft_ms": summarize(ttfts),
+        "tpot_ms": summarize(tpots),
+    }
+
+
+def print_result(result: dict[str, Any]) -> None:
+    print("{s:{c}^{n}}".format(s=" Scheduler Simulation Result ", n=50, c='='))
+    print("{:<40} {:<10}".format("Requests:", result["num_requests"]))
+    print("{:<40} {:<10}".format("Steps:", result["num_steps"]))
+    print("{:<40} {:<10.2f}".format("Simulated duration (s):",
+                                    result["simulated_duration"]))
+    print("{:<40} {:<10.2f}".format("Request throughput (req/s):",
+                                    result["request_throughput"]))
+    print("{:<40} {:<10.2f}".format("Output token throughput (tok/s):",
+                                    result["output_throughput"]))
+    print("{:<40} {:<10.4f}".format("Prefix cache hit rate:",
+                                    result["prefix_cache_hit_rate"]))
+    print("{:<40} {:<10}".format("Preemptions:", result["num_preemptions"]))
+    print("{:<40} {:<10}".format("Evicted blocks:",
+                                 result["num_evicted_blocks"]))
+    for key, name in [
+        ("schedule_ms", "schedule() (wall ms)"),
+        ("update_from_output_ms", "update_from_output() (wall ms)"),
+        ("scheduler_overhead_ms", "Scheduler overhead per step (wall ms)"),
+        ("ttft_ms", "TTFT (simulated ms)"),
+        ("tpot_ms", "TPOT (simulated ms)"),
+    ]:
+        print("{s:{c}^{n}}".format(s=name, n=50, c='-'))
+        for stat in ("mean", "median", "p99"):
+            print("{:<40} {:<10.3f}".format(f"{stat.capitalize()}:",
+                                            result[key][stat]))
+    print("=" * 50)
+
+
+def main(args: argparse.Namespace):
+    # The simulator always drives the v1 scheduler.
+    os.environ.setdefault("VLLM_USE_V1", "1")
+    result = simulate(args)
+    print_result(result)
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(result, f, indent=4)
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description="Simulate the v1 scheduler and KV cache manager on the "
+        "CPU with synthetic model outputs.")
+    parser.add_argument("--dataset-name",
+                        type=str,
+                        choices=["random", "sharegpt", "burstgpt"],
+                        default="random")
+    parser.add_argument("--dataset-path",
+                        type=str,
+                        default=None,
+                        help="Path to the ShareGPT or BurstGPT dataset.")
+    parser.add_argument("--num-prompts",
+                        type=int,
+                        default=1000,
+                        help="Number of requests to simulate.")
+    parser.add_argument("--input-len",
+                        type=int,
+                        default=None,
+                        help="Input length of the random dataset.")
+    parser.add_argument("--output-len",
+                        type=int,
+                        default=None,
+                        help="Output length, overriding the dataset's.")
+    parser.add_argument("--random-prefix-len",
+                        type=int,
+                        default=None,
+                        help="Length of the prefix shared by all the random "
+                        "requests.")
+    parser.add_argument("--random-range-ratio",
+                        type=float,
+                        default=None,
+                        help="Range ratio of the random input and output "
+                        "lengths.")
+    parser.add_argument("--request-rate",
+                        type=float,
+                        default=float("inf"),
+                        help="Poisson arrival rate of the requests in "
+                        "simulated req/s. If inf, all the requests arrive "
+                        "at time 0.")
+    parser.add_argument("--num-gpu-blocks",
+                        type=int,
+                        default=None,
+                        help="Number of KV cache blocks. If not set, it is "
+                        "derived from --kv-cache-memory-gb.")
+    parser.add_argument("--kv-cache-memory-gb",
+                        type=float,
+                        default=16,
+                        help="Simulated GPU memory for the KV cache (GiB).")
+    parser.add_argument("--sim-step-latency-ms",
+                        type=float,
+                        default=5.0,
+                        help="Simulated fixed latency of a step.")
+    parser.add_argument("--sim-token-latency-us",
+                        type=float,
+                        default=50.0,
+                        help="Simulated latency per scheduled token.")
+    parser.add_argument("--sim-context-token-latency-ns",
+                        type=float,
+                        default=10.0,
+                        help="Simulated latency per context token attended "
+                        "to by the scheduled requests.")
+    parser.add_argument("--exclude-scheduler-overhead",
+                        action="store_true",
+                        help="Do not add the wall-clock time of the "
+                        "scheduler to the simulated time.")
+    parser.add_argument("--output-json",
+                        type=str,
+                        default=None,
+                        help="Path to save the results in JSON format.")
+    parser = EngineArgs.add_cli_args(parser)
+    main(parser.parse_args())
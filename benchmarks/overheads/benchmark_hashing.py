@@ -2,9 +2,14 @@
 
 import cProfile
 import pstats
+import random
+import time
 
 from vllm import LLM, SamplingParams
 from vllm.utils import FlexibleArgumentParser
+from vllm.v1.core.kv_cache_utils import (get_block_hash_fn, hash_block_tokens,
+                                         hash_request_tokens)
+from vllm.v1.request import Request
 
 # A very long prompt, total number of tokens is about 15k.
 LONG_PROMPT = ["You are an expert in large language models, aren't you?"
@@ -12,7 +17,60 @@ LONG_PROMPT = ["You are an expert in large language models, aren't you?"
 LONG_PROMPT = ' '.join(LONG_PROMPT)
 
 
+def benchmark_block_hashing(args):
+    """Measure the per-token cost of the v1 prefix caching block hashes,
+    with the batched path (hash_request_tokens) and the block-by-block path
+    (hash_block_tokens), for each hash algorithm."""
+    prompt_token_ids = [
+        random.randint(0, 32000) for _ in range(args.num_prompt_tokens)
+    ]
+    request = Request(
+        request_id="0",
+        prompt=None,
+        prompt_token_ids=prompt_token_ids,
+        multi_modal_inputs=None,
+        multi_modal_hashes=None,
+        multi_modal_placeholders=None,
+        sampling_params=SamplingParams(max_tokens=1),
+        eos_token_id=None,
+        arrival_time=0,
+    )
+    num_blocks = args.num_prompt_tokens // args.block_size
+    num_tokens = num_blocks * args.block_size
+
+    def hash_block_by_block(hash_fn):
+        parent_block_hash = None
+        for i in range(num_blocks):
+            block_hash = hash_block_tokens(
+                hash_fn, parent_block_hash,
+                prompt_token_ids[i * args.block_size:(i + 1) *
+                                 args.block_size])
+            parent_block_hash = block_hash.hash_value
+
+    print(f"Hashing {num_tokens} tokens in blocks of {args.block_size} "
+          f"tokens, {args.num_iters} iterations")
+    for hash_algo in args.hash_algos:
+        hash_fn = get_block_hash_fn(hash_algo)
+        for name, func in [
+            ("block-by-block",
+             lambda hash_fn=hash_fn: hash_block_by_block(hash_fn)),
+            ("batched", lambda hash_fn=hash_fn: hash_request_tokens(
+                hash_fn, args.block_size, request)),
+        ]:
+            func()  # Warm up.
+            start = time.perf_counter()
+            for _ in range(args.num_iters):
+                func()
+            elapsed = (time.perf_counter() - start) / args.num_iters
+            print(f"{hash_algo:>8} {name:>15}: {elapsed * 1e3:8.3f} ms per "
+                  f"request, {elapsed / num_tokens * 1e9:8.2f} ns per token")
+
+
 def main(args):
+    if args.micro:
+        benchmark_block_hashing(args)
+        return
+
     llm = LLM(
         model=args.model,
         enforce_eager=True,
@@ -57,5 +115,17 @@ if __name__ == "__main__":
     parser.add_argument('--enable-prefix-caching',
                         action='store_true',
                         help='enable prefix caching')
+    parser.add_argument('--micro',
+                        action='store_true',
+                        help='benchmark the v1 block hashing functions '
+                        'alone, without running a model')
+    parser.add_argument('--num-prompt-tokens', type=int, default=100000)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--num-iters', type=int, default=10)
+    parser.add_argument('--hash-algos',
+                        type=str,
+                        nargs='+',
+                        default=["builtin", "sha256", "fast"],
+                        choices=["builtin", "sha256", "fast"])
     args = parser.parse_args()
     main(args)
@@ -160,3 +160,14 @@ def test_chat_template_validation_for_sad_paths(serve_parser):
     args = serve_parser.parse_args(args=["--chat-template", "does/not/exist"])
     with pytest.raises(ValueError):
         validate_parsed_serve_args(args)
+
+
+def test_api_server_count_fails_with_runtime_lora_updating(
+        serve_parser, monkeypatch):
+    """Ensure validation fails if LoRA adapters can be loaded at runtime
+    with several API servers"""
+    args = serve_parser.parse_args(args=["--api-server-count", "2"])
+    validate_parsed_serve_args(args)
+    monkeypatch.setenv("VLLM_ALLOW_RUNTIME_LORA_UPDATING", "1")
+    with pytest.raises(ValueError):
+        validate_parsed_serve_args(args)
@@ -230,9 +230,13 @@ EXPECTED_METRICS = [
 EXPECTED_METRICS_V1 = [
     "vllm:num_requests_running",
     "vllm:num_requests_waiting",
+    "vllm:scheduler_token_budget",
+    "vllm:step_time_model_intercept_seconds",
+    "vllm:step_time_model_per_token_seconds",
     "vllm:gpu_cache_usage_perc",
     "vllm:gpu_prefix_cache_queries",
     "vllm:gpu_prefix_cache_hits",
+    "vllm:gpu_prefix_cache_evictions",
     "vllm:num_preemptions_total",
     "vllm:prompt_tokens_total",
     "vllm:generation_tokens_total",
@@ -272,6 +276,10 @@ EXPECTED_METRICS_V1 = [
     "vllm:request_decode_time_seconds_sum",
     "vllm:request_decode_time_seconds_bucket",
     "vllm:request_decode_time_seconds_count",
+    "vllm:request_ttft_slo_total",
+    "vllm:request_ttft_slo_missed_total",
+    "vllm:request_tpot_slo_total",
+    "vllm:request_tpot_slo_missed_total",
 ]
 
 HIDDEN_DEPRECATED_METRICS = [
@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: Apache-2.0
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from ...utils import RemoteOpenAIServer
+
+MODEL_NAME = "facebook/opt-125m"
+BLOCK_SIZE = 16
+
+
+def start_server(use_v1: bool) -> RemoteOpenAIServer:
+    args = [
+        "--dtype",
+        "float16",
+        "--max-model-len",
+        "1024",
+        "--enforce-eager",
+        "--block-size",
+        str(BLOCK_SIZE),
+        "--enable-prefix-caching",
+    ]
+    return RemoteOpenAIServer(MODEL_NAME,
+                              args,
+                              env_dict={
+                                  "VLLM_SERVER_DEV_MODE": "1",
+                                  "VLLM_USE_V1": "1" if use_v1 else "0",
+                              })
+
+
+def test_pin_prefix():
+    prefix = list(range(100, 100 + 2 * BLOCK_SIZE + 3))
+    with start_server(use_v1=True) as remote_server:
+        response = requests.post(remote_server.url_for("pin_prefix"),
+                                 json={
+                                     "prompt": prefix,
+                                     "prefix_id": "system"
+                                 })
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            "prefix_id": "system",
+            "num_pinned_tokens": 2 * BLOCK_SIZE
+        }
+
+        response = requests.get(remote_server.url_for("pinned_prefixes"))
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            "pinned_prefixes": {
+                "system": 2 * BLOCK_SIZE
+            }
+        }
+
+        # Invalid requests are rejected.
+        response = requests.post(remote_server.url_for("pin_prefix"),
+                                 json={
+                                     "prompt": prefix,
+                                     "prefix_id": "system"
+                                 })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = requests.post(remote_server.url_for("pin_prefix"),
+                                 json={"prompt": prefix[:BLOCK_SIZE - 1]})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        response = requests.post(remote_server.url_for("unpin_prefix"),
+                                 json={"prefix_id": "system"})
+        assert response.status_code == HTTPStatus.OK
+        response = requests.post(remote_server.url_for("unpin_prefix"),
+                                 json={"prefix_id": "system"})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+        response = requests.get(remote_server.url_for("pinned_prefixes"))
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {"pinned_prefixes": {}}
+
+
+@pytest.fixture(scope="module")
+def v0_server():
+    with start_server(use_v1=False) as remote_server:
+        yield remote_server
+
+
+@pytest.mark.parametrize("method,endpoint,body", [
+    ("post", "pin_prefix", {
+        "prompt": "Hello"
+    }),
+    ("post", "unpin_prefix", {
+        "prefix_id": "system"
+    }),
+    ("get", "pinned_prefixes", None),
+])
+def test_pin_prefix_unsupported_on_v0(v0_server: RemoteOpenAIServer,
+                                      method: str, endpoint: str, body):
+    response = requests.request(method, v0_server.url_for(endpoint), json=body)
+    assert response.status_code == HTTPStatus.NOT_IMPLEMENTED
@@ -52,7 +52,8 @@ def _run_incremental_decode(tokenizer,
                             skip_special_tokens: bool,
                             starting_index: int,
                             spaces_between_special_tokens: bool = True,
-                            fast: Optional[bool] = None):
+                            fast: Optional[bool] = None,
+                            tokens_per_step: int = 1):
 
     prompt_token_ids = all_input_ids[:starting_index]
 
@@ -72,9 +73,9 @@ def _run_incremental_decode(tokenizer,
         detokenizer = SlowIncrementalDetokenizer(tokenizer, request)
 
     output_text = ""
-    for i, token_id in enumerate(all_input_ids[starting_index:]):
-        detokenizer.update([token_id], False)
-        finished = i == len(all_input_ids) - 1
+    for i in range(starting_index, len(all_input_ids), tokens_per_step):
+        detokenizer.update(all_input_ids[i:i + tokens_per_step], False)
+        finished = i + tokens_per_step >= len(all_input_ids)
         output_text += detokenizer.get_next_output_text(finished, delta=True)
 
     return output_text, detokenizer.output_token_ids
@@ -130,8 +131,10 @@ def skip_special_tokens(request, tokenizer_name) -> Generator[bool, Any, None]:
 @pytest.mark.parametrize("skip_special_tokens", (True, False), indirect=True)
 @pytest.mark.parametrize("spaces_between_special_tokens", (True, False))
 @pytest.mark.parametrize("fast", (True, False))
+@pytest.mark.parametrize("tokens_per_step", (1, 4))
 def test_decode_streaming(tokenizer, truth, with_prompt, skip_special_tokens,
-                          spaces_between_special_tokens, fast):
+                          spaces_between_special_tokens, fast,
+                          tokens_per_step):
     if fast and not isinstance(tokenizer, PreTrainedTokenizerFast):
         pytest.skip()
 
@@ -187,7 +190,8 @@ def test_decode_streaming(tokenizer, truth, with_prompt, skip_special_tokens,
         skip_special_tokens=skip_special_tokens,
         starting_index=starting_index,
         spaces_between_special_tokens=spaces_between_special_tokens,
-        fast=fast)
+        fast=fast,
+        tokens_per_step=tokens_per_step)
 
     assert decoded_text == generated
     assert out_ids == all_input_ids[starting_index:]
@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: Apache-2.0
+from vllm.v1.core.encoder_cache_manager import EncoderCacheManager
+
+
+class MockRequest:
+
+    def __init__(self, request_id: str, mm_hashes: list[str],
+                 num_encoder_tokens: int):
+        self.request_id = request_id
+        self.mm_hashes = mm_hashes
+        self.num_encoder_tokens = num_encoder_tokens
+
+    def get_num_encoder_tokens(self, input_id: int) -> int:
+        return self.num_encoder_tokens
+
+
+def test_shared_encoder_output():
+    manager = EncoderCacheManager(cache_size=10)
+    req0 = MockRequest("0", ["image"], 4)
+    req1 = MockRequest("1", ["image"], 4)
+
+    assert not manager.check_and_update_cache(req0, 0)
+    manager.allocate(req0, 0)
+    # The second request reuses the encoder output of the first one.
+    assert manager.check_and_update_cache(req1, 0)
+    assert manager.num_free_slots == 6
+    assert manager.get_cached_input_ids(req1) == {0}
+
+    # The encoder output is kept after the last reference goes away.
+    manager.free(req0)
+    manager.free(req1)
+    assert manager.num_free_slots == 6
+    assert manager.num_freeable_slots == 10
+    assert not manager.get_cached_input_ids(req1)
+    assert not manager.get_freed_mm_hashes()
+
+    # A new request with the same input still hits the cache.
+    req2 = MockRequest("2", ["image"], 4)
+    assert manager.check_and_update_cache(req2, 0)
+    assert manager.num_freeable_slots == 6
+
+
+def test_lru_eviction():
+    manager = EncoderCacheManager(cache_size=10)
+    for i, mm_hash in enumerate(["a", "b"]):
+        request = MockRequest(str(i), [mm_hash], 4)
+        manager.allocate(request, 0)
+        manager.free(request)
+    # Touch "a", so that "b" is the least recently used.
+    request = MockRequest("2", ["a"], 4)
+    assert manager.check_and_update_cache(request, 0)
+    manager.free(request)
+
+    request = MockRequest("3", ["c"], 4)
+    assert manager.can_allocate(request, 0)
+    manager.allocate(request, 0)
+    assert manager.get_freed_mm_hashes() == ["b"]
+    assert manager.num_free_slots == 2
+    assert not manager.check_and_update_cache(MockRequest("4", ["b"], 4), 0)
+
+    # The referenced encoder outputs are never evicted.
+    assert not manager.can_allocate(MockRequest("5", ["d"], 8), 0)
@@ -1,5 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
+from typing import Any, Optional
+
 import pytest
 import torch
 
@@ -14,8 +16,10 @@ from vllm.v1.core.kv_cache_utils import (NONE_HASH, BlockHashType,
                                          FreeKVCacheBlockQueue, KVCacheBlock,
                                          PrefixCachingMetrics,
                                          estimate_max_model_len,
+                                         fast_block_hash,
                                          generate_block_hash_extra_keys,
                                          hash_block_tokens,
+                                         hash_block_tokens_batch,
                                          hash_request_tokens,
                                          unify_kv_cache_configs)
 from vllm.v1.kv_cache_interface import (FullAttentionSpec, KVCacheConfig,
@@ -214,7 +218,7 @@ def test_generate_block_hash_extra_keys_no_mm_inputs():
     assert next_mm_idx == 0
 
 
-@pytest.mark.parametrize("hash_fn", [sha256, hash])
+@pytest.mark.parametrize("hash_fn", [sha256, hash, fast_block_hash])
 def test_hash_block_tokens(hash_fn):
     parent_block_hash = 123
     curr_block_token_ids = (1, 2, 3)
@@ -229,7 +233,7 @@ def test_hash_block_tokens(hash_fn):
     assert block_hash.extra_keys == extra_keys
 
 
-@pytest.mark.parametrize("hash_fn", [sha256, hash])
+@pytest.mark.parametrize("hash_fn", [sha256, hash, fast_block_hash])
 def test_hash_request_tokens(hash_fn):
     request = make_request(
         request_id=0,
@@ -257,7 +261,7 @@ def test_hash_request_tokens(hash_fn):
     assert block_hashes[1].extra_keys == ("hash2", )
 
 
-@pytest.mark.parametrize("hash_fn", [sha256, hash])
+@pytest.mark.parametrize("hash_fn", [sha256, hash, fast_block_hash])
 def test_hash_tokens_different_mm_input(hash_fn):
     request1 = make_request(
         request_id=0,
@@ -284,7 +288,7 @@ def test_hash_tokens_different_mm_input(hash_fn):
     assert block_hashes1[1] != block_hashes2[1]
 
 
-@pytest.mark.parametrize("hash_fn", [sha256, hash])
+@pytest.mark.parametrize("hash_fn", [sha256, hash, fast_block_hash])
 def test_hash_request_tokens_no_mm_inputs(hash_fn):
     request = make_request(
         request_id=0,
@@ -303,6 +307,30 @@ def test_hash_request_tokens_no_mm_inputs(hash_fn):
     assert block_hashes[1].extra_keys is None
 
 
+@pytest.mark.parametrize("hash_fn", [sha256, hash, fast_block_hash])
+def test_hash_block_tokens_batch(hash_fn):
+    block_size = 4
+    token_ids = [(i * 7919) % 32000 for i in range(10 * block_size)]
+    extra_keys: list[Optional[tuple[Any, ...]]] = [None] * 10
+    extra_keys[3] = ("hash1", )
+    extra_keys[7] = (1, "hash2")
+
+    for parent_block_hash in (None, 12345):
+        block_hashes = hash_block_tokens_batch(hash_fn, parent_block_hash,
+                                               token_ids, block_size,
+                                               extra_keys)
+        assert len(block_hashes) == 10
+
+        # The batched hashes are the same as the block-by-block ones.
+        for i, block_hash in enumerate(block_hashes):
+            expected = hash_block_tokens(
+                hash_fn, parent_block_hash,
+                token_ids[i * block_size:(i + 1) * block_size], extra_keys[i])
+            assert block_hash == expected
+            assert isinstance(block_hash.hash_value, int)
+            parent_block_hash = expected.hash_value
+
+
 def test_metrics():
     """
     Test the prefix caching metrics.
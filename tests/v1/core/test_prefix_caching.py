@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 """Compare the with and without prefix caching."""
 
+import random
 from typing import Optional
 
 import pytest
@@ -12,9 +13,11 @@ from vllm.utils import cdiv, sha256
 from vllm.v1.core.block_pool import BlockPool
 from vllm.v1.core.kv_cache_manager import KVCacheManager, Request
 from vllm.v1.core.kv_cache_utils import (BlockHashType, KVCacheBlock,
+                                         get_block_routing_keys,
                                          hash_block_tokens)
 from vllm.v1.kv_cache_interface import (FullAttentionSpec, KVCacheConfig,
                                         KVCacheGroupSpec)
+from vllm.v1.request import RequestStatus
 
 
 def make_request(request_id,
@@ -773,3 +776,193 @@ def test_prefix_cache_stats_disabled():
 
     # Ensure prefix_cache_stats remains None
     assert manager.prefix_cache_stats is None
+
+
+def test_array_block_pool_matches_block_pool():
+    """Test that the array-backed block pool allocates, caches and evicts
+    exactly the same blocks as the default block pool."""
+    managers = [
+        KVCacheManager(
+            make_kv_cache_config(16, 24),
+            max_model_len=8192,
+            enable_caching=True,
+            num_preallocate_tokens=0,
+            block_pool_backend=backend,
+        ) for backend in ("object", "array")
+    ]
+
+    rng = random.Random(0)
+    prefixes = [[i] * 32 for i in range(3)]
+    running: list[Request] = []
+    for step in range(200):
+        if running and (rng.random() < 0.4 or len(running) > 3):
+            req = running.pop(rng.randrange(len(running)))
+            for manager in managers:
+                manager.free(req)
+        else:
+            prompt = (rng.choice(prefixes) + [100 + step] * rng.randint(1, 40))
+            req = make_request(str(step), prompt)
+            new_blocks = []
+            for manager in managers:
+                computed_blocks, num_computed_tokens = (
+                    manager.get_computed_blocks(req))
+                new_blocks.append(
+                    manager.allocate_slots(req,
+                                           len(prompt) - num_computed_tokens,
+                                           computed_blocks))
+            if new_blocks[0] is None:
+                assert new_blocks[1] is None
+                continue
+            assert ([b.block_id for b in new_blocks[0]
+                     ] == [b.block_id for b in new_blocks[1]])
+            running.append(req)
+
+        ref_manager, array_manager = managers
+        assert (ref_manager.block_pool.get_num_free_blocks() ==
+                array_manager.block_pool.get_num_free_blocks())
+        assert [
+            b.block_id for b in
+            ref_manager.block_pool.free_block_queue.get_all_free_blocks()
+        ] == array_manager.block_pool.get_free_block_ids()
+        for req in running:
+            assert ([(b.block_id, b.ref_cnt, b.block_hash)
+                     for b in ref_manager.req_to_blocks[req.request_id]] == [
+                         (b.block_id, b.ref_cnt, b.block_hash)
+                         for b in array_manager.req_to_blocks[req.request_id]
+                     ])
+
+
+@pytest.mark.parametrize("eviction_policy,expect_shared_hit", [
+    ("lru", False),
+    ("lfu", True),
+    ("cost", True),
+])
+def test_eviction_policy(eviction_policy: str, expect_shared_hit: bool):
+    """Test that the frequency and cost aware policies keep a shared system
+    prompt that is evicted by LRU under a stream of one-off requests."""
+    manager = KVCacheManager(
+        make_kv_cache_config(16, 11),
+        max_model_len=8192,
+        enable_caching=True,
+        num_preallocate_tokens=0,
+        log_stats=True,
+        eviction_policy=eviction_policy,
+    )
+
+    def run(req_id: str, prompt: list[int]) -> int:
+        req = make_request(req_id, prompt)
+        computed_blocks, num_computed_tokens = manager.get_computed_blocks(req)
+        assert manager.allocate_slots(req,
+                                      len(prompt) - num_computed_tokens,
+                                      computed_blocks) is not None
+        manager.free(req)
+        return len(computed_blocks)
+
+    system_prompt = [i for i in range(2) for _ in range(16)]
+    assert run("0", system_prompt + [10] * 16) == 0
+    assert run("1", system_prompt + [11] * 16) == 2
+    # One-off requests fill up the cache.
+    assert run("2", [20] * 48) == 0
+    assert run("3", [21] * 48) == 0
+    # This request has to evict 4 cached blocks.
+    assert run("4", [22] * 64) == 0
+    stats = manager.make_prefix_cache_stats()
+    assert stats is not None and stats.evictions == 4
+
+    num_hits = run("5", system_prompt + [12] * 16)
+    assert num_hits == (2 if expect_shared_hit else 0)
+
+
+def test_prefix_cache_events():
+    """Test that the block pool reports the routing keys of the cached and
+    evicted blocks."""
+    manager = KVCacheManager(
+        make_kv_cache_config(16, 5),
+        max_model_len=8192,
+        enable_caching=True,
+        num_preallocate_tokens=0,
+        enable_kv_cache_events=True,
+    )
+    assert manager.take_prefix_cache_events() is None
+
+    prompt0 = [i for i in range(3) for _ in range(16)] + [3]
+    req0 = make_request("0", prompt0)
+    assert manager.allocate_slots(req0, len(prompt0)) is not None
+    events = manager.take_prefix_cache_events()
+    assert events is not None and not events.reset
+    assert events.stored == get_block_routing_keys(prompt0, 16)
+    assert not events.removed
+    manager.free(req0)
+    assert manager.take_prefix_cache_events() is None
+
+    # Evicts the tail blocks of req0 first.
+    prompt1 = [10] * 40
+    req1 = make_request("1", prompt1)
+    assert manager.allocate_slots(req1, len(prompt1)) is not None
+    events = manager.take_prefix_cache_events()
+    assert events is not None
+    assert events.stored == get_block_routing_keys(prompt1, 16)
+    assert events.removed == get_block_routing_keys(prompt0, 16)[:0:-1]
+    manager.free(req1)
+
+    assert manager.reset_prefix_cache()
+    events = manager.take_prefix_cache_events()
+    assert events is not None and events.reset
+    assert not events.stored and not events.removed
+
+
+def test_pin_prefix():
+    """Test that pinned prefixes are never evicted."""
+    manager = KVCacheManager(
+        make_kv_cache_config(16, 11),
+        max_model_len=8192,
+        enable_caching=True,
+        num_preallocate_tokens=0,
+        max_num_pinned_blocks=3,
+    )
+    system_prompt = [i for i in range(3) for _ in range(16)] + [3] * 7
+
+    # The prefix must be cached before being pinned.
+    assert manager.pin_prefix("tenant0", system_prompt) == 0
+    req0 = make_request("0", system_prompt)
+    assert manager.allocate_slots(req0, len(system_prompt)) is not None
+    manager.free(req0)
+    assert manager.pin_prefix("tenant0", system_prompt) == 48
+    assert manager.list_pinned_prefixes() == {"tenant0": 48}
+    with pytest.raises(ValueError):
+        manager.pin_prefix("tenant0", system_prompt)
+    # The pinned blocks count towards the limit only once.
+    assert manager.pin_prefix("tenant1", system_prompt[:32]) == 32
+    assert manager.unpin_prefix("tenant1")
+
+    # The pinned blocks are not evictable.
+    assert manager.block_pool.get_num_free_blocks() == 7
+    req1 = make_request("1", [10] * 16 * 7)
+    assert manager.allocate_slots(req1, 16 * 7) is not None
+    manager.free(req1)
+
+    # The pinned references do not count for the common prefix.
+    req2 = make_request("2", system_prompt)
+    computed_blocks, num_computed_tokens = manager.get_computed_blocks(req2)
+    assert num_computed_tokens == 48
+    assert manager.allocate_slots(req2,
+                                  len(system_prompt) - 48,
+                                  computed_blocks) is not None
+    req2.status = RequestStatus.RUNNING
+    assert manager.get_num_common_prefix_blocks(req2, 1) == 4
+
+    # The limit of pinned blocks is enforced.
+    manager.free(req2)
+    other_prompt = [20] * 32
+    req3 = make_request("3", other_prompt)
+    assert manager.allocate_slots(req3, len(other_prompt)) is not None
+    manager.free(req3)
+    with pytest.raises(ValueError):
+        manager.pin_prefix("tenant2", other_prompt)
+
+    # The prefix cache cannot be reset while prefixes are pinned.
+    assert not manager.reset_prefix_cache()
+    assert manager.unpin_prefix("tenant0")
+    assert not manager.unpin_prefix("tenant0")
+    assert manager.list_pinned_prefixes() == {}
+    assert manager.reset_prefix_cache()
@@ -8,14 +8,19 @@ import torch
 from vllm.config import (CacheConfig, KVTransferConfig, ModelConfig,
                          SchedulerConfig, VllmConfig)
 from vllm.multimodal.inputs import MultiModalKwargs, PlaceholderRange
-from vllm.sampling_params import SamplingParams
-from vllm.v1.core.sched.output import SchedulerOutput
+from vllm.sampling_params import GuidedDecodingParams, SamplingParams
+from vllm.v1.core.sched.async_scheduler import AsyncScheduler
+from vllm.v1.core.sched.output import CachedRequestData, SchedulerOutput
 from vllm.v1.core.sched.scheduler import Scheduler
+from vllm.v1.core.sched.utils import BatchStopChecker, StepTimeEstimator
 from vllm.v1.kv_cache_interface import (FullAttentionSpec, KVCacheConfig,
                                         KVCacheGroupSpec)
 from vllm.v1.outputs import ModelRunnerOutput
 from vllm.v1.request import Request, RequestStatus
 from vllm.v1.structured_output import StructuredOutputManager
+from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
+                                                     StructuredOutputGrammar)
+from vllm.v1.structured_output.request import StructuredOutputRequest
 
 EOS_TOKEN_ID = 50256
 
@@ -30,6 +35,14 @@ def create_scheduler(
     use_kv_connector: bool = False,
     num_blocks: int = 10000,
     block_size: int = 16,
+    kv_connector: str = "SharedStorageConnector",
+    kv_connector_extra_config: Optional[dict] = None,
+    policy: str = "fcfs",
+    fair_share_weights: Optional[dict[str, float]] = None,
+    preemption_mode: Optional[str] = None,
+    swap_space: float = 0,
+    async_scheduling: bool = False,
+    target_step_time: Optional[float] = None,
 ) -> Scheduler:
     '''Create scheduler under test.
 
@@ -50,6 +63,13 @@ def create_scheduler(
         max_model_len=max_num_batched_tokens,
         long_prefill_token_threshold=long_prefill_token_threshold,
         disable_chunked_mm_input=disable_chunked_mm_input,
+        policy=policy,
+        fair_share_key="user",
+        fair_share_weights=fair_share_weights,
+        preemption_mode=preemption_mode,
+        # Always swap when swap preemption is enabled.
+        preemption_recompute_throughput=1.0,
+        target_step_time=target_step_time,
     )
     model_config = ModelConfig(
         model=model,
@@ -67,14 +87,16 @@ def create_scheduler(
     cache_config = CacheConfig(
         block_size=block_size,
         gpu_memory_utilization=0.9,
-        swap_space=0,
+        swap_space=swap_space,
         cache_dtype="auto",
         **kwargs_cache,
     )
     kv_transfer_config = KVTransferConfig(
-        kv_connector="SharedStorageConnector",
+        kv_connector=kv_connector,
         kv_role="kv_both",
-        kv_connector_extra_config={"shared_storage_path": "local_storage"},
+        kv_connector_extra_config=(kv_connector_extra_config or {
+            "shared_storage_path": "local_storage"
+        }),
     ) if use_kv_connector else None
 
     vllm_config = VllmConfig(
@@ -93,7 +115,8 @@ def create_scheduler(
         ],
     )
     cache_config.num_gpu_blocks = num_blocks
-    return Scheduler(
+    scheduler_cls = AsyncScheduler if async_scheduling else Scheduler
+    return scheduler_cls(
         vllm_config=vllm_config,
         kv_cache_config=kv_cache_config,
         log_stats=True,
@@ -116,9 +139,11 @@ def create_requests(num_requests: int,
         if mm_positions is not None:
             mm_position = mm_positions[i]
             mm_inputs = [MultiModalKwargs({})] * len(mm_position)
+            mm_hashes = [f"hash_{i}_{j}" for j in range(len(mm_position))]
         else:
             mm_position = None
             mm_inputs = None
+            mm_hashes = None
         request = Request(
             request_id=f"{i}",
             prompt=None,
@@ -126,7 +151,7 @@ def create_requests(num_requests: int,
             sampling_params=sampling_params,
             multi_modal_inputs=mm_inputs,
             multi_modal_placeholders=mm_position,
-            multi_modal_hashes=None,
+            multi_modal_hashes=mm_hashes,
             eos_token_id=EOS_TOKEN_ID,
             arrival_time=0,
         )
@@ -432,25 +457,28 @@ def test_stop_via_update_from_output():
         req.num_computed_tokens = req.num_tokens
         scheduler.requests[req.request_id] = req
         scheduler.running.append(req)
+        scheduler.stop_checker.append(req)
         scheduler.scheduled_req_ids.add(req.request_id)
 
-    scheduler_output = SchedulerOutput(scheduled_new_reqs=[],
-                                       scheduled_cached_reqs=[],
-                                       num_scheduled_tokens={
-                                           requests[0].request_id: 1,
-                                           requests[1].request_id: 2
-                                       },
-                                       total_num_scheduled_tokens=3,
-                                       scheduled_encoder_inputs={},
-                                       scheduled_spec_decode_tokens={
-                                           requests[0].request_id: [],
-                                           requests[1].request_id: [10]
-                                       },
-                                       num_common_prefix_blocks=0,
-                                       finished_req_ids=set(),
-                                       free_encoder_input_ids=[],
-                                       structured_output_request_ids={},
-                                       grammar_bitmask=None)
+    scheduler_output = SchedulerOutput(
+        scheduled_new_reqs=[],
+        scheduled_cached_reqs=CachedRequestData.make_empty(),
+        num_scheduled_tokens={
+            requests[0].request_id: 1,
+            requests[1].request_id: 2
+        },
+        total_num_scheduled_tokens=3,
+        scheduled_encoder_inputs={},
+        scheduled_spec_decode_tokens={
+            requests[0].request_id: [],
+            requests[1].request_id: [10]
+        },
+        num_common_prefix_blocks=0,
+        finished_req_ids=set(),
+        free_encoder_mm_hashes=[],
+        structured_output_request_ids={},
+        grammar_bitmask=None,
+    )
 
     model_output = ModelRunnerOutput(
         req_ids=[req.request_id for req in requests],
@@ -484,25 +512,28 @@ def test_stop_via_update_from_output():
         req.num_computed_tokens = req.num_tokens
         scheduler.requests[req.request_id] = req
         scheduler.running.append(req)
+        scheduler.stop_checker.append(req)
         scheduler.scheduled_req_ids.add(req.request_id)
 
-    scheduler_output = SchedulerOutput(scheduled_new_reqs=[],
-                                       scheduled_cached_reqs=[],
-                                       num_scheduled_tokens={
-                                           requests[0].request_id: 3,
-                                           requests[1].request_id: 2
-                                       },
-                                       total_num_scheduled_tokens=5,
-                                       scheduled_encoder_inputs={},
-                                       scheduled_spec_decode_tokens={
-                                           requests[0].request_id: [10, 42],
-                                           requests[1].request_id: [13]
-                                       },
-                                       num_common_prefix_blocks=0,
-                                       finished_req_ids=set(),
-                                       free_encoder_input_ids=[],
-                                       structured_output_request_ids={},
-                                       grammar_bitmask=None)
+    scheduler_output = SchedulerOutput(
+        scheduled_new_reqs=[],
+        scheduled_cached_reqs=CachedRequestData.make_empty(),
+        num_scheduled_tokens={
+            requests[0].request_id: 3,
+            requests[1].request_id: 2
+        },
+        total_num_scheduled_tokens=5,
+        scheduled_encoder_inputs={},
+        scheduled_spec_decode_tokens={
+            requests[0].request_id: [10, 42],
+            requests[1].request_id: [13]
+        },
+        num_common_prefix_blocks=0,
+        finished_req_ids=set(),
+        free_encoder_mm_hashes=[],
+        structured_output_request_ids={},
+        grammar_bitmask=None,
+    )
 
     model_output = ModelRunnerOutput(
         req_ids=[req.request_id for req in requests],
@@ -534,25 +565,28 @@ def test_stop_via_update_from_output():
         req.num_computed_tokens = req.num_tokens
         scheduler.requests[req.request_id] = req
         scheduler.running.append(req)
+        scheduler.stop_checker.append(req)
         scheduler.scheduled_req_ids.add(req.request_id)
 
-    scheduler_output = SchedulerOutput(scheduled_new_reqs=[],
-                                       scheduled_cached_reqs=[],
-                                       num_scheduled_tokens={
-                                           requests[0].request_id: 3,
-                                           requests[1].request_id: 1
-                                       },
-                                       total_num_scheduled_tokens=4,
-                                       scheduled_encoder_inputs={},
-                                       scheduled_spec_decode_tokens={
-                                           requests[0].request_id: [10, 11],
-                                           requests[1].request_id: []
-                                       },
-                                       num_common_prefix_blocks=0,
-                                       finished_req_ids=set(),
-                                       free_encoder_input_ids=[],
-                                       structured_output_request_ids={},
-                                       grammar_bitmask=None)
+    scheduler_output = SchedulerOutput(
+        scheduled_new_reqs=[],
+        scheduled_cached_reqs=CachedRequestData.make_empty(),
+        num_scheduled_tokens={
+            requests[0].request_id: 3,
+            requests[1].request_id: 1
+        },
+        total_num_scheduled_tokens=4,
+        scheduled_encoder_inputs={},
+        scheduled_spec_decode_tokens={
+            requests[0].request_id: [10, 11],
+            requests[1].request_id: []
+        },
+        num_common_prefix_blocks=0,
+        finished_req_ids=set(),
+        free_encoder_mm_hashes=[],
+        structured_output_request_ids={},
+        grammar_bitmask=None,
+    )
 
     model_output = ModelRunnerOutput(
         req_ids=[req.request_id for req in requests],
@@ -584,11 +618,12 @@ def test_stop_via_update_from_output():
     requests[0].num_computed_tokens = requests[0].num_tokens
     scheduler.requests[requests[0].request_id] = requests[0]
     scheduler.running.append(requests[0])
+    scheduler.stop_checker.append(requests[0])
     scheduler.scheduled_req_ids.add(requests[0].request_id)
 
     scheduler_output = SchedulerOutput(
         scheduled_new_reqs=[],
-        scheduled_cached_reqs=[],
+        scheduled_cached_reqs=CachedRequestData.make_empty(),
         num_scheduled_tokens={requests[0].request_id: 3},
         total_num_scheduled_tokens=3,
         scheduled_encoder_inputs={},
@@ -597,7 +632,7 @@ def test_stop_via_update_from_output():
         },
         num_common_prefix_blocks=0,
         finished_req_ids=set(),
-        free_encoder_input_ids=[],
+        free_encoder_mm_hashes=[],
         structured_output_request_ids={},
         grammar_bitmask=None)
 
@@ -1158,3 +1193,496 @@ def test_kv_connector_handles_preemption():
     # All memory should be freed since nothing is running.
     assert scheduler.kv_cache_manager.block_pool.get_num_free_blocks() \
         == NUM_BLOCKS - 1
+
+
+def test_cpu_offload_connector():
+    """
+    Test that CPUOffloadConnector offloads the blocks evicted from the
+    prefix cache and loads them back on a later hit.
+    """
+    block_size = 16
+    scheduler = create_scheduler(
+        enable_prefix_caching=True,
+        use_kv_connector=True,
+        num_blocks=10,
+        block_size=block_size,
+        kv_connector="CPUOffloadConnector",
+        kv_connector_extra_config={"cpu_offload_size_gb": 0.01},
+    )
+    kv_cache_manager = scheduler.kv_cache_manager
+
+    def make_request(request_id: str, token_id: int) -> Request:
+        return Request(
+            request_id=request_id,
+            prompt=None,
+            prompt_token_ids=[token_id] * (3 * block_size + 2),
+            sampling_params=SamplingParams(max_tokens=1),
+            multi_modal_inputs=None,
+            multi_modal_placeholders=None,
+            multi_modal_hashes=None,
+            eos_token_id=EOS_TOKEN_ID,
+            arrival_time=0,
+        )
+
+    # The first request fills 3 full blocks of the prefix cache.
+    scheduler.add_request(make_request("0", 0))
+    output = scheduler.schedule()
+    assert not output.kv_connector_metadata.blocks_to_offload
+    req0_blocks = [b.block_id for b in kv_cache_manager.req_to_blocks["0"]]
+    scheduler.finish_requests("0", RequestStatus.FINISHED_ABORTED)
+
+    # The second request evicts the last 2 cached blocks of the first one.
+    scheduler.add_request(make_request("1", 1))
+    output = scheduler.schedule()
+    assert output.kv_connector_metadata.blocks_to_offload == [
+        (req0_blocks[2], 0), (req0_blocks[1], 1)
+    ]
+    assert not output.kv_connector_metadata.blocks_to_load
+    scheduler.finish_requests("1", RequestStatus.FINISHED_ABORTED)
+
+    # The third request shares the prompt of the first one: the first block
+    # is a local hit and the next 2 blocks are loaded from the host memory.
+    scheduler.add_request(make_request("2", 0))
+    output = scheduler.schedule()
+    assert output.num_scheduled_tokens["2"] == 2
+    req2_blocks = [b.block_id for b in kv_cache_manager.req_to_blocks["2"]]
+    assert req2_blocks[0] == req0_blocks[0]
+    assert output.kv_connector_metadata.blocks_to_load == [(1, req2_blocks[1]),
+                                                           (0, req2_blocks[2])]
+
+
+def test_disk_cache_connector_restart(tmp_path):
+    """
+    Test that DiskCacheConnector saves the full blocks, persists its index
+    and reuses the blocks found on disk after a restart.
+    """
+    block_size = 16
+    extra_config = {
+        "disk_cache_path": str(tmp_path),
+        "disk_cache_size_gb": 0.01,
+        "disk_cache_manifest_interval": 0,
+    }
+
+    def make_scheduler() -> Scheduler:
+        return create_scheduler(enable_prefix_caching=True,
+                                use_kv_connector=True,
+                                block_size=block_size,
+                                kv_connector="DiskCacheConnector",
+                                kv_connector_extra_config=extra_config)
+
+    scheduler = make_scheduler()
+    request = create_requests(num_requests=1, num_tokens=3 * block_size + 2)[0]
+    scheduler.add_request(request)
+    output = scheduler.schedule()
+    meta = output.kv_connector_metadata
+    block_ids = [
+        b.block_id
+        for b in scheduler.kv_cache_manager.req_to_blocks[request.request_id]
+    ]
+    assert [block_id for _, block_id in meta.blocks_to_save] == block_ids[:3]
+    assert not meta.blocks_to_load
+
+    # Emulate the worker writing the block files.
+    connector = scheduler.connector
+    for key, _ in meta.blocks_to_save:
+        with open(connector._get_filename(key, 0), "w"):
+            pass
+    connector._manifest_executor.shutdown(wait=True)
+
+    # After a restart, the blocks are loaded from disk.
+    scheduler = make_scheduler()
+    request = create_requests(num_requests=1, num_tokens=3 * block_size + 2)[0]
+    scheduler.add_request(request)
+    output = scheduler.schedule()
+    assert output.num_scheduled_tokens[request.request_id] == 2
+    assert [key for key, _ in output.kv_connector_metadata.blocks_to_load
+            ] == [key for key, _ in meta.blocks_to_save]
+    assert not output.kv_connector_metadata.blocks_to_save
+
+
+def test_priority_scheduling():
+    scheduler = create_scheduler(max_num_seqs=1, policy="priority")
+    requests = create_requests(num_requests=3)
+    for request, priority in zip(requests, [2, 0, 1]):
+        request.priority = priority
+        scheduler.add_request(request)
+
+    # The requests are admitted in the order of their priorities.
+    admitted: list[str] = []
+    for _ in range(len(requests)):
+        output = scheduler.schedule()
+        admitted.extend(req.req_id for req in output.scheduled_new_reqs)
+        scheduler.finish_requests(admitted[-1], RequestStatus.FINISHED_ABORTED)
+    assert admitted == ["1", "2", "0"]
+
+
+def test_wfq_scheduling():
+    scheduler = create_scheduler(max_num_seqs=1,
+                                 policy="wfq",
+                                 fair_share_weights={"a": 2.0})
+    # Tenant "a" has twice the weight of tenant "b", and submits all its
+    # requests before tenant "b".
+    requests = create_requests(num_requests=6)
+    for i, request in enumerate(requests):
+        request.sampling_params = request.sampling_params.clone()
+        request.sampling_params.extra_args = {"user": "a" if i < 3 else "b"}
+        scheduler.add_request(request)
+
+    admitted: list[str] = []
+    for _ in range(len(requests)):
+        output = scheduler.schedule()
+        admitted.extend(req.req_id for req in output.scheduled_new_reqs)
+        scheduler.finish_requests(admitted[-1], RequestStatus.FINISHED_ABORTED)
+    # Tenant "a" gets two turns for each turn of tenant "b".
+    assert admitted == ["0", "3", "1", "2", "4", "5"]
+
+
+def test_slo_scheduling():
+    scheduler = create_scheduler(max_num_seqs=1, policy="slo")
+    # The requests are admitted in the order of their TTFT deadlines, and
+    # the ones without a deadline come last.
+    requests = create_requests(num_requests=4)
+    for request, arrival_time, ttft_slo in zip(requests, [0, 1, 2, 3],
+                                               [None, 5.0, 1.0, 2.0]):
+        request.arrival_time = arrival_time
+        request.sampling_params = request.sampling_params.clone()
+        request.sampling_params.ttft_slo = ttft_slo
+        scheduler.add_request(request)
+
+    admitted: list[str] = []
+    for _ in range(len(requests)):
+        output = scheduler.schedule()
+        admitted.extend(req.req_id for req in output.scheduled_new_reqs)
+        scheduler.finish_requests(admitted[-1], RequestStatus.FINISHED_ABORTED)
+    assert admitted == ["2", "3", "1", "0"]
+
+
+def test_adaptive_token_budget():
+    scheduler = create_scheduler(target_step_time=0.05)
+    requests = create_requests(num_requests=10, num_tokens=100)
+    for request in requests:
+        scheduler.add_request(request)
+
+    # The budget is not capped before the step time model is fitted.
+    output = scheduler.schedule()
+    assert output.total_num_scheduled_tokens == 1000
+    assert scheduler.last_token_budget == scheduler.max_num_scheduled_tokens
+
+    # The steps take 10ms plus 1ms per token, so 40 tokens fit in 50ms.
+    assert scheduler.step_time_estimator is not None
+    for num_tokens in [16, 256, 64, 1024]:
+        scheduler.step_time_estimator.observe(num_tokens,
+                                              0.01 + 0.001 * num_tokens)
+    for request in create_requests(num_requests=20, num_tokens=100)[10:]:
+        scheduler.add_request(request)
+    output = scheduler.schedule()
+    assert scheduler.last_token_budget in (39, 40)
+    assert output.total_num_scheduled_tokens == scheduler.last_token_budget
+
+    stats = scheduler.make_stats()
+    assert stats is not None
+    assert stats.token_budget == scheduler.last_token_budget
+    assert stats.step_time_model == pytest.approx((0.01, 0.001))
+
+
+def test_step_time_estimator():
+    estimator = StepTimeEstimator()
+    assert estimator.get_max_num_tokens(1.0) is None
+    for num_tokens in [16, 256, 64, 1024]:
+        estimator.observe(num_tokens, 0.01 + 0.001 * num_tokens)
+    a, b = estimator.get_params()
+    assert a == pytest.approx(0.01)
+    assert b == pytest.approx(0.001)
+    assert estimator.estimate(100) == pytest.approx(0.11)
+    assert estimator.get_max_num_tokens(0.05) == pytest.approx(40, abs=1)
+
+
+def test_batch_stop_checker():
+    checker = BatchStopChecker(max_num_reqs=4, max_model_len=14)
+    # Length capped by max_tokens (at 13 tokens), by stop tokens, and by
+    # max_model_len (at 14 tokens).
+    request_max_tokens = create_requests(num_requests=1, max_tokens=3)[0]
+    request_stop = create_requests(num_requests=2, stop_token_ids=[42, 43])[1]
+    request_long = create_requests(num_requests=3, num_tokens=12)[2]
+    for request in (request_max_tokens, request_stop, request_long):
+        checker.append(request)
+
+    # The number of new tokens up to the stop, by row.
+    assert checker.check([[1, 2], [5, 43, 6], [EOS_TOKEN_ID]]) == {1: 2, 2: 1}
+    checker.remove([1, 2])
+    assert checker.check([[3, 4]]) == {0: 1}
+
+    # The rows follow the pops.
+    checker.append(request_stop)
+    checker.append(request_long)
+    checker.pop(0)
+    assert checker.check([[], [7]]) == {}
+    assert checker.check([[42], [8]]) == {0: 1, 1: 1}
+
+
+@pytest.mark.parametrize("policy, preempted_req_id", [
+    ("fcfs", "1"),
+    ("priority", "0"),
+    ("slo", "0"),
+])
+def test_priority_preemption(policy: str, preempted_req_id: str):
+    """Test that the lowest-priority running request is preempted, even if
+    it was admitted before the others."""
+    block_size = 16
+    # NOTE: there is 1 null block, so this is 3 blocks.
+    scheduler = create_scheduler(enable_prefix_caching=False,
+                                 block_size=block_size,
+                                 num_blocks=4,
+                                 policy=policy)
+    scheduler.kv_cache_manager.num_preallocate_blocks = 0
+    # Request 0 (2 blocks) has a lower priority than request 1 (1 block).
+    request_low = create_requests(num_requests=1,
+                                  num_tokens=2 * block_size - 1)[0]
+    request_high = create_requests(num_requests=2, num_tokens=block_size)[1]
+    request_low.priority = 1
+    request_high.priority = 0
+
+    def step(output: SchedulerOutput) -> None:
+        req_ids = list(output.num_scheduled_tokens)
+        scheduler.update_from_output(
+            output,
+            ModelRunnerOutput(
+                req_ids=req_ids,
+                req_id_to_index={
+                    req_id: i
+                    for i, req_id in enumerate(req_ids)
+                },
+                sampled_token_ids=[[1000]] * len(req_ids),
+                spec_token_ids=None,
+                logprobs=None,
+                prompt_logprobs_dict={},
+            ))
+
+    scheduler.add_request(request_low)
+    step(scheduler.schedule())
+    scheduler.add_request(request_high)
+    step(scheduler.schedule())
+    assert scheduler.running == [request_low, request_high]
+
+    # Request 0 needs a new block, but all the blocks are in use.
+    output = scheduler.schedule()
+    assert len(scheduler.running) == 1
+    assert len(scheduler.waiting) == 1
+    preempted_req = scheduler.waiting.peek_request()
+    assert preempted_req.request_id == preempted_req_id
+    assert preempted_req.status == RequestStatus.PREEMPTED
+    assert preempted_req_id not in output.num_scheduled_tokens
+
+
+def test_swap_preemption():
+    """Test that a request preempted by swapping keeps its computed tokens
+    and gets its KV cache blocks swapped back in when it is resumed."""
+    block_size = 16
+    # NOTE: there is 1 null block, so this is 3 blocks.
+    scheduler = create_scheduler(enable_prefix_caching=False,
+                                 block_size=block_size,
+                                 num_blocks=4,
+                                 preemption_mode="swap",
+                                 swap_space=1)
+    assert scheduler.swap_manager is not None
+    scheduler.kv_cache_manager.num_preallocate_blocks = 0
+    requests = create_requests(num_requests=2, num_tokens=block_size)
+    requests[0] = create_requests(num_requests=1,
+                                  num_tokens=2 * block_size - 1)[0]
+
+    def step(output: SchedulerOutput) -> None:
+        req_ids = list(output.num_scheduled_tokens)
+        scheduler.update_from_output(
+            output,
+            ModelRunnerOutput(
+                req_ids=req_ids,
+                req_id_to_index={
+                    req_id: i
+                    for i, req_id in enumerate(req_ids)
+                },
+                sampled_token_ids=[[1000]] * len(req_ids),
+                spec_token_ids=None,
+                logprobs=None,
+                prompt_logprobs_dict={},
+            ))
+
+    for request in requests:
+        scheduler.add_request(request)
+        step(scheduler.schedule())
+    swapped_req = requests[1]
+    gpu_block_ids = scheduler.kv_cache_manager.get_block_ids(
+        swapped_req.request_id)
+
+    # Request 0 needs a new block, so request 1 is swapped out.
+    output = scheduler.schedule()
+    assert scheduler.waiting.peek_request() is swapped_req
+    assert swapped_req.status == RequestStatus.PREEMPTED
+    cpu_block_ids = scheduler.swap_manager.req_to_cpu_blocks[
+        swapped_req.request_id]
+    assert output.blocks_to_swap_out == list(zip(gpu_block_ids, cpu_block_ids))
+    assert not output.blocks_to_swap_in
+    step(output)
+
+    # Request 1 is resumed after request 0 finishes, and only its last
+    # token is computed.
+    scheduler.finish_requests(requests[0].request_id,
+                              RequestStatus.FINISHED_ABORTED)
+    output = scheduler.schedule()
+    assert output.num_scheduled_tokens == {swapped_req.request_id: 1}
+    assert output.scheduled_cached_reqs.resumed_from_preemption[0]
+    assert output.scheduled_cached_reqs.num_computed_tokens[0] == block_size
+    new_gpu_block_ids = scheduler.kv_cache_manager.get_block_ids(
+        swapped_req.request_id)
+    assert output.blocks_to_swap_in == list(
+        zip(cpu_block_ids, new_gpu_block_ids))
+    assert not scheduler.swap_manager.req_to_cpu_blocks
+    assert (scheduler.swap_manager.get_num_free_blocks() ==
+            scheduler.swap_manager.num_cpu_blocks)
+
+
+def test_async_scheduling():
+    """Test that the async scheduler schedules the next step before the
+    outputs of the current step are received, and drops the tokens of the
+    steps in flight when a request stops."""
+    scheduler = create_scheduler(async_scheduling=True)
+    requests = create_requests(num_requests=2, max_tokens=3)
+    for request in requests:
+        scheduler.add_request(request)
+
+    def update(output: SchedulerOutput, sampled_token_ids: list[list[int]]):
+        req_ids = list(output.num_scheduled_tokens)
+        return scheduler.update_from_output(
+            output,
+            ModelRunnerOutput(
+                req_ids=req_ids,
+                req_id_to_index={
+                    req_id: i
+                    for i, req_id in enumerate(req_ids)
+                },
+                sampled_token_ids=sampled_token_ids,
+                spec_token_ids=None,
+                logprobs=None,
+                prompt_logprobs_dict={},
+            ))
+
+    # The decode step is scheduled before the prefill outputs are received,
+    # so its input tokens are not known by the scheduler.
+    output0 = scheduler.schedule()
+    output1 = scheduler.schedule()
+    assert output1.num_scheduled_tokens == {"0": 1, "1": 1}
+    assert len(output1.scheduled_cached_reqs.new_token_ids) == 0
+    assert all(request.num_output_placeholders == 2 for request in requests)
+
+    update(output0, [[100], [100]])
+    output2 = scheduler.schedule()
+    assert output2.num_scheduled_tokens == {"0": 1, "1": 1}
+
+    # Request 1 stops, and the token of output2 is dropped for it.
+    update(output1, [[100], [EOS_TOKEN_ID]])
+    assert requests[1].is_finished()
+    assert requests[0].num_output_placeholders == 1
+    # Request 0 is not scheduled, since the step in flight generates its
+    # last token.
+    output3 = scheduler.schedule()
+    assert output3.total_num_scheduled_tokens == 0
+    assert output3.finished_req_ids == {"1"}
+
+    update(output2, [[100], [100]])
+    assert requests[0].is_finished()
+    assert list(requests[0].output_token_ids) == [100, 100, 100]
+    assert list(requests[1].output_token_ids) == [100, EOS_TOKEN_ID]
+    assert not scheduler.running
+
+
+class _ForcedRunGrammar(StructuredOutputGrammar):
+    """Allows any token, except that token 0 forces the tokens 5, 6, 7."""
+
+    def __init__(self):
+        self.forced_token_ids: list[int] = []
+
+    def accept_tokens(self, request_id, tokens):
+        for token in tokens:
+            if self.forced_token_ids:
+                assert token == self.forced_token_ids.pop(0)
+            elif token == 0:
+                self.forced_token_ids = [5, 6, 7]
+        return True
+
+    def fill_bitmask(self, bitmask, batch_index):
+        if self.forced_token_ids:
+            bitmask[batch_index] = 1 << self.forced_token_ids[0]
+        else:
+            bitmask[batch_index] = -1
+
+    def is_terminated(self):
+        return False
+
+    def reset(self):
+        pass
+
+
+class _ForcedRunBackend(StructuredOutputBackend):
+
+    def compile_grammar(self, request_type, grammar_spec):
+        return _ForcedRunGrammar()
+
+    def allocate_token_bitmask(self, max_num_seqs):
+        return torch.full((max_num_seqs, 1), -1, dtype=torch.int32)
+
+
+def test_jump_forward_decoding():
+    """Test that the tokens forced by the grammar are appended to the
+    request and scheduled in one step, and output with the next sampled
+    token."""
+    scheduler = create_scheduler()
+    manager = scheduler.structured_output_manager
+    manager.backend = _ForcedRunBackend()
+    manager.max_jump_forward_tokens = 8
+
+    sampling_params = SamplingParams(
+        max_tokens=16, guided_decoding=GuidedDecodingParams(regex=".*"))
+    request = Request(
+        request_id="0",
+        prompt=None,
+        prompt_token_ids=[1] * 10,
+        multi_modal_inputs=None,
+        multi_modal_hashes=None,
+        multi_modal_placeholders=None,
+        sampling_params=sampling_params,
+        eos_token_id=EOS_TOKEN_ID,
+        arrival_time=0,
+        structured_output_request=StructuredOutputRequest(sampling_params),
+    )
+    request.structured_output_request.grammar = _ForcedRunGrammar()
+    scheduler.add_request(request)
+
+    def update(output: SchedulerOutput, sampled_token_ids: list[int]):
+        return scheduler.update_from_output(
+            output,
+            ModelRunnerOutput(
+                req_ids=["0"],
+                req_id_to_index={"0": 0},
+                sampled_token_ids=[sampled_token_ids],
+                spec_token_ids=None,
+                logprobs=None,
+                prompt_logprobs_dict={},
+            ))
+
+    output = scheduler.schedule()
+    assert output.num_scheduled_tokens == {"0": 10}
+    update(output, [0])
+
+    # The forced tokens are scheduled along with the sampled token.
+    output = scheduler.schedule()
+    assert output.num_scheduled_tokens == {"0": 4}
+    assert list(output.scheduled_cached_reqs.new_token_ids) == [0, 5, 6, 7]
+    assert output.grammar_bitmask is not None
+    assert output.grammar_bitmask[0, 0] == -1
+    engine_core_outputs = update(output, [9])
+    assert engine_core_outputs.token_outputs is not None
+    assert list(
+        engine_core_outputs.token_outputs.new_token_ids) == [5, 6, 7, 9]
+    assert list(request.output_token_ids) == [0, 5, 6, 7, 9]
+
+    output = scheduler.schedule()
+    assert output.num_scheduled_tokens == {"0": 1}
@@ -216,3 +216,37 @@ async def test_finished_flag(monkeypatch: pytest.MonkeyPatch, n: int,
         # Assert only the last output has the finished flag set
         assert all(not out.finished for out in outputs[:-1])
         assert outputs[-1].finished
+
+
+@pytest.mark.asyncio
+async def test_pin_prefix(monkeypatch: pytest.MonkeyPatch):
+
+    with monkeypatch.context() as m, ExitStack() as after:
+        m.setenv("VLLM_USE_V1", "1")
+
+        engine = AsyncLLM.from_engine_args(TEXT_ENGINE_ARGS)
+        after.callback(engine.shutdown)
+
+        # Only the full blocks of the prefix are pinned.
+        block_size = engine.vllm_config.cache_config.block_size
+        prefix = list(range(100, 100 + 3 * block_size + 5))
+        prefix_id, num_pinned_tokens = await engine.pin_prefix(prefix)
+        assert num_pinned_tokens == 3 * block_size
+        assert await engine.list_pinned_prefixes() == {
+            prefix_id: num_pinned_tokens
+        }
+
+        # The same blocks can be pinned under another ID.
+        other_id, num_other_tokens = await engine.pin_prefix(prefix, "other")
+        assert (other_id, num_other_tokens) == ("other", num_pinned_tokens)
+
+        with pytest.raises(ValueError, match="already pinned"):
+            await engine.pin_prefix(prefix, prefix_id)
+        with pytest.raises(ValueError, match="shorter than a block"):
+            await engine.pin_prefix(prefix[:block_size - 1])
+
+        assert await engine.unpin_prefix(prefix_id)
+        assert not await engine.unpin_prefix(prefix_id)
+        assert await engine.list_pinned_prefixes() == {
+            "other": num_pinned_tokens
+        }
@@ -6,14 +6,17 @@ import time
 import uuid
 from concurrent.futures import Future
 
+import numpy as np
 import pytest
 from transformers import AutoTokenizer
 
 from vllm import SamplingParams
 from vllm.engine.arg_utils import EngineArgs
 from vllm.platforms import current_platform
-from vllm.v1.engine import EngineCoreRequest
-from vllm.v1.engine.core import EngineCore
+from vllm.v1.engine import (EngineCoreOutput, EngineCoreOutputs,
+                            EngineCoreRequest, EngineCoreTokenOutputs,
+                            FinishReason, UtilityOutput)
+from vllm.v1.engine.core import EngineCore, EngineCoreProc
 from vllm.v1.executor.abstract import Executor, UniProcExecutor
 from vllm.v1.kv_cache_interface import KVCacheConfig
 from vllm.v1.outputs import ModelRunnerOutput
@@ -89,7 +92,7 @@ def test_engine_core(monkeypatch: pytest.MonkeyPatch):
         assert len(engine_core.scheduler.running) == 4
 
         # Loop through until they are all done.
-        while len(engine_core.step().outputs) > 0:
+        while engine_core.step().num_outputs > 0:
             pass
 
         assert len(engine_core.scheduler.waiting) == 0
@@ -164,11 +167,11 @@ def test_engine_core(monkeypatch: pytest.MonkeyPatch):
         req0.request_id = req1.request_id = "test"
         engine_core.add_request(req0)
 
-        while len(engine_core.step().outputs) > 0:
+        while engine_core.step().num_outputs > 0:
             pass
 
         engine_core.add_request(req1)
-        while len(engine_core.step().outputs) > 0:
+        while engine_core.step().num_outputs > 0:
             pass
 
         assert len(engine_core.scheduler.waiting) == 0
@@ -208,7 +211,7 @@ def test_engine_core_advanced_sampling(monkeypatch: pytest.MonkeyPatch):
             assert len(engine_core.scheduler.waiting) == 1
             assert len(engine_core.scheduler.running) == 0
             # Loop through until they are all done.
-            while len(engine_core.step().outputs) > 0:
+            while engine_core.step().num_outputs > 0:
                 pass
             assert len(engine_core.scheduler.waiting) == 0
             assert len(engine_core.scheduler.running) == 0
@@ -310,3 +313,47 @@ def test_engine_core_concurrent_batches(monkeypatch: pytest.MonkeyPatch):
         # Reaching here when got the result of the first request.
         while engine_core.scheduler.get_num_unfinished_requests() == 1:
             engine_core.step_with_batch_queue()
+
+
+def test_split_outputs_by_client():
+    """Test that the outputs are routed to the API server clients that added
+    the requests when multiple clients share the engine core."""
+    engine_core = EngineCoreProc.__new__(EngineCoreProc)
+    engine_core.num_clients = 3
+    engine_core.request_clients = {"a": 0, "b": 1, "c": 1, "d": 0}
+    engine_core.utility_clients = {7: 1}
+
+    outputs = EngineCoreOutputs(
+        outputs=[
+            EngineCoreOutput(request_id="b",
+                             new_token_ids=[1],
+                             finish_reason=FinishReason.STOP),
+        ],
+        token_outputs=EngineCoreTokenOutputs(
+            request_ids=["a", "c", "d"],
+            new_token_ids=np.array([10, 20, 21, 30]),
+            offsets=np.array([0, 1, 3, 4]),
+        ),
+    )
+    client_outputs = engine_core._split_outputs_by_client(outputs)
+    # The first client always gets the outputs, e.g., for the stats.
+    assert client_outputs[0] is not None
+    assert client_outputs[1] is not None
+    assert client_outputs[2] is None
+    assert not client_outputs[0].outputs
+    assert [(o.request_id, o.new_token_ids)
+            for o in client_outputs[0].token_outputs.to_outputs()
+            ] == [("a", [10]), ("d", [30])]
+    assert [o.request_id for o in client_outputs[1].outputs] == ["b"]
+    assert [(o.request_id, o.new_token_ids)
+            for o in client_outputs[1].token_outputs.to_outputs()
+            ] == [("c", [20, 21])]
+    # The finished requests are forgotten.
+    assert "b" not in engine_core.request_clients
+
+    outputs = EngineCoreOutputs(utility_output=UtilityOutput(call_id=7))
+    client_outputs = engine_core._split_outputs_by_client(outputs)
+    assert client_outputs[1] is not None
+    assert client_outputs[1].utility_output is not None
+    assert client_outputs[2] is None
+    assert not engine_core.utility_clients
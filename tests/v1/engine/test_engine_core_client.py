@@ -50,7 +50,7 @@ def make_request(params: SamplingParams) -> EngineCoreRequest:
 def loop_until_done(client: EngineCoreClient, outputs: dict):
 
     while True:
-        engine_core_outputs = client.get_output().outputs
+        engine_core_outputs = client.get_output().get_all_outputs()
 
         if len(engine_core_outputs) == 0:
             continue
@@ -68,7 +68,8 @@ def loop_until_done(client: EngineCoreClient, outputs: dict):
 async def loop_until_done_async(client: EngineCoreClient, outputs: dict):
 
     while True:
-        engine_core_outputs = (await client.get_output_async()).outputs
+        engine_core_outputs = (await
+                               client.get_output_async()).get_all_outputs()
 
         if len(engine_core_outputs) == 0:
             continue
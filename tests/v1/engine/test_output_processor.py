@@ -16,6 +16,7 @@ from vllm.sampling_params import RequestOutputKind, SamplingParams
 from vllm.sequence import PromptLogprobs, SampleLogprobs
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 from vllm.v1.engine import EngineCoreRequest
+from vllm.v1.engine.detokenizer_pool import DetokenizerPool
 from vllm.v1.engine.output_processor import (OutputProcessor,
                                              RequestOutputCollector)
 from vllm.v1.metrics.stats import IterationStats
@@ -921,3 +922,79 @@ async def test_request_output_collector():
     # Cumulative logprobs should be the last one.
     cumulative_logprob_expected = 1.0 * num_to_put
     assert output.outputs[0].cumulative_logprob == cumulative_logprob_expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("include_stop_str_in_output", [True, False])
+@pytest.mark.parametrize(
+    "request_output_kind",
+    [RequestOutputKind.DELTA, RequestOutputKind.FINAL_ONLY])
+async def test_detokenizer_pool(include_stop_str_in_output: bool,
+                                request_output_kind: RequestOutputKind,
+                                dummy_test_vectors):
+    """The outputs detokenized by the DetokenizerPool must match the outputs
+    detokenized in process."""
+    detokenizer_pool = DetokenizerPool(dummy_test_vectors.vllm_config,
+                                       num_workers=2)
+    try:
+        output_processors = [
+            OutputProcessor(dummy_test_vectors.tokenizer_group,
+                            log_stats=False,
+                            detokenizer_pool=pool)
+            for pool in (None, detokenizer_pool)
+        ]
+        engine_cores = [
+            MockEngineCore(tokens_list=dummy_test_vectors.generation_tokens)
+            for _ in output_processors
+        ]
+
+        # Make N requests, half of them with stop strings.
+        requests = [
+            EngineCoreRequest(
+                request_id=f"request-{idx}",
+                prompt=prompt,
+                prompt_token_ids=prompt_tokens,
+                arrival_time=0,
+                mm_inputs=None,
+                mm_hashes=None,
+                mm_placeholders=None,
+                eos_token_id=None,
+                lora_request=None,
+                sampling_params=SamplingParams(
+                    skip_special_tokens=False,
+                    spaces_between_special_tokens=False,
+                    output_kind=request_output_kind,
+                    stop=STOP_STRINGS if idx % 2 else [],
+                    include_stop_str_in_output=include_stop_str_in_output,
+                )) for idx, (prompt, prompt_tokens) in enumerate(
+                    zip(dummy_test_vectors.prompt_strings,
+                        dummy_test_vectors.prompt_tokens))
+        ]
+        for output_processor in output_processors:
+            for request in requests:
+                output_processor.add_request(request)
+
+        while True:
+            outputs = [
+                engine_core.get_outputs() for engine_core in engine_cores
+            ]
+            if len(outputs[0]) == 0:
+                break
+
+            ref_processor, pool_processor = output_processors
+            ref_outputs = await ref_processor.process_outputs_async(outputs[0])
+            pool_outputs = await pool_processor.process_outputs_async(
+                outputs[1])
+            assert pool_outputs.reqs_to_abort == ref_outputs.reqs_to_abort
+            assert len(pool_outputs.request_outputs) == len(
+                ref_outputs.request_outputs)
+            for pool_output, ref_output in zip(pool_outputs.request_outputs,
+                                               ref_outputs.request_outputs):
+                assert pool_output.request_id == ref_output.request_id
+                assert pool_output.finished == ref_output.finished
+                assert pool_output.outputs == ref_output.outputs
+
+        for output_processor in output_processors:
+            assert not output_processor.has_unfinished_requests()
+    finally:
+        detokenizer_pool.shutdown()
@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: Apache-2.0
+import torch
+
+from tests.v1.kv_connector.utils import (create_forward_context,
+                                         create_kv_caches, create_vllm_config)
+from vllm.distributed.kv_transfer.kv_connector.v1.base import KVConnectorRole
+from vllm.distributed.kv_transfer.kv_connector.v1.cpu_offload_connector import (  # noqa: E501
+    CPUOffloadConnector, CPUOffloadConnectorMetadata)
+
+NUM_LAYERS = 2
+NUM_GPU_BLOCKS = 8
+# Holds 4 blocks of facebook/opt-125m.
+CPU_OFFLOAD_SIZE_GB = 0.0025
+
+
+def create_worker_connector() -> CPUOffloadConnector:
+    vllm_config = create_vllm_config(
+        "CPUOffloadConnector", {"cpu_offload_size_gb": CPU_OFFLOAD_SIZE_GB})
+    return CPUOffloadConnector(vllm_config, KVConnectorRole.WORKER)
+
+
+def test_start_load_kv_without_copies():
+    """Test that no host buffer is allocated until a block is copied."""
+    connector = create_worker_connector()
+    kv_caches = create_kv_caches(NUM_LAYERS, NUM_GPU_BLOCKS)
+    connector.bind_connector_metadata(CPUOffloadConnectorMetadata())
+    connector.start_load_kv(create_forward_context(kv_caches))
+    assert not connector._cpu_kv_caches
+
+
+def test_start_load_kv_offloads_before_loading():
+    """
+    Test that start_load_kv copies the blocks evicted in a step to the host
+    before the loads of the same step overwrite them on the device.
+    """
+    connector = create_worker_connector()
+    kv_caches = create_kv_caches(NUM_LAYERS, NUM_GPU_BLOCKS)
+    original = {name: kv.clone() for name, kv in kv_caches.items()}
+    forward_context = create_forward_context(kv_caches)
+
+    # Block 2 is evicted to slot 0.
+    connector.bind_connector_metadata(
+        CPUOffloadConnectorMetadata(blocks_to_offload=[(2, 0)]))
+    connector.start_load_kv(forward_context)
+    connector.clear_connector_metadata()
+    for name, cpu_kv_cache in connector._cpu_kv_caches.items():
+        assert cpu_kv_cache.shape[1] == 4
+        assert torch.equal(cpu_kv_cache[:, 0], original[name][:, 2])
+
+    # Block 3 is evicted to slot 1 and reused for the hit in slot 0.
+    connector.bind_connector_metadata(
+        CPUOffloadConnectorMetadata(blocks_to_offload=[(3, 1)],
+                                    blocks_to_load=[(0, 3)]))
+    connector.start_load_kv(forward_context)
+    connector.clear_connector_metadata()
+    for name, kv_cache in kv_caches.items():
+        cpu_kv_cache = connector._cpu_kv_caches[name]
+        assert torch.equal(cpu_kv_cache[:, 1], original[name][:, 3])
+        assert torch.equal(kv_cache[:, 3], original[name][:, 2])
+        # The other blocks are untouched.
+        for block_id in range(NUM_GPU_BLOCKS):
+            if block_id != 3:
+                assert torch.equal(kv_cache[:, block_id],
+                                   original[name][:, block_id])
@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: Apache-2.0
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import safetensors.torch
+import torch
+
+from tests.v1.kv_connector.utils import (create_forward_context,
+                                         create_kv_caches, create_vllm_config)
+from vllm.distributed import parallel_state
+from vllm.distributed.kv_transfer.kv_connector.v1 import disk_cache_connector
+from vllm.distributed.kv_transfer.kv_connector.v1.base import KVConnectorRole
+from vllm.distributed.kv_transfer.kv_connector.v1.disk_cache_connector import (  # noqa: E501
+    MANIFEST_FILENAME, MANIFEST_VERSION, DiskCacheConnector,
+    DiskCacheConnectorMetadata)
+
+NUM_LAYERS = 2
+NUM_GPU_BLOCKS = 8
+TIMEOUT_S = 10
+
+
+@pytest.fixture
+def worker_connector(tmp_path, monkeypatch) -> DiskCacheConnector:
+    group = SimpleNamespace(rank_in_group=0)
+    monkeypatch.setattr(parallel_state, "get_pp_group", lambda: group)
+    monkeypatch.setattr(parallel_state, "get_tp_group", lambda: group)
+    vllm_config = create_vllm_config("DiskCacheConnector",
+                                     {"disk_cache_path": str(tmp_path)})
+    return DiskCacheConnector(vllm_config, KVConnectorRole.WORKER)
+
+
+def save_blocks(
+    connector: DiskCacheConnector,
+    kv_caches: dict[str, torch.Tensor],
+    blocks_to_save: list[tuple[str, int]],
+) -> None:
+    connector.bind_connector_metadata(
+        DiskCacheConnectorMetadata(blocks_to_save=blocks_to_save))
+    for layer_name, kv_cache in kv_caches.items():
+        connector.save_kv_layer(layer_name, kv_cache, None)
+    connector.wait_for_save()
+    connector.clear_connector_metadata()
+
+
+def load_blocks(
+    connector: DiskCacheConnector,
+    kv_caches: dict[str, torch.Tensor],
+    blocks_to_load: list[tuple[str, int]],
+    keys_to_remove: list[str],
+) -> None:
+    connector.bind_connector_metadata(
+        DiskCacheConnectorMetadata(blocks_to_load=blocks_to_load,
+                                   keys_to_remove=keys_to_remove))
+    connector.start_load_kv(create_forward_context(kv_caches))
+    connector.clear_connector_metadata()
+
+
+def wait_until(condition) -> None:
+    deadline = time.monotonic() + TIMEOUT_S
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for I/O"
+        time.sleep(0.01)
+
+
+def test_save_and_load(worker_connector, monkeypatch):
+    """Test that saved blocks are written in the background and loaded back
+    from their files with safe_open."""
+    kv_caches = create_kv_caches(NUM_LAYERS, NUM_GPU_BLOCKS)
+    original = {name: kv.clone() for name, kv in kv_caches.items()}
+    opened_files: list[str] = []
+    safe_open = disk_cache_connector.safe_open
+
+    def recording_safe_open(filename, *args, **kwargs):
+        opened_files.append(filename)
+        return safe_open(filename, *args, **kwargs)
+
+    monkeypatch.setattr(disk_cache_connector, "safe_open", recording_safe_open)
+
+    save_blocks(worker_connector, kv_caches, [("a", 2), ("b", 5)])
+    wait_until(lambda: not worker_connector._pending_writes)
+    filenames = [worker_connector._get_filename(key, 0) for key in "ab"]
+    assert all(os.path.exists(filename) for filename in filenames)
+    assert not [f for f in os.listdir(worker_connector._path) if ".tmp" in f]
+
+    load_blocks(worker_connector, kv_caches, [("a", 0), ("b", 1)], [])
+    assert opened_files == filenames
+    for name, kv_cache in kv_caches.items():
+        assert torch.equal(kv_cache[:, 0], original[name][:, 2])
+        assert torch.equal(kv_cache[:, 1], original[name][:, 5])
+        assert torch.equal(kv_cache[:, 2:], original[name][:, 2:])
+
+
+def test_load_pending_write(worker_connector, monkeypatch):
+    """Test that a block whose write is still pending is loaded from
+    memory."""
+    kv_caches = create_kv_caches(NUM_LAYERS, NUM_GPU_BLOCKS)
+    original = {name: kv.clone() for name, kv in kv_caches.items()}
+    write_allowed = threading.Event()
+    save_file = safetensors.torch.save_file
+
+    def blocking_save_file(*args, **kwargs):
+        write_allowed.wait(TIMEOUT_S)
+        save_file(*args, **kwargs)
+
+    monkeypatch.setattr(safetensors.torch, "save_file", blocking_save_file)
+
+    filename = worker_connector._get_filename("a", 0)
+    try:
+        save_blocks(worker_connector, kv_caches, [("a", 3)])
+        assert "a" in worker_connector._pending_writes
+        load_blocks(worker_connector, kv_caches, [("a", 6)], [])
+        assert not os.path.exists(filename)
+    finally:
+        write_allowed.set()
+    for name, kv_cache in kv_caches.items():
+        assert torch.equal(kv_cache[:, 6], original[name][:, 3])
+
+    wait_until(lambda: not worker_connector._pending_writes)
+    assert os.path.exists(filename)
+
+
+def test_remove_blocks(worker_connector):
+    """Test that the files of the evicted blocks are removed in the
+    background, after the pending writes."""
+    kv_caches = create_kv_caches(NUM_LAYERS, NUM_GPU_BLOCKS)
+    save_blocks(worker_connector, kv_caches, [("a", 1), ("b", 2)])
+    load_blocks(worker_connector, kv_caches, [], ["a"])
+
+    # The removal is queued after the writes, so it runs once they are done.
+    filename = worker_connector._get_filename("a", 0)
+    wait_until(lambda: not worker_connector._pending_writes)
+    wait_until(lambda: not os.path.exists(filename))
+    assert os.path.exists(worker_connector._get_filename("b", 0))
+
+
+def test_restore_index(tmp_path):
+    """Test that the index is rebuilt from the manifest and the files on
+    disk, and that the unreferenced files are removed."""
+    vllm_config = create_vllm_config("DiskCacheConnector",
+                                     {"disk_cache_path": str(tmp_path)})
+    path = tmp_path / DiskCacheConnector._compute_fingerprint(vllm_config)
+    path.mkdir()
+    with open(path / MANIFEST_FILENAME, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "keys": ["a", "b", "c"]}, f)
+    # "b" is in the manifest but its file is missing, "d" is an orphan and
+    # the temporary file was left behind by an interrupted write.
+    for filename in ("a.rank0.safetensors", "c.rank0.safetensors",
+                     "d.rank0.safetensors", "a.rank0.safetensors.tmp"):
+        (path / filename).touch()
+
+    connector = DiskCacheConnector(vllm_config, KVConnectorRole.SCHEDULER)
+    assert list(connector._index) == ["a", "c"]
+    assert sorted(os.listdir(path)) == [
+        "a.rank0.safetensors", "c.rank0.safetensors", MANIFEST_FILENAME
+    ]
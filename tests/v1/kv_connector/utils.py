@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: Apache-2.0
+from types import SimpleNamespace
+from typing import Any
+
+import torch
+
+from vllm.config import (CacheConfig, KVTransferConfig, ModelConfig,
+                         SchedulerConfig, VllmConfig)
+
+MODEL = "facebook/opt-125m"
+BLOCK_SIZE = 16
+
+
+def create_vllm_config(kv_connector: str,
+                       kv_connector_extra_config: dict[str, Any],
+                       block_size: int = BLOCK_SIZE) -> VllmConfig:
+    """Create a VllmConfig with prefix caching and a KV connector."""
+    model_config = ModelConfig(
+        model=MODEL,
+        task="auto",
+        tokenizer=MODEL,
+        tokenizer_mode="auto",
+        trust_remote_code=True,
+        dtype="float16",
+        seed=42,
+    )
+    cache_config = CacheConfig(
+        block_size=block_size,
+        gpu_memory_utilization=0.9,
+        swap_space=0,
+        cache_dtype="auto",
+        enable_prefix_caching=True,
+    )
+    kv_transfer_config = KVTransferConfig(
+        kv_connector=kv_connector,
+        kv_role="kv_both",
+        kv_connector_extra_config=kv_connector_extra_config,
+    )
+    return VllmConfig(
+        scheduler_config=SchedulerConfig(),
+        model_config=model_config,
+        cache_config=cache_config,
+        kv_transfer_config=kv_transfer_config,
+    )
+
+
+def create_kv_caches(num_layers: int,
+                     num_blocks: int,
+                     block_size: int = BLOCK_SIZE) -> dict[str, torch.Tensor]:
+    """Create the paged KV caches of the layers, in the non-MLA layout
+    [2, num_blocks, block_size, num_kv_heads, head_size]. Every element
+    holds a distinct value so that misplaced copies are detected."""
+    shape = (2, num_blocks, block_size, 1, 2)
+    numel = torch.Size(shape).numel()
+    return {
+        f"layer{i}":
+        torch.arange(i * numel, (i + 1) * numel,
+                     dtype=torch.float32).reshape(shape)
+        for i in range(num_layers)
+    }
+
+
+def create_forward_context(kv_caches: dict[str, torch.Tensor]) -> Any:
+    """Create the parts of a ForwardContext that the connectors use."""
+    return SimpleNamespace(
+        no_compile_layers={
+            layer_name: SimpleNamespace(kv_cache=[kv_cache])
+            for layer_name, kv_cache in kv_caches.items()
+        },
+        virtual_engine=0,
+        attn_metadata=None,
+    )
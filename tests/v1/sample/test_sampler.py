@@ -543,3 +543,57 @@ def test_sampler_bad_words(device: str, batch_size: int,
                 assert logits_for_req[token_id] == -float("inf")
             else:
                 assert logits_for_req[token_id] != -float("inf")
+
+
+@pytest.mark.parametrize("device", CUDA_DEVICES)
+@pytest.mark.parametrize("batch_size", [1, 2, 32])
+@pytest.mark.parametrize("bad_words_lengths", [(1, 3), (2, 2)])
+def test_sampler_bad_words_with_bin_count_penalties(
+        device: str, batch_size: int, bad_words_lengths: list[tuple[int]]):
+    """
+    Test to verify that the bad words are applied together with the
+    penalties computed from the output token counts, and that these
+    penalties match the ones computed from the output token ids.
+    """
+    torch.set_default_device(device)
+    sampling_metadata = _create_default_sampling_metadata(
+        NUM_OUTPUT_TOKENS, batch_size, VOCAB_SIZE, torch.device(device))
+    sampling_metadata.bad_words_token_ids = _create_bad_words_token_ids(
+        batch_size, VOCAB_SIZE, bad_words_lengths)
+    bad_words_last_tokens = _update_output_token_ids_for_bad_words(
+        sampling_metadata, VOCAB_SIZE)
+    sampling_metadata.presence_penalties = _create_penalty_tensor(
+        batch_size, 0.5, torch.device(device))
+    sampling_metadata.frequency_penalties = _create_penalty_tensor(
+        batch_size, 0.5, torch.device(device))
+    sampling_metadata.repetition_penalties = _create_penalty_tensor(
+        batch_size, 1.2, torch.device(device))
+    sampling_metadata.no_penalties = False
+    sampler = Sampler()
+
+    # Apply the bad words and the penalties as in Sampler.forward, with the
+    # penalties computed from the output token ids.
+    expected_logits = sampler.apply_bad_words(
+        _create_fake_logits(batch_size, VOCAB_SIZE), sampling_metadata)
+    expected_logits = sampler.apply_penalties(expected_logits,
+                                              sampling_metadata)
+
+    # Then with the penalties computed from the output token counts.
+    sampling_metadata.output_bin_counts = torch.stack([
+        torch.bincount(torch.tensor(output_token_ids), minlength=VOCAB_SIZE)
+        for output_token_ids in sampling_metadata.output_token_ids
+    ]).to(torch.int32)
+    logits = sampler.apply_bad_words(
+        _create_fake_logits(batch_size, VOCAB_SIZE), sampling_metadata)
+    logits = sampler.apply_penalties(logits, sampling_metadata)
+
+    assert torch.allclose(logits, expected_logits)
+    logits = logits.cpu()
+    for batch_idx in range(batch_size):
+        logits_for_req = logits[batch_idx]
+        for token_id in range(VOCAB_SIZE):
+            if (batch_idx in bad_words_last_tokens
+                    and token_id in bad_words_last_tokens[batch_idx]):
+                assert logits_for_req[token_id] == -float("inf")
+            else:
+                assert logits_for_req[token_id] != -float("inf")
@@ -1,88 +1,110 @@
 # SPDX-License-Identifier: Apache-2.0
+from types import SimpleNamespace
 
 import numpy as np
 
-from vllm.v1.spec_decode.ngram_proposer import (NgramProposer,
-                                                _find_subarray_kmp,
-                                                _kmp_lps_array)
-
-
-def test_kmp_lps_array():
-    np.testing.assert_array_equal(_kmp_lps_array(np.array([])), np.array([]))
-    np.testing.assert_array_equal(_kmp_lps_array(np.array([1])), np.array([0]))
-    np.testing.assert_array_equal(_kmp_lps_array(np.array([1, 1, 1])),
-                                  np.array([0, 1, 2]))
-    np.testing.assert_array_equal(_kmp_lps_array(np.array([1, 2, 3, 4])),
-                                  np.array([0, 0, 0, 0]))
-    np.testing.assert_array_equal(_kmp_lps_array(np.array([1, 2, 1, 2, 3])),
-                                  np.array([0, 0, 1, 2, 0]))
-
-
-def test_find_subarray_kmp():
-    X = np.array([1, 2, 3, 4, 1, 2, 3, 5, 6])
-    assert _find_subarray_kmp(X, 2, 2) is None
-    X = np.array([1, 2, 3, 4, 1, 2, 3])
-    np.testing.assert_array_equal(_find_subarray_kmp(X, 2, 3),
-                                  np.array([4, 1, 2]))
-    np.testing.assert_array_equal(_find_subarray_kmp(X, 2, 2), np.array([4,
-                                                                         1]))
-    np.testing.assert_array_equal(_find_subarray_kmp(X, 1, 3),
-                                  np.array([4, 1, 2]))
-    np.testing.assert_array_equal(_find_subarray_kmp(X, 1, 2), np.array([4,
-                                                                         1]))
-    X = np.array([1, 3, 6, 2, 3, 4, 1, 2, 3])
-    np.testing.assert_array_equal(_find_subarray_kmp(X, 2, 3),
-                                  np.array([4, 1, 2]))
-    # Return on the first match
-    np.testing.assert_array_equal(_find_subarray_kmp(X, 1, 3),
-                                  np.array([6, 2, 3]))
+from vllm.v1.spec_decode.ngram_proposer import NgramProposer, SuffixAutomaton
 
 
-def test_ngram_proposer():
-    proposer = NgramProposer()
+def _make_proposer(min_n: int,
+                   k: int,
+                   corpus_tokens: int = 0,
+                   max_n: int = 5) -> NgramProposer:
+    vllm_config = SimpleNamespace(speculative_config=SimpleNamespace(
+        prompt_lookup_min=min_n,
+        prompt_lookup_max=max_n,
+        num_speculative_tokens=k,
+        prompt_lookup_corpus_tokens=corpus_tokens))
+    return NgramProposer(vllm_config)  # type: ignore[arg-type]
+
+
+def test_suffix_automaton():
+    automaton = SuffixAutomaton(capacity=2)
+    assert automaton.longest_repeated_suffix() == (0, -1)
+    automaton.extend(np.array([1, 2, 3], dtype=np.int32))
+    assert automaton.longest_repeated_suffix() == (0, -1)
+    automaton.extend(np.array([1, 2], dtype=np.int32))
+    # [1, 2] first ends at 1.
+    assert automaton.longest_repeated_suffix() == (2, 1)
+    automaton.extend(np.array([3, 1], dtype=np.int32))
+    assert automaton.longest_repeated_suffix() == (4, 3)
+    assert automaton.num_tokens == 7
+
+    # Extending one token at a time builds the same automaton.
+    token_ids = np.array([1, 1, 2, 1, 1, 2, 1, 3, 1, 1], dtype=np.int32)
+    batched = SuffixAutomaton()
+    batched.extend(token_ids)
+    incremental = SuffixAutomaton(capacity=1)
+    for i in range(len(token_ids)):
+        incremental.extend(token_ids[i:i + 1])
+    assert (batched.longest_repeated_suffix() ==
+            incremental.longest_repeated_suffix() == (2, 1))
 
+    # The longest suffix of another sequence that occurs in this one.
+    match: np.ndarray = np.zeros(2, dtype=np.int64)
+    batched.match(match, np.array([3, 2, 1, 1], dtype=np.int32))
+    assert match[1] == 3
+    batched.match(match, np.array([3], dtype=np.int32))
+    assert match[1] == 2
+
+
+def test_ngram_proposer():
     # No match.
-    result = proposer.propose(
-        context_token_ids=np.array([1, 2, 3, 4, 5]),
-        min_n=2,
-        max_n=2,
-        k=2,
-    )
+    proposer = _make_proposer(min_n=2, k=2)
+    result = proposer.propose("0", np.array([1, 2, 3, 4, 5]))
     assert result is None
 
     # No match for 4-gram.
-    result = proposer.propose(
-        context_token_ids=np.array([1, 2, 3, 4, 1, 2, 3]),
-        min_n=4,
-        max_n=4,
-        k=2,
-    )
+    proposer = _make_proposer(min_n=4, k=2)
+    result = proposer.propose("0", np.array([1, 2, 3, 4, 1, 2, 3]))
     assert result is None
 
     # No match for 4-gram but match for 3-gram.
-    result = proposer.propose(
-        context_token_ids=np.array([1, 2, 3, 4, 1, 2, 3]),
-        min_n=3,
-        max_n=4,
-        k=2,
-    )
+    proposer = _make_proposer(min_n=3, k=2)
+    result = proposer.propose("0", np.array([1, 2, 3, 4, 1, 2, 3]))
     assert np.array_equal(result, np.array([4, 1]))
 
     # Match for both 4-gram and 3-gram.
     # In this case, the proposer should return the 4-gram match.
-    result = proposer.propose(
-        context_token_ids=np.array([2, 3, 4, 5, 1, 2, 3, 4, 1, 2, 3, 4]),
-        min_n=3,
-        max_n=4,
-        k=2,
-    )
+    result = proposer.propose("1",
+                              np.array([2, 3, 4, 5, 1, 2, 3, 4, 1, 2, 3, 4]))
     assert np.array_equal(result, np.array([1, 2]))  # Not [5, 1]
 
     # Match for 2-gram and 3-gram, but not 4-gram.
-    result = proposer.propose(
-        context_token_ids=np.array([3, 4, 5, 2, 3, 4, 1, 2, 3, 4]),
-        min_n=2,
-        max_n=4,
-        k=2,
-    )
+    proposer = _make_proposer(min_n=2, k=2)
+    result = proposer.propose("0", np.array([3, 4, 5, 2, 3, 4, 1, 2, 3, 4]))
     assert np.array_equal(result, np.array([1, 2]))  # Not [5, 2]
+
+    # The match is cut to the last max_n tokens, so the first occurrence of
+    # the 2-gram is used.
+    proposer = _make_proposer(min_n=2, k=2, max_n=2)
+    result = proposer.propose("0", np.array([3, 4, 5, 2, 3, 4, 1, 2, 3, 4]))
+    assert np.array_equal(result, np.array([5, 2]))
+
+    # The context of a request is extended with the new tokens.
+    context = np.array([1, 2, 3, 4, 5, 6, 1, 2])
+    result = proposer.propose("1", context[:6])
+    assert result is None
+    result = proposer.propose("1", context)
+    assert np.array_equal(result, np.array([3, 4]))
+    proposer.finish_request("1", [])
+    assert "1" not in proposer.requests
+
+
+def test_ngram_proposer_corpus():
+    proposer = _make_proposer(min_n=2, k=3, corpus_tokens=16)
+    proposer.finish_request("0", [7, 8, 9, 10, 11])
+
+    # The match in the corpus does not continue into the next output.
+    result = proposer.propose("1", np.array([1, 7, 8, 9]))
+    assert np.array_equal(result, np.array([10, 11]))
+
+    # The longer match in the context of the request is preferred.
+    result = proposer.propose("2", np.array([1, 8, 9, 5, 6, 1, 8, 9]))
+    assert np.array_equal(result, np.array([5, 6, 1]))
+
+    # The oldest outputs are dropped from the corpus.
+    for i in range(5):
+        proposer.finish_request(f"{i + 3}", [20 + i] * 5)
+    result = proposer.propose("3", np.array([7, 8]))
+    assert result is None
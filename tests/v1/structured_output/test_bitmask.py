@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: Apache-2.0
+
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from vllm.sampling_params import SamplingParams
+from vllm.v1.structured_output import StructuredOutputManager
+from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
+                                                     StructuredOutputGrammar,
+                                                     get_forced_token_id)
+from vllm.v1.structured_output.request import StructuredOutputRequest
+
+
+class OneTokenGrammar(StructuredOutputGrammar):
+    """Allows only the token after the last accepted token."""
+
+    def __init__(self, next_token: int):
+        self.next_token = next_token
+
+    def accept_tokens(self, request_id, tokens):
+        self.next_token = tokens[-1] + 1
+        return True
+
+    def fill_bitmask(self, bitmask, batch_index):
+        bitmask[batch_index] = 0
+        bitmask[batch_index, 0] = 1 << self.next_token
+
+    def is_terminated(self):
+        return self.next_token > 30
+
+    def reset(self):
+        pass
+
+
+class OneTokenBackend(StructuredOutputBackend):
+
+    def compile_grammar(self, request_type, grammar_spec):
+        raise NotImplementedError
+
+    def allocate_token_bitmask(self, max_num_seqs):
+        return torch.full((max_num_seqs, 1), -1, dtype=torch.int32)
+
+
+def _make_request(request_id: str, next_token: int):
+    structured_output_request = StructuredOutputRequest(
+        sampling_params=SamplingParams())
+    structured_output_request.grammar = OneTokenGrammar(next_token)
+    return SimpleNamespace(request_id=request_id,
+                           structured_output_request=structured_output_request)
+
+
+def test_grammar_bitmask():
+    vllm_config = SimpleNamespace(scheduler_config=SimpleNamespace(
+        max_num_seqs=64))
+    manager = StructuredOutputManager(vllm_config)  # type: ignore[arg-type]
+    manager.backend = OneTokenBackend()
+
+    requests = {
+        f"req_{i}": _make_request(f"req_{i}", i % 30)
+        for i in range(40)
+    }
+    # The requests are in the reverse order in the batch.
+    batch_indices = {
+        req_id: len(requests) - 1 - i
+        for i, req_id in enumerate(requests)
+    }
+    bitmask = manager.grammar_bitmask(requests, batch_indices,
+                                      len(requests))  # type: ignore[arg-type]
+    assert bitmask is not None and bitmask.shape == (len(requests), 1)
+    for i, batch_index in enumerate(batch_indices.values()):
+        assert bitmask[batch_index, 0] == np.int32(1 << (i % 30))
+
+    # Accept a token and fill the bitmasks of the next step ahead.
+    for i, request in enumerate(requests.values()):
+        request.structured_output_request.grammar.accept_tokens(
+            "", [i % 30 + 1])
+    manager.fill_bitmasks_ahead(list(requests.values()))  # type: ignore
+    for request in requests.values():
+        assert request.structured_output_request.bitmask_future is not None
+
+    bitmask = manager.grammar_bitmask(requests, batch_indices,
+                                      len(requests))  # type: ignore[arg-type]
+    assert bitmask is not None
+    for i, batch_index in enumerate(batch_indices.values()):
+        if i % 30 + 2 > 30:
+            # The grammar is terminated.
+            continue
+        assert bitmask[batch_index, 0] == np.int32(1 << (i % 30 + 2))
+    for request in requests.values():
+        assert request.structured_output_request.bitmask_future is None
+
+
+def test_accept_forced_tokens():
+    bitmask = torch.zeros((1, 1), dtype=torch.int32)
+    grammar = OneTokenGrammar(3)
+    assert grammar.accept_forced_tokens("", bitmask, 4, set()) == [3, 4, 5, 6]
+    # The bitmask is filled for the state after the run.
+    assert bitmask[0, 0] == 1 << 7
+
+    # The run ends before a stop token.
+    assert grammar.accept_forced_tokens("", bitmask, 8, {9}) == [7, 8]
+    assert bitmask[0, 0] == 1 << 9
+
+
+def test_get_forced_token_id():
+    bitmask = torch.zeros(4, dtype=torch.int32)
+    assert get_forced_token_id(bitmask) is None
+    bitmask[2] = 1 << 5
+    assert get_forced_token_id(bitmask) == 2 * 32 + 5
+    bitmask[2] = -(1 << 31)
+    assert get_forced_token_id(bitmask) == 2 * 32 + 31
+    bitmask[2] = 0b11
+    assert get_forced_token_id(bitmask) is None
+    bitmask[2] = 1
+    bitmask[3] = 1
+    assert get_forced_token_id(bitmask) is None
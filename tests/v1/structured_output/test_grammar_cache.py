@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pytest
+
+from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
+                                                     StructuredOutputGrammar,
+                                                     StructuredOutputOptions)
+from vllm.v1.structured_output.grammar_cache import (GrammarCache,
+                                                     canonicalize_grammar_spec)
+
+
+class FakeGrammar(StructuredOutputGrammar):
+
+    def __init__(self, precompiled: str):
+        self.precompiled = precompiled
+
+    def accept_tokens(self, request_id, tokens):
+        return True
+
+    def fill_bitmask(self, bitmask, batch_index):
+        pass
+
+    def is_terminated(self):
+        return False
+
+    def reset(self):
+        pass
+
+
+class FakeBackend(StructuredOutputBackend):
+
+    def __init__(self, fingerprint: str = "fake"):
+        self.fingerprint = fingerprint
+        self.num_compiled = 0
+
+    def compile_grammar(self, request_type, grammar_spec):
+        return self.grammar_from_precompiled(
+            self.precompile_grammar(request_type, grammar_spec))
+
+    def allocate_token_bitmask(self, max_num_seqs):
+        raise NotImplementedError
+
+    def get_cache_fingerprint(self) -> Optional[str]:
+        return self.fingerprint
+
+    def precompile_grammar(self, request_type, grammar_spec) -> str:
+        self.num_compiled += 1
+        return f"{request_type.name}:{grammar_spec}"
+
+    def grammar_from_precompiled(self, precompiled: str) -> FakeGrammar:
+        return FakeGrammar(precompiled)
+
+    def serialize_precompiled(self, precompiled: str) -> bytes:
+        return precompiled.encode()
+
+    def deserialize_precompiled(self, data: bytes) -> str:
+        return data.decode()
+
+
+def test_canonicalize_grammar_spec():
+    json_type = StructuredOutputOptions.JSON
+    assert canonicalize_grammar_spec(
+        json_type, '{"b": 1,\n "a": [1, 2]}') == '{"b":1,"a":[1,2]}'
+    # The order of the keys is kept.
+    assert canonicalize_grammar_spec(
+        json_type, '{"b": 1, "a": 2}') != canonicalize_grammar_spec(
+            json_type, '{"a": 2, "b": 1}')
+    regex = "a  b"
+    assert canonicalize_grammar_spec(StructuredOutputOptions.REGEX,
+                                     regex) == regex
+
+
+def test_grammar_cache_in_memory():
+    backend = FakeBackend()
+    cache = GrammarCache("fake", backend)
+    json_type = StructuredOutputOptions.JSON
+
+    grammar = cache.compile_grammar(json_type, '{"type": "object"}')
+    assert grammar.precompiled == 'JSON:{"type": "object"}'
+    # Only the formatting differs, so the grammar is not compiled again.
+    cache.compile_grammar(json_type, '{"type":  "object"}')
+    assert backend.num_compiled == 1
+    # Grammars of other request types are distinct.
+    cache.compile_grammar(StructuredOutputOptions.REGEX, '{"type": "object"}')
+    assert backend.num_compiled == 2
+
+    # Concurrent requests for the same grammar are compiled once.
+    specs = [f'{{"const": {i % 4}}}' for i in range(32)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(
+            executor.map(lambda spec: cache.compile_grammar(json_type, spec),
+                         specs))
+    assert backend.num_compiled == 6
+
+
+def test_grammar_cache_on_disk(tmp_path):
+    json_type = StructuredOutputOptions.JSON
+    backend = FakeBackend()
+    GrammarCache("fake", backend,
+                 str(tmp_path)).compile_grammar(json_type,
+                                                '{"type": "string"}')
+    assert backend.num_compiled == 1
+    assert len(os.listdir(tmp_path)) == 1
+
+    # Another engine loads the grammar instead of compiling it.
+    other_backend = FakeBackend()
+    grammar = GrammarCache("fake", other_backend,
+                           str(tmp_path)).compile_grammar(
+                               json_type, '{"type": "string"}')
+    assert grammar.precompiled == 'JSON:{"type": "string"}'
+    assert other_backend.num_compiled == 0
+
+    # The grammars of another tokenizer are not shared.
+    new_backend = FakeBackend(fingerprint="other")
+    GrammarCache("fake", new_backend,
+                 str(tmp_path)).compile_grammar(json_type,
+                                                '{"type": "string"}')
+    assert new_backend.num_compiled == 1
+
+
+def test_grammar_cache_compile_error():
+
+    class FailingBackend(FakeBackend):
+
+        def precompile_grammar(self, request_type, grammar_spec):
+            self.num_compiled += 1
+            raise ValueError("Invalid grammar")
+
+    backend = FailingBackend()
+    cache = GrammarCache("fake", backend)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.compile_grammar(StructuredOutputOptions.REGEX, "(")
+    # Failed compilations are not cached.
+    assert backend.num_compiled == 2
@@ -1,4 +1,5 @@
 # SPDX-License-Identifier: Apache-2.0
+import gc
 from collections import UserDict
 from dataclasses import dataclass
 from typing import Optional
@@ -11,7 +12,11 @@ from vllm.multimodal.inputs import (MultiModalBatchedField,
                                     MultiModalFieldElem, MultiModalKwargs,
                                     MultiModalKwargsItem,
                                     MultiModalSharedField, NestedTensors)
+from vllm.v1.engine import (EngineCoreOutput, EngineCoreOutputs,
+                            EngineCoreTokenOutputs)
 from vllm.v1.serial_utils import MsgpackDecoder, MsgpackEncoder
+from vllm.v1.shm_arena import SharedMemoryArena
+from vllm.v1.utils import flatten_int_lists
 
 
 class UnrecognizedType(UserDict):
@@ -124,6 +129,32 @@ def test_multimodal_kwargs():
     assert all(nested_equal(d[k], decoded[k]) for k in d)
 
 
+def test_shm_arena():
+    """Test that large tensors are passed via shared memory, and that the
+    space is reused once the decoded tensors are garbage collected."""
+    d = {
+        "foo": torch.rand(10000, dtype=torch.float32),
+        "bar": torch.rand(1000, dtype=torch.float32),
+    }
+    req = MyRequest(mm=[MultiModalKwargs(d)])
+
+    arena = SharedMemoryArena(size=64 * 1024)
+    encoder = MsgpackEncoder(shm_arena=arena, shm_size_threshold=8192)
+    decoder = MsgpackDecoder(MyRequest)
+
+    # "foo" is passed via shared memory, and "bar" via a dedicated message.
+    encoded = encoder.encode(req)
+    assert len(encoded) == 2
+    decoded: MultiModalKwargs = decoder.decode(encoded).mm[0]
+    assert all(nested_equal(d[k], decoded[k]) for k in d)
+
+    # The arena is full until the decoded tensor is garbage collected.
+    assert len(encoder.encode(req)) == 3
+    del decoded
+    gc.collect()
+    assert len(encoder.encode(req)) == 2
+
+
 def test_multimodal_items_by_modality():
     e1 = MultiModalFieldElem("audio", "a0",
                              torch.zeros(1000, dtype=torch.bfloat16),
@@ -172,6 +203,44 @@ def test_multimodal_items_by_modality():
     assert all(nested_equal(mm[k], decoded[k]) for k in mm)
 
 
+def test_engine_core_token_outputs():
+    """Test that the columnar token outputs are sent without copies."""
+    num_reqs = 512
+    req_ids = [f"req-{i}" for i in range(num_reqs)]
+    token_ids = [[i] * (1 + i % 3) for i in range(num_reqs)]
+    new_token_ids, offsets = flatten_int_lists(token_ids)
+    outputs = EngineCoreOutputs(
+        outputs=[EngineCoreOutput(request_id="req-x", new_token_ids=[7])],
+        token_outputs=EngineCoreTokenOutputs(request_ids=req_ids,
+                                             new_token_ids=new_token_ids,
+                                             offsets=offsets),
+    )
+
+    encoder = MsgpackEncoder(size_threshold=256)
+    decoder = MsgpackDecoder(EngineCoreOutputs)
+    encoded = encoder.encode(outputs)
+    # The main buffer + the token ids and offsets arrays.
+    assert len(encoded) == 3
+    decoded: EngineCoreOutputs = decoder.decode(encoded)
+
+    assert decoded.num_outputs == num_reqs + 1
+    all_outputs = decoded.get_all_outputs()
+    assert [o.request_id for o in all_outputs] == ["req-x"] + req_ids
+    assert [o.new_token_ids for o in all_outputs] == [[7]] + token_ids
+
+    # The chunks cover all the requests in order.
+    chunks = decoded.split(100)
+    assert len(chunks) == 1 + 6
+    chunked_token_ids: list[list[int]] = []
+    for chunk_outputs, chunk_token_outputs in chunks[1:]:
+        assert not chunk_outputs
+        assert chunk_token_outputs is not None
+        assert len(chunk_token_outputs) <= 100
+        chunked_token_ids.extend(o.new_token_ids
+                                 for o in chunk_token_outputs.to_outputs())
+    assert chunked_token_ids == token_ids
+
+
 def nested_equal(a: NestedTensors, b: NestedTensors):
     if isinstance(a, torch.Tensor):
         return torch.equal(a, b)
@@ -101,11 +101,18 @@ def _construct_expected_sampling_metadata(
                                          dtype=torch.bool,
                                          device=device)
     bad_words_token_ids = {}
+    output_bin_counts = torch.zeros(num_reqs,
+                                    VOCAB_SIZE,
+                                    dtype=torch.int32,
+                                    device=device)
     for req in reqs:
         if req.req_id not in req_ids_retained:
             continue
         index_in_input_batch = req_id_index_in_input_batch[req.req_id]
         output_token_ids[index_in_input_batch] = req.output_token_ids
+        output_bin_counts[index_in_input_batch] = torch.bincount(
+            torch.tensor(req.output_token_ids, dtype=torch.int64),
+            minlength=VOCAB_SIZE).to(device)
         prompt_token_ids[index_in_input_batch] = req.prompt_token_ids
         presence_penalties[
             index_in_input_batch] = req.sampling_params.presence_penalty
@@ -164,6 +171,7 @@ def _construct_expected_sampling_metadata(
         logit_bias=logit_bias,
         allowed_token_ids_mask=allowed_token_ids_mask,
         bad_words_token_ids=bad_words_token_ids,
+        output_bin_counts=output_bin_counts,
     )
 
 
@@ -199,6 +207,7 @@ def _construct_cached_request_state(req_id_suffix: int):
         sampling_params=_create_sampling_params(),
         mm_inputs=[],
         mm_positions=[],
+        mm_hashes=[],
         block_ids=[],
         generator=None,
         num_computed_tokens=len(output_token_ids),
@@ -236,6 +245,7 @@ def test_sampling_metadata_in_input_batch(device: str, batch_size: int):
         reqs.append(req)
         req_id_reqs[req.req_id] = req
         req_id_output_token_ids[req.req_id] = req.output_token_ids
+    input_batch.update_output_bin_counts()
 
     # Remove some requests
     req_ids_to_remove, req_indices_to_remove = _remove_requests(
@@ -245,6 +255,12 @@ def test_sampling_metadata_in_input_batch(device: str, batch_size: int):
     # Compact the input batch
     input_batch.condense(req_indices_to_remove)
 
+    # Sample a new token for the retained requests
+    for req_id in req_ids_retained:
+        req_id_reqs[req_id].output_token_ids.append(
+            np.random.randint(0, VOCAB_SIZE))
+    input_batch.update_output_bin_counts()
+
     # Generate the sampling metadata
     sampling_metadata = input_batch._make_sampling_metadata()
 
@@ -291,6 +307,8 @@ def test_sampling_metadata_in_input_batch(device: str, batch_size: int):
             sampling_metadata.allowed_token_ids_mask)
     assert expected_sampling_metadata.bad_words_token_ids == \
         sampling_metadata.bad_words_token_ids
+    assert torch.equal(expected_sampling_metadata.output_bin_counts,
+                       sampling_metadata.output_bin_counts)
 
 
 @pytest.mark.parametrize("device", CUDA_DEVICES)
@@ -334,6 +352,7 @@ def test_swap_states_in_input_batch(device: str, batch_size: int,
         reqs.append(req)
         req_id_reqs[req.req_id] = req
         req_id_output_token_ids[req.req_id] = req.output_token_ids
+    input_batch.update_output_bin_counts()
 
     reordered_reqs = reqs.copy()
     for swap_pair in swap_list:
@@ -345,6 +364,7 @@ def test_swap_states_in_input_batch(device: str, batch_size: int,
         req = reordered_reqs[req_index]
         ref_input_batch.add_request(req, req_index)
 
+    ref_input_batch.update_output_bin_counts()
     input_batch.refresh_sampling_metadata()
     ref_input_batch.refresh_sampling_metadata()
 
@@ -1260,6 +1260,14 @@ class CacheConfig:
         sliding_window: Sliding window size for the KV cache.
         enable_prefix_caching: Whether to enable prefix caching.
         cpu_offload_gb: Size of the CPU offload buffer in GiB.
+        prefix_caching_eviction_policy: The eviction policy of the V1 prefix
+            cache, one of "lru", "lfu" (least frequently used with aging) or
+            "cost" (cost-aware, favors shared blocks and chain heads).
+        max_pinned_prefix_fraction: The maximum fraction of the V1 KV cache
+            blocks that pinned prefixes may hold.
+        block_pool_backend: The data structure of the V1 KV cache block pool,
+            either "object" (one Python object per block) or "array" (the
+            block states are kept in numpy arrays, for very large pools).
     """
 
     def compute_hash(self) -> str:
@@ -1294,6 +1302,9 @@ class CacheConfig:
         prefix_caching_hash_algo: str = "builtin",
         cpu_offload_gb: float = 0,
         calculate_kv_scales: Optional[bool] = None,
+        block_pool_backend: str = "object",
+        prefix_caching_eviction_policy: str = "lru",
+        max_pinned_prefix_fraction: float = 0.2,
     ) -> None:
         self.block_size = block_size
         self.gpu_memory_utilization = gpu_memory_utilization
@@ -1306,6 +1317,9 @@ class CacheConfig:
         self.prefix_caching_hash_algo = prefix_caching_hash_algo
         self.cpu_offload_gb = cpu_offload_gb
         self.calculate_kv_scales = calculate_kv_scales
+        self.block_pool_backend = block_pool_backend
+        self.prefix_caching_eviction_policy = prefix_caching_eviction_policy
+        self.max_pinned_prefix_fraction = max_pinned_prefix_fraction
         self._verify_args()
         self._verify_cache_dtype()
         self._verify_prefix_caching()
@@ -1328,6 +1342,28 @@ class CacheConfig:
             raise ValueError("CPU offload space must be non-negative"
                              f", but got {self.cpu_offload_gb}")
 
+        if not 0.0 <= self.max_pinned_prefix_fraction <= 1.0:
+            raise ValueError(
+                "Max pinned prefix fraction must be between 0 and 1. Got "
+                f"{self.max_pinned_prefix_fraction}.")
+
+        if self.block_pool_backend not in ("object", "array"):
+            raise ValueError(
+                f"Unknown block pool backend: {self.block_pool_backend}. "
+                "Must be one of 'object' or 'array'.")
+
+        if self.prefix_caching_eviction_policy not in ("lru", "lfu", "cost"):
+            raise ValueError(
+                "Unknown prefix caching eviction policy: "
+                f"{self.prefix_caching_eviction_policy}. Must be one of "
+                "'lru', 'lfu' or 'cost'.")
+
+        if (self.block_pool_backend == "array"
+                and self.prefix_caching_eviction_policy != "lru"):
+            raise ValueError(
+                "The 'array' block pool backend only supports the 'lru' "
+                "prefix caching eviction policy.")
+
         if self.gpu_memory_utilization > 1.0:
             raise ValueError(
                 "GPU memory utilization must be less than 1.0. Got "
@@ -1355,11 +1391,11 @@ class CacheConfig:
                 "Run with --disable-sliding-window to use prefix caching.")
 
         if self.enable_prefix_caching and self.prefix_caching_hash_algo not in (
-                "builtin", "sha256"):
+                "builtin", "sha256", "fast"):
             raise ValueError(
                 "Unknown prefix caching hash algorithm: "
-                f"{self.prefix_caching_hash_algo}. Must be either "
-                "'builtin' or 'sha256'.")
+                f"{self.prefix_caching_hash_algo}. Must be one of "
+                "'builtin', 'sha256' or 'fast'.")
 
     def verify_with_parallel_config(
         self,
@@ -1573,6 +1609,16 @@ class ParallelConfig:
     """Port of the data parallel master."""
     enable_expert_parallel: bool = False
     """Use expert parallelism instead of tensor parallelism for MoE layers."""
+    data_parallel_routing: Literal["load", "prefix"] = "load"
+    """How the front end routes requests across data parallel engines. "load"
+    sends each request to the engine with the fewest requests in flight.
+    "prefix" sends it to the engine expected to hold the longest prefix of the
+    request in its prefix cache, based on the cached and evicted blocks the
+    engines report."""
+    data_parallel_routing_max_imbalance: int = 16
+    """With "prefix" routing, the maximum number of requests in flight that
+    the chosen engine may have over the least loaded engine. Beyond it, the
+    request is sent to the least loaded engine instead."""
 
     max_parallel_loading_workers: Optional[int] = None
     """Maximum number of parallal loading workers when loading model
@@ -1784,7 +1830,8 @@ class ParallelConfig:
             "worker_extension_cls must be a string (qualified class name).")
 
 
-SchedulerPolicy = Literal["fcfs", "priority"]
+SchedulerPolicy = Literal["fcfs", "priority", "wfq", "slo"]
+FairShareKey = Literal["lora", "user"]
 
 
 @config
@@ -1866,7 +1913,20 @@ class SchedulerConfig:
     We use recomputation by default since it incurs lower overhead than
     swapping. However, when the sequence group has multiple sequences
     (e.g., beam search), recomputation is not currently supported. In
-    such a case, we use swapping instead."""
+    such a case, we use swapping instead.\n
+    In V1, recomputation is used unless this is "swap", in which case each
+    preempted request is either swapped out to the CPU swap space or
+    recomputed, whichever is estimated to be cheaper given its context
+    length, `preemption_swap_bandwidth` and
+    `preemption_recompute_throughput`."""
+
+    preemption_swap_bandwidth: float = 16.0
+    """The host-device bandwidth in GB/s assumed by the cost model of swap
+    preemption in V1."""
+
+    preemption_recompute_throughput: float = 10000.0
+    """The prefill throughput in tokens/s assumed by the cost model of swap
+    preemption in V1."""
 
     num_scheduler_steps: int = 1
     """Maximum number of forward steps per scheduler call."""
@@ -1885,7 +1945,31 @@ class SchedulerConfig:
     - "fcfs" means first come first served, i.e. requests are handled in order
     of arrival.\n
     - "priority" means requests are handled based on given priority (lower
-    value means earlier handling) and time of arrival deciding any ties)."""
+    value means earlier handling) and time of arrival deciding any ties).\n
+    - "wfq" means weighted fair queuing across tenants within each priority
+    level, so that each tenant gets a share of the prefill tokens
+    proportional to its weight. Only supported by the V1 engine.\n
+    - "slo" means the requests are handled in the order of their time to
+    first token deadlines (`SamplingParams.ttft_slo`) within each priority
+    level, and the requests without a target go last. The prefill tokens of
+    a step are capped so that the step meets the tightest time per output
+    token target (`SamplingParams.tpot_slo`) of the decoding requests,
+    unless the next waiting request would miss its deadline. The requests
+    without a time per output token target are preempted first. Only
+    supported by the V1 engine.\n
+    With a policy other than "fcfs", the V1 engine preempts the running
+    request with the lowest priority first."""
+
+    fair_share_key: FairShareKey = "lora"
+    """How the tenants are identified by the "wfq" scheduling policy:\n
+    - "lora" means each LoRA adapter is a tenant, and the requests to the base
+    model share one tenant.\n
+    - "user" means the `user` field of the OpenAI API requests (or
+    `SamplingParams.extra_args["user"]`) is the tenant."""
+
+    fair_share_weights: Optional[dict[str, float]] = None
+    """The weights of the tenants for the "wfq" scheduling policy, e.g.,
+    '{"tenant-a": 2.0}'. The tenants that are not listed have weight 1."""
 
     chunked_prefill_enabled: bool = field(init=False)
     """True if chunked prefill is enabled."""
@@ -1903,6 +1987,22 @@ class SchedulerConfig:
     default scheduler. Can be a class directly or the path to a class of form
     "mod.custom_class"."""
 
+    async_scheduling: bool = False
+    """If set to True, the V1 engine schedules the next step while the current
+    step is executed, assuming that each running request generates one token
+    per step. The stops are reconciled when the outputs of the step are
+    received. This hides the scheduling overhead between the steps. Not
+    supported with pipeline parallelism, speculative decoding or KV transfer,
+    and only supported with the "mp" and "uni" distributed executor
+    backends."""
+
+    target_step_time: Optional[float] = None
+    """If set, the V1 scheduler adapts the number of tokens scheduled in each
+    step so that a step is expected to take this long (in seconds). The step
+    time is modeled online from the measured steps, and the prefill tokens
+    get what remains of the budget after the decoding requests. The budget
+    never exceeds `max_num_batched_tokens`."""
+
     def compute_hash(self) -> str:
         """
         WARNING: Whenever a new field is added to this config,
@@ -1991,6 +2091,27 @@ class SchedulerConfig:
         self._verify_args()
 
     def _verify_args(self) -> None:
+        if self.preemption_mode not in (None, "swap", "recompute"):
+            raise ValueError("preemption_mode must be 'swap' or 'recompute'. "
+                             f"Got {self.preemption_mode}.")
+
+        if (self.preemption_swap_bandwidth <= 0
+                or self.preemption_recompute_throughput <= 0):
+            raise ValueError(
+                "preemption_swap_bandwidth "
+                f"({self.preemption_swap_bandwidth}) and "
+                "preemption_recompute_throughput "
+                f"({self.preemption_recompute_throughput}) must be positive.")
+
+        if self.target_step_time is not None and self.target_step_time <= 0:
+            raise ValueError("target_step_time must be positive. Got "
+                             f"{self.target_step_time}.")
+
+        if self.fair_share_weights is not None and any(
+                weight <= 0 for weight in self.fair_share_weights.values()):
+            raise ValueError("fair_share_weights must be positive. Got "
+                             f"{self.fair_share_weights}.")
+
         if (self.max_num_batched_tokens < self.max_model_len
                 and not self.chunked_prefill_enabled):
             raise ValueError(
@@ -2125,10 +2246,16 @@ class SpeculativeConfig:
                     Related additional configuration:
                     - prompt_lookup_max (Optional[int]):
                         Maximum size of ngram token window when using Ngram
-                        proposer, required when method is set to ngram.
+                        proposer, required when method is set to ngram. In
+                        V1, a longer match is cut to its last
+                        prompt_lookup_max tokens.
                     - prompt_lookup_min (Optional[int]):
                         Minimum size of ngram token window when using Ngram
                         proposer, if provided. Defaults to 1.
+                    - prompt_lookup_corpus_tokens (int): The number of
+                        recent output tokens of the finished requests that
+                        the V1 Ngram proposer also searches for matches.
+                        Defaults to 0 (disabled).
                 - eagle
                 - medusa
                 - mlp_speculator
@@ -2221,6 +2348,7 @@ class SpeculativeConfig:
     disable_by_batch_size: Optional[int] = None
     prompt_lookup_max: Optional[int] = None
     prompt_lookup_min: Optional[int] = None
+    prompt_lookup_corpus_tokens: int = 0
     posterior_threshold: Optional[float] = None
     posterior_alpha: Optional[float] = None
 
@@ -2331,6 +2459,10 @@ class SpeculativeConfig:
                 raise ValueError(
                     f"prompt_lookup_min={self.prompt_lookup_min} must "
                     f"be <= prompt_lookup_max={self.prompt_lookup_max}")
+            if self.prompt_lookup_corpus_tokens < 0:
+                raise ValueError("prompt_lookup_corpus_tokens="
+                                 f"{self.prompt_lookup_corpus_tokens} must "
+                                 "be >= 0")
 
             # TODO: current we still need extract vocab_size from target model
             # config, in future, we may try refactor it out, and set
@@ -100,3 +100,13 @@ KVConnectorFactory.register_connector(
     "SharedStorageConnector",
     "vllm.distributed.kv_transfer.kv_connector.v1.shared_storage_connector",
     "SharedStorageConnector")
+
+KVConnectorFactory.register_connector(
+    "CPUOffloadConnector",
+    "vllm.distributed.kv_transfer.kv_connector.v1.cpu_offload_connector",
+    "CPUOffloadConnector")
+
+KVConnectorFactory.register_connector(
+    "DiskCacheConnector",
+    "vllm.distributed.kv_transfer.kv_connector.v1.disk_cache_connector",
+    "DiskCacheConnector")
@@ -8,6 +8,7 @@ import vllm.envs as envs
 from vllm import _custom_ops as ops
 from vllm.config import VllmConfig
 from vllm.logger import init_logger
+from vllm.utils import STR_DTYPE_TO_TORCH_DTYPE, get_dtype_size
 
 logger = init_logger(__name__)
 
@@ -88,3 +89,25 @@ class model_aware_kv_ops_helper:
                 layer.self_attn.attn._k_scale,
                 layer.self_attn.attn._v_scale,
             )
+
+
+def get_kv_block_size_bytes(config: VllmConfig) -> int:
+    """Get the size in bytes of one KV cache block across all the attention
+    layers held by a single worker. This is used by the connectors that keep
+    a size-bounded copy of the KV cache outside of the GPU.
+    """
+    model_config = config.model_config
+    cache_config = config.cache_config
+    parallel_config = config.parallel_config
+
+    if cache_config.cache_dtype == "auto":
+        kv_cache_dtype = model_config.dtype
+    else:
+        kv_cache_dtype = STR_DTYPE_TO_TORCH_DTYPE[cache_config.cache_dtype]
+
+    # For MLA we only store a single latent vector.
+    coef = 1 if model_config.use_mla else 2
+    return (coef * cache_config.block_size *
+            model_config.get_num_kv_heads(parallel_config) *
+            model_config.get_head_size() * get_dtype_size(kv_cache_dtype) *
+            model_config.get_num_layers(parallel_config))
@@ -10,6 +10,8 @@ The class provides the following primitives:
             that exist in the remote KV cache
         update_state_after_alloc() - update KVConnector state after
             temporary buffer alloc by the CacheManager.
+        on_block_evicted() - (optional) get notified when a cached block
+            is evicted from the local prefix cache.
 
     Worker-side: runs in each worker, loads/saves KV cache to/from
     the Connector based on the metadata.
@@ -34,6 +36,7 @@ if TYPE_CHECKING:
     from vllm.attention.backends.abstract import AttentionMetadata
     from vllm.config import VllmConfig
     from vllm.forward_context import ForwardContext
+    from vllm.v1.core.kv_cache_utils import BlockHashType
     from vllm.v1.request import Request
 
 logger = init_logger(__name__)
@@ -194,6 +197,20 @@ class KVConnectorBase_V1(ABC):
         """
         pass
 
+    def on_block_evicted(self, block_hash: "BlockHashType",
+                         block_id: int) -> None:
+        """
+        Called when a cached block is evicted from the local prefix cache,
+        right before the block is handed out for reuse. The KV content of
+        the block stays valid until the next forward pass, so connectors
+        may schedule a copy of it in the metadata of the current step.
+
+        Args:
+            block_hash (BlockHashType): the hash of the evicted block.
+            block_id (int): the id of the evicted block.
+        """
+        return
+
     @abstractmethod
     def build_connector_meta(
             self, scheduler_output: SchedulerOutput) -> KVConnectorMetadata:
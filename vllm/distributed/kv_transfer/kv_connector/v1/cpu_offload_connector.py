@@ -0,0 +1,300 @@
+# SPDX-License-Identifier: Apache-2.0
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+import torch
+
+from vllm.config import VllmConfig
+from vllm.distributed.kv_transfer.kv_connector.utils import (
+    get_kv_block_size_bytes)
+from vllm.distributed.kv_transfer.kv_connector.v1.base import (
+    KVConnectorBase_V1, KVConnectorMetadata, KVConnectorRole)
+from vllm.logger import init_logger
+from vllm.utils import GiB_bytes, is_pin_memory_available
+from vllm.v1.attention.backends.mla.common import MLACommonMetadata
+from vllm.v1.core.kv_cache_utils import (BlockHashType, get_block_hash_fn,
+                                         hash_request_tokens)
+from vllm.v1.core.sched.output import SchedulerOutput
+
+if TYPE_CHECKING:
+    from vllm.attention.backends.abstract import AttentionMetadata
+    from vllm.forward_context import ForwardContext
+    from vllm.v1.request import Request
+
+logger = init_logger(__name__)
+
+
+@dataclass
+class CPUOffloadConnectorMetadata(KVConnectorMetadata):
+    # (GPU block ID, CPU slot) pairs to copy from device to host. These are
+    # the blocks evicted from the prefix cache in this step, so the copies
+    # must happen before the forward pass overwrites them.
+    blocks_to_offload: list[tuple[int, int]] = field(default_factory=list)
+    # (CPU slot, GPU block ID) pairs to copy from host to device.
+    blocks_to_load: list[tuple[int, int]] = field(default_factory=list)
+
+
+class CPUOffloadConnector(KVConnectorBase_V1):
+    """A second-tier prefix cache that keeps the KV of blocks evicted from
+    the GPU prefix cache in a size-bounded LRU store in host memory.
+
+    The scheduler-side connector owns the index of the store: it maps block
+    hashes to slots of a preallocated CPU buffer, decides which slots to
+    reuse and tells the workers which copies to perform through the
+    connector metadata. The worker-side connector only holds the buffers
+    and executes the copies, so both sides never disagree on the content
+    of a slot.
+
+    Configured through `kv_connector_extra_config`:
+        cpu_offload_size_gb: the size of the host memory store per worker.
+    """
+
+    def __init__(self, vllm_config: "VllmConfig", role: KVConnectorRole):
+        super().__init__(vllm_config=vllm_config, role=role)
+        self._block_size = vllm_config.cache_config.block_size
+        transfer_config = vllm_config.kv_transfer_config
+        size_gb = float(
+            transfer_config.get_from_extra_config("cpu_offload_size_gb", 4))
+        self._num_cpu_blocks = int(size_gb * GiB_bytes //
+                                   get_kv_block_size_bytes(vllm_config))
+        logger.info("CPU offload store holds %d blocks (%.2f GiB)",
+                    self._num_cpu_blocks, size_gb)
+        if not vllm_config.cache_config.enable_prefix_caching:
+            logger.warning("CPUOffloadConnector is a no-op when prefix "
+                           "caching is disabled.")
+
+        # Scheduler-side states.
+        self._hash_fn = get_block_hash_fn(
+            vllm_config.cache_config.prefix_caching_hash_algo)
+        # {block_hash: CPU slot} in LRU order (the oldest entry first).
+        self._cpu_cache: OrderedDict[BlockHashType, int] = OrderedDict()
+        self._free_slots: list[int] = list(
+            range(self._num_cpu_blocks - 1, -1, -1))
+        self._blocks_to_offload: list[tuple[int, int]] = []
+        # Slots that will be loaded in the current step and so must not be
+        # reused by the offloads of the same step.
+        self._locked_slots: set[int] = set()
+        # {req_id: CPU slots} of the hits found by get_num_new_matched_tokens.
+        self._load_candidates: dict[str, list[int]] = {}
+        self._requests_need_load: dict[str, list[int]] = {}
+
+        # Worker-side states.
+        # {layer_name: CPU buffer with the same layout as the GPU KV cache}
+        self._cpu_kv_caches: dict[str, torch.Tensor] = {}
+
+    # ==============================
+    # Worker-side methods
+    # ==============================
+
+    def start_load_kv(self, forward_context: "ForwardContext",
+                      **kwargs) -> None:
+        """Copy the evicted blocks to the host and the hit blocks back to
+        the device. Offloads are done first since a block evicted in this
+        step may be the destination of a load in the same step.
+
+        Args:
+            forward_context (ForwardContext): the forward context.
+            **kwargs: additional arguments for the load operation
+        """
+        metadata = self._get_connector_metadata()
+        assert isinstance(metadata, CPUOffloadConnectorMetadata)
+        if not metadata.blocks_to_offload and not metadata.blocks_to_load:
+            return
+
+        attn_metadata = forward_context.attn_metadata
+        # The block dimension is 0 for MLA ([num_pages, page_size, xxx]) and
+        # 1 otherwise ([2, num_pages, page_size, xxx]).
+        block_dim = 0 if isinstance(attn_metadata, MLACommonMetadata) else 1
+
+        for layer_name, attn_layer in forward_context.no_compile_layers.items(
+        ):
+            kv_cache_layer = attn_layer.kv_cache[
+                forward_context.virtual_engine]
+            cpu_kv_cache = self._get_cpu_kv_cache(layer_name, kv_cache_layer,
+                                                  block_dim)
+            device = kv_cache_layer.device
+
+            if metadata.blocks_to_offload:
+                gpu_ids, cpu_slots = zip(*metadata.blocks_to_offload)
+                cpu_kv_cache.index_copy_(
+                    block_dim, torch.tensor(cpu_slots),
+                    kv_cache_layer.index_select(
+                        block_dim, torch.tensor(gpu_ids, device=device)).cpu())
+            if metadata.blocks_to_load:
+                cpu_slots, gpu_ids = zip(*metadata.blocks_to_load)
+                kv_cache_layer.index_copy_(
+                    block_dim, torch.tensor(gpu_ids, device=device),
+                    cpu_kv_cache.index_select(block_dim,
+                                              torch.tensor(cpu_slots)).to(
+                                                  device, non_blocking=True))
+
+    def wait_for_layer_load(self, layer_name: str) -> None:
+        # All loads are issued on the current stream in start_load_kv.
+        return
+
+    def save_kv_layer(self, layer_name: str, kv_layer: torch.Tensor,
+                      attn_metadata: "AttentionMetadata", **kwargs) -> None:
+        # Blocks are only copied out when they are evicted.
+        return
+
+    def wait_for_save(self):
+        return
+
+    def _get_cpu_kv_cache(self, layer_name: str, kv_cache_layer: torch.Tensor,
+                          block_dim: int) -> torch.Tensor:
+        """Lazily allocate the CPU buffer of a layer, mirroring the layout
+        of its GPU KV cache with `num_cpu_blocks` pages."""
+        cpu_kv_cache = self._cpu_kv_caches.get(layer_name)
+        if cpu_kv_cache is None:
+            shape = list(kv_cache_layer.shape)
+            shape[block_dim] = self._num_cpu_blocks
+            cpu_kv_cache = torch.empty(shape,
+                                       dtype=kv_cache_layer.dtype,
+                                       device="cpu",
+                                       pin_memory=is_pin_memory_available())
+            self._cpu_kv_caches[layer_name] = cpu_kv_cache
+        return cpu_kv_cache
+
+    # ==============================
+    # Scheduler-side methods
+    # ==============================
+
+    def get_num_new_matched_tokens(
+        self,
+        request: "Request",
+        num_computed_tokens: int,
+    ) -> int:
+        """
+        Get number of new tokens that can be loaded from the host memory
+        store beyond the num_computed_tokens.
+
+        Args:
+            request (Request): the request object.
+            num_computed_tokens (int): the number of locally
+                computed tokens for this request
+
+        Returns:
+            the number of tokens that can be loaded from the
+            host memory store beyond what is already computed.
+        """
+        if not self._cpu_cache or (request.sampling_params.prompt_logprobs
+                                   is not None):
+            return 0
+
+        block_hashes = hash_request_tokens(self._hash_fn, self._block_size,
+                                           request)
+        # NOTE: At least the last token must be computed to sample the next
+        # token, and num_computed_tokens must stay aligned with the block
+        # size, so the block holding the last token is never loaded.
+        num_loadable_blocks = (request.num_tokens - 1) // self._block_size
+        slots: list[int] = []
+        for block_hash in block_hashes[num_computed_tokens //
+                                       self._block_size:num_loadable_blocks]:
+            slot = self._cpu_cache.get(block_hash)
+            if slot is None:
+                break
+            self._cpu_cache.move_to_end(block_hash)
+            slots.append(slot)
+
+        if not slots:
+            return 0
+        self._locked_slots.update(slots)
+        self._load_candidates[request.request_id] = slots
+        return len(slots) * self._block_size
+
+    def update_state_after_alloc(self, request: "Request",
+                                 num_external_tokens: int):
+        """
+        Update KVConnector state after block allocation.
+
+        If blocks were allocated, add to _requests_need_load,
+        such that we load the KVs in the next forward pass.
+        """
+        slots = self._load_candidates.pop(request.request_id, None)
+        if num_external_tokens > 0:
+            assert slots is not None
+            assert len(slots) * self._block_size == num_external_tokens
+            self._requests_need_load[request.request_id] = slots
+
+    def on_block_evicted(self, block_hash: BlockHashType,
+                         block_id: int) -> None:
+        """Schedule the copy of an evicted block to the host memory store.
+
+        Args:
+            block_hash (BlockHashType): the hash of the evicted block.
+            block_id (int): the id of the evicted block.
+        """
+        if block_hash in self._cpu_cache:
+            # The content is already in the store.
+            self._cpu_cache.move_to_end(block_hash)
+            return
+
+        slot = self._allocate_slot()
+        if slot is None:
+            return
+        self._cpu_cache[block_hash] = slot
+        self._blocks_to_offload.append((block_id, slot))
+
+    def build_connector_meta(
+        self,
+        scheduler_output: SchedulerOutput,
+    ) -> KVConnectorMetadata:
+        """Build the connector metadata for this step.
+
+        This function should NOT modify any fields in the scheduler_output.
+        Also, calling this function will reset the state of the connector.
+
+        Args:
+            scheduler_output (SchedulerOutput): the scheduler output object.
+        """
+        meta = CPUOffloadConnectorMetadata(
+            blocks_to_offload=self._blocks_to_offload)
+
+        # NOTE: num_computed_tokens includes both the local and the external
+        # hits, and the external hits always directly follow the local ones.
+        for new_req in scheduler_output.scheduled_new_reqs:
+            slots = self._requests_need_load.pop(new_req.req_id, None)
+            if slots is not None:
+                self._add_loads(meta, slots, new_req.block_ids,
+                                new_req.num_computed_tokens)
+
+        cached_reqs = scheduler_output.scheduled_cached_reqs
+        for i, req_id in enumerate(cached_reqs.req_ids):
+            # NOTE(rob): here we rely on the resumed requests being
+            # the first N requests in the list scheduled_cache_reqs.
+            if not cached_reqs.resumed_from_preemption[i]:
+                break
+            slots = self._requests_need_load.pop(req_id, None)
+            if slots is not None:
+                # NOTE(rob): For resumed req, new_block_ids is all
+                # of the block_ids for the request.
+                self._add_loads(meta, slots, cached_reqs.get_new_block_ids(i),
+                                int(cached_reqs.num_computed_tokens[i]))
+
+        assert not self._requests_need_load
+        self._blocks_to_offload = []
+        self._locked_slots.clear()
+        self._load_candidates.clear()
+        return meta
+
+    # ==============================
+    # Helper functions
+    # ==============================
+
+    def _add_loads(self, meta: CPUOffloadConnectorMetadata, slots: list[int],
+                   block_ids: list[int], num_computed_tokens: int) -> None:
+        start = num_computed_tokens // self._block_size - len(slots)
+        meta.blocks_to_load.extend(
+            zip(slots, block_ids[start:start + len(slots)]))
+
+    def _allocate_slot(self) -> Optional[int]:
+        """Get a free CPU slot, evicting the least recently used entry of
+        the store if needed. Returns None if all slots are locked."""
+        if self._free_slots:
+            return self._free_slots.pop()
+        for block_hash, slot in self._cpu_cache.items():
+            if slot not in self._locked_slots:
+                del self._cpu_cache[block_hash]
+                return slot
+        return None
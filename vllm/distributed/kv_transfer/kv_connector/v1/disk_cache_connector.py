@@ -0,0 +1,516 @@
+# SPDX-License-Identifier: Apache-2.0
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+import safetensors.torch
+import torch
+from safetensors import safe_open
+
+from vllm.config import VllmConfig
+from vllm.distributed.kv_transfer.kv_connector.utils import (
+    get_kv_block_size_bytes)
+from vllm.distributed.kv_transfer.kv_connector.v1.base import (
+    KVConnectorBase_V1, KVConnectorMetadata, KVConnectorRole)
+from vllm.logger import init_logger
+from vllm.utils import GiB_bytes
+from vllm.v1.attention.backends.mla.common import MLACommonMetadata
+from vllm.v1.core.kv_cache_utils import (generate_block_hash_extra_keys,
+                                         need_extra_keys)
+from vllm.v1.core.sched.output import SchedulerOutput
+
+if TYPE_CHECKING:
+    from vllm.attention.backends.abstract import AttentionMetadata
+    from vllm.forward_context import ForwardContext
+    from vllm.v1.request import Request
+
+logger = init_logger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class DiskCacheConnectorMetadata(KVConnectorMetadata):
+    # (block key, block ID) pairs to save after the forward pass.
+    blocks_to_save: list[tuple[str, int]] = field(default_factory=list)
+    # (block key, block ID) pairs to load before the forward pass.
+    blocks_to_load: list[tuple[str, int]] = field(default_factory=list)
+    # Keys of the blocks evicted from the disk cache.
+    keys_to_remove: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _RequestState:
+    request: "Request"
+    # The block IDs of the request, in order.
+    block_ids: list[int] = field(default_factory=list)
+    # The chained block keys of the full blocks of the request.
+    block_keys: list[str] = field(default_factory=list)
+    # The multi-modal index for the next block key.
+    next_mm_idx: int = 0
+
+
+class DiskCacheConnector(KVConnectorBase_V1):
+    """A persistent, size-bounded prefix cache on local disk.
+
+    Every full block is stored in one safetensors file per worker, named
+    after a chained SHA-256 key of the block tokens (and extra keys), so
+    that the keys are stable across restarts. The scheduler-side connector
+    keeps the index of the stored blocks in LRU order and evicts the least
+    recently used blocks once the cache is over capacity. The index is
+    persisted in a manifest that is rewritten atomically in the background,
+    and it is validated against the files on disk at start-up.
+
+    The worker-side connector copies the blocks to save to host memory
+    during the forward pass and writes them to disk on a background thread.
+    Blocks are written to a temporary file first and atomically renamed, so
+    a crash never leaves a partially written block behind. Reads are served
+    from memory-mapped files, or from memory if the write is still pending.
+
+    Configured through `kv_connector_extra_config`:
+        disk_cache_path: the directory of the cache.
+        disk_cache_size_gb: the size of the cache per worker.
+        disk_cache_manifest_interval: the minimum number of seconds between
+            two manifest writes.
+    """
+
+    def __init__(self, vllm_config: "VllmConfig", role: KVConnectorRole):
+        super().__init__(vllm_config=vllm_config, role=role)
+        self._block_size = vllm_config.cache_config.block_size
+        parallel_config = vllm_config.parallel_config
+        self._world_size = (parallel_config.tensor_parallel_size *
+                            parallel_config.pipeline_parallel_size)
+        transfer_config = vllm_config.kv_transfer_config
+        base_path = transfer_config.get_from_extra_config(
+            "disk_cache_path", "/tmp/vllm_disk_cache")
+        # Blocks of different models or layouts never share a directory.
+        self._path = os.path.join(base_path,
+                                  self._compute_fingerprint(vllm_config))
+        os.makedirs(self._path, exist_ok=True)
+
+        if role == KVConnectorRole.SCHEDULER:
+            size_gb = float(
+                transfer_config.get_from_extra_config("disk_cache_size_gb",
+                                                      64))
+            self._capacity = int(size_gb * GiB_bytes //
+                                 get_kv_block_size_bytes(vllm_config))
+            self._manifest_interval = float(
+                transfer_config.get_from_extra_config(
+                    "disk_cache_manifest_interval", 10))
+            # {block key: None} in LRU order (the oldest entry first).
+            self._index: OrderedDict[str, None] = OrderedDict()
+            self._req_states: dict[str, _RequestState] = {}
+            self._locked_keys: set[str] = set()
+            self._load_candidates: dict[str, list[str]] = {}
+            self._requests_need_load: dict[str, list[str]] = {}
+            self._keys_to_remove: list[str] = []
+            self._manifest_dirty = False
+            self._last_manifest_time = time.monotonic()
+            self._manifest_executor = ThreadPoolExecutor(max_workers=1)
+            self._restore_index()
+            logger.info("Disk cache at %s holds %d/%d blocks", self._path,
+                        len(self._index), self._capacity)
+        else:
+            from vllm.distributed.parallel_state import (get_pp_group,
+                                                         get_tp_group)
+            self._rank = (get_pp_group().rank_in_group *
+                          parallel_config.tensor_parallel_size +
+                          get_tp_group().rank_in_group)
+            # {layer_name: blocks copied to host memory in this step}
+            self._save_buffer: dict[str, torch.Tensor] = {}
+            self._save_block_dim = 1
+            # {block key: {layer_name: tensor}} of the writes not yet done.
+            self._pending_writes: dict[str, dict[str, torch.Tensor]] = {}
+            self._pending_lock = threading.Lock()
+            self._io_queue: queue.Queue = queue.Queue()
+            self._io_thread = threading.Thread(target=self._io_loop,
+                                               daemon=True,
+                                               name="disk_cache_io")
+            self._io_thread.start()
+
+    # ==============================
+    # Worker-side methods
+    # ==============================
+
+    def start_load_kv(self, forward_context: "ForwardContext",
+                      **kwargs) -> None:
+        """Load the hit blocks from disk into vLLM's paged KV buffer.
+
+        Args:
+            forward_context (ForwardContext): the forward context.
+            **kwargs: additional arguments for the load operation
+        """
+        metadata = self._get_connector_metadata()
+        assert isinstance(metadata, DiskCacheConnectorMetadata)
+        for key in metadata.keys_to_remove:
+            self._io_queue.put(("remove", key, None))
+        if not metadata.blocks_to_load:
+            return
+
+        block_dim = self._get_block_dim(forward_context.attn_metadata)
+        for key, block_id in metadata.blocks_to_load:
+            with self._pending_lock:
+                tensors = self._pending_writes.get(key)
+            if tensors is not None:
+                self._inject_block(forward_context, block_dim, block_id,
+                                   tensors.__getitem__)
+                continue
+
+            filename = self._get_filename(key, self._rank)
+            if not os.path.exists(filename):
+                raise RuntimeError(
+                    f"Block {key} is missing from the disk cache at "
+                    f"{self._path}. It may have been removed externally.")
+            # safe_open memory-maps the file, so only the data of the
+            # layers being copied is read.
+            with safe_open(filename, framework="pt", device="cpu") as f:
+                self._inject_block(forward_context, block_dim, block_id,
+                                   f.get_tensor)
+
+    def wait_for_layer_load(self, layer_name: str) -> None:
+        # All loads are done in start_load_kv.
+        return
+
+    def save_kv_layer(self, layer_name: str, kv_layer: torch.Tensor,
+                      attn_metadata: "AttentionMetadata", **kwargs) -> None:
+        """Copy the blocks to save of this layer to host memory. They are
+        written to disk in the background once all the layers are done.
+
+        Args:
+            layer_name (str): the name of the layer.
+            kv_layer (torch.Tensor): the paged KV buffer of the current
+                layer in vLLM.
+            attn_metadata (AttentionMetadata): the attention metadata.
+            **kwargs: additional arguments for the save operation.
+        """
+        metadata = self._get_connector_metadata()
+        assert isinstance(metadata, DiskCacheConnectorMetadata)
+        if not metadata.blocks_to_save:
+            return
+        self._save_block_dim = self._get_block_dim(attn_metadata)
+        block_ids = torch.tensor(
+            [block_id for _, block_id in metadata.blocks_to_save],
+            device=kv_layer.device)
+        self._save_buffer[layer_name] = kv_layer.index_select(
+            self._save_block_dim, block_ids).cpu()
+
+    def wait_for_save(self):
+        """Hand the blocks copied in this step over to the I/O thread."""
+        if not self._save_buffer:
+            return
+        metadata = self._get_connector_metadata()
+        assert isinstance(metadata, DiskCacheConnectorMetadata)
+        for i, (key, _) in enumerate(metadata.blocks_to_save):
+            tensors = {
+                layer_name: data.select(self._save_block_dim, i).contiguous()
+                for layer_name, data in self._save_buffer.items()
+            }
+            with self._pending_lock:
+                self._pending_writes[key] = tensors
+            self._io_queue.put(("save", key, tensors))
+        self._save_buffer = {}
+
+    def _inject_block(self, forward_context: "ForwardContext", block_dim: int,
+                      block_id: int, get_tensor) -> None:
+        for layer_name, attn_layer in forward_context.no_compile_layers.items(
+        ):
+            kv_cache_layer = attn_layer.kv_cache[
+                forward_context.virtual_engine]
+            kv_cache_layer.select(block_dim,
+                                  block_id).copy_(get_tensor(layer_name))
+
+    def _io_loop(self) -> None:
+        """Write and remove block files in the order they were requested."""
+        while True:
+            op, key, tensors = self._io_queue.get()
+            filename = self._get_filename(key, self._rank)
+            try:
+                if op == "save":
+                    tmp_filename = f"{filename}.tmp"
+                    safetensors.torch.save_file(tensors, tmp_filename)
+                    os.replace(tmp_filename, filename)
+                elif os.path.exists(filename):
+                    os.remove(filename)
+            except OSError:
+                logger.exception("Failed to %s block %s in the disk cache", op,
+                                 key)
+            finally:
+                if op == "save":
+                    with self._pending_lock:
+                        if self._pending_writes.get(key) is tensors:
+                            del self._pending_writes[key]
+
+    # ==============================
+    # Scheduler-side methods
+    # ==============================
+
+    def get_num_new_matched_tokens(
+        self,
+        request: "Request",
+        num_computed_tokens: int,
+    ) -> int:
+        """
+        Get number of new tokens that can be loaded from the
+        disk cache beyond the num_computed_tokens.
+
+        Args:
+            request (Request): the request object.
+            num_computed_tokens (int): the number of locally
+                computed tokens for this request
+
+        Returns:
+            the number of tokens that can be loaded from the
+            disk cache beyond what is already computed.
+        """
+        state = self._req_states.get(request.request_id)
+        if state is None:
+            state = _RequestState(request)
+            self._req_states[request.request_id] = state
+        if not self._index or (request.sampling_params.prompt_logprobs
+                               is not None):
+            return 0
+
+        # NOTE: At least the last token must be computed to sample the next
+        # token, and num_computed_tokens must stay aligned with the block
+        # size, so the block holding the last token is never loaded.
+        num_loadable_blocks = (request.num_tokens - 1) // self._block_size
+        keys: list[str] = []
+        for key in self._get_block_keys(
+                state)[num_computed_tokens //
+                       self._block_size:num_loadable_blocks]:
+            if key not in self._index:
+                break
+            self._index.move_to_end(key)
+            keys.append(key)
+
+        if not keys:
+            return 0
+        self._locked_keys.update(keys)
+        self._load_candidates[request.request_id] = keys
+        return len(keys) * self._block_size
+
+    def update_state_after_alloc(self, request: "Request",
+                                 num_external_tokens: int):
+        """
+        Update KVConnector state after block allocation.
+
+        If blocks were allocated, add to _requests_need_load,
+        such that we load the KVs in the next forward pass.
+        """
+        keys = self._load_candidates.pop(request.request_id, None)
+        if num_external_tokens > 0:
+            assert keys is not None
+            self._requests_need_load[request.request_id] = keys
+
+    def build_connector_meta(
+        self,
+        scheduler_output: SchedulerOutput,
+    ) -> KVConnectorMetadata:
+        """Build the connector metadata for this step.
+
+        This function should NOT modify any fields in the scheduler_output.
+        Also, calling this function will reset the state of the connector.
+
+        Args:
+            scheduler_output (SchedulerOutput): the scheduler output object.
+        """
+        meta = DiskCacheConnectorMetadata()
+        for req_id in scheduler_output.finished_req_ids:
+            self._req_states.pop(req_id, None)
+
+        for new_req in scheduler_output.scheduled_new_reqs:
+            state = self._req_states[new_req.req_id]
+            state.block_ids = list(new_req.block_ids)
+            self._add_loads(meta, state, new_req.req_id,
+                            new_req.num_computed_tokens)
+            # Blocks hit in the local prefix cache may not be on disk yet.
+            self._add_saves(
+                meta, state, 0, new_req.num_computed_tokens +
+                scheduler_output.num_scheduled_tokens[new_req.req_id])
+
+        cached_reqs = scheduler_output.scheduled_cached_reqs
+        for i, req_id in enumerate(cached_reqs.req_ids):
+            if req_id not in self._req_states:
+                continue
+            state = self._req_states[req_id]
+            num_computed_tokens = int(cached_reqs.num_computed_tokens[i])
+            if cached_reqs.resumed_from_preemption[i]:
+                # NOTE(rob): For resumed req, new_block_ids is all
+                # of the block_ids for the request.
+                state.block_ids = cached_reqs.get_new_block_ids(i)
+                self._add_loads(meta, state, req_id, num_computed_tokens)
+                start_token = 0
+            else:
+                state.block_ids.extend(cached_reqs.get_new_block_ids(i))
+                start_token = num_computed_tokens
+            self._add_saves(
+                meta, state, start_token, num_computed_tokens +
+                scheduler_output.num_scheduled_tokens[req_id])
+
+        assert not self._requests_need_load
+        meta.keys_to_remove = self._keys_to_remove
+        self._keys_to_remove = []
+        self._locked_keys.clear()
+        self._load_candidates.clear()
+        self._maybe_write_manifest()
+        return meta
+
+    # ==============================
+    # Helper functions
+    # ==============================
+
+    def _add_loads(self, meta: DiskCacheConnectorMetadata,
+                   state: _RequestState, req_id: str,
+                   num_computed_tokens: int) -> None:
+        keys = self._requests_need_load.pop(req_id, None)
+        if keys is None:
+            return
+        # NOTE: num_computed_tokens includes both the local and the external
+        # hits, and the external hits always directly follow the local ones.
+        start = num_computed_tokens // self._block_size - len(keys)
+        meta.blocks_to_load.extend(
+            zip(keys, state.block_ids[start:start + len(keys)]))
+
+    def _add_saves(self, meta: DiskCacheConnectorMetadata,
+                   state: _RequestState, start_token: int,
+                   end_token: int) -> None:
+        """Save the blocks that become full in [start_token, end_token) and
+        are not in the disk cache yet."""
+        if self._capacity <= 0:
+            return
+        # Scheduled spec tokens are not part of the request tokens and may
+        # be rejected, so they are never saved.
+        end_token = min(end_token, state.request.num_tokens)
+        block_keys = self._get_block_keys(state)
+        for i in range(start_token // self._block_size,
+                       end_token // self._block_size):
+            key = block_keys[i]
+            if key in self._index:
+                self._index.move_to_end(key)
+                continue
+            self._insert(key)
+            meta.blocks_to_save.append((key, state.block_ids[i]))
+
+    def _insert(self, key: str) -> None:
+        """Add a block to the index, evicting the least recently used blocks
+        that are not being loaded in this step if over capacity."""
+        self._index[key] = None
+        self._manifest_dirty = True
+        if len(self._index) <= self._capacity:
+            return
+        for old_key in self._index:
+            if old_key not in self._locked_keys and old_key != key:
+                del self._index[old_key]
+                self._keys_to_remove.append(old_key)
+                return
+
+    def _get_block_keys(self, state: _RequestState) -> list[str]:
+        """Extend the chained block keys of a request to all its full
+        blocks. Unlike the prefix caching hashes, the keys are stable across
+        processes and restarts."""
+        request = state.request
+        block_keys = state.block_keys
+        req_need_extra_keys = need_extra_keys(request)
+        extra_keys = None
+        token_ids = request.all_token_ids
+        for i in range(len(block_keys),
+                       request.num_tokens // self._block_size):
+            start, end = i * self._block_size, (i + 1) * self._block_size
+            if req_need_extra_keys:
+                extra_keys, state.next_mm_idx = generate_block_hash_extra_keys(
+                    request, start, end, state.next_mm_idx)
+            hasher = hashlib.sha256(
+                block_keys[-1].encode() if block_keys else b"")
+            hasher.update(
+                repr((tuple(token_ids[start:end]), extra_keys)).encode())
+            block_keys.append(hasher.hexdigest())
+        return block_keys
+
+    def _get_filename(self, key: str, rank: int) -> str:
+        return os.path.join(self._path, f"{key}.rank{rank}.safetensors")
+
+    def _restore_index(self) -> None:
+        """Rebuild the index from the manifest, keeping only the blocks that
+        are complete on disk for all the workers, and remove the files that
+        are not referenced by the index or were left behind by interrupted
+        writes."""
+        manifest_path = os.path.join(self._path, MANIFEST_FILENAME)
+        keys: list[str] = []
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == MANIFEST_VERSION:
+                    keys = manifest["keys"]
+            except (OSError, ValueError, KeyError):
+                logger.warning("Ignoring corrupted disk cache manifest %s",
+                               manifest_path)
+
+        for key in keys[-self._capacity:] if self._capacity > 0 else []:
+            if all(
+                    os.path.exists(self._get_filename(key, rank))
+                    for rank in range(self._world_size)):
+                self._index[key] = None
+
+        for filename in os.listdir(self._path):
+            if filename == MANIFEST_FILENAME:
+                continue
+            if (filename.endswith(".tmp")
+                    or filename.split(".", 1)[0] not in self._index):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self._path, filename))
+
+    def _maybe_write_manifest(self) -> None:
+        now = time.monotonic()
+        if (not self._manifest_dirty
+                or now - self._last_manifest_time < self._manifest_interval):
+            return
+        self._manifest_dirty = False
+        self._last_manifest_time = now
+        manifest = {"version": MANIFEST_VERSION, "keys": list(self._index)}
+        self._manifest_executor.submit(self._write_manifest, manifest)
+
+    def _write_manifest(self, manifest: dict[str, Any]) -> None:
+        manifest_path = os.path.join(self._path, MANIFEST_FILENAME)
+        tmp_path = f"{manifest_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, manifest_path)
+        except OSError:
+            logger.exception("Failed to write the disk cache manifest")
+
+    @staticmethod
+    def _get_block_dim(attn_metadata: Optional["AttentionMetadata"]) -> int:
+        # The block dimension is 0 for MLA ([num_pages, page_size, xxx]) and
+        # 1 otherwise ([2, num_pages, page_size, xxx]).
+        return 0 if isinstance(attn_metadata, MLACommonMetadata) else 1
+
+    @staticmethod
+    def _compute_fingerprint(vllm_config: "VllmConfig") -> str:
+        model_config = vllm_config.model_config
+        parallel_config = vllm_config.parallel_config
+        factors = [
+            model_config.model,
+            model_config.revision,
+            str(model_config.dtype),
+            vllm_config.cache_config.cache_dtype,
+            vllm_config.cache_config.block_size,
+            parallel_config.tensor_parallel_size,
+            parallel_config.pipeline_parallel_size,
+            # Engines of different data parallel ranks never share files.
+            parallel_config.data_parallel_rank,
+        ]
+        return hashlib.md5(str(factors).encode(),
+                           usedforsecurity=False).hexdigest()
@@ -303,23 +303,24 @@ class SharedStorageConnector(KVConnectorBase_V1):
                                      block_size=self._block_size,
                                      is_store=True)
 
-        for cached_req in scheduler_output.scheduled_cached_reqs:
+        cached_reqs = scheduler_output.scheduled_cached_reqs
+        for i, req_id in enumerate(cached_reqs.req_ids):
             # NOTE(rob): here we rely on the resumed requests being
             # the first N requests in the list scheduled_cache_reqs.
-            if not cached_req.resumed_from_preemption:
+            if not cached_reqs.resumed_from_preemption[i]:
                 break
-            if cached_req.req_id in self._requests_need_load:
+            if req_id in self._requests_need_load:
                 # NOTE(rob): cached_req_data does not have the full
                 # list of token ids (only new tokens). So we look it
                 # up in the actual request object.
-                request = self._requests_need_load[cached_req.req_id]
-                total_tokens = (len(cached_req.new_token_ids) +
-                                cached_req.num_computed_tokens)
+                request = self._requests_need_load[req_id]
+                total_tokens = (int(cached_reqs.num_computed_tokens[i]) +
+                                scheduler_output.num_scheduled_tokens[req_id])
                 token_ids = request.all_token_ids[:total_tokens]
 
                 # NOTE(rob): For resumed req, new_block_ids is all
                 # of the block_ids for the request.
-                block_ids = cached_req.new_block_ids
+                block_ids = cached_reqs.get_new_block_ids(i)
 
                 meta.add_request(token_ids=token_ids,
                                  block_ids=block_ids,
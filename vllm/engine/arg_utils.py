@@ -18,7 +18,7 @@ import vllm.envs as envs
 from vllm import version
 from vllm.config import (CacheConfig, CompilationConfig, Config, ConfigFormat,
                          DecodingConfig, Device, DeviceConfig,
-                         DistributedExecutorBackend, HfOverrides,
+                         DistributedExecutorBackend, FairShareKey, HfOverrides,
                          KVTransferConfig, LoadConfig, LoadFormat, LoRAConfig,
                          ModelConfig, ModelImpl, MultiModalConfig,
                          ObservabilityConfig, ParallelConfig, PoolerConfig,
@@ -152,11 +152,17 @@ class EngineArgs:
     tensor_parallel_size: int = ParallelConfig.tensor_parallel_size
     data_parallel_size: int = ParallelConfig.data_parallel_size
     enable_expert_parallel: bool = ParallelConfig.enable_expert_parallel
+    data_parallel_routing: str = ParallelConfig.data_parallel_routing
+    data_parallel_routing_max_imbalance: int = \
+        ParallelConfig.data_parallel_routing_max_imbalance
     max_parallel_loading_workers: Optional[
         int] = ParallelConfig.max_parallel_loading_workers
     block_size: Optional[int] = None
     enable_prefix_caching: Optional[bool] = None
     prefix_caching_hash_algo: str = "builtin"
+    block_pool_backend: str = "object"
+    prefix_caching_eviction_policy: str = "lru"
+    max_pinned_prefix_fraction: float = 0.2
     disable_sliding_window: bool = False
     disable_cascade_attn: bool = False
     use_v2_block_manager: bool = True
@@ -218,6 +224,10 @@ class EngineArgs:
     ignore_patterns: Optional[Union[str,
                                     List[str]]] = LoadConfig.ignore_patterns
     preemption_mode: Optional[str] = SchedulerConfig.preemption_mode
+    preemption_swap_bandwidth: float = \
+        SchedulerConfig.preemption_swap_bandwidth
+    preemption_recompute_throughput: float = \
+        SchedulerConfig.preemption_recompute_throughput
 
     scheduler_delay_factor: float = SchedulerConfig.delay_factor
     enable_chunked_prefill: Optional[
@@ -235,7 +245,12 @@ class EngineArgs:
     collect_detailed_traces: Optional[str] = None
     disable_async_output_proc: bool = False
     scheduling_policy: SchedulerPolicy = SchedulerConfig.policy
+    fair_share_key: FairShareKey = SchedulerConfig.fair_share_key
+    fair_share_weights: Optional[Dict[str, float]] = \
+        SchedulerConfig.fair_share_weights
     scheduler_cls: Union[str, Type[object]] = SchedulerConfig.scheduler_cls
+    async_scheduling: bool = SchedulerConfig.async_scheduling
+    target_step_time: Optional[float] = SchedulerConfig.target_step_time
 
     override_neuron_config: Optional[Dict[str, Any]] = None
     override_pooler_config: Optional[PoolerConfig] = None
@@ -535,6 +550,11 @@ class EngineArgs:
         parallel_group.add_argument(
             '--enable-expert-parallel',
             **parallel_kwargs["enable_expert_parallel"])
+        parallel_group.add_argument('--data-parallel-routing',
+                                    **parallel_kwargs["data_parallel_routing"])
+        parallel_group.add_argument(
+            '--data-parallel-routing-max-imbalance',
+            **parallel_kwargs["data_parallel_routing_max_imbalance"])
         parallel_group.add_argument(
             '--max-parallel-loading-workers',
             **parallel_kwargs["max_parallel_loading_workers"])
@@ -565,11 +585,44 @@ class EngineArgs:
         parser.add_argument(
             "--prefix-caching-hash-algo",
             type=str,
-            choices=["builtin", "sha256"],
+            choices=["builtin", "sha256", "fast"],
             default=EngineArgs.prefix_caching_hash_algo,
             help="Set the hash algorithm for prefix caching. "
-            "Options are 'builtin' (Python's built-in hash) or 'sha256' "
-            "(collision resistant but with certain overheads).",
+            "Options are 'builtin' (Python's built-in hash), 'sha256' "
+            "(collision resistant but with certain overheads) or 'fast' "
+            "(a non-cryptographic 64-bit hash computed for all the blocks of "
+            "a request at once with vectorized ops).",
+        )
+        parser.add_argument(
+            "--prefix-caching-eviction-policy",
+            type=str,
+            choices=["lru", "lfu", "cost"],
+            default=EngineArgs.prefix_caching_eviction_policy,
+            help="Set the eviction policy of the V1 prefix cache. Options "
+            "are 'lru' (least recently used), 'lfu' (least frequently used "
+            "with aging) or 'cost' (cost-aware, keeps the blocks shared by "
+            "many requests and the blocks near the start of long prefixes). "
+            "The evictions are reported by the "
+            "vllm:gpu_prefix_cache_evictions metric.",
+        )
+        parser.add_argument(
+            "--max-pinned-prefix-fraction",
+            type=float,
+            default=EngineArgs.max_pinned_prefix_fraction,
+            help="The maximum fraction of the KV cache blocks that can be "
+            "held by the prefixes pinned through the /pin_prefix endpoint "
+            "(V1 only).",
+        )
+        parser.add_argument(
+            "--block-pool-backend",
+            type=str,
+            choices=["object", "array"],
+            default=EngineArgs.block_pool_backend,
+            help="Set the data structure of the V1 KV cache block pool. "
+            "'object' keeps one Python object per block, 'array' keeps the "
+            "block states in preallocated numpy arrays, which lowers the "
+            "start-up time and the scheduling overheads with millions of "
+            "blocks.",
         )
         parser.add_argument('--disable-sliding-window',
                             action='store_true',
@@ -822,7 +875,9 @@ class EngineArgs:
             default=None,
             help='If \'recompute\', the engine performs preemption by '
             'recomputing; If \'swap\', the engine performs preemption by '
-            'block swapping.')
+            'block swapping. In V1, \'swap\' swaps out the preempted '
+            'requests to the --swap-space only when it is estimated to be '
+            'cheaper than recomputing them.')
 
         parser.add_argument(
             "--served-model-name",
@@ -910,11 +965,25 @@ class EngineArgs:
             **scheduler_kwargs["multi_step_stream_outputs"])
         scheduler_group.add_argument('--scheduling-policy',
                                      **scheduler_kwargs["policy"])
+        scheduler_group.add_argument(
+            '--preemption-swap-bandwidth',
+            **scheduler_kwargs["preemption_swap_bandwidth"])
+        scheduler_group.add_argument(
+            '--preemption-recompute-throughput',
+            **scheduler_kwargs["preemption_recompute_throughput"])
+        scheduler_group.add_argument('--fair-share-key',
+                                     **scheduler_kwargs["fair_share_key"])
+        scheduler_group.add_argument('--fair-share-weights',
+                                     **scheduler_kwargs["fair_share_weights"])
         scheduler_group.add_argument(
             "--disable-chunked-mm-input",
             **scheduler_kwargs["disable_chunked_mm_input"])
         parser.add_argument('--scheduler-cls',
                             **scheduler_kwargs["scheduler_cls"])
+        scheduler_group.add_argument('--async-scheduling',
+                                     **scheduler_kwargs["async_scheduling"])
+        scheduler_group.add_argument('--target-step-time',
+                                     **scheduler_kwargs["target_step_time"])
 
         parser.add_argument(
             '--override-neuron-config',
@@ -1183,6 +1252,17 @@ class EngineArgs:
         else:
             envs.set_vllm_use_v1(use_v1)
 
+        if not use_v1 and self.scheduling_policy in ("wfq", "slo"):
+            raise ValueError(
+                f"The {self.scheduling_policy} scheduling policy is only "
+                "supported by the V1 engine.")
+        if not use_v1 and self.async_scheduling:
+            raise ValueError("Async scheduling is only supported by the V1 "
+                             "engine.")
+        if not use_v1 and self.target_step_time is not None:
+            raise ValueError("target_step_time is only supported by the V1 "
+                             "engine.")
+
         # Set default arguments for V0 or V1 Engine.
         if use_v1:
             self._set_default_args_v1(usage_context)
@@ -1203,6 +1283,9 @@ class EngineArgs:
             prefix_caching_hash_algo=self.prefix_caching_hash_algo,
             cpu_offload_gb=self.cpu_offload_gb,
             calculate_kv_scales=self.calculate_kv_scales,
+            block_pool_backend=self.block_pool_backend,
+            prefix_caching_eviction_policy=self.prefix_caching_eviction_policy,
+            max_pinned_prefix_fraction=self.max_pinned_prefix_fraction,
         )
 
         # Get the current placement group if Ray is initialized and
@@ -1221,6 +1304,9 @@ class EngineArgs:
             tensor_parallel_size=self.tensor_parallel_size,
             data_parallel_size=self.data_parallel_size,
             enable_expert_parallel=self.enable_expert_parallel,
+            data_parallel_routing=self.data_parallel_routing,
+            data_parallel_routing_max_imbalance=self.
+            data_parallel_routing_max_imbalance,
             max_parallel_loading_workers=self.max_parallel_loading_workers,
             disable_custom_all_reduce=self.disable_custom_all_reduce,
             tokenizer_pool_config=TokenizerPoolConfig.create_config(
@@ -1266,6 +1352,23 @@ class EngineArgs:
             if speculative_config is None \
             else speculative_config.num_lookahead_slots
 
+        if self.async_scheduling:
+            if parallel_config.pipeline_parallel_size > 1:
+                raise ValueError("Async scheduling is not supported with "
+                                 "pipeline parallelism.")
+            if speculative_config is not None:
+                raise ValueError("Async scheduling is not supported with "
+                                 "speculative decoding.")
+            if self.kv_transfer_config is not None:
+                raise ValueError("Async scheduling is not supported with "
+                                 "KV transfer.")
+            if parallel_config.distributed_executor_backend not in ("mp",
+                                                                    "uni"):
+                raise ValueError(
+                    "Async scheduling is only supported with the mp and uni "
+                    "distributed executor backends. Got "
+                    f"{parallel_config.distributed_executor_backend}.")
+
         scheduler_config = SchedulerConfig(
             runner_type=model_config.runner_type,
             max_num_batched_tokens=self.max_num_batched_tokens,
@@ -1277,12 +1380,19 @@ class EngineArgs:
             disable_chunked_mm_input=self.disable_chunked_mm_input,
             is_multimodal_model=model_config.is_multimodal_model,
             preemption_mode=self.preemption_mode,
+            preemption_swap_bandwidth=self.preemption_swap_bandwidth,
+            preemption_recompute_throughput=self.
+            preemption_recompute_throughput,
             num_scheduler_steps=self.num_scheduler_steps,
             multi_step_stream_outputs=self.multi_step_stream_outputs,
             send_delta_data=(envs.VLLM_USE_RAY_SPMD_WORKER
                              and parallel_config.use_ray),
             policy=self.scheduling_policy,
+            fair_share_key=self.fair_share_key,
+            fair_share_weights=self.fair_share_weights,
             scheduler_cls=self.scheduler_cls,
+            async_scheduling=self.async_scheduling,
+            target_step_time=self.target_step_time,
             max_num_partial_prefills=self.max_num_partial_prefills,
             max_long_partial_prefills=self.max_long_partial_prefills,
             long_prefill_token_threshold=self.long_prefill_token_threshold,
@@ -1381,22 +1491,12 @@ class EngineArgs:
                                recommend_to_remove=False)
             return False
 
-        if self.preemption_mode != SchedulerConfig.preemption_mode:
-            _raise_or_fallback(feature_name="--preemption-mode",
-                               recommend_to_remove=True)
-            return False
-
         if (self.disable_async_output_proc
                 != EngineArgs.disable_async_output_proc):
             _raise_or_fallback(feature_name="--disable-async-output-proc",
                                recommend_to_remove=True)
             return False
 
-        if self.scheduling_policy != SchedulerConfig.policy:
-            _raise_or_fallback(feature_name="--scheduling-policy",
-                               recommend_to_remove=False)
-            return False
-
         if self.num_scheduler_steps != SchedulerConfig.num_scheduler_steps:
             _raise_or_fallback(feature_name="--num-scheduler-steps",
                                recommend_to_remove=True)
@@ -1653,7 +1753,11 @@ class EngineArgs:
         # V1 should use the new scheduler by default.
         # Swap it only if this arg is set to the original V0 default
         if self.scheduler_cls == EngineArgs.scheduler_cls:
-            self.scheduler_cls = "vllm.v1.core.sched.scheduler.Scheduler"
+            if self.async_scheduling:
+                self.scheduler_cls = (
+                    "vllm.v1.core.sched.async_scheduler.AsyncScheduler")
+            else:
+                self.scheduler_cls = "vllm.v1.core.sched.scheduler.Scheduler"
 
         # When no user override, set the default values based on the usage
         # context.
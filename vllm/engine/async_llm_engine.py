@@ -1226,6 +1226,20 @@ class AsyncLLMEngine(EngineClient):
                                  device: Optional[Device] = None) -> None:
         self.engine.reset_prefix_cache(device)
 
+    async def pin_prefix(self,
+                         prompt: Union[str, List[int]],
+                         prefix_id: Optional[str] = None) -> Tuple[str, int]:
+        raise NotImplementedError(
+            "Pinning prefixes is only supported by the V1 engine.")
+
+    async def unpin_prefix(self, prefix_id: str) -> bool:
+        raise NotImplementedError(
+            "Pinning prefixes is only supported by the V1 engine.")
+
+    async def list_pinned_prefixes(self) -> Dict[str, int]:
+        raise NotImplementedError(
+            "Pinning prefixes is only supported by the V1 engine.")
+
     async def sleep(self, level: int = 1) -> None:
         self.engine.sleep(level)
 
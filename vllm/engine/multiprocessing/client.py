@@ -5,7 +5,7 @@ import copy
 import pickle
 from contextlib import contextmanager, suppress
 from typing import (Any, AsyncGenerator, Dict, Iterator, List, Mapping,
-                    Optional, Union, cast, overload)
+                    Optional, Tuple, Union, cast, overload)
 
 import cloudpickle
 import psutil
@@ -696,6 +696,20 @@ class MQLLMEngineClient(EngineClient):
             request=RPCResetPrefixCacheRequest(device),
             socket=self.input_socket)
 
+    async def pin_prefix(self,
+                         prompt: Union[str, List[int]],
+                         prefix_id: Optional[str] = None) -> Tuple[str, int]:
+        raise NotImplementedError(
+            "Pinning prefixes is only supported by the V1 engine.")
+
+    async def unpin_prefix(self, prefix_id: str) -> bool:
+        raise NotImplementedError(
+            "Pinning prefixes is only supported by the V1 engine.")
+
+    async def list_pinned_prefixes(self) -> Dict[str, int]:
+        raise NotImplementedError(
+            "Pinning prefixes is only supported by the V1 engine.")
+
     async def sleep(self, level: int = 1) -> None:
         """Sleep the engine for a given level"""
         return await self._send_one_way_rpc_request(
@@ -2,7 +2,8 @@
 
 import asyncio
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, List, Mapping, Optional
+from typing import (Any, AsyncGenerator, Dict, List, Mapping, Optional, Tuple,
+                    Union)
 
 from vllm.beam_search import BeamSearchSequence, create_sort_beams_key_function
 from vllm.config import DecodingConfig, ModelConfig, VllmConfig
@@ -281,6 +282,34 @@ class EngineClient(ABC):
         """Reset the prefix cache"""
         ...
 
+    @abstractmethod
+    async def pin_prefix(self,
+                         prompt: Union[str, List[int]],
+                         prefix_id: Optional[str] = None) -> Tuple[str, int]:
+        """Prefill a prefix if needed and pin its KV cache blocks so that
+        they are never evicted. Returns the prefix ID and the number of
+        pinned tokens. Raises NotImplementedError if the engine does not
+        support pinning."""
+        ...
+
+    @abstractmethod
+    async def unpin_prefix(self, prefix_id: str) -> bool:
+        """Unpin a pinned prefix. Returns whether it was pinned."""
+        ...
+
+    @abstractmethod
+    async def list_pinned_prefixes(self) -> Dict[str, int]:
+        """Get the number of pinned tokens of each pinned prefix."""
+        ...
+
+    async def precompile_grammars(
+            self, json_schemas: List[Union[str, Dict[str, Any]]]) -> int:
+        """Compile the structured output grammars of JSON schemas ahead of
+        the requests that use them. Returns the number of precompiled
+        grammars."""
+        raise NotImplementedError(
+            "Precompiling grammars is only supported by the V1 engine.")
+
     @abstractmethod
     async def sleep(self, level: int = 1) -> None:
         """Sleep the engine"""
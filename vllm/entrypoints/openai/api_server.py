@@ -13,10 +13,11 @@ import socket
 import tempfile
 import uuid
 from argparse import Namespace
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Awaitable
 from contextlib import asynccontextmanager
 from functools import partial
 from http import HTTPStatus
+from multiprocessing.process import BaseProcess
 from typing import Annotated, Optional, Union
 
 import uvloop
@@ -58,16 +59,21 @@ from vllm.entrypoints.openai.protocol import (ChatCompletionRequest,
                                               EmbeddingResponseData,
                                               ErrorResponse,
                                               LoadLoRAAdapterRequest,
+                                              PinPrefixRequest,
+                                              PinPrefixResponse,
                                               PoolingChatRequest,
                                               PoolingCompletionRequest,
                                               PoolingRequest, PoolingResponse,
+                                              PrecompileGrammarsRequest,
+                                              PrecompileGrammarsResponse,
                                               RerankRequest, RerankResponse,
                                               ScoreRequest, ScoreResponse,
                                               TokenizeRequest,
                                               TokenizeResponse,
                                               TranscriptionRequest,
                                               TranscriptionResponse,
-                                              UnloadLoRAAdapterRequest)
+                                              UnloadLoRAAdapterRequest,
+                                              UnpinPrefixRequest)
 # yapf: enable
 from vllm.entrypoints.openai.serving_chat import OpenAIServingChat
 from vllm.entrypoints.openai.serving_completion import OpenAIServingCompletion
@@ -137,14 +143,22 @@ async def lifespan(app: FastAPI):
 
 @asynccontextmanager
 async def build_async_engine_client(
-        args: Namespace) -> AsyncIterator[EngineClient]:
+    args: Namespace,
+    client_addresses: Optional[list[tuple[str, str]]] = None,
+    client_index: int = 0,
+) -> AsyncIterator[EngineClient]:
 
     # Context manager to handle engine_client lifecycle
     # Ensures everything is shutdown and cleaned up on error/exit
     engine_args = AsyncEngineArgs.from_cli_args(args)
+    if client_addresses is not None:
+        # The multimodal input caches of the API servers cannot mirror the
+        # cache of the engine, which gets the inputs of all of them.
+        engine_args.disable_mm_preprocessor_cache = True
 
     async with build_async_engine_client_from_engine_args(
-            engine_args, args.disable_frontend_multiprocessing) as engine:
+            engine_args, args.disable_frontend_multiprocessing,
+            client_addresses, client_index) as engine:
         yield engine
 
 
@@ -152,12 +166,17 @@ async def build_async_engine_client(
 async def build_async_engine_client_from_engine_args(
     engine_args: AsyncEngineArgs,
     disable_frontend_multiprocessing: bool = False,
+    client_addresses: Optional[list[tuple[str, str]]] = None,
+    client_index: int = 0,
 ) -> AsyncIterator[EngineClient]:
     """
     Create EngineClient, either:
         - in-process using the AsyncLLMEngine Directly
         - multiprocess using AsyncLLMEngine RPC
 
+    With `client_addresses`, multiple API server processes share the V1
+    engine, see `run_server`.
+
     Returns the Client or None if the creation failed.
     """
 
@@ -165,6 +184,12 @@ async def build_async_engine_client_from_engine_args(
     usage_context = UsageContext.OPENAI_API_SERVER
     vllm_config = engine_args.create_engine_config(usage_context=usage_context)
 
+    if client_addresses is not None and (
+            not envs.VLLM_USE_V1
+            or vllm_config.parallel_config.data_parallel_size > 1):
+        raise ValueError("Multiple API servers are only supported by the V1 "
+                         "engine without data parallel.")
+
     # V1 AsyncLLM.
     if envs.VLLM_USE_V1:
         if disable_frontend_multiprocessing:
@@ -179,7 +204,9 @@ async def build_async_engine_client_from_engine_args(
                 vllm_config=vllm_config,
                 usage_context=usage_context,
                 disable_log_requests=engine_args.disable_log_requests,
-                disable_log_stats=engine_args.disable_log_stats)
+                disable_log_stats=engine_args.disable_log_stats,
+                client_addresses=client_addresses,
+                client_index=client_index)
             yield async_llm
         finally:
             if async_llm:
@@ -203,20 +230,7 @@ async def build_async_engine_client_from_engine_args(
 
     # V0MQLLMEngine.
     else:
-        if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
-            # Make TemporaryDirectory for prometheus multiprocessing
-            # Note: global TemporaryDirectory will be automatically
-            #   cleaned up upon exit.
-            global prometheus_multiproc_dir
-            prometheus_multiproc_dir = tempfile.TemporaryDirectory()
-            os.environ[
-                "PROMETHEUS_MULTIPROC_DIR"] = prometheus_multiproc_dir.name
-        else:
-            logger.warning(
-                "Found PROMETHEUS_MULTIPROC_DIR was set by user. "
-                "This directory must be wiped between vLLM runs or "
-                "you will find inaccurate metrics. Unset the variable "
-                "and vLLM will properly handle cleanup.")
+        setup_prometheus_multiproc_dir()
 
         # Select random path for IPC.
         ipc_path = get_open_zmq_ipc_path()
@@ -292,6 +306,23 @@ async def build_async_engine_client_from_engine_args(
             multiprocess.mark_process_dead(engine_process.pid)
 
 
+def setup_prometheus_multiproc_dir() -> None:
+    """Share the metrics of the processes started from now on through
+    PROMETHEUS_MULTIPROC_DIR, unless it is set by the user."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Make TemporaryDirectory for prometheus multiprocessing
+        # Note: global TemporaryDirectory will be automatically
+        #   cleaned up upon exit.
+        global prometheus_multiproc_dir
+        prometheus_multiproc_dir = tempfile.TemporaryDirectory()
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = prometheus_multiproc_dir.name
+    else:
+        logger.warning("Found PROMETHEUS_MULTIPROC_DIR was set by user. "
+                       "This directory must be wiped between vLLM runs or "
+                       "you will find inaccurate metrics. Unset the variable "
+                       "and vLLM will properly handle cleanup.")
+
+
 async def validate_json_request(raw_request: Request):
     content_type = raw_request.headers.get("content-type", "").lower()
     media_type = content_type.split(";", maxsplit=1)[0]
@@ -449,6 +480,25 @@ async def detokenize(request: DetokenizeRequest, raw_request: Request):
     assert_never(generator)
 
 
+@router.post("/precompile_grammars",
+             dependencies=[Depends(validate_json_request)])
+async def precompile_grammars(request: PrecompileGrammarsRequest,
+                              raw_request: Request):
+    """
+    Compile the structured output grammars of JSON schemas ahead of the
+    requests that use them, e.g. the schemas of the tools at startup.
+    """
+    try:
+        num_precompiled = await engine_client(raw_request).precompile_grammars(
+            request.json_schemas)
+    except Exception as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST.value,
+                            detail=str(e)) from e
+    logger.info("Precompiled %d structured output grammars", num_precompiled)
+    return JSONResponse(content=PrecompileGrammarsResponse(
+        num_precompiled=num_precompiled).model_dump())
+
+
 @router.get("/v1/models")
 async def show_available_models(raw_request: Request):
     handler = models(raw_request)
@@ -707,6 +757,52 @@ if envs.VLLM_SERVER_DEV_MODE:
         await engine_client(raw_request).reset_prefix_cache(device)
         return Response(status_code=200)
 
+    @router.post("/pin_prefix")
+    async def pin_prefix(request: PinPrefixRequest, raw_request: Request):
+        """
+        Prefill a prefix if needed and pin its KV cache blocks so that they
+        are never evicted from the prefix cache.
+        """
+        try:
+            prefix_id, num_pinned_tokens = await engine_client(
+                raw_request).pin_prefix(request.prompt, request.prefix_id)
+        except NotImplementedError as e:
+            raise HTTPException(status_code=HTTPStatus.NOT_IMPLEMENTED.value,
+                                detail=str(e)) from e
+        except ValueError as e:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST.value,
+                                detail=str(e)) from e
+        logger.info("Pinned %d tokens of prefix %s", num_pinned_tokens,
+                    prefix_id)
+        return JSONResponse(content=PinPrefixResponse(
+            prefix_id=prefix_id,
+            num_pinned_tokens=num_pinned_tokens).model_dump())
+
+    @router.post("/unpin_prefix")
+    async def unpin_prefix(request: UnpinPrefixRequest, raw_request: Request):
+        try:
+            unpinned = await engine_client(raw_request).unpin_prefix(
+                request.prefix_id)
+        except NotImplementedError as e:
+            raise HTTPException(status_code=HTTPStatus.NOT_IMPLEMENTED.value,
+                                detail=str(e)) from e
+        if not unpinned:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND.value,
+                detail=f"Prefix {request.prefix_id} is not pinned.")
+        logger.info("Unpinned prefix %s", request.prefix_id)
+        return Response(status_code=200)
+
+    @router.get("/pinned_prefixes")
+    async def list_pinned_prefixes(raw_request: Request):
+        try:
+            pinned_prefixes = await engine_client(raw_request
+                                                  ).list_pinned_prefixes()
+        except NotImplementedError as e:
+            raise HTTPException(status_code=HTTPStatus.NOT_IMPLEMENTED.value,
+                                detail=str(e)) from e
+        return JSONResponse(content={"pinned_prefixes": pinned_prefixes})
+
     @router.post("/sleep")
     async def sleep(raw_request: Request):
         # get POST params
@@ -1039,10 +1135,7 @@ def create_server_socket(addr: tuple[str, int]) -> socket.socket:
     return sock
 
 
-async def run_server(args, **uvicorn_kwargs) -> None:
-    logger.info("vLLM API server version %s", VLLM_VERSION)
-    logger.info("args: %s", args)
-
+def validate_api_server_args(args: Namespace) -> None:
     if args.tool_parser_plugin and len(args.tool_parser_plugin) > 3:
         ToolParserManager.import_tool_parser(args.tool_parser_plugin)
 
@@ -1059,6 +1152,13 @@ async def run_server(args, **uvicorn_kwargs) -> None:
             f"invalid reasoning parser: {args.reasoning_parser} "
             f"(chose from {{ {','.join(valid_reasoning_parses)} }})")
 
+
+async def run_server(args, **uvicorn_kwargs) -> None:
+    logger.info("vLLM API server version %s", VLLM_VERSION)
+    logger.info("args: %s", args)
+
+    validate_api_server_args(args)
+
     # workaround to make sure that we bind the port before the engine is set up.
     # This avoids race conditions with ray.
     # see https://github.com/vllm-project/vllm/issues/8204
@@ -1075,47 +1175,138 @@ async def run_server(args, **uvicorn_kwargs) -> None:
 
     signal.signal(signal.SIGTERM, signal_handler)
 
-    async with build_async_engine_client(args) as engine_client:
-        app = build_app(args)
-
-        vllm_config = await engine_client.get_vllm_config()
-        await init_app_state(engine_client, vllm_config, app.state, args)
-
-        def _listen_addr(a: str) -> str:
-            if is_valid_ipv6_address(a):
-                return '[' + a + ']'
-            return a or "0.0.0.0"
-
-        is_ssl = args.ssl_keyfile and args.ssl_certfile
-        logger.info("Starting vLLM API server on http%s://%s:%d",
-                    "s" if is_ssl else "", _listen_addr(sock_addr[0]),
-                    sock_addr[1])
-
-        shutdown_task = await serve_http(
-            app,
-            sock=sock,
-            enable_ssl_refresh=args.enable_ssl_refresh,
-            host=args.host,
-            port=args.port,
-            log_level=args.uvicorn_log_level,
-            # NOTE: When the 'disable_uvicorn_access_log' value is True,
-            # no access log will be output.
-            access_log=not args.disable_uvicorn_access_log,
-            timeout_keep_alive=TIMEOUT_KEEP_ALIVE,
-            ssl_keyfile=args.ssl_keyfile,
-            ssl_certfile=args.ssl_certfile,
-            ssl_ca_certs=args.ssl_ca_certs,
-            ssl_cert_reqs=args.ssl_cert_reqs,
-            **uvicorn_kwargs,
-        )
+    # With multiple API servers, this process starts the engine and serves
+    # as the first API server. The other API servers are started once the
+    # engine is ready, connect to it, and listen on the same port
+    # (SO_REUSEPORT), so that the kernel balances the connections.
+    client_addresses: Optional[list[tuple[str, str]]] = None
+    if args.api_server_count > 1:
+        client_addresses = [(get_open_zmq_ipc_path(), get_open_zmq_ipc_path())
+                            for _ in range(args.api_server_count)]
+        # Every API server exposes the metrics of all of them, including the
+        # engine-level metrics that only this process records.
+        setup_prometheus_multiproc_dir()
+        # prometheus_client selects the storage of the metric values when it
+        # is imported, which this process already did.
+        from prometheus_client import values
+        values.ValueClass = values.get_value_class()
+    api_server_procs: list[BaseProcess] = []
+
+    try:
+        async with build_async_engine_client(
+                args, client_addresses) as engine_client:
+            if client_addresses is not None:
+                api_server_procs = start_api_servers(args, client_addresses)
+            shutdown_task = await serve_api(args, sock, engine_client,
+                                            **uvicorn_kwargs)
+
+        # NB: Await server shutdown only after the backend context is exited
+        try:
+            await shutdown_task
+        finally:
+            sock.close()
+    finally:
+        for proc in api_server_procs:
+            proc.terminate()
+        for proc in api_server_procs:
+            proc.join(5)
+            if proc.is_alive():
+                proc.kill()
+        if api_server_procs:
+            from prometheus_client import multiprocess
+            for proc in api_server_procs:
+                multiprocess.mark_process_dead(proc.pid)
+
+
+def start_api_servers(
+    args: Namespace,
+    client_addresses: list[tuple[str, str]],
+) -> list[BaseProcess]:
+    """Start the API server processes other than the first one."""
+    context = multiprocessing.get_context("spawn")
+    procs: list[BaseProcess] = []
+    for client_index in range(1, len(client_addresses)):
+        proc = context.Process(target=run_api_server_worker,
+                               name=f"APIServer_{client_index}",
+                               args=(args, client_addresses, client_index))
+        proc.start()
+        logger.info("Started API server %d with PID %s", client_index,
+                    proc.pid)
+        procs.append(proc)
+    return procs
+
+
+def run_api_server_worker(args: Namespace, client_addresses: list[tuple[str,
+                                                                        str]],
+                          client_index: int) -> None:
+    """Entrypoint of the API server processes started by `run_server`."""
+    uvloop.run(run_server_worker(args, client_addresses, client_index))
+
+
+async def run_server_worker(args: Namespace,
+                            client_addresses: list[tuple[str, str]],
+                            client_index: int, **uvicorn_kwargs) -> None:
+    validate_api_server_args(args)
+
+    sock = create_server_socket((args.host or "", args.port))
+    set_ulimit()
+
+    def signal_handler(*_) -> None:
+        # Interrupt server on sigterm while initializing
+        raise KeyboardInterrupt("terminated")
+
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    async with build_async_engine_client(args, client_addresses,
+                                         client_index) as engine_client:
+        shutdown_task = await serve_api(args, sock, engine_client,
+                                        **uvicorn_kwargs)
 
-    # NB: Await server shutdown only after the backend context is exited
     try:
         await shutdown_task
     finally:
         sock.close()
 
 
+async def serve_api(args: Namespace, sock: socket.socket,
+                    engine_client: EngineClient,
+                    **uvicorn_kwargs) -> Awaitable[None]:
+    """Serve the API with the engine client, and return the awaitable that
+    completes when the server shuts down."""
+    app = build_app(args)
+
+    vllm_config = await engine_client.get_vllm_config()
+    await init_app_state(engine_client, vllm_config, app.state, args)
+
+    def _listen_addr(a: str) -> str:
+        if is_valid_ipv6_address(a):
+            return '[' + a + ']'
+        return a or "0.0.0.0"
+
+    is_ssl = args.ssl_keyfile and args.ssl_certfile
+    logger.info("Starting vLLM API server on http%s://%s:%d",
+                "s" if is_ssl else "", _listen_addr(args.host
+                                                    or ""), args.port)
+
+    return await serve_http(
+        app,
+        sock=sock,
+        enable_ssl_refresh=args.enable_ssl_refresh,
+        host=args.host,
+        port=args.port,
+        log_level=args.uvicorn_log_level,
+        # NOTE: When the 'disable_uvicorn_access_log' value is True,
+        # no access log will be output.
+        access_log=not args.disable_uvicorn_access_log,
+        timeout_keep_alive=TIMEOUT_KEEP_ALIVE,
+        ssl_keyfile=args.ssl_keyfile,
+        ssl_certfile=args.ssl_certfile,
+        ssl_ca_certs=args.ssl_ca_certs,
+        ssl_cert_reqs=args.ssl_cert_reqs,
+        **uvicorn_kwargs,
+    )
+
+
 if __name__ == "__main__":
     # NOTE(simon):
     # This section should be in sync with vllm/entrypoints/cli/main.py for CLI
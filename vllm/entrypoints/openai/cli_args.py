@@ -11,6 +11,7 @@ import ssl
 from collections.abc import Sequence
 from typing import Optional, Union, get_args
 
+import vllm.envs as envs
 from vllm.engine.arg_utils import AsyncEngineArgs, optional_str
 from vllm.entrypoints.chat_utils import (ChatTemplateContentFormatOption,
                                          validate_chat_template)
@@ -207,6 +208,15 @@ def make_arg_parser(parser: FlexibleArgumentParser) -> FlexibleArgumentParser:
         action="store_true",
         help="If specified, will run the OpenAI frontend server in the same "
         "process as the model serving engine.")
+    parser.add_argument(
+        "--api-server-count",
+        type=int,
+        default=1,
+        help="Number of API server processes that share the engine. Each "
+        "process handles the HTTP requests, tokenization and detokenization "
+        "of the requests it accepts, and /metrics reports the metrics of all "
+        "of them. Only supported by the V1 engine without data parallel, "
+        "and not with VLLM_ALLOW_RUNTIME_LORA_UPDATING.")
     parser.add_argument(
         "--enable-request-id-headers",
         action="store_true",
@@ -289,6 +299,15 @@ def validate_parsed_serve_args(args: argparse.Namespace):
         raise TypeError("Error: --enable-reasoning requires "
                         "--reasoning-parser")
 
+    if args.api_server_count < 1:
+        raise ValueError("Error: --api-server-count must be at least 1")
+
+    # Each API server keeps its own list of LoRA adapters, so an adapter
+    # loaded through one of them would be unknown to the others.
+    if args.api_server_count > 1 and envs.VLLM_ALLOW_RUNTIME_LORA_UPDATING:
+        raise ValueError("Error: VLLM_ALLOW_RUNTIME_LORA_UPDATING is not "
+                         "supported with --api-server-count > 1")
+
 
 def create_parser_for_docs() -> FlexibleArgumentParser:
     parser_for_docs = FlexibleArgumentParser(
@@ -360,6 +360,18 @@ class ChatCompletionRequest(OpenAIBaseModel):
             "default: 0). Any priority other than 0 will raise an error "
             "if the served model does not use priority scheduling."),
     )
+    ttft_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "The target time to first token of the request, in seconds. "
+            "Used by the 'slo' scheduling policy."),
+    )
+    tpot_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "The target time per output token of the request, in seconds. "
+            "Used by the 'slo' scheduling policy."),
+    )
     request_id: str = Field(
         default_factory=lambda: f"{random_uuid()}",
         description=(
@@ -514,7 +526,10 @@ class ChatCompletionRequest(OpenAIBaseModel):
             output_kind=RequestOutputKind.DELTA if self.stream \
                 else RequestOutputKind.FINAL_ONLY,
             guided_decoding=guided_decoding,
-            logit_bias=self.logit_bias)
+            logit_bias=self.logit_bias,
+            extra_args=({"user": self.user} if self.user else None),
+            ttft_slo=self.ttft_slo,
+            tpot_slo=self.tpot_slo)
 
     def _get_guided_json_from_tool(
             self) -> Optional[Union[str, dict, BaseModel]]:
@@ -788,6 +803,18 @@ class CompletionRequest(OpenAIBaseModel):
             "default: 0). Any priority other than 0 will raise an error "
             "if the served model does not use priority scheduling."),
     )
+    ttft_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "The target time to first token of the request, in seconds. "
+            "Used by the 'slo' scheduling policy."),
+    )
+    tpot_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "The target time per output token of the request, in seconds. "
+            "Used by the 'slo' scheduling policy."),
+    )
     logits_processors: Optional[LogitsProcessors] = Field(
         default=None,
         description=(
@@ -932,7 +959,10 @@ class CompletionRequest(OpenAIBaseModel):
                 else RequestOutputKind.FINAL_ONLY,
             guided_decoding=guided_decoding,
             logit_bias=self.logit_bias,
-            allowed_token_ids=self.allowed_token_ids)
+            allowed_token_ids=self.allowed_token_ids,
+            extra_args=({"user": self.user} if self.user else None),
+            ttft_slo=self.ttft_slo,
+            tpot_slo=self.tpot_slo)
 
     @model_validator(mode="before")
     @classmethod
@@ -1535,6 +1565,35 @@ class UnloadLoRAAdapterRequest(BaseModel):
     lora_int_id: Optional[int] = Field(default=None)
 
 
+class PinPrefixRequest(BaseModel):
+    prompt: Union[str, list[int]] = Field(
+        description="The prefix to pin, as a text or a list of token IDs.")
+    prefix_id: Optional[str] = Field(
+        default=None,
+        description=(
+            "The ID of the pinned prefix, used to unpin it. Defaults to a "
+            "hash of the token IDs of the prefix."),
+    )
+
+
+class PinPrefixResponse(BaseModel):
+    prefix_id: str
+    num_pinned_tokens: int
+
+
+class UnpinPrefixRequest(BaseModel):
+    prefix_id: str
+
+
+class PrecompileGrammarsRequest(BaseModel):
+    json_schemas: list[Union[str, dict[str, Any]]] = Field(
+        description="The JSON schemas to compile the grammars of.")
+
+
+class PrecompileGrammarsResponse(BaseModel):
+    num_precompiled: int
+
+
 ## Protocols for Audio
 AudioResponseFormat: TypeAlias = Literal["json", "text", "srt", "verbose_json",
                                          "vtt"]
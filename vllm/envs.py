@@ -90,6 +90,7 @@ if TYPE_CHECKING:
     V_SCALE_CONSTANT: int = 100
     VLLM_SERVER_DEV_MODE: bool = False
     VLLM_V1_OUTPUT_PROC_CHUNK_SIZE: int = 128
+    VLLM_V1_DETOKENIZER_PROCESSES: int = 0
     VLLM_MLA_DISABLE: bool = False
     VLLM_ENABLE_MOE_ALIGN_BLOCK_SIZE_TRITON: bool = False
     VLLM_RAY_PER_WORKER_GPUS: float = 1.0
@@ -106,7 +107,11 @@ if TYPE_CHECKING:
     VLLM_TPU_BUCKET_PADDING_GAP: int = 0
     VLLM_USE_DEEP_GEMM: bool = False
     VLLM_XGRAMMAR_CACHE_MB: int = 0
+    VLLM_STRUCTURED_OUTPUT_CACHE_DIR: Optional[str] = None
+    VLLM_STRUCTURED_OUTPUT_JUMP_FORWARD_TOKENS: int = 0
     VLLM_MSGPACK_ZERO_COPY_THRESHOLD: int = 256
+    VLLM_MM_SHM_ARENA_MB: int = 0
+    VLLM_MM_SHM_ARENA_THRESHOLD: int = 1048576
 
 
 def get_default_cache_root():
@@ -605,6 +610,13 @@ environment_variables: dict[str, Callable[[], Any]] = {
     "VLLM_V1_OUTPUT_PROC_CHUNK_SIZE":
     lambda: int(os.getenv("VLLM_V1_OUTPUT_PROC_CHUNK_SIZE", "128")),
 
+    # Number of background processes that detokenize the outputs and check
+    # the stop strings for the V1 AsyncLLM interface. Requests are sharded
+    # across the processes by request id. 0 detokenizes on the asyncio event
+    # loop of the API server.
+    "VLLM_V1_DETOKENIZER_PROCESSES":
+    lambda: int(os.getenv("VLLM_V1_DETOKENIZER_PROCESSES", "0")),
+
     # If set, vLLM will disable the MLA attention optimizations.
     "VLLM_MLA_DISABLE":
     lambda: bool(int(os.getenv("VLLM_MLA_DISABLE", "0"))),
@@ -700,6 +712,20 @@ environment_variables: dict[str, Callable[[], Any]] = {
     "VLLM_XGRAMMAR_CACHE_MB":
     lambda: int(os.getenv("VLLM_XGRAMMAR_CACHE_MB", "512")),
 
+    # Directory where the V1 engine stores the compiled structured output
+    # grammars, so that they are shared by the engines of all the data
+    # parallel ranks and reused after a restart. Disabled if not set.
+    "VLLM_STRUCTURED_OUTPUT_CACHE_DIR":
+    lambda: os.path.expanduser(os.environ["VLLM_STRUCTURED_OUTPUT_CACHE_DIR"])
+    if "VLLM_STRUCTURED_OUTPUT_CACHE_DIR" in os.environ else None,
+
+    # The maximum number of tokens that the V1 engine appends to a structured
+    # output request per step when its grammar allows only one continuation
+    # (e.g., the fixed keys and punctuation of a JSON schema), instead of
+    # generating them one step at a time. Disabled if 0.
+    "VLLM_STRUCTURED_OUTPUT_JUMP_FORWARD_TOKENS":
+    lambda: int(os.getenv("VLLM_STRUCTURED_OUTPUT_JUMP_FORWARD_TOKENS", "0")),
+
     # Control the threshold for msgspec to use 'zero copy' for
     # serialization/deserialization of tensors. Tensors below
     # this limit will be encoded into the msgpack buffer, and
@@ -709,6 +735,18 @@ environment_variables: dict[str, Callable[[], Any]] = {
     # limit will actually be zero-copy decoded.
     "VLLM_MSGPACK_ZERO_COPY_THRESHOLD":
     lambda: int(os.getenv("VLLM_MSGPACK_ZERO_COPY_THRESHOLD", "256")),
+
+    # Size of the shared memory arena (in MiB) that the V1 frontend uses to
+    # pass large tensors (e.g. multimodal inputs) to the engine core
+    # processes, instead of sending them through the sockets. The tensors
+    # are mapped by the engine core without a copy. Disabled if 0.
+    "VLLM_MM_SHM_ARENA_MB":
+    lambda: int(os.getenv("VLLM_MM_SHM_ARENA_MB", "0")),
+
+    # Tensors of at least this many bytes are passed via the shared memory
+    # arena when it is enabled with VLLM_MM_SHM_ARENA_MB.
+    "VLLM_MM_SHM_ARENA_THRESHOLD":
+    lambda: int(os.getenv("VLLM_MM_SHM_ARENA_THRESHOLD", "1048576")),
 }
 
 # end-env-vars-definition
@@ -41,10 +41,30 @@ def apply_penalties(logits: torch.Tensor, prompt_tokens_tensor: torch.Tensor,
     repetition_penalties: The repetition penalties of shape (num_seqs, )
     """
     num_seqs, vocab_size = logits.shape
+    output_bin_counts, _ = get_token_bin_counts_and_mask(
+        output_tokens_tensor, vocab_size, num_seqs)
+    return apply_penalties_from_bin_counts(logits, prompt_tokens_tensor,
+                                           output_bin_counts,
+                                           presence_penalties,
+                                           frequency_penalties,
+                                           repetition_penalties)
+
+
+def apply_penalties_from_bin_counts(
+        logits: torch.Tensor, prompt_tokens_tensor: torch.Tensor,
+        output_bin_counts: torch.Tensor, presence_penalties: torch.Tensor,
+        frequency_penalties: torch.Tensor,
+        repetition_penalties: torch.Tensor) -> torch.Tensor:
+    """
+    Applies penalties in place to the logits tensor, like `apply_penalties`,
+    but with the output tokens given as their counts.
+    output_bin_counts: The number of times each token appears in the output
+        of each sequence, of shape [num_seqs, vocab_size]
+    """
+    num_seqs, vocab_size = logits.shape
     _, prompt_mask = get_token_bin_counts_and_mask(prompt_tokens_tensor,
                                                    vocab_size, num_seqs)
-    output_bin_counts, output_mask = get_token_bin_counts_and_mask(
-        output_tokens_tensor, vocab_size, num_seqs)
+    output_mask = output_bin_counts > 0
     repetition_penalties = repetition_penalties.unsqueeze(dim=1).repeat(
         1, vocab_size)
     logits[logits > 0] /= torch.where(prompt_mask | output_mask,
@@ -189,6 +189,12 @@ class SamplingParams(
         extra_args: Arbitrary additional args, that can be used by custom
             sampling implementations. Not used by any in-tree sampling
             implementations.
+        ttft_slo: The target time to first token of the request, in seconds.
+            Used by the "slo" scheduling policy. Defaults to None (i.e., no
+            target).
+        tpot_slo: The target time per output token of the request, in
+            seconds. Used by the "slo" scheduling policy. Defaults to None
+            (i.e., no target).
     """
 
     n: int = 1
@@ -237,6 +243,10 @@ class SamplingParams(
     bad_words: Optional[list[str]] = None
     _bad_words_token_ids: Optional[list[list[int]]] = None
 
+    # Latency targets used for scheduling
+    ttft_slo: Optional[float] = None
+    tpot_slo: Optional[float] = None
+
     @staticmethod
     def from_optional(
         n: Optional[int] = 1,
@@ -269,6 +279,8 @@ class SamplingParams(
         logit_bias: Optional[Union[dict[int, float], dict[str, float]]] = None,
         allowed_token_ids: Optional[list[int]] = None,
         extra_args: Optional[dict[str, Any]] = None,
+        ttft_slo: Optional[float] = None,
+        tpot_slo: Optional[float] = None,
     ) -> "SamplingParams":
         if logit_bias is not None:
             # Convert token_id to integer
@@ -311,6 +323,8 @@ class SamplingParams(
             logit_bias=logit_bias,
             allowed_token_ids=allowed_token_ids,
             extra_args=extra_args,
+            ttft_slo=ttft_slo,
+            tpot_slo=tpot_slo,
         )
 
     def __post_init__(self) -> None:
@@ -403,6 +417,12 @@ class SamplingParams(
         if not 0.0 <= self.min_p <= 1.0:
             raise ValueError("min_p must be in [0, 1], got "
                              f"{self.min_p}.")
+        if self.ttft_slo is not None and self.ttft_slo <= 0:
+            raise ValueError(
+                f"ttft_slo must be positive, got {self.ttft_slo}.")
+        if self.tpot_slo is not None and self.tpot_slo <= 0:
+            raise ValueError(
+                f"tpot_slo must be positive, got {self.tpot_slo}.")
         if self.max_tokens is not None and self.max_tokens < 1:
             raise ValueError(
                 f"max_tokens must be at least 1, got {self.max_tokens}.")
@@ -563,7 +583,9 @@ class SamplingParams(
             f"{self.spaces_between_special_tokens}, "
             f"truncate_prompt_tokens={self.truncate_prompt_tokens}, "
             f"guided_decoding={self.guided_decoding}, "
-            f"extra_args={self.extra_args})")
+            f"extra_args={self.extra_args}, "
+            f"ttft_slo={self.ttft_slo}, "
+            f"tpot_slo={self.tpot_slo})")
 
 
 class BeamSearchParams(
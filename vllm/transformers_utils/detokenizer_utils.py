@@ -155,6 +155,62 @@ def detokenize_incrementally(
     if is_first_iter:
         new_tokens = output_tokens
 
+    new_text, prefix_offset, read_offset = _decode_new_text(
+        tokenizer, output_tokens, prefix_offset, read_offset,
+        skip_special_tokens, spaces_between_special_tokens)
+    return new_tokens, new_text, prefix_offset, read_offset
+
+
+def detokenize_run_incrementally(
+    tokenizer: AnyTokenizer,
+    new_token_ids: List[int],
+    prev_tokens: List[str],
+    prefix_offset: int,
+    read_offset: int,
+    skip_special_tokens: bool = False,
+    spaces_between_special_tokens: bool = True,
+) -> Tuple[List[str], str, int, int]:
+    """Same as `detokenize_incrementally` for a run of new token ids at
+    once, e.g., the tokens accepted in a speculative decoding step.
+
+    The new ids are converted to tokens with one tokenizer call, and the new
+    text of the whole run is decoded with one more, instead of once per id.
+    If the text of the run ends with an unfinished byte sequence, no text is
+    returned, and the run is decoded again with the next tokens.
+    """
+    vocab_size = len(tokenizer)
+    new_tokens: List[str]
+    if all(0 <= token_id < vocab_size for token_id in new_token_ids):
+        new_tokens = tokenizer.convert_ids_to_tokens(
+            new_token_ids, skip_special_tokens=skip_special_tokens)
+    else:
+        # Out of bounds ids are converted to empty strings.
+        new_tokens = []
+        for token_id in new_token_ids:
+            if 0 <= token_id < vocab_size:
+                new_tokens.extend(
+                    tokenizer.convert_ids_to_tokens(
+                        [token_id], skip_special_tokens=skip_special_tokens))
+            else:
+                new_tokens.append("")
+    output_tokens = prev_tokens + new_tokens
+
+    new_text, prefix_offset, read_offset = _decode_new_text(
+        tokenizer, output_tokens, prefix_offset, read_offset,
+        skip_special_tokens, spaces_between_special_tokens)
+    return new_tokens, new_text, prefix_offset, read_offset
+
+
+def _decode_new_text(
+    tokenizer: AnyTokenizer,
+    output_tokens: List[str],
+    prefix_offset: int,
+    read_offset: int,
+    skip_special_tokens: bool,
+    spaces_between_special_tokens: bool,
+) -> Tuple[str, int, int]:
+    """Decode the text of the tokens after the read offset, and return it
+    with the new prefix and read offsets."""
     # The prefix text is necessary only to defeat cleanup algorithms in
     # the decode which decide to add a space or not depending on the
     # surrounding ids.
@@ -182,7 +238,7 @@ def detokenize_incrementally(
         # from byte fallback tokenization.
         # If it's in the middle, it's probably a real invalid id generated
         # by the model
-        return new_tokens, "", prefix_offset, read_offset
+        return "", prefix_offset, read_offset
 
     new_text = new_text[len(prefix_text):]
-    return new_tokens, new_text, read_offset, len(output_tokens)
+    return new_text, read_offset, len(output_tokens)
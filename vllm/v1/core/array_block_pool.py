@@ -0,0 +1,279 @@
+# SPDX-License-Identifier: Apache-2.0
+from collections.abc import Iterable
+from typing import Callable, Optional
+
+import numpy as np
+
+from vllm.logger import init_logger
+from vllm.v1.core.block_pool import BaseBlockPool
+from vllm.v1.core.kv_cache_utils import BlockHashType
+
+logger = init_logger(__name__)
+
+
+class ArrayKVCacheBlock:
+    """A lightweight handle of a block owned by an ArrayBlockPool.
+
+    It exposes the same interface as KVCacheBlock, but the reference count
+    and the block hash live in the arrays of the pool, so handles are only
+    created for the blocks handed out to the callers and two handles with the
+    same block_id always see the same states.
+    """
+
+    __slots__ = ("_pool", "block_id")
+
+    def __init__(self, pool: "ArrayBlockPool", block_id: int):
+        self._pool = pool
+        self.block_id = block_id
+
+    @property
+    def ref_cnt(self) -> int:
+        return int(self._pool.ref_cnts[self.block_id])
+
+    def incr_ref(self):
+        self._pool.ref_cnts[self.block_id] += 1
+
+    def decr_ref(self):
+        self._pool.ref_cnts[self.block_id] -= 1
+
+    @property
+    def block_hash(self) -> Optional[BlockHashType]:
+        return self._pool.block_hashes[self.block_id]
+
+    @block_hash.setter
+    def block_hash(self, block_hash: BlockHashType):
+        assert self.block_hash is None, (
+            "The block already has a hash. This should not happen.")
+        self._pool.block_hashes[self.block_id] = block_hash
+
+    def reset_hash(self):
+        """Reset the block hash when the block is evicted."""
+        self._pool.block_hashes[self.block_id] = None
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, ArrayKVCacheBlock)
+                and other._pool is self._pool
+                and other.block_id == self.block_id)
+
+    def __hash__(self) -> int:
+        return hash(self.block_id)
+
+    def __repr__(self) -> str:
+        return (f"ArrayKVCacheBlock(block_id={self.block_id}, "
+                f"ref_cnt={self.ref_cnt}, block_hash={self.block_hash})")
+
+
+class ArrayBlockPool(BaseBlockPool[ArrayKVCacheBlock]):
+    """A block pool that keeps the per-block states in preallocated arrays
+    indexed by block_id instead of one KVCacheBlock object per block.
+
+    This avoids building and garbage-collecting millions of linked Python
+    objects when the pool is very large, and lets `touch`, `free_blocks` and
+    `get_new_blocks` update the states of all their blocks with vectorized
+    ops.
+
+    The free blocks are kept in eviction order in an array-backed FIFO queue
+    with lazy deletion: `free_pos[block_id]` is the position of the block in
+    the queue (-1 if the block is not free), so removing a block from the
+    middle of the queue is O(1) and the stale entries are skipped when they
+    reach the head. The queue is compacted when its tail reaches the end of
+    the buffer. The allocation order is the same as the one of BlockPool.
+
+    Args:
+        num_gpu_blocks: The number of blocks in the pool.
+        enable_caching: Whether to enable prefix caching.
+        on_evict: Optional callback invoked with the block hash and block ID
+            of every cached block right before it is evicted.
+        eviction_policy: The eviction policy of the prefix cache. Only "lru"
+            is supported.
+        enable_kv_cache_events: Whether to record the cached and evicted
+            blocks for the prefix-aware routing of data parallel engines.
+    """
+
+    def __init__(
+        self,
+        num_gpu_blocks: int,
+        enable_caching: bool,
+        on_evict: Optional[Callable[[BlockHashType, int], None]] = None,
+        eviction_policy: str = "lru",
+        enable_kv_cache_events: bool = False,
+    ):
+        if eviction_policy != "lru":
+            raise ValueError("ArrayBlockPool only supports the LRU eviction "
+                             f"policy, got {eviction_policy}.")
+        super().__init__(num_gpu_blocks, enable_caching, on_evict,
+                         eviction_policy, enable_kv_cache_events)
+
+        self.ref_cnts: np.ndarray = np.zeros(num_gpu_blocks, dtype=np.int32)
+        self.block_hashes: list[Optional[BlockHashType]] = [None
+                                                            ] * num_gpu_blocks
+
+        # The free block queue. Entries in [_head, _tail) whose position
+        # matches free_pos of their block are the free blocks, the first one
+        # being evicted first.
+        self._queue: np.ndarray = np.empty(2 * num_gpu_blocks, dtype=np.int32)
+        self._queue[:num_gpu_blocks] = np.arange(num_gpu_blocks)
+        self.free_pos: np.ndarray = np.arange(num_gpu_blocks, dtype=np.int64)
+        self._head = 0
+        self._tail = num_gpu_blocks
+        self._num_free_blocks = num_gpu_blocks
+
+        self.null_block = ArrayKVCacheBlock(self, int(self._popleft(1)[0]))
+
+    def get_new_blocks(self, num_blocks: int) -> list[ArrayKVCacheBlock]:
+        """Get new blocks from the free block pool.
+
+        Note that we do not check block cache in this function.
+
+        Args:
+            num_blocks: The number of blocks to allocate.
+
+        Returns:
+            A list of new block.
+        """
+        if num_blocks > self.get_num_free_blocks():
+            raise ValueError(
+                f"Cannot get {num_blocks} free blocks from the pool")
+        if num_blocks == 0:
+            return []
+
+        block_ids = self._popleft(num_blocks)
+        assert not self.ref_cnts[block_ids].any()
+        self.ref_cnts[block_ids] = 1
+
+        ret: list[ArrayKVCacheBlock] = []
+        for block_id in block_ids.tolist():
+            # If the block is cached, evict it.
+            if self.enable_caching:
+                self._maybe_evict_cached_block_id(block_id)
+            ret.append(ArrayKVCacheBlock(self, block_id))
+        return ret
+
+    def _maybe_evict_cached_block_id(self, block_id: int) -> bool:
+        """
+        If a block is cached in `cached_block_hash_to_block`, we reset its hash
+        metadata and evict it from the cache.
+
+        Args:
+            block_id: The ID of the block to evict.
+
+        Returns:
+            True if the block is evicted, False otherwise.
+        """
+        block_hash = self.block_hashes[block_id]
+        if block_hash and block_hash in self.cached_block_hash_to_block:
+            self._uncache_block(block_hash, block_id)
+            self.block_hashes[block_id] = None
+            return True
+        return False
+
+    def touch(self, blocks: list[ArrayKVCacheBlock]) -> None:
+        """Touch a block increases its reference count by 1, and may remove
+        the block from the free queue. This is used when a block is hit by
+        another request with the same prefix.
+
+        Args:
+            blocks: A list of blocks to touch.
+        """
+        block_ids = self._to_block_ids(blocks)
+        if len(block_ids) == 0:
+            return
+        # ref_cnt=0 means this block is in the free list (i.e. eviction
+        # candidate), so remove it.
+        free_ids = block_ids[self.ref_cnts[block_ids] == 0]
+        self.free_pos[free_ids] = -1
+        self._num_free_blocks -= len(free_ids)
+        self.ref_cnts[block_ids] += 1
+
+    def free_blocks(self, ordered_blocks: Iterable[ArrayKVCacheBlock]) -> None:
+        """Free a list of blocks. The blocks should be ordered by their
+        eviction priority, where the first block will be evicted first.
+
+        Args:
+            ordered_blocks: A list of blocks to free ordered by their eviction
+                priority.
+        """
+        block_ids = self._to_block_ids(ordered_blocks)
+        if len(block_ids) == 0:
+            return
+        self.ref_cnts[block_ids] -= 1
+        self._append(block_ids[self.ref_cnts[block_ids] == 0])
+
+    def _reset_block_hashes(self) -> None:
+        self.block_hashes = [None] * self.num_gpu_blocks
+
+    def get_num_free_blocks(self) -> int:
+        """Get the number of free blocks in the pool.
+
+        Returns:
+            The number of free blocks.
+        """
+        return self._num_free_blocks
+
+    def get_free_block_ids(self) -> list[int]:
+        """Get the IDs of the free blocks in eviction order.
+
+        Returns:
+            The IDs of the free blocks, the first one being evicted first.
+        """
+        block_ids = self._queue[self._head:self._tail]
+        positions = np.arange(self._head, self._tail)
+        return block_ids[self.free_pos[block_ids] == positions].tolist()
+
+    def _to_block_ids(self, blocks: Iterable[ArrayKVCacheBlock]) -> np.ndarray:
+        # The null block may appear several times in the block table of a
+        # request, and its ref_cnt is not maintained, so it is skipped. The
+        # other blocks are unique, which allows the fancy-indexed updates.
+        null_block_id = self.null_block.block_id
+        return np.fromiter(
+            (block.block_id
+             for block in blocks if block.block_id != null_block_id),
+            dtype=np.int64)
+
+    def _popleft(self, num_blocks: int) -> np.ndarray:
+        """Pop the first `num_blocks` free blocks of the queue."""
+        chunks: list[np.ndarray] = []
+        num_needed = num_blocks
+        while num_needed > 0:
+            # Usually only a few entries are stale, so a chunk slightly larger
+            # than the number of needed blocks is enough.
+            end = min(self._tail, self._head + 2 * num_needed + 16)
+            block_ids = self._queue[self._head:end]
+            valid = np.flatnonzero(
+                self.free_pos[block_ids] == np.arange(self._head, end))
+            if len(valid) >= num_needed:
+                valid = valid[:num_needed]
+                self._head += int(valid[-1]) + 1
+            else:
+                self._head = end
+            chunks.append(block_ids[valid])
+            num_needed -= len(valid)
+
+        ret = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        self.free_pos[ret] = -1
+        self._num_free_blocks -= num_blocks
+        return ret
+
+    def _append(self, block_ids: np.ndarray) -> None:
+        """Append blocks to the tail of the free queue."""
+        num_blocks = len(block_ids)
+        if num_blocks == 0:
+            return
+        if self._tail + num_blocks > len(self._queue):
+            self._compact()
+        self._queue[self._tail:self._tail + num_blocks] = block_ids
+        self.free_pos[block_ids] = np.arange(self._tail,
+                                             self._tail + num_blocks)
+        self._tail += num_blocks
+        self._num_free_blocks += num_blocks
+
+    def _compact(self) -> None:
+        """Drop the stale entries and move the free blocks to the beginning
+        of the queue buffer."""
+        block_ids = np.asarray(self.get_free_block_ids(), dtype=np.int32)
+        num_free_blocks = len(block_ids)
+        assert num_free_blocks == self._num_free_blocks
+        self._queue[:num_free_blocks] = block_ids
+        self.free_pos[block_ids] = np.arange(num_free_blocks)
+        self._head = 0
+        self._tail = num_free_blocks
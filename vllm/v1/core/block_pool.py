@@ -1,43 +1,80 @@
 # SPDX-License-Identifier: Apache-2.0
+from abc import ABC, abstractmethod
 from collections import defaultdict
 from collections.abc import Iterable
-from typing import Callable, Optional
+from typing import Callable, Generic, Optional, Protocol, TypeVar
 
 from vllm.logger import init_logger
-from vllm.v1.core.kv_cache_utils import (BlockHashType, FreeKVCacheBlockQueue,
-                                         KVCacheBlock,
+from vllm.v1.core.eviction_policy import make_eviction_policy
+from vllm.v1.core.kv_cache_utils import (BlockHashType, KVCacheBlock,
                                          generate_block_hash_extra_keys,
                                          hash_block_tokens)
+from vllm.v1.engine import PrefixCacheEvents
 from vllm.v1.request import Request
 
 logger = init_logger(__name__)
 
 
-class BlockPool:
-    """BlockPool that manages KVCacheBlocks.
-    It provides methods to allocate, free and cache the kv cache blocks. The
-    free_block_queue stores the free blocks in eviction order to enable
-    allocation, free, and cache eviction. The cached_block_hash_to_block
-    maps between block hash and cached block to support finding cached blocks
-    by their block hash.
+class PoolBlock(Protocol):
+    """The interface of the blocks handed out by a block pool."""
+
+    block_id: int
+
+    @property
+    def ref_cnt(self) -> int:
+        ...
+
+    @property
+    def block_hash(self) -> Optional[BlockHashType]:
+        ...
+
+    @block_hash.setter
+    def block_hash(self, block_hash: BlockHashType) -> None:
+        ...
+
+
+BlockT = TypeVar("BlockT", bound=PoolBlock)
+
+
+class BaseBlockPool(ABC, Generic[BlockT]):
+    """The part of a block pool that does not depend on how the block states
+    and the free blocks are stored: the prefix cache index from the block
+    hashes to the cached blocks, the eviction bookkeeping and the prefix
+    cache events.
 
     Args:
         num_gpu_blocks: The number of blocks in the pool.
         enable_caching: Whether to enable prefix caching.
+        on_evict: Optional callback invoked with the block hash and block ID
+            of every cached block right before it is evicted.
+        eviction_policy: The eviction policy of the prefix cache.
+        enable_kv_cache_events: Whether to record the cached and evicted
+            blocks for the prefix-aware routing of data parallel engines.
     """
 
-    def __init__(self, num_gpu_blocks: int, enable_caching: bool):
+    # To represent a placeholder block with block_id=0.
+    # The ref_cnt of null_block is not maintained, needs special care to
+    # avoid freeing it.
+    null_block: BlockT
+
+    def __init__(
+        self,
+        num_gpu_blocks: int,
+        enable_caching: bool,
+        on_evict: Optional[Callable[[BlockHashType, int], None]] = None,
+        eviction_policy: str = "lru",
+        enable_kv_cache_events: bool = False,
+    ):
         assert isinstance(num_gpu_blocks, int) and num_gpu_blocks > 0
         self.num_gpu_blocks = num_gpu_blocks
         self.enable_caching = enable_caching
-        # All kv-cache blocks.
-        self.blocks: list[KVCacheBlock] = [
-            KVCacheBlock(idx) for idx in range(num_gpu_blocks)
-        ]
-        # Free block queue that constructs and manipulates a doubly linked
-        # list of free blocks (including eviction candidates when caching is
-        # enabled).
-        self.free_block_queue = FreeKVCacheBlockQueue(self.blocks)
+        self.on_evict = on_evict
+        self.eviction_policy = eviction_policy
+        # The number of cached blocks evicted since the pool was created.
+        self.num_evicted_blocks = 0
+        # The prefix cache changes since the last take_prefix_cache_events.
+        self.prefix_cache_events: Optional[PrefixCacheEvents] = (
+            PrefixCacheEvents() if enable_kv_cache_events else None)
 
         # {block_hash: {block ID: block}}. A cached block is
         # a full block with a block hash that can be used for prefix caching.
@@ -48,16 +85,11 @@ class BlockPool:
         # if there is already an identical block in the cache. This is because
         # we want to make sure the allocated block IDs won't change so that
         # block tables are append-only.
-        self.cached_block_hash_to_block: dict[BlockHashType, dict[
-            int, KVCacheBlock]] = defaultdict(dict)
-
-        # To represent a placeholder block with block_id=0.
-        # The ref_cnt of null_block is not maintained, needs special care to
-        # avoid freeing it.
-        self.null_block = self.free_block_queue.popleft()
+        self.cached_block_hash_to_block: dict[BlockHashType,
+                                              dict[int,
+                                                   BlockT]] = defaultdict(dict)
 
-    def get_cached_block(self,
-                         block_hash: BlockHashType) -> Optional[KVCacheBlock]:
+    def get_cached_block(self, block_hash: BlockHashType) -> Optional[BlockT]:
         """Get a cached block by the block hash, or None if cache miss.
         If there are duplicated blocks, we return the first block in the cache.
 
@@ -76,7 +108,7 @@ class BlockPool:
     def cache_full_blocks(
         self,
         request: Request,
-        blocks: list[KVCacheBlock],
+        blocks: list[BlockT],
         block_hashes: list[BlockHashType],
         num_cached_blocks: int,
         num_full_blocks: int,
@@ -153,8 +185,184 @@ class BlockPool:
             # Update and added the full block to the cache.
             blk.block_hash = block_hash
             self.cached_block_hash_to_block[block_hash][blk.block_id] = blk
+            self._on_block_cached(blk, num_cached_blocks + i)
+            if self.prefix_cache_events is not None:
+                self.prefix_cache_events.stored.append(
+                    hash(block_hash.token_ids))
             prev_block_hash_value = block_hash.hash_value
 
+    def _on_block_cached(self, block: BlockT, chain_pos: int) -> None:
+        """Called when a block is added to the prefix cache.
+
+        Args:
+            block: The cached block.
+            chain_pos: The position of the block in its chain of blocks.
+        """
+        return
+
+    def _uncache_block(self, block_hash: BlockHashType, block_id: int) -> None:
+        """Remove a block from the prefix cache when it is evicted. The
+        caller resets the hash of the block.
+
+        Args:
+            block_hash: The hash of the block.
+            block_id: The ID of the block.
+        """
+        if self.on_evict is not None:
+            self.on_evict(block_hash, block_id)
+        del self.cached_block_hash_to_block[block_hash][block_id]
+        self.num_evicted_blocks += 1
+        if self.prefix_cache_events is not None:
+            self.prefix_cache_events.removed.append(hash(block_hash.token_ids))
+
+        if len(self.cached_block_hash_to_block[block_hash]) == 0:
+            del self.cached_block_hash_to_block[block_hash]
+
+    @abstractmethod
+    def get_new_blocks(self, num_blocks: int) -> list[BlockT]:
+        """Get new blocks from the free block pool.
+
+        Note that we do not check block cache in this function.
+
+        Args:
+            num_blocks: The number of blocks to allocate.
+
+        Returns:
+            A list of new block.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def touch(self, blocks: list[BlockT]) -> None:
+        """Touch a block increases its reference count by 1, and may remove
+        the block from the free queue. This is used when a block is hit by
+        another request with the same prefix.
+
+        Args:
+            blocks: A list of blocks to touch.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def free_blocks(self, ordered_blocks: Iterable[BlockT]) -> None:
+        """Free a list of blocks. The blocks should be ordered by their
+        eviction priority, where the first block will be evicted first.
+
+        Args:
+            ordered_blocks: A list of blocks to free ordered by their eviction
+                priority.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_num_free_blocks(self) -> int:
+        """Get the number of free blocks in the pool.
+
+        Returns:
+            The number of free blocks.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _reset_block_hashes(self) -> None:
+        """Remove the hashes of all the blocks."""
+        raise NotImplementedError
+
+    def reset_prefix_cache(self) -> bool:
+        """Reset prefix cache. This function may be used in RLHF
+        flows to invalid prefix caching after the weights are updated,
+        or used for resetting prefix caching status for benchmarking.
+
+        Returns:
+            bool: True if the prefix cache is successfully reset,
+            False otherwise.
+        """
+        num_used_blocks = (self.num_gpu_blocks - self.get_num_free_blocks())
+        if num_used_blocks != 1:  # The null block is always marked as used
+            logger.warning(
+                "Failed to reset prefix cache because some "
+                "blocks (%d) are not freed yet", num_used_blocks - 1)
+            return False
+
+        # Remove all hashes so that no new blocks will hit.
+        self.cached_block_hash_to_block = defaultdict(dict)
+
+        # Remove all hashes from all blocks.
+        self._reset_block_hashes()
+
+        if self.prefix_cache_events is not None:
+            self.prefix_cache_events = PrefixCacheEvents(reset=True)
+
+        logger.info("Successfully reset prefix cache")
+        return True
+
+    def take_prefix_cache_events(self) -> Optional[PrefixCacheEvents]:
+        """Get (and reset) the prefix cache changes since the last call.
+
+        Returns:
+            The prefix cache changes, or None if there is no change or the
+            events are disabled.
+        """
+        events = self.prefix_cache_events
+        if events is None or not (events.reset or events.stored
+                                  or events.removed):
+            return None
+        self.prefix_cache_events = PrefixCacheEvents()
+        return events
+
+    def get_usage(self) -> float:
+        """Get the KV cache usage.
+
+        Returns:
+            The KV cache usage (between 0.0 and 1.0).
+        """
+        return 1.0 - (self.get_num_free_blocks() / self.num_gpu_blocks)
+
+
+class BlockPool(BaseBlockPool[KVCacheBlock]):
+    """BlockPool that manages KVCacheBlocks.
+    It provides methods to allocate, free and cache the kv cache blocks. The
+    free_block_queue stores the free blocks and decides their eviction order
+    according to the eviction policy to enable allocation, free, and cache
+    eviction. The cached_block_hash_to_block
+    maps between block hash and cached block to support finding cached blocks
+    by their block hash.
+
+    Args:
+        num_gpu_blocks: The number of blocks in the pool.
+        enable_caching: Whether to enable prefix caching.
+        on_evict: Optional callback invoked with the block hash and block ID
+            of every cached block right before it is evicted.
+        eviction_policy: The eviction policy of the prefix cache, one of
+            "lru", "lfu" or "cost". See vllm.v1.core.eviction_policy.
+        enable_kv_cache_events: Whether to record the cached and evicted
+            blocks for the prefix-aware routing of data parallel engines.
+    """
+
+    def __init__(
+        self,
+        num_gpu_blocks: int,
+        enable_caching: bool,
+        on_evict: Optional[Callable[[BlockHashType, int], None]] = None,
+        eviction_policy: str = "lru",
+        enable_kv_cache_events: bool = False,
+    ):
+        super().__init__(num_gpu_blocks, enable_caching, on_evict,
+                         eviction_policy, enable_kv_cache_events)
+        # All kv-cache blocks.
+        self.blocks: list[KVCacheBlock] = [
+            KVCacheBlock(idx) for idx in range(num_gpu_blocks)
+        ]
+        # Free block queue that holds the free blocks (including eviction
+        # candidates when caching is enabled) in the order of the eviction
+        # policy. For LRU, it is a doubly linked list of free blocks.
+        self.free_block_queue = make_eviction_policy(eviction_policy,
+                                                     self.blocks)
+        self.null_block = self.free_block_queue.popleft()
+
+    def _on_block_cached(self, block: KVCacheBlock, chain_pos: int) -> None:
+        self.free_block_queue.on_block_cached(block, chain_pos)
+
     def get_new_blocks(self, num_blocks: int) -> list[KVCacheBlock]:
         """Get new blocks from the free block pool.
 
@@ -200,12 +408,8 @@ class BlockPool:
         """
         block_hash = block.block_hash
         if block_hash and block_hash in self.cached_block_hash_to_block:
+            self._uncache_block(block_hash, block.block_id)
             block.reset_hash()
-            del self.cached_block_hash_to_block[block_hash][block.block_id]
-
-            if len(self.cached_block_hash_to_block[block_hash]) == 0:
-                del self.cached_block_hash_to_block[block_hash]
-
             return True
         return False
 
@@ -223,6 +427,7 @@ class BlockPool:
             if block.ref_cnt == 0 and block != self.null_block:
                 self.free_block_queue.remove(block)
             block.incr_ref()
+            self.free_block_queue.on_block_hit(block)
 
     def free_blocks(self, ordered_blocks: Iterable[KVCacheBlock]) -> None:
         """Free a list of blocks. The blocks should be ordered by their
@@ -238,32 +443,6 @@ class BlockPool:
             if block.ref_cnt == 0 and block != self.null_block:
                 self.free_block_queue.append(block)
 
-    def reset_prefix_cache(self) -> bool:
-        """Reset prefix cache. This function may be used in RLHF
-        flows to invalid prefix caching after the weights are updated,
-        or used for resetting prefix caching status for benchmarking.
-
-        Returns:
-            bool: True if the prefix cache is successfully reset,
-            False otherwise.
-        """
-        num_used_blocks = (self.num_gpu_blocks - self.get_num_free_blocks())
-        if num_used_blocks != 1:  # The null block is always marked as used
-            logger.warning(
-                "Failed to reset prefix cache because some "
-                "blocks (%d) are not freed yet", num_used_blocks - 1)
-            return False
-
-        # Remove all hashes so that no new blocks will hit.
-        self.cached_block_hash_to_block = defaultdict(dict)
-
-        # Remove all hashes from all blocks.
-        for block in self.blocks:
-            block.reset_hash()
-
-        logger.info("Successfully reset prefix cache")
-        return True
-
     def get_num_free_blocks(self) -> int:
         """Get the number of free blocks in the pool.
 
@@ -272,10 +451,7 @@ class BlockPool:
         """
         return self.free_block_queue.num_free_blocks
 
-    def get_usage(self) -> float:
-        """Get the KV cache usage.
-
-        Returns:
-            The KV cache usage (between 0.0 and 1.0).
-        """
-        return 1.0 - (self.get_num_free_blocks() / self.num_gpu_blocks)
+    def _reset_block_hashes(self) -> None:
+        for block in self.blocks:
+            block.reset_hash()
+        self.free_block_queue.on_prefix_cache_reset()
@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: Apache-2.0
 
+from collections import OrderedDict
 from typing import TYPE_CHECKING
 
 from vllm.logger import init_logger
@@ -13,52 +14,101 @@ logger = init_logger(__name__)
 
 
 class EncoderCacheManager:
+    """Manages the cache of the encoder outputs (e.g., vision embeddings).
+
+    The encoder outputs are keyed by the hashes of the multimodal inputs, so
+    the requests with the same input (e.g., the same image) share a single
+    encoder output, and the encoder runs once for all of them. A cached
+    output is referenced by the requests that need it. When it is no longer
+    referenced, it is kept in the cache and evicted in LRU order only when
+    the space is needed for a new output.
+
+    The cache size is in the unit of encoder tokens (i.e., the number of
+    placeholder tokens of the multimodal inputs).
+    """
 
     def __init__(self, cache_size: int):
         self.cache_size = cache_size
+        # The number of slots that are not used by any encoder output.
         self.num_free_slots = cache_size
-        # req_id -> cached input ids
-        self.cached: dict[str, set[int]] = {}
-        # list of [req_id, input_id]
-        self.freed: list[tuple[str, int]] = []
-
-    def has_cache(self, request: Request, input_id: int) -> bool:
-        req_id = request.request_id
-        return req_id in self.cached and input_id in self.cached[req_id]
+        # The number of free slots plus the slots of the encoder outputs
+        # that are not referenced and can be evicted.
+        self.num_freeable_slots = cache_size
+        # mm_hash -> ids of the requests referencing the encoder output
+        self.cached: dict[str, set[str]] = {}
+        # mm_hash -> num encoder tokens of the encoder outputs that are not
+        # referenced, from the least recently used.
+        self.freeable: OrderedDict[str, int] = OrderedDict()
+        # mm_hashes of the evicted encoder outputs
+        self.freed: list[str] = []
+
+    def check_and_update_cache(self, request: Request, input_id: int) -> bool:
+        """Check if the encoder output of the input is cached. If so, the
+        request references it, so that it is not evicted."""
+        mm_hash = request.mm_hashes[input_id]
+        req_ids = self.cached.get(mm_hash)
+        if req_ids is None:
+            return False
+        if not req_ids:
+            # The encoder output is referenced again.
+            self.num_freeable_slots -= self.freeable.pop(mm_hash)
+        req_ids.add(request.request_id)
+        return True
 
     def can_allocate(self, request: Request, input_id: int) -> bool:
         num_tokens = request.get_num_encoder_tokens(input_id)
-        return num_tokens <= self.num_free_slots
+        return num_tokens <= self.num_freeable_slots
 
     def allocate(self, request: Request, input_id: int) -> None:
-        req_id = request.request_id
-        if req_id not in self.cached:
-            self.cached[req_id] = set()
-        self.cached[req_id].add(input_id)
-        self.num_free_slots -= request.get_num_encoder_tokens(input_id)
+        mm_hash = request.mm_hashes[input_id]
+        if self.check_and_update_cache(request, input_id):
+            # The same input appears more than once in the request.
+            return
+
+        num_tokens = request.get_num_encoder_tokens(input_id)
+        # Evict the least recently used encoder outputs if needed.
+        while num_tokens > self.num_free_slots and self.freeable:
+            evicted_hash, num_evicted_tokens = self.freeable.popitem(
+                last=False)
+            del self.cached[evicted_hash]
+            self.num_free_slots += num_evicted_tokens
+            self.freed.append(evicted_hash)
+
+        self.cached[mm_hash] = {request.request_id}
+        self.num_free_slots -= num_tokens
+        self.num_freeable_slots -= num_tokens
 
     def get_cached_input_ids(self, request: Request) -> set[int]:
-        return self.cached.get(request.request_id, set())
+        """Get the ids of the inputs whose cached encoder outputs are
+        referenced by the request."""
+        req_id = request.request_id
+        return {
+            input_id
+            for input_id, mm_hash in enumerate(request.mm_hashes)
+            if req_id in self.cached.get(mm_hash, ())
+        }
 
     def free_encoder_input(self, request: Request, input_id: int) -> None:
-        """Free a single encoder input id for the request."""
-        req_id = request.request_id
-        if req_id not in self.cached:
+        """Free the reference of the request to a single encoder output.
+
+        The encoder output stays in the cache until it is evicted."""
+        mm_hash = request.mm_hashes[input_id]
+        req_ids = self.cached.get(mm_hash)
+        if not req_ids or request.request_id not in req_ids:
             return
 
-        self.cached[req_id].discard(input_id)
-        if len(self.cached[req_id]) == 0:
-            del self.cached[req_id]
-        self.num_free_slots += request.get_num_encoder_tokens(input_id)
-        self.freed.append((req_id, input_id))
+        req_ids.remove(request.request_id)
+        if not req_ids:
+            num_tokens = request.get_num_encoder_tokens(input_id)
+            self.freeable[mm_hash] = num_tokens
+            self.num_freeable_slots += num_tokens
 
     def free(self, request: Request) -> None:
-        """Free all cached input ids for the request."""
-        input_ids = self.get_cached_input_ids(request).copy()
-        for input_id in input_ids:
+        """Free all the references of the request to the encoder outputs."""
+        for input_id in self.get_cached_input_ids(request):
             self.free_encoder_input(request, input_id)
 
-    def get_freed_ids(self) -> list[tuple[str, int]]:
+    def get_freed_mm_hashes(self) -> list[str]:
         freed = self.freed
         self.freed = []
         return freed
@@ -0,0 +1,214 @@
+# SPDX-License-Identifier: Apache-2.0
+"""Eviction policies of the v1 prefix cache.
+
+An eviction policy holds the free blocks of a BlockPool, which includes the
+cached blocks that are not used by any request (i.e., eviction candidates),
+and decides which one is reused first.
+"""
+import heapq
+from abc import ABC, abstractmethod
+
+from vllm.v1.core.kv_cache_utils import FreeKVCacheBlockQueue, KVCacheBlock
+
+
+class EvictionPolicy(ABC):
+    """The interface of the free block queue of a BlockPool.
+
+    The queue holds both the free blocks without a cached prefix and the
+    eviction candidates, and each policy decides the order in which all of
+    them are reused.
+    """
+
+    # The number of free blocks in the queue.
+    num_free_blocks: int
+
+    @abstractmethod
+    def popleft(self) -> KVCacheBlock:
+        """Pop the block to reuse first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, block: KVCacheBlock) -> None:
+        """Remove a block from the queue, e.g., when it gets a cache hit."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def append(self, block: KVCacheBlock) -> None:
+        """Put a block that is no longer used by any request to the queue."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_free_blocks(self) -> list[KVCacheBlock]:
+        """Get all free blocks in eviction order."""
+        raise NotImplementedError
+
+    def on_block_cached(self, block: KVCacheBlock, chain_pos: int) -> None:
+        """Called when a full block is added to the prefix cache.
+
+        Args:
+            block: The cached block.
+            chain_pos: The index of the block in the chain of its request.
+        """
+        return
+
+    def on_block_hit(self, block: KVCacheBlock) -> None:
+        """Called when a cached block is hit by a request."""
+        return
+
+    def on_prefix_cache_reset(self) -> None:
+        """Called after all the block hashes are reset."""
+        return
+
+
+class LRUEvictionPolicy(FreeKVCacheBlockQueue, EvictionPolicy):
+    """Evict the least recently used block first. The blocks of a request
+    are freed in reverse order, so its tail blocks are evicted first."""
+
+
+class _AgingEvictionPolicy(EvictionPolicy):
+    """Base class of the policies that evict the block with the lowest
+    priority first, where the priority of a cached block is its value plus
+    the priority of the last evicted block when it was freed (i.e., the
+    "age" of the cache). Aging lets blocks that were valuable in the past
+    eventually be evicted once they stop being used.
+
+    Free blocks that do not hold a cached prefix always have the lowest
+    priority, so they are reused before any eviction candidate.
+
+    The free blocks are kept in a heap with lazy deletion. Ties are broken
+    in the order the blocks were freed, like LRU.
+    """
+
+    # The priority of the free blocks without a cached prefix.
+    _UNCACHED_PRIORITY = -1.0
+
+    def __init__(self, blocks: list[KVCacheBlock]) -> None:
+        self.num_free_blocks = len(blocks)
+        self._blocks = blocks
+        self._age = 0.0
+        self._next_seq = len(blocks)
+        # The sequence number of the heap entry of each free block, or -1 if
+        # the block is not free. Other entries of the heap are stale.
+        self._entry_seq = list(range(len(blocks)))
+        self._heap: list[tuple[float, int, int]] = [
+            (self._UNCACHED_PRIORITY, i, block.block_id)
+            for i, block in enumerate(blocks)
+        ]
+        # The number of cache hits of each block since it was cached.
+        self._num_hits = [0] * len(blocks)
+        # The index of each block in the chain of the request caching it.
+        self._chain_pos = [0] * len(blocks)
+
+    @abstractmethod
+    def _value(self, block_id: int) -> float:
+        """The value of keeping a cached block, higher is kept longer."""
+        raise NotImplementedError
+
+    def popleft(self) -> KVCacheBlock:
+        while self._heap:
+            priority, seq, block_id = heapq.heappop(self._heap)
+            if self._entry_seq[block_id] != seq:
+                continue
+            self._entry_seq[block_id] = -1
+            self.num_free_blocks -= 1
+            self._age = max(self._age, priority)
+            return self._blocks[block_id]
+        raise ValueError("No free blocks available")
+
+    def remove(self, block: KVCacheBlock) -> None:
+        assert self._entry_seq[block.block_id] != -1
+        self._entry_seq[block.block_id] = -1
+        self.num_free_blocks -= 1
+
+    def append(self, block: KVCacheBlock) -> None:
+        block_id = block.block_id
+        if block.block_hash is None:
+            priority = self._UNCACHED_PRIORITY
+        else:
+            priority = self._age + self._value(block_id)
+        seq = self._next_seq
+        self._next_seq += 1
+        self._entry_seq[block_id] = seq
+        heapq.heappush(self._heap, (priority, seq, block_id))
+        self.num_free_blocks += 1
+
+        # Drop the stale entries once they dominate the heap.
+        if len(self._heap) > 2 * len(self._blocks):
+            self._heap = self._valid_entries()
+            heapq.heapify(self._heap)
+
+    def get_all_free_blocks(self) -> list[KVCacheBlock]:
+        return [
+            self._blocks[block_id]
+            for _, _, block_id in sorted(self._valid_entries())
+        ]
+
+    def on_block_cached(self, block: KVCacheBlock, chain_pos: int) -> None:
+        self._num_hits[block.block_id] = 0
+        self._chain_pos[block.block_id] = chain_pos
+
+    def on_block_hit(self, block: KVCacheBlock) -> None:
+        self._num_hits[block.block_id] += 1
+
+    def on_prefix_cache_reset(self) -> None:
+        # All free blocks are now uncached, so they are reused in the order
+        # they were freed.
+        self._age = 0.0
+        self._heap = [(self._UNCACHED_PRIORITY, seq, block_id)
+                      for _, seq, block_id in self._valid_entries()]
+        heapq.heapify(self._heap)
+
+    def _valid_entries(self) -> list[tuple[float, int, int]]:
+        return [
+            entry for entry in self._heap
+            if self._entry_seq[entry[2]] == entry[1]
+        ]
+
+
+class LFUEvictionPolicy(_AgingEvictionPolicy):
+    """Evict the least frequently used block first, with aging (LFU-DA).
+    The frequency of a block is the number of requests that used it since
+    it was cached."""
+
+    def _value(self, block_id: int) -> float:
+        return 1.0 + self._num_hits[block_id]
+
+
+class CostAwareEvictionPolicy(_AgingEvictionPolicy):
+    """Evict the block that is the cheapest to lose first, with aging.
+
+    A block is worth more when it is shared by many requests, and when it is
+    near the start of its chain since evicting it also makes all the blocks
+    after it unreachable. For example, the blocks of a long system prompt
+    shared by all the requests are kept over the one-off suffixes, even if
+    the suffixes were used more recently.
+    """
+
+    def _value(self, block_id: int) -> float:
+        return (1.0 +
+                self._num_hits[block_id]) * (1.0 + 1.0 /
+                                             (1.0 + self._chain_pos[block_id]))
+
+
+EVICTION_POLICIES: dict[str, type[EvictionPolicy]] = {
+    "lru": LRUEvictionPolicy,
+    "lfu": LFUEvictionPolicy,
+    "cost": CostAwareEvictionPolicy,
+}
+
+
+def make_eviction_policy(name: str,
+                         blocks: list[KVCacheBlock]) -> EvictionPolicy:
+    """Create the eviction policy of a BlockPool.
+
+    Args:
+        name: The name of the policy, one of EVICTION_POLICIES.
+        blocks: All the blocks of the pool, which are initially free.
+
+    Returns:
+        The eviction policy holding the free blocks.
+    """
+    if name not in EVICTION_POLICIES:
+        raise ValueError(f"Unknown eviction policy: {name}. Must be one of "
+                         f"{list(EVICTION_POLICIES)}.")
+    return EVICTION_POLICIES[name](blocks)  # type: ignore[call-arg]
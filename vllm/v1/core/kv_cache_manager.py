@@ -2,14 +2,18 @@
 
 from collections import defaultdict
 from collections.abc import Iterable
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from vllm.logger import init_logger
-from vllm.utils import cdiv, sha256
-from vllm.v1.core.block_pool import BlockPool
+from vllm.utils import cdiv
+from vllm.v1.core.array_block_pool import ArrayBlockPool
+from vllm.v1.core.block_pool import BaseBlockPool, BlockPool
 from vllm.v1.core.kv_cache_utils import (BlockHashType, KVCacheBlock,
+                                         get_block_hash_fn,
+                                         hash_block_tokens_batch,
                                          hash_request_tokens)
 from vllm.v1.core.specialized_manager import get_specialized_manager
+from vllm.v1.engine import PrefixCacheEvents
 from vllm.v1.kv_cache_interface import KVCacheConfig
 from vllm.v1.metrics.stats import PrefixCacheStats
 from vllm.v1.request import Request, RequestStatus
@@ -27,6 +31,11 @@ class KVCacheManager:
         caching_hash_algo: str = "builtin",
         num_preallocate_tokens: int = 64,
         log_stats: bool = False,
+        on_evict: Optional[Callable[[BlockHashType, int], None]] = None,
+        block_pool_backend: str = "object",
+        eviction_policy: str = "lru",
+        enable_kv_cache_events: bool = False,
+        max_num_pinned_blocks: int = 0,
     ) -> None:
         assert len(kv_cache_config.kv_cache_groups) == 1, (
             "KVCacheManager does not support hybrid models with more than 1 "
@@ -38,7 +47,7 @@ class KVCacheManager:
         self.max_num_blocks_per_req = cdiv(max_model_len, self.block_size)
 
         self.enable_caching = enable_caching
-        self.caching_hash_fn = sha256 if caching_hash_algo == "sha256" else hash
+        self.caching_hash_fn = get_block_hash_fn(caching_hash_algo)
         self.log_stats = log_stats
         # FIXME: make prefix cache stats conditional on log_stats
         self.prefix_cache_stats = PrefixCacheStats() if log_stats else None
@@ -56,7 +65,17 @@ class KVCacheManager:
         self.num_preallocate_blocks = cdiv(num_preallocate_tokens,
                                            self.block_size)
 
-        self.block_pool = BlockPool(self.num_gpu_blocks, enable_caching)
+        block_pool_cls: type[BaseBlockPool[Any]]
+        if block_pool_backend == "array":
+            block_pool_cls = ArrayBlockPool
+        else:
+            block_pool_cls = BlockPool
+        self.block_pool = block_pool_cls(self.num_gpu_blocks, enable_caching,
+                                         on_evict, eviction_policy,
+                                         enable_kv_cache_events)
+        # The number of evicted blocks reported in the last prefix cache
+        # stats.
+        self._last_num_evicted_blocks = 0
 
         self.specialized_manager = get_specialized_manager(
             kv_cache_spec=kv_cache_spec,
@@ -69,6 +88,13 @@ class KVCacheManager:
         self.req_to_blocks: defaultdict[str,
                                         list[KVCacheBlock]] = defaultdict(list)
 
+        # Pinned prefixes hold a reference to their blocks so that the blocks
+        # are never evicted. {prefix_id: blocks}
+        self.pinned_prefixes: dict[str, list[KVCacheBlock]] = {}
+        # {block_id: number of pinned prefixes holding the block}
+        self.block_pin_counts: dict[int, int] = {}
+        self.max_num_pinned_blocks = max_num_pinned_blocks
+
         # Mapping from request ID to kv block hashes.
         # This is to avoid recomputing the block hashes for each call of
         # `get_computed_blocks` or `allocate_slots`.
@@ -99,9 +125,22 @@ class KVCacheManager:
         if not self.log_stats:
             return None
         stats = self.prefix_cache_stats
+        assert stats is not None
+        num_evicted_blocks = self.block_pool.num_evicted_blocks
+        stats.evictions = num_evicted_blocks - self._last_num_evicted_blocks
+        self._last_num_evicted_blocks = num_evicted_blocks
         self.prefix_cache_stats = PrefixCacheStats()
         return stats
 
+    def take_prefix_cache_events(self) -> Optional[PrefixCacheEvents]:
+        """Get (and reset) the prefix cache changes since the last call.
+
+        Returns:
+            The prefix cache changes, or None if there is no change or the
+            events are disabled.
+        """
+        return self.block_pool.take_prefix_cache_events()
+
     def get_computed_blocks(
             self, request: Request) -> tuple[list[KVCacheBlock], int]:
         """Get the computed (cached) blocks for the request.
@@ -284,9 +323,12 @@ class KVCacheManager:
                                                       len(new_computed_blocks))
         # Speculated tokens might be rejected in the future, so we does
         # not cache any speculated tokens. We only cache blocks with
-        # generated (accepted) tokens.
-        num_full_blocks_after_append = (num_computed_tokens + num_tokens - len(
-            request.spec_token_ids)) // self.block_size
+        # generated (accepted) tokens. With async scheduling, the tokens of
+        # the steps in flight are not known yet, so they are not cached
+        # either.
+        num_full_blocks_after_append = min(
+            num_computed_tokens + num_tokens - len(request.spec_token_ids),
+            request.num_tokens) // self.block_size
 
         self.block_pool.cache_full_blocks(
             request=request,
@@ -330,6 +372,11 @@ class KVCacheManager:
             bool: True if the prefix cache is successfully reset,
             False otherwise.
         """
+        if self.pinned_prefixes:
+            logger.warning(
+                "Failed to reset prefix cache because %d prefixes are "
+                "pinned", len(self.pinned_prefixes))
+            return False
         if not self.block_pool.reset_prefix_cache():
             return False
         if self.log_stats:
@@ -378,13 +425,107 @@ class KVCacheManager:
         assert request.status == RequestStatus.RUNNING
         blocks = self.req_to_blocks[request.request_id]
         num_common_blocks = 0
+        pin_counts = self.block_pin_counts
         for block in blocks:
-            if block.ref_cnt == num_running_requests:
+            # The references held by the pinned prefixes do not count.
+            ref_cnt = block.ref_cnt
+            if pin_counts:
+                ref_cnt -= pin_counts.get(block.block_id, 0)
+            if ref_cnt == num_running_requests:
                 num_common_blocks += 1
             else:
                 break
         return num_common_blocks
 
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        """Pin the cached blocks of a prefix so that they are never evicted.
+
+        Only the full blocks of the prefix are pinned, and they must all be
+        in the prefix cache already, i.e., the prefix must have been prefilled
+        by a request without multi-modal inputs or LoRA.
+
+        Args:
+            prefix_id: The ID of the pinned prefix.
+            token_ids: The token IDs of the prefix.
+
+        Returns:
+            The number of pinned tokens, or 0 if the prefix is not cached.
+
+        Raises:
+            ValueError: If prefix caching is disabled, the prefix ID is
+                already pinned, the prefix is shorter than a block, or the
+                pinned blocks would exceed the limit.
+        """
+        if not self.enable_caching:
+            raise ValueError("Pinning prefixes requires prefix caching.")
+        if prefix_id in self.pinned_prefixes:
+            raise ValueError(f"Prefix {prefix_id} is already pinned.")
+        num_full_blocks = len(token_ids) // self.block_size
+        if num_full_blocks == 0:
+            raise ValueError(f"Prefix {prefix_id} is shorter than a block "
+                             f"({len(token_ids)} < {self.block_size} tokens).")
+
+        block_hashes = hash_block_tokens_batch(
+            self.caching_hash_fn, None,
+            token_ids[:num_full_blocks * self.block_size], self.block_size)
+        blocks: list[KVCacheBlock] = []
+        for block_hash in block_hashes:
+            block = self.block_pool.get_cached_block(block_hash)
+            if block is None:
+                return 0
+            blocks.append(block)
+
+        num_new_pinned_blocks = sum(block.block_id not in self.block_pin_counts
+                                    for block in blocks)
+        if (len(self.block_pin_counts) + num_new_pinned_blocks
+                > self.max_num_pinned_blocks):
+            raise ValueError(
+                f"Cannot pin prefix {prefix_id}: {num_new_pinned_blocks} more "
+                f"blocks would exceed the limit of {self.max_num_pinned_blocks}"
+                f" pinned blocks ({len(self.block_pin_counts)} in use).")
+
+        self.block_pool.touch(blocks)
+        for block in blocks:
+            self.block_pin_counts[block.block_id] = (
+                self.block_pin_counts.get(block.block_id, 0) + 1)
+        self.pinned_prefixes[prefix_id] = blocks
+        return num_full_blocks * self.block_size
+
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        """Unpin a prefix. Its blocks become evictable once they are not used
+        by any request.
+
+        Args:
+            prefix_id: The ID of the pinned prefix.
+
+        Returns:
+            True if the prefix was pinned, False otherwise.
+        """
+        blocks = self.pinned_prefixes.pop(prefix_id, None)
+        if blocks is None:
+            return False
+        for block in blocks:
+            num_pins = self.block_pin_counts[block.block_id] - 1
+            if num_pins:
+                self.block_pin_counts[block.block_id] = num_pins
+            else:
+                del self.block_pin_counts[block.block_id]
+        # Free blocks in reverse order so that the tail blocks are evicted
+        # first, like for requests.
+        self.block_pool.free_blocks(reversed(blocks))
+        return True
+
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        """List the pinned prefixes.
+
+        Returns:
+            The number of pinned tokens of each pinned prefix.
+        """
+        return {
+            prefix_id: len(blocks) * self.block_size
+            for prefix_id, blocks in self.pinned_prefixes.items()
+        }
+
     def free_block_hashes(self, request: Request) -> None:
         """Discard the block hashes for the request.
 
@@ -392,3 +533,9 @@ class KVCacheManager:
         is finished, not when it is preempted.
         """
         self.req_to_block_hashes.pop(request.request_id, None)
+
+    def get_block_ids(self, request_id: str) -> list[int]:
+        """Get the block ids of a request."""
+        return [
+            block.block_id for block in self.req_to_blocks.get(request_id, [])
+        ]
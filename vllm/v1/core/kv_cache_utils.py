@@ -4,8 +4,11 @@ import os
 from collections import deque
 from collections.abc import Sequence
 from dataclasses import dataclass
+from itertools import repeat
 from typing import Any, Callable, NamedTuple, Optional
 
+import numpy as np
+
 from vllm.config import VllmConfig
 from vllm.logger import init_logger
 from vllm.utils import GiB_bytes, sha256
@@ -45,6 +48,114 @@ class BlockHashType(NamedTuple):
 NONE_HASH = int.from_bytes(os.urandom(32), byteorder="big") if os.getenv(
     'PYTHONHASHSEED') is not None else sha256(os.getenv('PYTHONHASHSEED'))
 
+# Constants of the "fast" block hash. The token IDs of a block are folded
+# with 64-bit FNV-1a, the result goes through the splitmix64 finalizer, and
+# the blocks are chained with a polynomial hash: h_i = h_{i-1} * P + d_i.
+_MASK64 = (1 << 64) - 1
+_FNV_OFFSET = 0xcbf29ce484222325
+_FNV_PRIME = 0x100000001b3
+_CHAIN_PRIME = 0x9e3779b97f4a7c15
+_CHAIN_PRIME_INV = pow(_CHAIN_PRIME, -1, 1 << 64)
+
+
+def _splitmix64(z: int) -> int:
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return z ^ (z >> 31)
+
+
+def _fast_block_digest(token_ids: Sequence[int],
+                       extra_keys: Optional[tuple[Any, ...]]) -> int:
+    h = _FNV_OFFSET
+    for token_id in token_ids:
+        h = ((h ^ (token_id & _MASK64)) * _FNV_PRIME) & _MASK64
+    if extra_keys is not None:
+        h ^= hash(extra_keys) & _MASK64
+    return _splitmix64(h)
+
+
+def fast_block_hash(
+        input: tuple[int, tuple[int, ...], Optional[tuple[Any, ...]]]) -> int:
+    """A fast, non-cryptographic 64-bit hash of a block given its parent
+    hash, its token IDs and its extra keys. Unlike `hash` and `sha256`, it
+    has a vectorized counterpart that hashes all the blocks of a request at
+    once (see `hash_block_tokens_batch`), which gives the same values.
+
+    Args:
+        input: A tuple of (parent block hash, token IDs, extra keys).
+
+    Returns:
+        The 64-bit hash value of the block.
+    """
+    parent_block_hash, token_ids, extra_keys = input
+    return ((parent_block_hash & _MASK64) * _CHAIN_PRIME +
+            _fast_block_digest(token_ids, extra_keys)) & _MASK64
+
+
+def _fast_block_hash_batch(
+        parent_block_hash: int, token_ids: np.ndarray,
+        extra_keys: Optional[list[Optional[tuple[Any, ...]]]]) -> list[int]:
+    """Vectorized `fast_block_hash` over a chain of blocks.
+
+    Args:
+        parent_block_hash: The hash of the parent of the first block.
+        token_ids: The token IDs of the blocks, of shape
+            [num_blocks, block_size].
+        extra_keys: The extra keys of each block, if any.
+
+    Returns:
+        The hash values of the blocks.
+    """
+    num_blocks = token_ids.shape[0]
+    tokens: np.ndarray = token_ids.astype(np.uint64)
+    # NOTE: numpy arithmetic on uint64 arrays wraps around modulo 2**64.
+    with np.errstate(over="ignore"):
+        h = np.full(num_blocks, _FNV_OFFSET, dtype=np.uint64)
+        fnv_prime = np.uint64(_FNV_PRIME)
+        for j in range(tokens.shape[1]):
+            h ^= tokens[:, j]
+            h *= fnv_prime
+        if extra_keys is not None:
+            h ^= np.array([
+                hash(keys) & _MASK64 if keys is not None else 0
+                for keys in extra_keys
+            ],
+                          dtype=np.uint64)
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xbf58476d1ce4e5b9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94d049bb133111eb)
+        h ^= h >> np.uint64(31)
+
+        # h_i = P^(i+1) * h_{-1} + sum_{k<=i} d_k * P^(i-k)
+        #     = P^i * (P * h_{-1} + sum_{k<=i} d_k * P^(-k))
+        # where P^(-1) is the inverse of P modulo 2**64 (P is odd).
+        powers = np.cumprod(np.full(num_blocks, _CHAIN_PRIME, dtype=np.uint64))
+        powers = np.concatenate(([np.uint64(1)], powers[:-1]))
+        inv_powers = np.cumprod(
+            np.full(num_blocks, _CHAIN_PRIME_INV, dtype=np.uint64))
+        inv_powers = np.concatenate(([np.uint64(1)], inv_powers[:-1]))
+        head = np.uint64((parent_block_hash & _MASK64) * _CHAIN_PRIME
+                         & _MASK64)
+        chained = powers * (np.cumsum(h * inv_powers, dtype=np.uint64) + head)
+    return chained.tolist()
+
+
+def get_block_hash_fn(hash_algo: str) -> Callable:
+    """Get the block hash function of a prefix caching hash algorithm.
+
+    Args:
+        hash_algo: One of "builtin", "sha256" or "fast".
+
+    Returns:
+        The hash function.
+    """
+    if hash_algo == "sha256":
+        return sha256
+    if hash_algo == "fast":
+        return fast_block_hash
+    return hash
+
 
 class PrefixCachingMetrics:
     """Metrics for prefix caching with a hit rate of the most recent N requests.
@@ -420,6 +531,75 @@ def hash_block_tokens(
         curr_block_token_ids_tuple, extra_keys)
 
 
+def get_block_routing_keys(token_ids: Sequence[int],
+                           block_size: int) -> list[int]:
+    """Get the routing keys of the full blocks of a token sequence.
+
+    The routing keys identify the blocks in the approximate index of the
+    prefix caches of the data parallel engines kept by the front end. Unlike
+    the block hashes, they only depend on the token IDs of each block, so
+    the front end and the engines compute the same keys regardless of the
+    hash function and its random seed. The key of a block is the built-in
+    hash of its token IDs tuple, i.e., `hash(block_hash.token_ids)`.
+
+    Args:
+        token_ids: A sequence of token ids.
+        block_size: The size of each block.
+
+    Returns:
+        The routing keys of the full blocks.
+    """
+    return [
+        hash(tuple(token_ids[start:start + block_size]))
+        for start in range(0,
+                           len(token_ids) - block_size + 1, block_size)
+    ]
+
+
+def hash_block_tokens_batch(
+    hash_function: Callable,
+    parent_block_hash: Optional[int],
+    token_ids: Sequence[int],
+    block_size: int,
+    extra_keys: Optional[list[Optional[tuple[Any, ...]]]] = None,
+) -> list[BlockHashType]:
+    """Computes the hash values of a chain of full blocks in one call. This
+    gives the same results as calling `hash_block_tokens` block by block,
+    but the token IDs are split into blocks with numpy and, for
+    `fast_block_hash`, the hash values are computed with vectorized ops.
+
+    Args:
+        hash_function: The hash function.
+        parent_block_hash: The hash of the parent of the first block. None
+            if the first block is the first block of the sequence.
+        token_ids: The token IDs of the blocks. Its length must be a
+            multiple of the block size.
+        block_size: The size of each block.
+        extra_keys: The extra keys of each block, if any.
+
+    Returns:
+        The hash values of the blocks.
+    """
+    prev_block_hash = parent_block_hash if parent_block_hash else NONE_HASH
+    token_array = np.asarray(token_ids, dtype=np.int64).reshape(-1, block_size)
+    block_token_ids = list(map(tuple, token_array.tolist()))
+
+    hash_values: list[int]
+    if hash_function is fast_block_hash:
+        hash_values = _fast_block_hash_batch(prev_block_hash, token_array,
+                                             extra_keys)
+    else:
+        hash_values = []
+        for curr_block_token_ids, curr_extra_keys in zip(
+                block_token_ids, extra_keys or repeat(None)):
+            prev_block_hash = hash_function(
+                (prev_block_hash, curr_block_token_ids, curr_extra_keys))
+            hash_values.append(prev_block_hash)
+    return list(
+        map(BlockHashType, hash_values, block_token_ids, extra_keys
+            or repeat(None)))
+
+
 def hash_request_tokens(hash_function: Any, block_size: int,
                         request: Request) -> list[BlockHashType]:
     """Computes hash values of a chain of blocks given a sequence of
@@ -433,30 +613,23 @@ def hash_request_tokens(hash_function: Any, block_size: int,
         The list of computed hash values.
     """
     token_ids = request.all_token_ids
+    num_full_blocks = len(token_ids) // block_size
+    if num_full_blocks == 0:
+        return []
 
-    req_need_extra_keys = need_extra_keys(request)
-    req_extra_keys = None
-    curr_mm_idx = 0
-
-    ret = []
-    parent_block_hash_value = None
-    for start in range(0, len(token_ids), block_size):
-        end = start + block_size
-        block_token_ids = token_ids[start:end]
-        # Do not hash the block if it is not full.
-        if len(block_token_ids) < block_size:
-            break
-
-        if req_need_extra_keys:
-            # MM and LoRA requests need extra keys for block-hash computation.
+    extra_keys: Optional[list[Optional[tuple[Any, ...]]]] = None
+    if need_extra_keys(request):
+        # MM and LoRA requests need extra keys for block-hash computation.
+        extra_keys = []
+        curr_mm_idx = 0
+        for start in range(0, num_full_blocks * block_size, block_size):
             req_extra_keys, curr_mm_idx = generate_block_hash_extra_keys(
-                request, start, end, curr_mm_idx)
+                request, start, start + block_size, curr_mm_idx)
+            extra_keys.append(req_extra_keys)
 
-        block_hash = hash_block_tokens(hash_function, parent_block_hash_value,
-                                       block_token_ids, req_extra_keys)
-        ret.append(block_hash)
-        parent_block_hash_value = block_hash.hash_value
-    return ret
+    return hash_block_tokens_batch(hash_function, None,
+                                   token_ids[:num_full_blocks * block_size],
+                                   block_size, extra_keys)
 
 
 def estimate_max_model_len(vllm_config: VllmConfig,
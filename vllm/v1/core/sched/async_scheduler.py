@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: Apache-2.0
+
+from __future__ import annotations
+
+from vllm.v1.core.sched.output import SchedulerOutput
+from vllm.v1.core.sched.scheduler import Scheduler
+from vllm.v1.request import Request
+
+
+class AsyncScheduler(Scheduler):
+    """Scheduler of async scheduling, where the engine schedules the next
+    step while the current step is executed.
+
+    When a step is scheduled, the tokens of the step in flight are not known
+    yet. The scheduler assumes that every request that reaches the end of its
+    known tokens in a step generates one token in that step, and keeps track
+    of these tokens with `Request.num_output_placeholders`. The workers
+    already have the sampled tokens when they execute the next step. The
+    actual outputs are reconciled when the step finishes: the requests that
+    stopped are freed, and the tokens generated for them by the next step
+    are discarded.
+    """
+
+    def _update_after_schedule(
+        self,
+        scheduler_output: SchedulerOutput,
+    ) -> None:
+        super()._update_after_schedule(scheduler_output)
+        for req_id in scheduler_output.num_scheduled_tokens:
+            request = self.requests[req_id]
+            if (request.num_computed_tokens == request.num_tokens +
+                    request.num_output_placeholders):
+                # The request generates a new token in this step.
+                request.num_output_placeholders += 1
+        # The requests can be scheduled again while they are in flight.
+        self.scheduled_req_ids.clear()
+
+    def _update_request_with_output(
+        self,
+        request: Request,
+        new_token_ids: list[int],
+        num_tokens_to_stop: int = 0,
+    ) -> tuple[list[int], bool]:
+        request.num_output_placeholders -= len(new_token_ids)
+        assert request.num_output_placeholders >= 0
+        return super()._update_request_with_output(request, new_token_ids,
+                                                   num_tokens_to_stop)
@@ -130,6 +130,30 @@ class SchedulerInterface(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        """Pin the cached KV blocks of a prefix so that they are never
+        evicted.
+
+        Returns:
+            The number of pinned tokens, or 0 if the prefix is not cached.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        """Unpin a prefix pinned by `pin_prefix`.
+
+        Returns:
+            True if the prefix was pinned, False otherwise.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        """Get the number of pinned tokens of each pinned prefix."""
+        raise NotImplementedError
+
     @abstractmethod
     def make_stats(self) -> Optional["SchedulerStats"]:
         """Make a SchedulerStats object for logging.
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Optional
 
+import numpy as np
+
+from vllm.v1.utils import flatten_int_lists
+
 if TYPE_CHECKING:
-    import numpy as np
     import numpy.typing as npt
 
     from vllm.distributed.kv_transfer.kv_connector.v1.base import (
@@ -53,32 +56,84 @@ class NewRequestData:
 
 @dataclass
 class CachedRequestData:
+    """The diff of the requests that have been scheduled before, in columnar
+    layout: the i-th element of each array belongs to req_ids[i].
 
-    req_id: str
+    The arrays are flat so that the batch costs a few objects to build and
+    to send to the workers regardless of the number of requests. The
+    resumed requests come before the running ones.
+    """
+
+    req_ids: list[str]
+    # [num_reqs]
     # If resumed_from_preemption is False, new_block_ids will be appended to
     # the request's block IDs. If True, new_block_ids will be used as the
     # request's block IDs instead of appending to the existing block IDs.
-    resumed_from_preemption: bool
-    new_token_ids: list[int]
-    new_block_ids: list[int]
-    num_computed_tokens: int
+    resumed_from_preemption: npt.NDArray[np.bool_]
+    # [total_num_new_tokens]
+    # The new token IDs of the i-th request are
+    # new_token_ids[new_token_ids_offsets[i]:new_token_ids_offsets[i + 1]].
+    # These are the scheduled tokens of a running request, and all the
+    # tokens after num_computed_tokens of a resumed request.
+    new_token_ids: npt.NDArray[np.int32]
+    # [num_reqs + 1]
+    new_token_ids_offsets: npt.NDArray[np.int32]
+    # [total_num_new_blocks]
+    # Indexed by new_block_ids_offsets like new_token_ids.
+    new_block_ids: npt.NDArray[np.int32]
+    # [num_reqs + 1]
+    new_block_ids_offsets: npt.NDArray[np.int32]
+    # [num_reqs]
+    num_computed_tokens: npt.NDArray[np.int32]
 
     @classmethod
-    def from_request(
+    def from_lists(
         cls,
-        request: Request,
-        resumed_from_preemption: bool,
-        new_token_ids: list[int],
-        new_block_ids: list[int],
+        req_ids: list[str],
+        num_resumed_reqs: int,
+        new_token_ids: list[list[int]],
+        new_block_ids: list[list[int]],
+        num_computed_tokens: list[int],
     ) -> CachedRequestData:
+        """Build the batch from per-request lists. The first
+        num_resumed_reqs requests are the ones resumed from preemption."""
+        num_reqs = len(req_ids)
+        resumed_from_preemption: np.ndarray = np.zeros(num_reqs,
+                                                       dtype=np.bool_)
+        resumed_from_preemption[:num_resumed_reqs] = True
+        flat_token_ids, token_ids_offsets = flatten_int_lists(new_token_ids)
+        flat_block_ids, block_ids_offsets = flatten_int_lists(new_block_ids)
         return cls(
-            req_id=request.request_id,
+            req_ids=req_ids,
             resumed_from_preemption=resumed_from_preemption,
-            new_token_ids=new_token_ids,
-            new_block_ids=new_block_ids,
-            num_computed_tokens=request.num_computed_tokens,
+            new_token_ids=flat_token_ids,
+            new_token_ids_offsets=token_ids_offsets,
+            new_block_ids=flat_block_ids,
+            new_block_ids_offsets=block_ids_offsets,
+            num_computed_tokens=np.array(num_computed_tokens, dtype=np.int32),
         )
 
+    @classmethod
+    def make_empty(cls) -> CachedRequestData:
+        return cls.from_lists([], 0, [], [], [])
+
+    def __len__(self) -> int:
+        return len(self.req_ids)
+
+    def get_new_token_ids(self, idx: int) -> npt.NDArray[np.int32]:
+        """Get a view of the new token IDs of the idx-th request."""
+        offsets = self.new_token_ids_offsets
+        return self.new_token_ids[offsets[idx]:offsets[idx + 1]]
+
+    def get_new_block_ids(self, idx: int) -> list[int]:
+        """Get the new block IDs of the idx-th request."""
+        offsets = self.new_block_ids_offsets
+        start, end = offsets[idx], offsets[idx + 1]
+        if start == end:
+            # Avoid creating arrays in the most common case of decoding.
+            return []
+        return self.new_block_ids[start:end].tolist()
+
 
 @dataclass
 class SchedulerOutput:
@@ -90,7 +145,7 @@ class SchedulerOutput:
     # list of the requests that have been scheduled before.
     # Since the request's data is already cached in the worker processes,
     # we only send the diff to minimize the communication cost.
-    scheduled_cached_reqs: list[CachedRequestData]
+    scheduled_cached_reqs: CachedRequestData
 
     # req_id -> num_scheduled_tokens
     # Number of tokens scheduled for each request.
@@ -114,9 +169,9 @@ class SchedulerOutput:
     # steps. This is used to notify the workers about the finished requests
     # so that they can free the cached states for those requests.
     finished_req_ids: set[str]
-    # list of (req_id, encoder_input_index) tuples.
+    # The mm_hashes of the encoder outputs evicted from the encoder cache.
     # Used to free the encoder cache.
-    free_encoder_input_ids: list[tuple[str, int]]
+    free_encoder_mm_hashes: list[str]
 
     # Dict of request ids to their index within the batch
     # for filling the next token bitmask
@@ -126,3 +181,11 @@ class SchedulerOutput:
 
     # KV Cache Connector metadata.
     kv_connector_metadata: Optional[KVConnectorMetadata] = None
+
+    # (GPU block ID, CPU block ID) pairs to copy from device to host for the
+    # requests preempted by swapping in this step. These must be copied
+    # before the forward pass since the blocks may be reused in this step.
+    blocks_to_swap_out: list[tuple[int, int]] = field(default_factory=list)
+    # (CPU block ID, GPU block ID) pairs to copy from host to device for the
+    # swapped requests resumed in this step.
+    blocks_to_swap_in: list[tuple[int, int]] = field(default_factory=list)
@@ -0,0 +1,278 @@
+# SPDX-License-Identifier: Apache-2.0
+"""Waiting queues of the v1 scheduler.
+
+The queue decides which waiting request the scheduler tries to schedule
+next. All the policies share the same interface so that the scheduler does
+not need to know which one is used.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+from vllm.v1.request import Request
+
+
+class RequestQueue(ABC):
+    """The interface of the waiting queue of the scheduler."""
+
+    @abstractmethod
+    def add_request(self, request: Request) -> None:
+        """Add a new request to the queue."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def pop_request(self) -> Request:
+        """Pop the request to schedule next."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def peek_request(self) -> Request:
+        """Get the request to schedule next without removing it."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def prepend_request(self, request: Request) -> None:
+        """Put back a request that was popped from the queue (e.g., it was
+        skipped or preempted), ahead of the requests of the same rank."""
+        raise NotImplementedError
+
+    def prepend_requests(self, requests: Iterable[Request]) -> None:
+        """Put back the requests so that they are popped in the given order
+        relative to each other."""
+        for request in reversed(list(requests)):
+            self.prepend_request(request)
+
+    @abstractmethod
+    def remove_request(self, request: Request) -> None:
+        """Remove a request from the queue, e.g., when it is aborted."""
+        raise NotImplementedError
+
+    def remove_requests(self, requests: Iterable[Request]) -> None:
+        for request in requests:
+            self.remove_request(request)
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[Request]:
+        """Iterate over the requests in the order they would be popped."""
+        raise NotImplementedError
+
+
+class FCFSRequestQueue(deque[Request], RequestQueue):
+    """First come first served. A plain deque, so it adds no overhead over
+    the original waiting queue of the scheduler."""
+
+    def add_request(self, request: Request) -> None:
+        self.append(request)
+
+    def pop_request(self) -> Request:
+        return self.popleft()
+
+    def peek_request(self) -> Request:
+        if not self:
+            raise IndexError("peek from an empty queue")
+        return self[0]
+
+    def prepend_request(self, request: Request) -> None:
+        self.appendleft(request)
+
+    def prepend_requests(self, requests: Iterable[Request]) -> None:
+        self.extendleft(reversed(list(requests)))
+
+    def remove_request(self, request: Request) -> None:
+        self.remove(request)
+
+    def remove_requests(self, requests: Iterable[Request]) -> None:
+        requests_to_remove = set(requests)
+        filtered = [req for req in self if req not in requests_to_remove]
+        self.clear()
+        self.extend(filtered)
+
+
+class _HeapRequestQueue(RequestQueue):
+    """Base class of the queues that pop the request with the smallest key.
+
+    Ties are broken by a sequence number, which is negative for the requests
+    put back by prepend_request() so that they are popped before the requests
+    with the same key that were never popped.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[tuple, int, Request]] = []
+        self._next_seq = 0
+        self._next_prepend_seq = -1
+
+    @abstractmethod
+    def _key(self, request: Request) -> tuple:
+        """The key of a new request."""
+        raise NotImplementedError
+
+    def _prepend_key(self, request: Request) -> tuple:
+        """The key of a request put back to the queue."""
+        return self._key(request)
+
+    def add_request(self, request: Request) -> None:
+        heapq.heappush(self._heap,
+                       (self._key(request), self._next_seq, request))
+        self._next_seq += 1
+
+    def pop_request(self) -> Request:
+        if not self._heap:
+            raise IndexError("pop from an empty queue")
+        return heapq.heappop(self._heap)[2]
+
+    def peek_request(self) -> Request:
+        if not self._heap:
+            raise IndexError("peek from an empty queue")
+        return self._heap[0][2]
+
+    def prepend_request(self, request: Request) -> None:
+        heapq.heappush(
+            self._heap,
+            (self._prepend_key(request), self._next_prepend_seq, request))
+        self._next_prepend_seq -= 1
+
+    def remove_request(self, request: Request) -> None:
+        self.remove_requests((request, ))
+
+    def remove_requests(self, requests: Iterable[Request]) -> None:
+        # NOTE: Aborts are rare compared to pops, so we simply rebuild the
+        # heap instead of keeping track of the removed entries.
+        requests_to_remove = set(requests)
+        self._heap = [
+            entry for entry in self._heap if entry[2] not in requests_to_remove
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self) -> Iterator[Request]:
+        return (entry[2] for entry in sorted(self._heap, key=lambda e: e[:2]))
+
+
+class PriorityRequestQueue(_HeapRequestQueue):
+    """Schedule the request with the lowest priority value first, and the
+    earliest arrival among the requests of the same priority."""
+
+    def _key(self, request: Request) -> tuple:
+        return (request.priority, request.arrival_time)
+
+
+class WFQRequestQueue(_HeapRequestQueue):
+    """Weighted fair queuing across tenants, within each priority level.
+
+    This implements start-time fair queuing: a new request of tenant t gets
+    the start tag S = max(V, F_t) and tenant t's finish tag becomes
+    F_t = S + cost / w_t, where V is the virtual time (the start tag of the
+    last popped request), w_t is the weight of the tenant and the cost is
+    the number of prompt tokens. Requests are popped in the order of their
+    start tags, so each backlogged tenant gets a share of the prefill
+    tokens proportional to its weight, and a tenant that was idle does not
+    get credit for the time it was idle.
+
+    The requests put back to the queue are tagged with the current virtual
+    time, so that they go first in their priority level without charging
+    their tenant twice.
+    """
+
+    def __init__(self,
+                 tenant_key: str = "lora",
+                 tenant_weights: Optional[dict[str, float]] = None) -> None:
+        super().__init__()
+        if tenant_key not in ("lora", "user"):
+            raise ValueError(f"Unknown fair share key: {tenant_key}. "
+                             "Must be one of ['lora', 'user'].")
+        self.tenant_key = tenant_key
+        self.tenant_weights = tenant_weights or {}
+        self._virtual_time = 0.0
+        # Tenant -> the finish tag of its last request.
+        self._finish_tags: dict[str, float] = {}
+
+    def get_tenant(self, request: Request) -> str:
+        """Get the tenant of a request. The requests without a tenant share
+        the "" tenant."""
+        if self.tenant_key == "lora":
+            lora_request = request.lora_request
+            return lora_request.lora_name if lora_request is not None else ""
+        extra_args = request.sampling_params.extra_args
+        if not extra_args:
+            return ""
+        return str(extra_args.get("user") or "")
+
+    def _key(self, request: Request) -> tuple:
+        tenant = self.get_tenant(request)
+        start_tag = max(self._virtual_time, self._finish_tags.get(tenant, 0.0))
+        weight = self.tenant_weights.get(tenant, 1.0)
+        self._finish_tags[tenant] = (start_tag +
+                                     request.num_prompt_tokens / weight)
+        return (request.priority, start_tag)
+
+    def _prepend_key(self, request: Request) -> tuple:
+        return (request.priority, self._virtual_time)
+
+    def pop_request(self) -> Request:
+        if not self._heap:
+            raise IndexError("pop from an empty queue")
+        (_, start_tag), _, request = heapq.heappop(self._heap)
+        self._virtual_time = max(self._virtual_time, start_tag)
+        if not self._heap:
+            # The system is idle, so the past usage of the tenants does not
+            # matter anymore.
+            self._finish_tags.clear()
+        return request
+
+
+class DeadlineRequestQueue(_HeapRequestQueue):
+    """Earliest deadline first, within each priority level.
+
+    The deadline of a request is its arrival time plus its time to first
+    token target. The requests without a target have no deadline and are
+    handled in the order of arrival after the others.
+    """
+
+    def _key(self, request: Request) -> tuple:
+        ttft_slo = request.sampling_params.ttft_slo
+        if ttft_slo is None:
+            deadline = math.inf
+        else:
+            deadline = request.arrival_time + ttft_slo
+        return (request.priority, deadline, request.arrival_time)
+
+
+def create_request_queue(
+        policy: str,
+        fair_share_key: str = "lora",
+        fair_share_weights: Optional[dict[str, float]] = None) -> RequestQueue:
+    """Create the waiting queue of the scheduler.
+
+    Args:
+        policy: The scheduling policy, one of "fcfs", "priority", "wfq" and
+            "slo".
+        fair_share_key: How the tenants are identified for "wfq".
+        fair_share_weights: The weights of the tenants for "wfq". The
+            tenants that are not listed have weight 1.
+
+    Returns:
+        The waiting queue.
+    """
+    if policy == "fcfs":
+        return FCFSRequestQueue()
+    if policy == "priority":
+        return PriorityRequestQueue()
+    if policy == "wfq":
+        return WFQRequestQueue(fair_share_key, fair_share_weights)
+    if policy == "slo":
+        return DeadlineRequestQueue()
+    raise ValueError(f"Unknown scheduling policy: {policy}")
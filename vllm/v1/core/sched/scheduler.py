@@ -3,31 +3,37 @@
 from __future__ import annotations
 
 import time
-from collections import deque
 from collections.abc import Iterable
 from typing import Optional, Union
 
 from vllm.config import VllmConfig
 from vllm.distributed.kv_transfer.kv_connector.factory import (
     KVConnectorFactory)
+from vllm.distributed.kv_transfer.kv_connector.utils import (
+    get_kv_block_size_bytes)
 from vllm.distributed.kv_transfer.kv_connector.v1 import KVConnectorRole
 from vllm.logger import init_logger
 from vllm.multimodal import MULTIMODAL_REGISTRY, MultiModalRegistry
+from vllm.utils import cdiv
 from vllm.v1.core.encoder_cache_manager import (EncoderCacheManager,
                                                 compute_encoder_budget)
 from vllm.v1.core.kv_cache_manager import KVCacheManager
 from vllm.v1.core.sched.interface import SchedulerInterface
 from vllm.v1.core.sched.output import (CachedRequestData, NewRequestData,
                                        SchedulerOutput)
-from vllm.v1.core.sched.utils import check_stop
+from vllm.v1.core.sched.request_queue import create_request_queue
+from vllm.v1.core.sched.utils import (BatchStopChecker, StepTimeEstimator,
+                                      check_stop)
+from vllm.v1.core.swap_manager import SwapManager, get_num_swap_blocks
 from vllm.v1.engine import (EngineCoreEventType, EngineCoreOutput,
-                            EngineCoreOutputs)
+                            EngineCoreOutputs, EngineCoreTokenOutputs)
 from vllm.v1.kv_cache_interface import KVCacheConfig
 from vllm.v1.metrics.stats import SchedulerStats
 from vllm.v1.outputs import ModelRunnerOutput
 from vllm.v1.request import Request, RequestStatus
 from vllm.v1.spec_decode.metrics import SpecDecodingStats
 from vllm.v1.structured_output import StructuredOutputManager
+from vllm.v1.utils import flatten_int_lists
 
 logger = init_logger(__name__)
 
@@ -80,29 +86,70 @@ class Scheduler(SchedulerInterface):
             max_model_len=self.max_model_len,
             enable_caching=self.cache_config.enable_prefix_caching,
             caching_hash_algo=self.cache_config.prefix_caching_hash_algo,
-            log_stats=self.log_stats)
+            log_stats=self.log_stats,
+            on_evict=(self.connector.on_block_evicted
+                      if self.connector is not None else None),
+            block_pool_backend=self.cache_config.block_pool_backend,
+            eviction_policy=self.cache_config.prefix_caching_eviction_policy,
+            enable_kv_cache_events=(
+                vllm_config.parallel_config.data_parallel_size > 1 and
+                vllm_config.parallel_config.data_parallel_routing == "prefix"),
+            max_num_pinned_blocks=int(
+                num_gpu_blocks * self.cache_config.max_pinned_prefix_fraction))
         self.block_size = self.cache_config.block_size
 
+        # Swap preemption. If disabled, the preempted requests are always
+        # recomputed when they are resumed.
+        self.swap_manager: Optional[SwapManager] = None
+        num_swap_blocks = get_num_swap_blocks(vllm_config)
+        if num_swap_blocks > 0:
+            self.swap_manager = SwapManager(
+                num_cpu_blocks=num_swap_blocks,
+                block_size=self.block_size,
+                block_size_bytes=get_kv_block_size_bytes(vllm_config),
+                swap_bandwidth=self.scheduler_config.preemption_swap_bandwidth,
+                recompute_throughput=(
+                    self.scheduler_config.preemption_recompute_throughput))
+        elif self.scheduler_config.preemption_mode == "swap":
+            logger.warning(
+                "Swap preemption is not supported with this configuration "
+                "or the swap space is empty. Falling back to recomputation.")
+
         # req_id -> Request
         self.requests: dict[str, Request] = {}
         # Priority queues for requests.
-        self.waiting: deque[Request] = deque()
+        self.policy = self.scheduler_config.policy
+        self.waiting = create_request_queue(
+            self.policy,
+            fair_share_key=self.scheduler_config.fair_share_key,
+            fair_share_weights=self.scheduler_config.fair_share_weights)
         self.running: list[Request] = []
+        # The stop parameters of the running requests, in the same order.
+        self.stop_checker = BatchStopChecker(self.max_num_running_reqs,
+                                             self.max_model_len)
         # The requests that have been scheduled and are being executed
         # by the executor.
         self.scheduled_req_ids: set[str] = set()
 
+        # Adaptive token budget.
+        # With a target step time or the "slo" policy, the execution time of
+        # the steps is measured to estimate how many tokens a step can take
+        # within the target (or the TPOT targets of the requests).
+        self.target_step_time = self.scheduler_config.target_step_time
+        self.step_time_estimator: Optional[StepTimeEstimator] = None
+        # id(scheduler_output) -> (start time, num scheduled tokens)
+        self._steps_in_flight: dict[int, tuple[float, int]] = {}
+        self._last_step_end_time = 0.0
+        self.last_token_budget = self.max_num_scheduled_tokens
+        if self.target_step_time is not None or self.policy == "slo":
+            self.step_time_estimator = StepTimeEstimator()
+
         # The request IDs that are finished in between the previous and the
         # current steps. This is used to notify the workers about the finished
         # requests so that they can free the cached states for those requests.
         # This is flushed at the end of each scheduling step.
         self.finished_req_ids: set[str] = set()
 
-        # OPTIMIZATION: Cache the CachedRequestData objects to avoid creating
-        # them at each scheduling step.
-        # Request id -> CachedRequestData
-        self._cached_reqs_data: dict[str, CachedRequestData] = {}
-
         # Encoder-related.
         # Calculate encoder cache size if applicable
         # NOTE: For now we use the same budget for both compute and space.
@@ -158,6 +205,9 @@ class Scheduler(SchedulerInterface):
         req_to_new_block_ids: dict[str, list[int]] = {}
         num_scheduled_tokens: dict[str, int] = {}
         token_budget = self.max_num_scheduled_tokens
+        if self.step_time_estimator is not None:
+            token_budget = self._get_adaptive_token_budget()
+            self.last_token_budget = token_budget
         # Encoder-related.
         scheduled_encoder_inputs: dict[str, list[int]] = {}
         encoder_budget = self.max_num_encoder_input_tokens
@@ -167,6 +217,9 @@ class Scheduler(SchedulerInterface):
         # For logging.
         scheduled_timestamp = time.monotonic()
 
+        if self.structured_output_manager.has_pending_forced_tokens:
+            self._append_forced_tokens()
+
         # First, schedule the RUNNING requests.
         req_index = 0
         while req_index < len(self.running) and token_budget > 0:
@@ -175,8 +228,19 @@ class Scheduler(SchedulerInterface):
                 # This request has already been scheduled.
                 req_index += 1
                 continue
+            if request.num_output_placeholders > 0 and (
+                    request.use_structured_output or
+                    request.num_output_tokens + request.num_output_placeholders
+                    >= request.max_tokens or request.num_tokens +
+                    request.num_output_placeholders >= self.max_model_len):
+                # Async scheduling: the grammar bitmask needs the tokens of
+                # the steps in flight, or these steps generate the last
+                # tokens of the request anyway.
+                req_index += 1
+                continue
 
-            num_new_tokens = (request.num_tokens_with_spec -
+            num_new_tokens = (request.num_tokens_with_spec +
+                              request.num_output_placeholders -
                               request.num_computed_tokens)
             if (0 < self.scheduler_config.long_prefill_token_threshold <
                     num_new_tokens):
@@ -212,15 +276,23 @@ class Scheduler(SchedulerInterface):
                 if new_blocks is None:
                     # The request cannot be scheduled.
                     # Preempt the lowest-priority request.
-                    preempted_req = self.running.pop()
+                    preempted_req = self._pop_preemption_victim(req_index)
+                    if (self.swap_manager is not None
+                            and self.swap_manager.should_swap(preempted_req)):
+                        self.swap_manager.swap_out(
+                            preempted_req,
+                            self.kv_cache_manager.get_block_ids(
+                                preempted_req.request_id))
                     self.kv_cache_manager.free(preempted_req)
                     preempted_req.status = RequestStatus.PREEMPTED
                     preempted_req.num_computed_tokens = 0
+                    # The tokens of the steps in flight are dropped.
+                    preempted_req.num_output_placeholders = 0
                     if self.log_stats:
                         preempted_req.record_event(
                             EngineCoreEventType.PREEMPTED, scheduled_timestamp)
 
-                    self.waiting.appendleft(preempted_req)
+                    self.waiting.prepend_request(preempted_req)
                     preempted_reqs.append(preempted_req)
                     if preempted_req == request:
                         # No more request to preempt.
@@ -278,9 +350,9 @@ class Scheduler(SchedulerInterface):
                 if req.lora_request and req.lora_request.lora_int_id > 0)
             assert len(scheduled_loras) <= self.lora_config.max_loras
 
-        # Use a temporary deque to collect requests that need to be skipped
+        # Use a temporary list to collect requests that need to be skipped
         # and put back at the head of the waiting queue later
-        skipped_waiting_requests: deque[Request] = deque()
+        skipped_waiting_requests: list[Request] = []
 
         # Next, schedule the WAITING requests.
         if not preempted_reqs:
@@ -288,7 +360,7 @@ class Scheduler(SchedulerInterface):
                 if len(self.running) == self.max_num_running_reqs:
                     break
 
-                request = self.waiting[0]
+                request = self.waiting.peek_request()
 
                 # Skip request if the structured output request is still waiting
                 # for FSM compilation.
@@ -297,8 +369,8 @@ class Scheduler(SchedulerInterface):
                     if structured_output_req and structured_output_req.grammar:
                         request.status = RequestStatus.WAITING
                     else:
-                        self.waiting.popleft()
-                        skipped_waiting_requests.appendleft(request)
+                        self.waiting.pop_request()
+                        skipped_waiting_requests.append(request)
                         continue
 
                 # Check that adding the request still respects the max_loras
@@ -308,22 +380,29 @@ class Scheduler(SchedulerInterface):
                         and request.lora_request.lora_int_id
                         not in scheduled_loras):
                     # Scheduling would exceed max_loras, skip.
-                    self.waiting.popleft()
-                    skipped_waiting_requests.appendleft(request)
+                    self.waiting.pop_request()
+                    skipped_waiting_requests.append(request)
                     continue
 
                 # Get already-cached tokens.
                 computed_blocks, num_computed_tokens = \
                     self.kv_cache_manager.get_computed_blocks(request)
 
+                num_local_computed_tokens = num_computed_tokens
+
+                # Get the tokens swapped out when the request was preempted.
+                num_swapped_tokens = (0 if self.swap_manager is None else
+                                      self.swap_manager.get_num_swap_in_tokens(
+                                          request, num_computed_tokens))
+
                 # Get externally-cached tokens if using a KVConnector.
                 num_external_tokens = (
-                    0 if self.connector is None else
+                    0 if self.connector is None or num_swapped_tokens > 0 else
                     self.connector.get_num_new_matched_tokens(
                         request, num_computed_tokens))
 
-                # Total computed tokens (local + external).
-                num_computed_tokens += num_external_tokens
+                # Total computed tokens (local + swapped + external).
+                num_computed_tokens += num_swapped_tokens + num_external_tokens
 
                 # Number of tokens to be scheduled.
                 # We use `request.num_tokens` instead of
@@ -351,7 +430,8 @@ class Scheduler(SchedulerInterface):
                     new_encoder_budget = encoder_budget
 
                 new_blocks = self.kv_cache_manager.allocate_slots(
-                    request, num_new_tokens + num_external_tokens,
+                    request,
+                    num_new_tokens + num_swapped_tokens + num_external_tokens,
                     computed_blocks)
                 if new_blocks is None:
                     # The request cannot be scheduled.
@@ -366,12 +446,19 @@ class Scheduler(SchedulerInterface):
                         num_external_tokens,
                     )
 
-                self.waiting.popleft()
+                if self.swap_manager is not None:
+                    self.swap_manager.swap_in(
+                        request,
+                        self.kv_cache_manager.get_block_ids(
+                            request.request_id), num_local_computed_tokens)
+
+                self.waiting.pop_request()
                 if request.use_structured_output:
                     structured_output_request_ids[
                         request.request_id] = req_index
                 req_index += 1
                 self.running.append(request)
+                self.stop_checker.append(request)
                 self.scheduled_req_ids.add(request.request_id)
                 if self.log_stats:
                     request.record_event(EngineCoreEventType.SCHEDULED,
@@ -405,7 +492,7 @@ class Scheduler(SchedulerInterface):
 
         # Put back any skipped requests at the head of the waiting queue
         if skipped_waiting_requests:
-            self.waiting.extendleft(skipped_waiting_requests)
+            self.waiting.prepend_requests(skipped_waiting_requests)
 
         # Check if the scheduling constraints are satisfied.
         total_num_scheduled_tokens = sum(num_scheduled_tokens.values())
@@ -438,27 +525,16 @@ class Scheduler(SchedulerInterface):
                                         req_to_new_block_ids[req.request_id])
             for req in scheduled_new_reqs
         ]
-        resumed_reqs_data = [
-            self._make_cached_request_data(
-                req,
-                num_scheduled_tokens[req.request_id],
-                len(scheduled_spec_decode_tokens.get(req.request_id, ())),
-                req_to_new_block_ids[req.request_id],
-                resumed_from_preemption=True,
-            ) for req in scheduled_resumed_reqs
-        ]
-        running_reqs_data = [
-            self._make_cached_request_data(
-                req,
-                num_scheduled_tokens[req.request_id],
-                len(scheduled_spec_decode_tokens.get(req.request_id, ())),
-                req_to_new_block_ids[req.request_id],
-                resumed_from_preemption=False,
-            ) for req in scheduled_running_reqs
-        ]
+        cached_reqs_data = self._make_cached_request_data(
+            scheduled_resumed_reqs,
+            scheduled_running_reqs,
+            num_scheduled_tokens,
+            scheduled_spec_decode_tokens,
+            req_to_new_block_ids,
+        )
         scheduler_output = SchedulerOutput(
             scheduled_new_reqs=new_reqs_data,
-            scheduled_cached_reqs=resumed_reqs_data + running_reqs_data,
+            scheduled_cached_reqs=cached_reqs_data,
             num_scheduled_tokens=num_scheduled_tokens,
             total_num_scheduled_tokens=total_num_scheduled_tokens,
             scheduled_spec_decode_tokens=scheduled_spec_decode_tokens,
@@ -469,10 +545,15 @@ class Scheduler(SchedulerInterface):
             # It contains the request IDs that are finished in between
             # the previous and the current steps.
             finished_req_ids=self.finished_req_ids,
-            free_encoder_input_ids=self.encoder_cache_manager.get_freed_ids(),
+            free_encoder_mm_hashes=self.encoder_cache_manager.
+            get_freed_mm_hashes(),
             structured_output_request_ids=structured_output_request_ids,
             grammar_bitmask=grammar_bitmask,
         )
+        if self.swap_manager is not None:
+            (scheduler_output.blocks_to_swap_out,
+             scheduler_output.blocks_to_swap_in) = (
+                 self.swap_manager.take_swap_ops())
 
         # NOTE(Kuntai): this function is designed for multiple purposes:
         # 1. Plan the KV cache store
@@ -482,6 +563,18 @@ class Scheduler(SchedulerInterface):
             meta = self.connector.build_connector_meta(scheduler_output)
             scheduler_output.kv_connector_metadata = meta
 
+        if (self.step_time_estimator is not None
+                and total_num_scheduled_tokens > 0):
+            self._steps_in_flight[id(scheduler_output)] = (
+                time.monotonic(), total_num_scheduled_tokens)
+
+        self._update_after_schedule(scheduler_output)
+        return scheduler_output
+
+    def _update_after_schedule(
+        self,
+        scheduler_output: SchedulerOutput,
+    ) -> None:
         # Advance the number of computed tokens for the request AFTER
         # the request is scheduled.
         # 1. The scheduler_output of the current step has to include the
@@ -491,39 +584,154 @@ class Scheduler(SchedulerInterface):
         #    scheduling step.
         # 3. If some tokens (e.g. spec tokens) are rejected later, the number of
         #    computed tokens will be adjusted in update_from_output.
+        num_scheduled_tokens = scheduler_output.num_scheduled_tokens
         for req_id, num_scheduled_token in num_scheduled_tokens.items():
             self.requests[req_id].num_computed_tokens += num_scheduled_token
 
         self.finished_req_ids = set()
-        return scheduler_output
+
+    def _append_forced_tokens(self) -> None:
+        """Jump-forward decoding: append the tokens forced by the grammars of
+        the running requests, so that they are scheduled in one step like a
+        prefill chunk instead of being generated one step at a time."""
+        self.structured_output_manager.has_pending_forced_tokens = False
+        for running_index, request in enumerate(self.running):
+            if not request.use_structured_output:
+                continue
+            forced_token_ids = (
+                self.structured_output_manager.take_forced_token_ids(request))
+            if forced_token_ids:
+                request.append_output_token_ids(forced_token_ids)
+                self.stop_checker.add_num_tokens(running_index,
+                                                 len(forced_token_ids))
 
     def _make_cached_request_data(
         self,
-        request: Request,
-        num_scheduled_tokens: int,
-        num_scheduled_spec_tokens: int,
-        new_block_ids: list[int],
-        resumed_from_preemption: bool,
+        resumed_reqs: list[Request],
+        running_reqs: list[Request],
+        num_scheduled_tokens: dict[str, int],
+        spec_decode_tokens: dict[str, list[int]],
+        req_to_new_block_ids: dict[str, list[int]],
     ) -> CachedRequestData:
-        # OPTIMIZATION: Cache the CachedRequestData objects to avoid creating
-        # them at each scheduling step.
-        num_computed_tokens = request.num_computed_tokens
-        num_regular_tokens = num_scheduled_tokens - num_scheduled_spec_tokens
-        new_token_ids = request.all_token_ids[
-            num_computed_tokens:num_computed_tokens + num_regular_tokens]
-        req_data = self._cached_reqs_data.get(request.request_id)
-        if req_data is not None:
-            req_data.resumed_from_preemption = resumed_from_preemption
-            req_data.new_token_ids = new_token_ids
-            req_data.new_block_ids = new_block_ids
-            req_data.num_computed_tokens = num_computed_tokens
+        # OPTIMIZATION: Build the columns of the batch in a single loop
+        # instead of creating an object per request.
+        req_ids: list[str] = []
+        new_token_ids: list[list[int]] = []
+        new_block_ids: list[list[int]] = []
+        num_computed_tokens: list[int] = []
+        for req in resumed_reqs:
+            req_id = req.request_id
+            num_computed = req.num_computed_tokens
+            req_ids.append(req_id)
+            # NOTE: Send all the tokens of the resumed request, so that the
+            # workers drop the tokens of the steps that were in flight when
+            # it was preempted with async scheduling.
+            new_token_ids.append(req.all_token_ids[num_computed:])
+            new_block_ids.append(req_to_new_block_ids[req_id])
+            num_computed_tokens.append(num_computed)
+        for req in running_reqs:
+            req_id = req.request_id
+            num_computed = req.num_computed_tokens
+            req_ids.append(req_id)
+            if num_computed < req.num_prompt_tokens:
+                num_regular_tokens = (num_scheduled_tokens[req_id] -
+                                      len(spec_decode_tokens.get(req_id, ())))
+                new_token_ids.append(
+                    req.all_token_ids[num_computed:num_computed +
+                                      num_regular_tokens])
+            else:
+                # NOTE: Send all the output tokens that are not computed yet,
+                # even if only some of them are scheduled (e.g., a chunk of a
+                # run of tokens forced by the grammar), so that the workers
+                # discard the tokens sampled in the middle of the run.
+                new_token_ids.append(req.all_token_ids[num_computed:])
+            new_block_ids.append(req_to_new_block_ids[req_id])
+            num_computed_tokens.append(num_computed)
+        return CachedRequestData.from_lists(req_ids, len(resumed_reqs),
+                                            new_token_ids, new_block_ids,
+                                            num_computed_tokens)
+
+    def _get_adaptive_token_budget(self) -> int:
+        """Get the token budget of the step from the step time estimator.
+
+        The step should take no longer than the target step time, and with
+        the "slo" policy, than the tightest TPOT target of the decoding
+        requests. The budget is the number of tokens that the step time
+        estimator allows within that time, and at least one token for each
+        running request. It is not capped when the next waiting request
+        would miss its TTFT deadline by prefilling with the capped budget.
+        """
+        assert self.step_time_estimator is not None
+        max_step_times = [] if self.target_step_time is None else [
+            self.target_step_time
+        ]
+        if self.policy == "slo":
+            max_step_times.extend(
+                request.sampling_params.tpot_slo for request in self.running
+                if request.sampling_params.tpot_slo is not None
+                and request.num_output_tokens > 0)
+        max_step_time = min(max_step_times, default=None)
+        if max_step_time is None:
+            return self.max_num_scheduled_tokens
+        token_budget = self.step_time_estimator.get_max_num_tokens(
+            max_step_time)
+        if token_budget is None:
+            return self.max_num_scheduled_tokens
+        # Every running request can get at least one token.
+        token_budget = max(token_budget, len(self.running))
+        if token_budget >= self.max_num_scheduled_tokens:
+            return self.max_num_scheduled_tokens
+
+        if self.waiting:
+            request = self.waiting.peek_request()
+            ttft_slo = request.sampling_params.ttft_slo
+            if ttft_slo is not None:
+                num_steps = cdiv(
+                    request.num_tokens - request.num_computed_tokens,
+                    max(token_budget - len(self.running), 1))
+                if (time.time() + num_steps * max_step_time
+                        >= request.arrival_time + ttft_slo):
+                    # Prefill the request as fast as possible.
+                    return self.max_num_scheduled_tokens
+        return token_budget
+
+    def _observe_step_time(self, scheduler_output: SchedulerOutput) -> None:
+        assert self.step_time_estimator is not None
+        step = self._steps_in_flight.pop(id(scheduler_output), None)
+        if step is None:
+            return
+        start_time, num_tokens = step
+        # NOTE: With async scheduling or pipeline parallelism, the step
+        # starts executing when the previous step finishes.
+        now = time.monotonic()
+        start_time = max(start_time, self._last_step_end_time)
+        self._last_step_end_time = now
+        self.step_time_estimator.observe(num_tokens, now - start_time)
+
+    def _pop_preemption_victim(self, req_index: int) -> Request:
+        """Remove the request to preempt from the running queue.
+
+        Only the requests that are not scheduled in this step yet (i.e., at
+        or after `req_index`) are considered. With the FCFS policy, this is
+        the last running request. Otherwise, it is the one with the lowest
+        priority, and the latest arrival among the requests of the same
+        priority. With the "slo" policy, the requests without a TPOT target
+        and then the ones with the loosest target are preempted first
+        within each priority level.
+        """
+        if self.policy == "fcfs":
+            victim_index = len(self.running) - 1
+        elif self.policy == "slo":
+            victim_index = max(
+                range(req_index, len(self.running)),
+                key=lambda i: _get_slo_preemption_key(self.running[i], i))
         else:
-            req_data = CachedRequestData.from_request(request,
-                                                      resumed_from_preemption,
-                                                      new_token_ids,
-                                                      new_block_ids)
-            self._cached_reqs_data[request.request_id] = req_data
-        return req_data
+            victim_index = max(
+                range(req_index, len(self.running)),
+                key=lambda i:
+                (self.running[i].priority, self.running[i].arrival_time, i))
+        self.stop_checker.pop(victim_index)
+        return self.running.pop(victim_index)
 
     def _try_schedule_encoder_inputs(
         self,
@@ -540,7 +748,8 @@ class Scheduler(SchedulerInterface):
         - Its output tokens overlap with the range of tokens being computed
         in this step, i.e.,
         [num_computed_tokens, num_computed_tokens + num_new_tokens).
-        - It is not already computed and stored in the encoder cache.
+        - It is not already computed and stored in the encoder cache, for
+        this request or for another request with the same input.
         - There is sufficient encoder token budget to process it.
         - The encoder cache has space to store it.
 
@@ -552,6 +761,7 @@ class Scheduler(SchedulerInterface):
         blocks and externally cached blocks (via KVConnector).
         """
         encoder_inputs_to_schedule: list[int] = []
+        mm_hashes_to_schedule: set[str] = set()
         mm_positions = request.mm_positions
         assert mm_positions is not None
         assert len(mm_positions) > 0
@@ -570,8 +780,13 @@ class Scheduler(SchedulerInterface):
                 # in the decoder's KV cache.
                 continue
 
-            if self.encoder_cache_manager.has_cache(request, i):
-                # The encoder input is already computed and cached.
+            if self.encoder_cache_manager.check_and_update_cache(request, i):
+                # The encoder input is already computed and cached, possibly
+                # for another request with the same input.
+                continue
+            mm_hash = request.mm_hashes[i]
+            if mm_hash in mm_hashes_to_schedule:
+                # The same input appears earlier in the request.
                 continue
 
             # If no encoder input chunking is allowed, we do not want to
@@ -604,6 +819,7 @@ class Scheduler(SchedulerInterface):
 
             encoder_budget -= num_encoder_tokens
             encoder_inputs_to_schedule.append(i)
+            mm_hashes_to_schedule.add(mm_hash)
         return encoder_inputs_to_schedule, num_new_tokens, encoder_budget
 
     def update_from_output(
@@ -611,20 +827,36 @@ class Scheduler(SchedulerInterface):
         scheduler_output: SchedulerOutput,
         model_runner_output: ModelRunnerOutput,
     ) -> EngineCoreOutputs:
+        if self.step_time_estimator is not None:
+            self._observe_step_time(scheduler_output)
+
         sampled_token_ids = model_runner_output.sampled_token_ids
         spec_token_ids = model_runner_output.spec_token_ids
         logprobs = model_runner_output.logprobs
         prompt_logprobs_dict = model_runner_output.prompt_logprobs_dict
         num_scheduled_tokens = scheduler_output.num_scheduled_tokens
+        req_id_to_index = model_runner_output.req_id_to_index
+
+        # Check the stop conditions of all the running requests at once, so
+        # that only the requests that stop are checked in the loop below.
+        # running index -> number of new tokens up to the stop
+        stop_positions = self.stop_checker.check([
+            sampled_token_ids[req_id_to_index[request.request_id]]
+            if request.request_id in num_scheduled_tokens else []
+            for request in self.running
+        ])
 
         new_running: list[Request] = []
         outputs: list[EngineCoreOutput] = []
+        token_output_req_ids: list[str] = []
+        token_output_ids: list[list[int]] = []
+        structured_output_reqs: list[Request] = []
         spec_decoding_stats: Optional[SpecDecodingStats] = None
 
         # NOTE(woosuk): As len(self.running) can be up to 1K or more, the below
         # loop can be a performance bottleneck. We should do our best to avoid
         # expensive operations inside the loop.
-        for request in self.running:
+        for running_index, request in enumerate(self.running):
             req_id = request.request_id
             num_tokens_scheduled = num_scheduled_tokens.get(req_id, 0)
             if num_tokens_scheduled == 0:
@@ -632,7 +864,7 @@ class Scheduler(SchedulerInterface):
                 new_running.append(request)
                 continue
 
-            req_index = model_runner_output.req_id_to_index[req_id]
+            req_index = req_id_to_index[req_id]
             generated_token_ids = sampled_token_ids[req_index]
 
             scheduled_spec_token_ids = (
@@ -670,23 +902,14 @@ class Scheduler(SchedulerInterface):
             if spec_token_ids is not None:
                 request.spec_token_ids = spec_token_ids[req_index]
 
-            stopped = False
             new_logprobs = None
             new_token_ids = generated_token_ids
 
             # Append generated tokens and check for stop. Note that if
             # a request is still being prefilled, we expect the model runner
             # to return empty token ids for the request.
-            for num_new, output_token_id in enumerate(new_token_ids, 1):
-                request.append_output_token_ids(output_token_id)
-
-                # Check for stop and update request state.
-                # This must be called before we make the EngineCoreOutput.
-                stopped = check_stop(request, self.max_model_len)
-                if stopped:
-                    self._free_request(request)
-                    del new_token_ids[num_new:]  # Trim new tokens if needed.
-                    break
+            new_token_ids, stopped = self._update_request_with_output(
+                request, new_token_ids, stop_positions.get(running_index, 0))
 
             # Extract sample logprobs if needed.
             if request.sampling_params.logprobs is not None and logprobs:
@@ -698,12 +921,26 @@ class Scheduler(SchedulerInterface):
                 # NOTE: structured_output_request
                 # should not be None if use_structured_output, we have
                 # check above, so safe to ignore type warning
-                request.structured_output_request.grammar.accept_tokens(  # type: ignore[union-attr]
+                so_request = request.structured_output_request
+                assert so_request is not None
+                so_request.grammar.accept_tokens(  # type: ignore[union-attr]
                     req_id, new_token_ids)
+                if so_request.unreported_token_ids:
+                    # Output the tokens forced by the grammar, which were
+                    # appended to the request before the sampled tokens.
+                    new_token_ids = (so_request.unreported_token_ids +
+                                     new_token_ids)
+                    so_request.unreported_token_ids = []
+                if not stopped:
+                    structured_output_reqs.append(request)
 
             # Get prompt logprobs for this request.
             prompt_logprobs_tensors = prompt_logprobs_dict.get(req_id)
-            if new_token_ids:
+            if not new_token_ids:
+                # Invariant: EngineCore returns no partial prefill outputs.
+                assert not prompt_logprobs_tensors
+            elif (stopped or new_logprobs is not None
+                  or prompt_logprobs_tensors is not None or request.events):
                 # Add EngineCoreOutput for this Request.
                 outputs.append(
                     EngineCoreOutput(
@@ -715,17 +952,38 @@ class Scheduler(SchedulerInterface):
                         stop_reason=request.stop_reason,
                         events=request.take_events()))
             else:
-                # Invariant: EngineCore returns no partial prefill outputs.
-                assert not prompt_logprobs_tensors
+                # OPTIMIZATION: Add the new tokens of the common case of
+                # decoding to the columnar outputs instead.
+                token_output_req_ids.append(req_id)
+                token_output_ids.append(new_token_ids)
 
-            self.scheduled_req_ids.remove(req_id)
+            self.scheduled_req_ids.discard(req_id)
             if not stopped:
                 new_running.append(request)
 
+        if structured_output_reqs:
+            # Fill the grammar bitmasks of the next step in the background
+            # while the outputs of this step are processed.
+            self.structured_output_manager.fill_bitmasks_ahead(
+                structured_output_reqs)
+
         self.running = new_running
+        if stop_positions:
+            self.stop_checker.remove(list(stop_positions))
+        token_outputs = None
+        if token_output_req_ids:
+            new_token_ids_array, offsets = flatten_int_lists(token_output_ids)
+            token_outputs = EngineCoreTokenOutputs(
+                request_ids=token_output_req_ids,
+                new_token_ids=new_token_ids_array,
+                offsets=offsets,
+            )
         engine_core_outputs = EngineCoreOutputs(
             outputs=outputs,
+            token_outputs=token_outputs,
             scheduler_stats=self.make_stats(spec_decoding_stats),
+            prefix_cache_events=self.kv_cache_manager.take_prefix_cache_events(
+            ),
         )
         if self.include_finished_set:
             #TODO currently sending duplicates here, improve this
@@ -734,8 +992,31 @@ class Scheduler(SchedulerInterface):
 
         return engine_core_outputs
 
+    def _update_request_with_output(
+        self,
+        request: Request,
+        new_token_ids: list[int],
+        num_tokens_to_stop: int = 0,
+    ) -> tuple[list[int], bool]:
+        """Append the new tokens to the request. `num_tokens_to_stop` is the
+        number of new tokens up to and including the one the request stops
+        at, as found by the BatchStopChecker, or 0 if it does not stop."""
+        if not num_tokens_to_stop:
+            request.append_output_token_ids(new_token_ids)
+            return new_token_ids, False
+
+        del new_token_ids[num_tokens_to_stop:]  # Trim new tokens if needed.
+        request.append_output_token_ids(new_token_ids)
+
+        # Update the request state.
+        # This must be called before we make the EngineCoreOutput.
+        stopped = check_stop(request, self.max_model_len)
+        assert stopped
+        self._free_request(request)
+        return new_token_ids, stopped
+
     def add_request(self, request: Request) -> None:
-        self.waiting.append(request)
+        self.waiting.add_request(request)
         self.requests[request.request_id] = request
         if self.log_stats:
             request.record_event(EngineCoreEventType.QUEUED)
@@ -763,10 +1044,12 @@ class Scheduler(SchedulerInterface):
                 continue
 
             if request.status == RequestStatus.RUNNING:
-                self.running.remove(request)
+                running_index = self.running.index(request)
+                self.running.pop(running_index)
+                self.stop_checker.pop(running_index)
                 self.scheduled_req_ids.discard(request.request_id)
             else:
-                self.waiting.remove(request)
+                self.waiting.remove_request(request)
             request.status = finished_status
             self._free_request(request)
 
@@ -775,7 +1058,8 @@ class Scheduler(SchedulerInterface):
         self.kv_cache_manager.free(request)
         self.kv_cache_manager.free_block_hashes(request)
         self.encoder_cache_manager.free(request)
-        self._cached_reqs_data.pop(request.request_id, None)
+        if self.swap_manager is not None:
+            self.swap_manager.free(request)
         del self.requests[request.request_id]
         self.finished_req_ids.add(request.request_id)
 
@@ -792,6 +1076,15 @@ class Scheduler(SchedulerInterface):
     def reset_prefix_cache(self) -> bool:
         return self.kv_cache_manager.reset_prefix_cache()
 
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        return self.kv_cache_manager.pin_prefix(prefix_id, token_ids)
+
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        return self.kv_cache_manager.unpin_prefix(prefix_id)
+
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        return self.kv_cache_manager.list_pinned_prefixes()
+
     def make_stats(
         self,
         spec_decoding_stats: Optional[SpecDecodingStats] = None,
@@ -800,12 +1093,17 @@ class Scheduler(SchedulerInterface):
             return None
         prefix_cache_stats = self.kv_cache_manager.make_prefix_cache_stats()
         assert prefix_cache_stats is not None
+        step_time_model = None
+        if self.step_time_estimator is not None:
+            step_time_model = self.step_time_estimator.get_params()
         return SchedulerStats(
             num_running_reqs=len(self.running),
             num_waiting_reqs=len(self.waiting),
             gpu_cache_usage=self.kv_cache_manager.usage,
             prefix_cache_stats=prefix_cache_stats,
             spec_decoding_stats=spec_decoding_stats,
+            token_budget=self.last_token_budget,
+            step_time_model=step_time_model,
         )
 
     def make_spec_decoding_stats(
@@ -821,3 +1119,9 @@ class Scheduler(SchedulerInterface):
         spec_decoding_stats.observe(num_draft_tokens=num_draft_tokens,
                                     num_accepted_tokens=num_accepted_tokens)
         return spec_decoding_stats
+
+
+def _get_slo_preemption_key(request: Request, index: int) -> tuple:
+    tpot_slo = request.sampling_params.tpot_slo
+    return (request.priority, tpot_slo is None, tpot_slo
+            or 0.0, request.arrival_time, index)
@@ -1,4 +1,9 @@
 # SPDX-License-Identifier: Apache-2.0
+import itertools
+from typing import Optional
+
+import numpy as np
+
 from vllm.v1.request import Request, RequestStatus
 
 
@@ -20,3 +25,183 @@ def check_stop(request: Request, max_model_len: int) -> bool:
         request.stop_reason = last_token_id
         return True
     return False
+
+
+class BatchStopChecker:
+    """Evaluates the stop conditions of `check_stop` for all the new tokens
+    of a batch of requests at once with numpy.
+
+    The stop parameters of the requests are kept in arrays whose rows are in
+    step with the running queue of the scheduler: the scheduler appends,
+    pops and removes the rows whenever it does so with the requests. Only
+    the requests that stop go through `check_stop` to update their state.
+    """
+
+    def __init__(self, max_num_reqs: int, max_model_len: int):
+        self.max_model_len = max_model_len
+        self.num_reqs = 0
+        # The number of tokens of each request.
+        self.num_tokens: np.ndarray = np.zeros(max_num_reqs, dtype=np.int64)
+        # The number of tokens at which each request is length capped.
+        self.max_num_tokens: np.ndarray = np.zeros(max_num_reqs,
+                                                   dtype=np.int64)
+        # -1 if the EOS token does not stop the request.
+        self.eos_token_ids: np.ndarray = np.full(max_num_reqs,
+                                                 -1,
+                                                 dtype=np.int64)
+        # The stop token ids of each request, padded with -1.
+        self.stop_token_ids: np.ndarray = np.full((max_num_reqs, 0),
+                                                  -1,
+                                                  dtype=np.int64)
+
+    def _arrays(self) -> tuple[np.ndarray, ...]:
+        return (self.num_tokens, self.max_num_tokens, self.eos_token_ids,
+                self.stop_token_ids)
+
+    def append(self, request: Request) -> None:
+        index = self.num_reqs
+        self.num_reqs += 1
+        self.num_tokens[index] = request.num_tokens
+        self.max_num_tokens[index] = min(
+            self.max_model_len, request.num_prompt_tokens + request.max_tokens)
+
+        sampling_params = request.sampling_params
+        eos_token_id = request.eos_token_id
+        self.eos_token_ids[index] = -1 if (sampling_params.ignore_eos
+                                           or eos_token_id is None) else (
+                                               eos_token_id)
+
+        stop_token_ids = sampling_params.stop_token_ids or ()
+        num_stop_token_ids = len(stop_token_ids)
+        width = self.stop_token_ids.shape[1]
+        if num_stop_token_ids > width:
+            self.stop_token_ids = np.pad(self.stop_token_ids,
+                                         ((0, 0),
+                                          (0, num_stop_token_ids - width)),
+                                         constant_values=-1)
+        self.stop_token_ids[index] = -1
+        self.stop_token_ids[index, :num_stop_token_ids] = stop_token_ids
+
+    def pop(self, index: int = -1) -> None:
+        num_reqs = self.num_reqs
+        if index < 0:
+            index += num_reqs
+        for array in self._arrays():
+            array[index:num_reqs - 1] = array[index + 1:num_reqs]
+        self.num_reqs = num_reqs - 1
+
+    def remove(self, indices: list[int]) -> None:
+        num_reqs = self.num_reqs
+        keep: np.ndarray = np.ones(num_reqs, dtype=bool)
+        keep[indices] = False
+        new_num_reqs = num_reqs - len(indices)
+        for array in self._arrays():
+            array[:new_num_reqs] = array[:num_reqs][keep]
+        self.num_reqs = new_num_reqs
+
+    def add_num_tokens(self, index: int, num_tokens: int) -> None:
+        """Count tokens appended to a request outside of `check`, e.g. the
+        tokens forced by its grammar."""
+        self.num_tokens[index] += num_tokens
+
+    def check(self, new_token_ids: list[list[int]]) -> dict[int, int]:
+        """Check the new token ids of each request, in the order of the
+        rows, and update the number of tokens.
+
+        Returns:
+            A dict from the row of each request that stops to the number of
+            its new tokens up to and including the one it stops at.
+        """
+        num_reqs = self.num_reqs
+        assert len(new_token_ids) == num_reqs
+        num_new_tokens = np.fromiter(map(len, new_token_ids),
+                                     dtype=np.int64,
+                                     count=num_reqs)
+        max_num_new_tokens = int(num_new_tokens.max()) if num_reqs else 0
+        if max_num_new_tokens == 0:
+            return {}
+
+        # [num_reqs, max_num_new_tokens], padded with -1.
+        valid = np.arange(max_num_new_tokens) < num_new_tokens[:, None]
+        token_ids: np.ndarray = np.full((num_reqs, max_num_new_tokens),
+                                        -1,
+                                        dtype=np.int64)
+        token_ids[valid] = np.fromiter(
+            itertools.chain.from_iterable(new_token_ids),
+            dtype=np.int64,
+            count=int(num_new_tokens.sum()))
+
+        num_tokens = self.num_tokens[:num_reqs]
+        stops = (num_tokens[:, None] + np.arange(1, max_num_new_tokens + 1)
+                 >= self.max_num_tokens[:num_reqs, None])
+        stops |= token_ids == self.eos_token_ids[:num_reqs, None]
+        if self.stop_token_ids.shape[1]:
+            stops |= (token_ids[:, :,
+                                None] == self.stop_token_ids[:num_reqs,
+                                                             None, :]).any(
+                                                                 axis=2)
+        stops &= valid
+        num_tokens += num_new_tokens
+
+        stopped = np.flatnonzero(stops.any(axis=1))
+        if not len(stopped):
+            return {}
+        num_tokens_to_stop = stops[stopped].argmax(axis=1) + 1
+        return dict(zip(stopped.tolist(), num_tokens_to_stop.tolist()))
+
+
+class StepTimeEstimator:
+    """Estimates the execution time of a step from its number of scheduled
+    tokens.
+
+    The step time is modeled as `a + b * num_tokens`, where the parameters
+    are fitted online by least squares over the observed steps. The weights
+    of the past observations decay exponentially, so that the model follows
+    the changes of the workload (e.g., the context lengths).
+    """
+
+    def __init__(self, decay: float = 0.99):
+        self.decay = decay
+        # The weighted sums of 1, n, t, n^2 and n*t over the observations.
+        self._sum_w = 0.0
+        self._sum_n = 0.0
+        self._sum_t = 0.0
+        self._sum_nn = 0.0
+        self._sum_nt = 0.0
+
+    def observe(self, num_tokens: int, step_time: float) -> None:
+        decay = self.decay
+        self._sum_w = self._sum_w * decay + 1.0
+        self._sum_n = self._sum_n * decay + num_tokens
+        self._sum_t = self._sum_t * decay + step_time
+        self._sum_nn = self._sum_nn * decay + num_tokens * num_tokens
+        self._sum_nt = self._sum_nt * decay + num_tokens * step_time
+
+    def get_params(self) -> Optional[tuple[float, float]]:
+        """Get the fitted (a, b), or None if the observations are not
+        enough to fit the model."""
+        det = self._sum_w * self._sum_nn - self._sum_n * self._sum_n
+        if det <= 1e-6 * self._sum_w * self._sum_nn:
+            # All the observed steps have (almost) the same size.
+            return None
+        b = (self._sum_w * self._sum_nt - self._sum_n * self._sum_t) / det
+        a = (self._sum_t - b * self._sum_n) / self._sum_w
+        return max(a, 0.0), b
+
+    def estimate(self, num_tokens: int) -> Optional[float]:
+        params = self.get_params()
+        if params is None:
+            return None
+        a, b = params
+        return a + max(b, 0.0) * num_tokens
+
+    def get_max_num_tokens(self, max_step_time: float) -> Optional[int]:
+        """Get the max number of tokens of a step that is expected to take no
+        longer than `max_step_time`, or None if it cannot be estimated."""
+        params = self.get_params()
+        if params is None:
+            return None
+        a, b = params
+        if b <= 0:
+            return None
+        return max(int((max_step_time - a) / b), 0)
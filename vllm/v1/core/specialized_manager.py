@@ -1,8 +1,9 @@
 # SPDX-License-Identifier: Apache-2.0
 from abc import ABC, abstractmethod
+from typing import Any
 
 from vllm.utils import cdiv
-from vllm.v1.core.block_pool import BlockPool
+from vllm.v1.core.block_pool import BaseBlockPool
 from vllm.v1.core.kv_cache_utils import BlockHashType, KVCacheBlock
 from vllm.v1.kv_cache_interface import (FullAttentionSpec, KVCacheSpec,
                                         SlidingWindowSpec)
@@ -17,7 +18,7 @@ class SpecializedManager(ABC):
     def __init__(
         self,
         kv_cache_spec: KVCacheSpec,
-        block_pool: BlockPool,
+        block_pool: BaseBlockPool[Any],
     ) -> None:
         """
         Initializes the SpecializedManager.
@@ -90,7 +91,7 @@ class FullAttentionManager(SpecializedManager):
 class SlidingWindowManager(SpecializedManager):
 
     def __init__(self, kv_cache_spec: SlidingWindowSpec,
-                 block_pool: BlockPool):
+                 block_pool: BaseBlockPool[Any]):
         super().__init__(kv_cache_spec, block_pool)
         self.sliding_window = kv_cache_spec.sliding_window
         # The number of contiguous blocks needed for prefix cache hit.
@@ -154,8 +155,9 @@ spec_manager_map: dict[type[KVCacheSpec], type[SpecializedManager]] = {
 }
 
 
-def get_specialized_manager(kv_cache_spec: KVCacheSpec,
-                            block_pool: BlockPool) -> SpecializedManager:
+def get_specialized_manager(
+        kv_cache_spec: KVCacheSpec,
+        block_pool: BaseBlockPool[Any]) -> SpecializedManager:
     manager_class = spec_manager_map[type(kv_cache_spec)]
     manager = manager_class(kv_cache_spec, block_pool)
     return manager
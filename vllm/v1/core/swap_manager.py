@@ -0,0 +1,174 @@
+# SPDX-License-Identifier: Apache-2.0
+
+from vllm.config import VllmConfig
+from vllm.distributed.kv_transfer.kv_connector.utils import (
+    get_kv_block_size_bytes)
+from vllm.logger import init_logger
+from vllm.platforms import current_platform
+from vllm.utils import cdiv
+from vllm.v1.request import Request
+
+logger = init_logger(__name__)
+
+# The fixed latency of swapping a request out and back in, in seconds. This
+# makes short requests prefer recomputation, which is nearly free when it
+# is batched with the other requests.
+_SWAP_LATENCY_S = 1e-3
+
+
+def get_num_swap_blocks(vllm_config: VllmConfig) -> int:
+    """Get the number of KV cache blocks of the host memory swap space of
+    each worker, or 0 if swap preemption is disabled.
+
+    This is computed from the config only, so that the scheduler and the
+    workers agree on it without any communication.
+    """
+    if vllm_config.scheduler_config.preemption_mode != "swap":
+        return 0
+    if (vllm_config.parallel_config.pipeline_parallel_size > 1
+            or not current_platform.is_cuda_alike()):
+        # The copies are only implemented by the GPU model runner, and the
+        # batch queue used by pipeline parallelism skips empty steps.
+        return 0
+    return int(vllm_config.cache_config.swap_space_bytes //
+               get_kv_block_size_bytes(vllm_config))
+
+
+class SwapManager:
+    """Scheduler-side manager of swap preemption.
+
+    When a request is preempted, it either frees its KV cache blocks and
+    recomputes them when it is resumed, or copies them to the host memory
+    and copies them back when it is resumed. The manager picks the cheaper
+    option for each request, owns the blocks of the host memory swap space
+    and tells the workers which copies to perform through the
+    SchedulerOutput.
+    """
+
+    def __init__(
+        self,
+        num_cpu_blocks: int,
+        block_size: int,
+        block_size_bytes: int,
+        swap_bandwidth: float,
+        recompute_throughput: float,
+    ) -> None:
+        """
+        Args:
+            num_cpu_blocks: The number of blocks of the swap space.
+            block_size: The number of tokens per block.
+            block_size_bytes: The size in bytes of one block on a worker.
+            swap_bandwidth: The host-device bandwidth in GB/s.
+            recompute_throughput: The prefill throughput in tokens/s.
+        """
+        self.num_cpu_blocks = num_cpu_blocks
+        self.block_size = block_size
+        self.swap_time_per_block = (2 * block_size_bytes /
+                                    (swap_bandwidth * 1e9))
+        self.recompute_time_per_token = 1.0 / recompute_throughput
+
+        self.free_cpu_block_ids = list(range(num_cpu_blocks - 1, -1, -1))
+        # req_id -> CPU block ids of the swapped out request.
+        self.req_to_cpu_blocks: dict[str, list[int]] = {}
+        # req_id -> number of tokens whose KV is swapped out.
+        self.num_swapped_tokens: dict[str, int] = {}
+
+        # The copies of the current step.
+        self.blocks_to_swap_out: list[tuple[int, int]] = []
+        self.blocks_to_swap_in: list[tuple[int, int]] = []
+        # The CPU blocks swapped in in the current step. They are released
+        # at the end of the step so that the swap outs of the same step
+        # cannot overwrite them before they are read.
+        self.cpu_blocks_to_release: list[int] = []
+
+    def should_swap(self, request: Request) -> bool:
+        """Whether swapping out the preempted request is cheaper than
+        recomputing it, and fits in the swap space."""
+        num_tokens = self._get_num_tokens_to_swap(request)
+        if num_tokens <= 0 or request.sampling_params.prompt_logprobs:
+            # The prompt logprobs must be recomputed anyway.
+            return False
+        num_blocks = cdiv(num_tokens, self.block_size)
+        if num_blocks > len(self.free_cpu_block_ids):
+            return False
+        swap_time = (_SWAP_LATENCY_S + num_blocks * self.swap_time_per_block)
+        recompute_time = num_tokens * self.recompute_time_per_token
+        return swap_time < recompute_time
+
+    def swap_out(self, request: Request, gpu_block_ids: list[int]) -> None:
+        """Copy the computed KV of a preempted request to the host memory.
+
+        Args:
+            request: The preempted request, before its blocks are freed.
+            gpu_block_ids: The block ids of the request.
+        """
+        num_tokens = self._get_num_tokens_to_swap(request)
+        num_blocks = cdiv(num_tokens, self.block_size)
+        cpu_block_ids = [
+            self.free_cpu_block_ids.pop() for _ in range(num_blocks)
+        ]
+        self.blocks_to_swap_out.extend(
+            zip(gpu_block_ids[:num_blocks], cpu_block_ids))
+        self.req_to_cpu_blocks[request.request_id] = cpu_block_ids
+        self.num_swapped_tokens[request.request_id] = num_tokens
+
+    def get_num_swap_in_tokens(self, request: Request,
+                               num_computed_tokens: int) -> int:
+        """Get the number of tokens that can be swapped in beyond the
+        num_computed_tokens hit in the prefix cache."""
+        return max(
+            0,
+            self.num_swapped_tokens.get(request.request_id, 0) -
+            num_computed_tokens)
+
+    def swap_in(self, request: Request, gpu_block_ids: list[int],
+                num_computed_tokens: int) -> None:
+        """Copy the KV of a resumed request back to the device, except for
+        the blocks hit in the prefix cache, and release its swap space.
+
+        Args:
+            request: The resumed request, after its blocks are allocated.
+            gpu_block_ids: The block ids of the request.
+            num_computed_tokens: The number of tokens hit in the prefix
+                cache, which is a multiple of the block size.
+        """
+        cpu_block_ids = self.req_to_cpu_blocks.pop(request.request_id, None)
+        if cpu_block_ids is None:
+            return
+        del self.num_swapped_tokens[request.request_id]
+        start = num_computed_tokens // self.block_size
+        self.blocks_to_swap_in.extend(
+            zip(cpu_block_ids[start:],
+                gpu_block_ids[start:len(cpu_block_ids)]))
+        self.cpu_blocks_to_release.extend(cpu_block_ids)
+
+    def free(self, request: Request) -> None:
+        """Release the swap space of a finished request."""
+        cpu_block_ids = self.req_to_cpu_blocks.pop(request.request_id, None)
+        if cpu_block_ids is None:
+            return
+        del self.num_swapped_tokens[request.request_id]
+        # NOTE: The request may be swapped out in this step, so its blocks
+        # are released at the end of the step like the swapped in ones.
+        self.cpu_blocks_to_release.extend(cpu_block_ids)
+
+    def take_swap_ops(
+            self) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+        """Get the (GPU, CPU) block pairs to swap out and the (CPU, GPU)
+        block pairs to swap in in this step, and release the swap space
+        freed in this step."""
+        blocks_to_swap_out = self.blocks_to_swap_out
+        blocks_to_swap_in = self.blocks_to_swap_in
+        self.blocks_to_swap_out = []
+        self.blocks_to_swap_in = []
+        self.free_cpu_block_ids.extend(self.cpu_blocks_to_release)
+        self.cpu_blocks_to_release = []
+        return blocks_to_swap_out, blocks_to_swap_in
+
+    def get_num_free_blocks(self) -> int:
+        return len(self.free_cpu_block_ids)
+
+    def _get_num_tokens_to_swap(self, request: Request) -> int:
+        # NOTE: At least the last token must be computed after the request
+        # is resumed to sample the next token.
+        return min(request.num_computed_tokens, request.num_tokens - 1)
@@ -6,6 +6,7 @@ from collections.abc import Sequence
 from typing import Any, Optional, Union
 
 import msgspec
+import numpy as np
 
 from vllm.lora.request import LoRARequest
 from vllm.multimodal import MultiModalKwargs
@@ -60,6 +61,7 @@ class EngineCoreRequest(
     eos_token_id: Optional[int]
     arrival_time: float
     lora_request: Optional[LoRARequest]
+    priority: int = 0
 
 
 class EngineCoreEventType(enum.IntEnum):
@@ -108,6 +110,61 @@ class EngineCoreOutput(
         return self.finish_reason is not None
 
 
+class EngineCoreTokenOutputs(
+        msgspec.Struct,
+        array_like=True,  # type: ignore[call-arg]
+        gc=False):  # type: ignore[call-arg]
+    """The outputs of the requests that only have new tokens in a step, i.e.,
+    no logprobs, events or finish reason, which is the common case of
+    decoding. They are sent in columnar layout to avoid an object per
+    request: the new token IDs of request_ids[i] are
+    new_token_ids[offsets[i]:offsets[i + 1]]."""
+
+    request_ids: list[str]
+    # [total_num_new_tokens]
+    new_token_ids: np.ndarray
+    # [num_reqs + 1]
+    offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.request_ids)
+
+    def slice(self, start: int, end: int) -> "EngineCoreTokenOutputs":
+        """Get the outputs of the requests in [start, end)."""
+        offsets = self.offsets[start:end + 1]
+        return EngineCoreTokenOutputs(
+            request_ids=self.request_ids[start:end],
+            new_token_ids=self.new_token_ids[offsets[0]:offsets[-1]],
+            offsets=offsets - offsets[0],
+        )
+
+    def take(self, indices: list[int]) -> "EngineCoreTokenOutputs":
+        """Get the outputs of the requests at the given indices."""
+        index_arr = np.array(indices, dtype=np.int64)
+        starts = self.offsets[index_arr]
+        lengths = self.offsets[index_arr + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=self.offsets.dtype)
+        np.cumsum(lengths, out=offsets[1:])
+        # The position of each selected token in new_token_ids.
+        positions = (np.repeat(starts - offsets[:-1], lengths) +
+                     np.arange(offsets[-1]))
+        return EngineCoreTokenOutputs(
+            request_ids=[self.request_ids[i] for i in indices],
+            new_token_ids=self.new_token_ids[positions],
+            offsets=offsets,
+        )
+
+    def to_outputs(self) -> list[EngineCoreOutput]:
+        """Convert to per-request outputs, e.g., for tests."""
+        token_ids = self.new_token_ids.tolist()
+        offsets = self.offsets.tolist()
+        return [
+            EngineCoreOutput(request_id=req_id,
+                             new_token_ids=token_ids[start:end]) for req_id,
+            start, end in zip(self.request_ids, offsets, offsets[1:])
+        ]
+
+
 class UtilityOutput(
         msgspec.Struct,
         array_like=True,  # type: ignore[call-arg]
@@ -120,18 +177,34 @@ class UtilityOutput(
     result: Any = None
 
 
-class EngineCoreOutputs(
+class PrefixCacheEvents(
         msgspec.Struct,
         array_like=True,  # type: ignore[call-arg]
         omit_defaults=True,  # type: ignore[call-arg]
         gc=False):  # type: ignore[call-arg]
+    """The changes of the prefix cache of an engine since its last report,
+    used by the front end to route requests across data parallel engines.
+    Blocks are identified by their routing keys, see
+    vllm.v1.core.kv_cache_utils.get_block_routing_keys."""
+
+    # Whether the prefix cache was reset before the other changes.
+    reset: bool = False
+    # Routing keys of the newly cached blocks.
+    stored: list[int] = []
+    # Routing keys of the evicted blocks.
+    removed: list[int] = []
 
-    #NOTE(Nick): We could consider ways to make this more compact,
-    # e.g. columnwise layout
+
+class EngineCoreOutputs(
+        msgspec.Struct,
+        array_like=True,  # type: ignore[call-arg]
+        omit_defaults=True,  # type: ignore[call-arg]
+        gc=False):  # type: ignore[call-arg]
 
     engine_index: int = 0
 
     # [num_reqs]
+    # The outputs of the requests that are not in token_outputs.
     outputs: list[EngineCoreOutput] = []
     scheduler_stats: Optional[SchedulerStats] = None
     timestamp: float = 0.0
@@ -142,10 +215,43 @@ class EngineCoreOutputs(
     # In DP case, used to signal that the engine is paused.
     engine_paused: bool = False
 
+    # In DP case with prefix-aware routing, the prefix cache changes.
+    prefix_cache_events: Optional[PrefixCacheEvents] = None
+
+    # The outputs of the requests that only have new tokens.
+    token_outputs: Optional[EngineCoreTokenOutputs] = None
+
     def __post_init__(self):
         if self.timestamp == 0.0:
             self.timestamp = time.monotonic()
 
+    @property
+    def num_outputs(self) -> int:
+        num_outputs = len(self.outputs)
+        if self.token_outputs is not None:
+            num_outputs += len(self.token_outputs)
+        return num_outputs
+
+    def get_all_outputs(self) -> list[EngineCoreOutput]:
+        """Get the outputs of all the requests as per-request outputs."""
+        if self.token_outputs is None:
+            return self.outputs
+        return self.outputs + self.token_outputs.to_outputs()
+
+    def split(
+        self, chunk_size: int
+    ) -> list[tuple[list[EngineCoreOutput], Optional[EngineCoreTokenOutputs]]]:
+        """Split the outputs into chunks of at most chunk_size requests."""
+        chunks: list[tuple[list[EngineCoreOutput],
+                           Optional[EngineCoreTokenOutputs]]] = []
+        for i in range(0, len(self.outputs), chunk_size):
+            chunks.append((self.outputs[i:i + chunk_size], None))
+        if self.token_outputs is not None:
+            chunks.extend(
+                ([], self.token_outputs.slice(i, i + chunk_size))
+                for i in range(0, len(self.token_outputs), chunk_size))
+        return chunks
+
 
 class EngineCoreRequestType(enum.Enum):
     """
@@ -1,18 +1,17 @@
 # SPDX-License-Identifier: Apache-2.0
 import asyncio
+import hashlib
 import logging
 from collections.abc import AsyncGenerator, Mapping
 from copy import copy
-from typing import Optional, Union
-
-import numpy as np
+from typing import Any, Optional, Union
 
 import vllm.envs as envs
 from vllm.config import ModelConfig, VllmConfig
 from vllm.engine.arg_utils import AsyncEngineArgs
 from vllm.engine.protocol import EngineClient
 from vllm.envs import VLLM_V1_OUTPUT_PROC_CHUNK_SIZE
-from vllm.inputs import PromptType
+from vllm.inputs import PromptType, TokensPrompt
 from vllm.inputs.preprocess import InputPreprocessor
 from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
@@ -24,9 +23,10 @@ from vllm.sampling_params import SamplingParams
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 from vllm.transformers_utils.tokenizer_group import init_tokenizer_from_configs
 from vllm.usage.usage_lib import UsageContext
-from vllm.utils import Device, cdiv
+from vllm.utils import Device, random_uuid
 from vllm.v1.engine import EngineCoreRequest
 from vllm.v1.engine.core_client import AsyncMPClient, DPAsyncMPClient
+from vllm.v1.engine.detokenizer_pool import DetokenizerPool
 from vllm.v1.engine.exceptions import EngineDeadError, EngineGenerateError
 from vllm.v1.engine.output_processor import (OutputProcessor,
                                              RequestOutputCollector)
@@ -52,6 +52,8 @@ class AsyncLLM(EngineClient):
         use_cached_outputs: bool = False,
         log_requests: bool = True,
         start_engine_loop: bool = True,
+        client_addresses: Optional[list[tuple[str, str]]] = None,
+        client_index: int = 0,
     ) -> None:
         if not envs.VLLM_USE_V1:
             raise ValueError(
@@ -91,20 +93,37 @@ class AsyncLLM(EngineClient):
             mm_registry=mm_registry,
         )
 
+        # DetokenizerPool (detokenizes outputs in background processes).
+        self.detokenizer_pool: Optional[DetokenizerPool] = None
+        if envs.VLLM_V1_DETOKENIZER_PROCESSES > 0:
+            self.detokenizer_pool = DetokenizerPool(
+                vllm_config, envs.VLLM_V1_DETOKENIZER_PROCESSES)
+
         # OutputProcessor (converts EngineCoreOutputs --> RequestOutput).
-        self.output_processor = OutputProcessor(self.tokenizer,
-                                                log_stats=self.log_stats)
+        self.output_processor = OutputProcessor(
+            self.tokenizer,
+            log_stats=self.log_stats,
+            detokenizer_pool=self.detokenizer_pool)
 
         # EngineCore (starts the engine in background process).
-        core_client_class = AsyncMPClient if (
-            vllm_config.parallel_config.data_parallel_size
-            == 1) else DPAsyncMPClient
-
-        self.engine_core = core_client_class(
-            vllm_config=vllm_config,
-            executor_class=executor_class,
-            log_stats=self.log_stats,
-        )
+        if vllm_config.parallel_config.data_parallel_size == 1:
+            # With multiple API servers, the first one starts the engine and
+            # the others connect to it.
+            self.engine_core = AsyncMPClient(
+                vllm_config=vllm_config,
+                executor_class=executor_class,
+                log_stats=self.log_stats,
+                client_addresses=client_addresses,
+                client_index=client_index,
+            )
+        else:
+            assert client_addresses is None, (
+                "Multiple API servers are not supported with data parallel.")
+            self.engine_core = DPAsyncMPClient(
+                vllm_config=vllm_config,
+                executor_class=executor_class,
+                log_stats=self.log_stats,
+            )
 
         self.output_handler: Optional[asyncio.Task] = None
         try:
@@ -123,6 +142,8 @@ class AsyncLLM(EngineClient):
         stat_loggers: Optional[dict[str, StatLoggerBase]] = None,
         disable_log_requests: bool = False,
         disable_log_stats: bool = False,
+        client_addresses: Optional[list[tuple[str, str]]] = None,
+        client_index: int = 0,
     ) -> "AsyncLLM":
         if not envs.VLLM_USE_V1:
             raise ValueError(
@@ -145,6 +166,8 @@ class AsyncLLM(EngineClient):
             log_requests=not disable_log_requests,
             log_stats=not disable_log_stats,
             usage_context=usage_context,
+            client_addresses=client_addresses,
+            client_index=client_index,
         )
 
     @classmethod
@@ -179,6 +202,9 @@ class AsyncLLM(EngineClient):
         if engine_core := getattr(self, "engine_core", None):
             engine_core.shutdown()
 
+        if detokenizer_pool := getattr(self, "detokenizer_pool", None):
+            detokenizer_pool.shutdown()
+
         if handler := getattr(self, "output_handler", None):
             handler.cancel()
 
@@ -342,7 +368,7 @@ class AsyncLLM(EngineClient):
                 while True:
                     # 1) Pull EngineCoreOutputs from the EngineCore.
                     outputs = await engine_core.get_output_async()
-                    num_outputs = len(outputs.outputs)
+                    num_outputs = outputs.num_outputs
 
                     iteration_stats = IterationStats() if (
                         log_stats and num_outputs) else None
@@ -351,16 +377,17 @@ class AsyncLLM(EngineClient):
                     # VLLM_V1_OUTPUT_PROC_CHUNK_SIZE, so that we don't block the
                     # event loop for too long.
                     if num_outputs <= VLLM_V1_OUTPUT_PROC_CHUNK_SIZE:
-                        slices = (outputs.outputs, )
+                        slices = [(outputs.outputs, outputs.token_outputs)]
                     else:
-                        slices = np.array_split(
-                            outputs.outputs,
-                            cdiv(num_outputs, VLLM_V1_OUTPUT_PROC_CHUNK_SIZE))
+                        slices = outputs.split(VLLM_V1_OUTPUT_PROC_CHUNK_SIZE)
 
-                    for i, outputs_slice in enumerate(slices):
+                    for i, (outputs_slice,
+                            token_outputs_slice) in enumerate(slices):
                         # 2) Process EngineCoreOutputs.
-                        processed_outputs = output_processor.process_outputs(
-                            outputs_slice, outputs.timestamp, iteration_stats)
+                        processed_outputs = (
+                            await output_processor.process_outputs_async(
+                                outputs_slice, outputs.timestamp,
+                                iteration_stats, token_outputs_slice))
                         # NOTE: RequestOutputs are pushed to their queues.
                         assert not processed_outputs.request_outputs
 
@@ -376,7 +403,6 @@ class AsyncLLM(EngineClient):
                     # TODO(rob): make into a coroutine and launch it in
                     # background thread once Prometheus overhead is non-trivial.
                     if stat_loggers:
-                        assert outputs.scheduler_stats is not None
                         AsyncLLM._record_stats(
                             stat_loggers[outputs.engine_index],
                             scheduler_stats=outputs.scheduler_stats,
@@ -400,7 +426,7 @@ class AsyncLLM(EngineClient):
     @staticmethod
     def _record_stats(
         stat_loggers: list[StatLoggerBase],
-        scheduler_stats: SchedulerStats,
+        scheduler_stats: Optional[SchedulerStats],
         iteration_stats: Optional[IterationStats],
     ):
         """static so that it can be used from the output_handler task
@@ -465,6 +491,88 @@ class AsyncLLM(EngineClient):
             raise ValueError("Not supported on CPU.")
         await self.engine_core.reset_prefix_cache_async()
 
+    async def pin_prefix(self,
+                         prompt: Union[str, list[int]],
+                         prefix_id: Optional[str] = None) -> tuple[str, int]:
+        """Prefill a prefix if needed and pin its KV cache blocks so that
+        they are never evicted.
+
+        Args:
+            prompt: The prefix, as a text or a list of token IDs.
+            prefix_id: The ID of the pinned prefix. Defaults to a hash of
+                the token IDs of the prefix.
+
+        Returns:
+            The prefix ID and the number of pinned tokens. Only the tokens of
+            the full KV cache blocks of the prefix are pinned.
+
+        Raises:
+            NotImplementedError: If data parallelism is enabled.
+            ValueError: If prefix caching is disabled, the prefix is shorter
+                than a block or the prefix ID is already pinned.
+        """
+        if self.vllm_config.parallel_config.data_parallel_size > 1:
+            raise NotImplementedError(
+                "Pinning prefixes is not supported with data parallelism.")
+        cache_config = self.vllm_config.cache_config
+        if not cache_config.enable_prefix_caching:
+            raise ValueError("Pinning prefixes requires prefix caching.")
+        if isinstance(prompt, str):
+            tokenizer = await self.get_tokenizer()
+            token_ids = tokenizer.encode(prompt)
+        else:
+            token_ids = list(prompt)
+        if prefix_id is None:
+            prefix_id = hashlib.sha256(
+                str(token_ids).encode()).hexdigest()[:16]
+        # Errors raised by the engine core lose their type, so the invalid
+        # requests are rejected here.
+        if len(token_ids) < cache_config.block_size:
+            raise ValueError(
+                f"Prefix {prefix_id} is shorter than a block "
+                f"({len(token_ids)} < {cache_config.block_size} tokens).")
+        if prefix_id in await self.list_pinned_prefixes():
+            raise ValueError(f"Prefix {prefix_id} is already pinned.")
+
+        num_pinned_tokens = await self.engine_core.pin_prefix_async(
+            prefix_id, token_ids)
+        if num_pinned_tokens == 0:
+            # The prefix is not cached yet, prefill it first.
+            async for _ in self.generate(
+                    TokensPrompt(prompt_token_ids=token_ids),
+                    SamplingParams(max_tokens=1),
+                    request_id=f"pin-prefix-{prefix_id}-{random_uuid()}"):
+                pass
+            num_pinned_tokens = await self.engine_core.pin_prefix_async(
+                prefix_id, token_ids)
+            if num_pinned_tokens == 0:
+                raise RuntimeError(
+                    f"Prefix {prefix_id} was evicted before being pinned.")
+        return prefix_id, num_pinned_tokens
+
+    async def unpin_prefix(self, prefix_id: str) -> bool:
+        """Unpin a prefix pinned by `pin_prefix`."""
+        return await self.engine_core.unpin_prefix_async(prefix_id)
+
+    async def list_pinned_prefixes(self) -> dict[str, int]:
+        """Get the number of pinned tokens of each pinned prefix."""
+        return await self.engine_core.list_pinned_prefixes_async()
+
+    async def precompile_grammars(
+            self, json_schemas: list[Union[str, dict[str, Any]]]) -> int:
+        """Compile the structured output grammars of JSON schemas into the
+        grammar cache of the engines, ahead of the requests that use them.
+
+        The engines do not schedule requests while compiling, so this is
+        meant to be called at startup. With VLLM_STRUCTURED_OUTPUT_CACHE_DIR
+        set, the compiled grammars are also reused after a restart.
+
+        Returns:
+            The number of precompiled grammars.
+        """
+        grammars = self.processor.get_json_schema_grammars(json_schemas)
+        return await self.engine_core.precompile_grammars_async(grammars)
+
     async def sleep(self, level: int = 1) -> None:
         await self.engine_core.sleep_async(level)
 
@@ -6,6 +6,7 @@ import sys
 import threading
 import time
 from concurrent.futures import Future
+from contextlib import ExitStack
 from inspect import isclass, signature
 from logging import DEBUG
 from typing import Any, Callable, Optional, TypeVar, Union
@@ -116,6 +117,14 @@ class EngineCore:
                         self.batch_queue_size)
             self.batch_queue = queue.Queue(self.batch_queue_size)
 
+        self.step_fn: Callable[[], Optional[EngineCoreOutputs]]
+        if self.batch_queue is None:
+            self.step_fn = self.step
+        elif vllm_config.scheduler_config.async_scheduling:
+            self.step_fn = self.step_with_async_scheduling
+        else:
+            self.step_fn = self.step_with_batch_queue
+
     def _initialize_kv_caches(
             self, vllm_config: VllmConfig) -> tuple[int, int, KVCacheConfig]:
         start = time.time()
@@ -248,6 +257,40 @@ class EngineCore:
 
         return engine_core_outputs
 
+    def step_with_async_scheduling(self) -> Optional[EngineCoreOutputs]:
+        """Schedule the next batch while the current batch is executed.
+        Note that if nothing to output in this step, None is returned.
+
+        The scheduler assumes that the batches in flight generate one token
+        for each of their running requests (see AsyncScheduler), so a new
+        batch can be scheduled before the outputs of the current batch are
+        received. The execution flow is as follows:
+        1. If the batch queue is not full, schedule and submit a new batch.
+        If the batch queue is still not full, return without waiting.
+        2. Otherwise, block until the oldest batch in the queue is finished.
+        3. Update the scheduler from the output.
+        """
+        assert self.batch_queue is not None
+
+        if self.scheduler.has_requests() and not self.batch_queue.full():
+            scheduler_output = self.scheduler.schedule()
+            # NOTE: Empty batches are submitted as well, so that the workers
+            # receive the finished requests.
+            future = self.model_executor.execute_model(scheduler_output)
+            self.batch_queue.put_nowait(
+                (future, scheduler_output))  # type: ignore
+            if not self.batch_queue.full():
+                return None
+
+        if self.batch_queue.empty():
+            return None
+        future, scheduler_output = self.batch_queue.get_nowait()
+        # Blocking until the oldest result is available.
+        model_output = future.result()
+        self.batch_queue.task_done()
+        return self.scheduler.update_from_output(scheduler_output,
+                                                 model_output)
+
     def shutdown(self):
         if self.model_executor:
             self.model_executor.shutdown()
@@ -258,6 +301,18 @@ class EngineCore:
     def reset_prefix_cache(self):
         self.scheduler.reset_prefix_cache()
 
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        return self.scheduler.pin_prefix(prefix_id, token_ids)
+
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        return self.scheduler.unpin_prefix(prefix_id)
+
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        return self.scheduler.list_pinned_prefixes()
+
+    def precompile_grammars(self, grammars: list[tuple[str, str, str]]) -> int:
+        return self.structured_output_manager.precompile_grammars(grammars)
+
     def sleep(self, level: int = 1):
         self.model_executor.sleep(level)
 
@@ -314,6 +369,7 @@ class EngineCoreProc(EngineCore):
         executor_class: type[Executor],
         log_stats: bool,
         engine_index: int = 0,
+        client_addresses: Optional[list[tuple[str, str]]] = None,
     ):
         input_queue = queue.Queue[tuple[EngineCoreRequestType, Any]]()
 
@@ -323,10 +379,21 @@ class EngineCoreProc(EngineCore):
         super().__init__(vllm_config, executor_class, log_stats,
                          executor_fail_callback)
 
-        self.step_fn = (self.step if self.batch_queue is None else
-                        self.step_with_batch_queue)
         self.global_unfinished_reqs = False
 
+        # The (input, output) socket paths of the API server clients. With
+        # multiple clients, the outputs of each request are sent to the
+        # client that added it.
+        if client_addresses is None:
+            client_addresses = [(input_path, output_path)]
+        input_paths = [address[0] for address in client_addresses]
+        output_paths = [address[1] for address in client_addresses]
+        self.num_clients = len(client_addresses)
+        # request_id -> client index, and utility call_id -> client index.
+        # Only used with multiple clients.
+        self.request_clients: dict[str, int] = {}
+        self.utility_clients: dict[int, int] = {}
+
         # Background Threads and Queues for IO. These enable us to
         # overlap ZMQ socket IO with GPU since they release the GIL,
         # and to overlap some serialization/deserialization with the
@@ -335,11 +402,11 @@ class EngineCoreProc(EngineCore):
         self.input_queue = input_queue
         self.output_queue = queue.Queue[Union[EngineCoreOutputs, bytes]]()
         threading.Thread(target=self.process_input_socket,
-                         args=(input_path, engine_index),
+                         args=(input_paths, engine_index),
                          daemon=True).start()
         self.output_thread = threading.Thread(
             target=self.process_output_socket,
-            args=(output_path, engine_index),
+            args=(output_paths, engine_index),
             daemon=True)
         self.output_thread.start()
 
@@ -446,6 +513,9 @@ class EngineCoreProc(EngineCore):
             self.add_request(request)
         elif request_type == EngineCoreRequestType.ABORT:
             self.abort_requests(request)
+            if self.num_clients > 1:
+                for request_id in request:
+                    self.request_clients.pop(request_id, None)
         elif request_type == EngineCoreRequestType.START_DP:
             if not self.global_unfinished_reqs:
                 logger.debug("EngineCore starting idle loop.")
@@ -495,7 +565,7 @@ class EngineCoreProc(EngineCore):
             logger.fatal("vLLM shutdown signal from EngineCore failed "
                          "to send. Please report this issue.")
 
-    def process_input_socket(self, input_path: str, engine_index: int):
+    def process_input_socket(self, input_paths: list[str], engine_index: int):
         """Input socket IO thread."""
 
         # Msgpack serialization decoding.
@@ -503,29 +573,51 @@ class EngineCoreProc(EngineCore):
         generic_decoder = MsgpackDecoder()
         identity = engine_index.to_bytes(length=2, byteorder="little")
 
-        with zmq_socket_ctx(input_path,
-                            zmq.DEALER,
-                            identity=identity,
-                            bind=False) as socket:
-
-            # Send ready message to front-end once input socket is connected.
-            socket.send(b'READY')
+        with ExitStack() as stack:
+            socket_clients = {
+                stack.enter_context(
+                    zmq_socket_ctx(input_path,
+                                   zmq.DEALER,
+                                   identity=identity,
+                                   bind=False)):
+                client_index
+                for client_index, input_path in enumerate(input_paths)
+            }
+            poller = zmq.Poller()
+            for socket in socket_clients:
+                # Send ready message to front-end once input socket is
+                # connected.
+                socket.send(b'READY')
+                poller.register(socket, zmq.POLLIN)
 
             while True:
-                # (RequestType, RequestData)
-                type_frame, *data_frames = socket.recv_multipart(copy=False)
-                request_type = EngineCoreRequestType(bytes(type_frame.buffer))
-
-                # Deserialize the request data.
-                decoder = add_request_decoder if (
-                    request_type
-                    == EngineCoreRequestType.ADD) else generic_decoder
-                request = decoder.decode(data_frames)
-
-                # Push to input queue for core busy loop.
-                self.input_queue.put_nowait((request_type, request))
-
-    def process_output_socket(self, output_path: str, engine_index: int):
+                for socket, _ in poller.poll():
+                    # (RequestType, RequestData)
+                    type_frame, *data_frames = socket.recv_multipart(
+                        copy=False)
+                    request_type = EngineCoreRequestType(
+                        bytes(type_frame.buffer))
+
+                    # Deserialize the request data.
+                    decoder = add_request_decoder if (
+                        request_type
+                        == EngineCoreRequestType.ADD) else generic_decoder
+                    request = decoder.decode(data_frames)
+
+                    if self.num_clients > 1:
+                        # Remember the client to send the outputs to.
+                        client_index = socket_clients[socket]
+                        if request_type == EngineCoreRequestType.ADD:
+                            self.request_clients[
+                                request.request_id] = client_index
+                        elif request_type == EngineCoreRequestType.UTILITY:
+                            self.utility_clients[request[0]] = client_index
+
+                    # Push to input queue for core busy loop.
+                    self.input_queue.put_nowait((request_type, request))
+
+    def process_output_socket(self, output_paths: list[str],
+                              engine_index: int):
         """Output socket IO thread."""
 
         # Msgpack serialization encoding.
@@ -535,17 +627,87 @@ class EngineCoreProc(EngineCore):
 
         # We must set linger to ensure the ENGINE_CORE_DEAD
         # message is sent prior to closing the socket.
-        with zmq_socket_ctx(output_path, zmq.constants.PUSH,
-                            linger=4000) as socket:
+        with ExitStack() as stack:
+            sockets = [
+                stack.enter_context(
+                    zmq_socket_ctx(output_path,
+                                   zmq.constants.PUSH,
+                                   linger=4000))
+                for output_path in output_paths
+            ]
             while True:
                 outputs = self.output_queue.get()
                 if outputs == EngineCoreProc.ENGINE_CORE_DEAD:
-                    socket.send(outputs, copy=False)
+                    for socket in sockets:
+                        socket.send(outputs, copy=False)
                     break
                 assert not isinstance(outputs, bytes)
                 outputs.engine_index = engine_index
-                buffers = encoder.encode_into(outputs, buffer)
-                socket.send_multipart(buffers, copy=False)
+                if len(sockets) == 1:
+                    buffers = encoder.encode_into(outputs, buffer)
+                    sockets[0].send_multipart(buffers, copy=False)
+                    continue
+                for socket, client_outputs in zip(
+                        sockets, self._split_outputs_by_client(outputs)):
+                    if client_outputs is not None:
+                        socket.send_multipart(encoder.encode(client_outputs),
+                                              copy=False)
+
+    def _split_outputs_by_client(
+            self,
+            outputs: EngineCoreOutputs) -> list[Optional[EngineCoreOutputs]]:
+        """Split the outputs of a step across the API server clients, by the
+        client that added each request. The engine-level stats and events
+        only go to the first client. The other clients only get outputs if
+        they have any."""
+        request_clients = self.request_clients
+        client_outputs = [
+            EngineCoreOutputs(engine_index=outputs.engine_index,
+                              outputs=[],
+                              timestamp=outputs.timestamp)
+            for _ in range(self.num_clients)
+        ]
+        client_outputs[0].scheduler_stats = outputs.scheduler_stats
+        client_outputs[0].engine_paused = outputs.engine_paused
+        client_outputs[0].prefix_cache_events = outputs.prefix_cache_events
+
+        for output in outputs.outputs:
+            if output.finished:
+                client_index = request_clients.pop(output.request_id, 0)
+            else:
+                client_index = request_clients.get(output.request_id, 0)
+            client_outputs[client_index].outputs.append(output)
+
+        token_outputs = outputs.token_outputs
+        if token_outputs is not None:
+            client_indices: list[list[int]] = [[]
+                                               for _ in range(self.num_clients)
+                                               ]
+            for i, req_id in enumerate(token_outputs.request_ids):
+                client_indices[request_clients.get(req_id, 0)].append(i)
+            for indices, client_output in zip(client_indices, client_outputs):
+                if indices:
+                    client_output.token_outputs = token_outputs.take(indices)
+
+        if outputs.finished_requests is not None:
+            for req_id in outputs.finished_requests:
+                client_output = client_outputs[request_clients.pop(req_id, 0)]
+                if client_output.finished_requests is None:
+                    client_output.finished_requests = set()
+                client_output.finished_requests.add(req_id)
+
+        if outputs.utility_output is not None:
+            client_index = self.utility_clients.pop(
+                outputs.utility_output.call_id, 0)
+            client_outputs[client_index].utility_output = (
+                outputs.utility_output)
+
+        split_outputs: list[Optional[EngineCoreOutputs]] = [client_outputs[0]]
+        split_outputs.extend(client_output if (
+            client_output.num_outputs or client_output.utility_output
+            is not None or client_output.finished_requests) else None
+                             for client_output in client_outputs[1:])
+        return split_outputs
 
 
 ENGINE_PAUSED_OUTPUTS = EngineCoreOutputs(engine_paused=True)
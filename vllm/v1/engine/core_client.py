@@ -13,17 +13,21 @@ from typing import Any, Callable, Optional, TypeVar, Union
 import zmq
 import zmq.asyncio
 
+import vllm.envs as envs
 from vllm.config import VllmConfig
 from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
 from vllm.utils import (get_open_zmq_inproc_path, get_open_zmq_ipc_path,
                         make_zmq_socket)
+from vllm.v1.core.kv_cache_utils import get_block_routing_keys
 from vllm.v1.engine import (EngineCoreOutputs, EngineCoreRequest,
-                            EngineCoreRequestType, UtilityOutput)
+                            EngineCoreRequestType, PrefixCacheEvents,
+                            UtilityOutput)
 from vllm.v1.engine.core import EngineCore, EngineCoreProc
 from vllm.v1.engine.exceptions import EngineDeadError
 from vllm.v1.executor.abstract import Executor
 from vllm.v1.serial_utils import MsgpackDecoder, MsgpackEncoder, bytestr
+from vllm.v1.shm_arena import SharedMemoryArena
 from vllm.v1.utils import BackgroundProcHandle
 
 logger = init_logger(__name__)
@@ -88,6 +92,18 @@ class EngineCoreClient(ABC):
     def reset_prefix_cache(self) -> None:
         raise NotImplementedError
 
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        raise NotImplementedError
+
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        raise NotImplementedError
+
+    def precompile_grammars(self, grammars: list[tuple[str, str, str]]) -> int:
+        raise NotImplementedError
+
     def sleep(self, level: int = 1) -> None:
         raise NotImplementedError
 
@@ -143,6 +159,20 @@ class EngineCoreClient(ABC):
     async def reset_prefix_cache_async(self) -> None:
         raise NotImplementedError
 
+    async def pin_prefix_async(self, prefix_id: str,
+                               token_ids: list[int]) -> int:
+        raise NotImplementedError
+
+    async def unpin_prefix_async(self, prefix_id: str) -> bool:
+        raise NotImplementedError
+
+    async def list_pinned_prefixes_async(self) -> dict[str, int]:
+        raise NotImplementedError
+
+    async def precompile_grammars_async(
+            self, grammars: list[tuple[str, str, str]]) -> int:
+        raise NotImplementedError
+
     async def sleep_async(self, level: int = 1) -> None:
         raise NotImplementedError
 
@@ -196,7 +226,11 @@ class InprocClient(EngineCoreClient):
         self.engine_core = EngineCore(*args, **kwargs)
 
     def get_output(self) -> EngineCoreOutputs:
-        return self.engine_core.step()
+        outputs = self.engine_core.step_fn()
+        if outputs is None:
+            # A batch was scheduled without waiting for its output.
+            return EngineCoreOutputs()
+        return outputs
 
     def add_request(self, request: EngineCoreRequest) -> None:
         self.engine_core.add_request(request)
@@ -214,6 +248,18 @@ class InprocClient(EngineCoreClient):
     def reset_prefix_cache(self) -> None:
         self.engine_core.reset_prefix_cache()
 
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        return self.engine_core.pin_prefix(prefix_id, token_ids)
+
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        return self.engine_core.unpin_prefix(prefix_id)
+
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        return self.engine_core.list_pinned_prefixes()
+
+    def precompile_grammars(self, grammars: list[tuple[str, str, str]]) -> int:
+        return self.engine_core.precompile_grammars(grammars)
+
     def sleep(self, level: int = 1) -> None:
         self.engine_core.sleep(level)
 
@@ -264,23 +310,27 @@ class CoreEngine:
         output_path: str,
         index: int = 0,
         local_dp_rank: int = 0,
+        client_addresses: Optional[list[tuple[str, str]]] = None,
     ):
         self.index = index
         self.identity = index.to_bytes(length=2, byteorder="little")
         try:
+            process_kwargs = {
+                "vllm_config": vllm_config,
+                "dp_rank": index,
+                "local_dp_rank": local_dp_rank,
+                "executor_class": executor_class,
+                "log_stats": log_stats,
+            }
+            if client_addresses is not None:
+                process_kwargs["client_addresses"] = client_addresses
             # Start EngineCore in background process.
-            self.proc_handle = BackgroundProcHandle(
-                input_path=input_path,
-                output_path=output_path,
-                process_name=f"EngineCore_{index}",
-                target_fn=EngineCoreProc.run_engine_core,
-                process_kwargs={
-                    "vllm_config": vllm_config,
-                    "dp_rank": index,
-                    "local_dp_rank": local_dp_rank,
-                    "executor_class": executor_class,
-                    "log_stats": log_stats,
-                })
+            self.proc_handle: Optional[BackgroundProcHandle] = (
+                BackgroundProcHandle(input_path=input_path,
+                                     output_path=output_path,
+                                     process_name=f"EngineCore_{index}",
+                                     target_fn=EngineCoreProc.run_engine_core,
+                                     process_kwargs=process_kwargs))
 
             self.num_reqs_in_flight = 0
         finally:
@@ -288,6 +338,16 @@ class CoreEngine:
                 # Ensure socket is closed if process fails to start.
                 self.close()
 
+    @classmethod
+    def connect(cls, index: int = 0) -> "CoreEngine":
+        """Get the handle of an engine that was started by another client."""
+        core_engine = cls.__new__(cls)
+        core_engine.index = index
+        core_engine.identity = index.to_bytes(length=2, byteorder="little")
+        core_engine.proc_handle = None
+        core_engine.num_reqs_in_flight = 0
+        return core_engine
+
     def close(self):
         if proc_handle := getattr(self, "proc_handle", None):
             proc_handle.shutdown()
@@ -350,6 +410,11 @@ class MPClient(EngineCoreClient):
     
         * AsyncMPClient subclass for AsyncLLM usage
         * SyncMPClient subclass for LLM usage
+
+    Multiple clients (e.g., API server processes) can share one EngineCore.
+    `client_addresses` are then the (input, output) socket paths of all the
+    clients, and `client_index` is the index of this client. The first
+    client starts the EngineCore, and the others connect to it.
     """
 
     def __init__(
@@ -358,9 +423,15 @@ class MPClient(EngineCoreClient):
         vllm_config: VllmConfig,
         executor_class: type[Executor],
         log_stats: bool,
+        client_addresses: Optional[list[tuple[str, str]]] = None,
+        client_index: int = 0,
     ):
         # Serialization setup.
-        self.encoder = MsgpackEncoder()
+        shm_arena = None
+        if envs.VLLM_MM_SHM_ARENA_MB > 0:
+            shm_arena = SharedMemoryArena(size=envs.VLLM_MM_SHM_ARENA_MB *
+                                          1024 * 1024)
+        self.encoder = MsgpackEncoder(shm_arena=shm_arena)
         self.decoder = MsgpackDecoder(EngineCoreOutputs)
 
         # ZMQ setup.
@@ -375,8 +446,11 @@ class MPClient(EngineCoreClient):
         success = False
         try:
             # Paths and sockets for IPC.
-            self.output_path = get_open_zmq_ipc_path()
-            input_path = get_open_zmq_ipc_path()
+            if client_addresses is None:
+                self.output_path = get_open_zmq_ipc_path()
+                input_path = get_open_zmq_ipc_path()
+            else:
+                input_path, self.output_path = client_addresses[client_index]
             self.input_socket = make_zmq_socket(self.ctx,
                                                 input_path,
                                                 zmq.ROUTER,
@@ -385,11 +459,17 @@ class MPClient(EngineCoreClient):
 
             new_core_engine = lambda index, local_dp_rank=None: CoreEngine(
                 vllm_config, executor_class, log_stats, input_path, self.
-                output_path, index, local_dp_rank)
-
-            # Start engine core process(es).
-            self._init_core_engines(vllm_config, new_core_engine,
-                                    self.resources.core_engines)
+                output_path, index, local_dp_rank, client_addresses)
+
+            if client_index == 0:
+                # Start engine core process(es).
+                self._init_core_engines(vllm_config, new_core_engine,
+                                        self.resources.core_engines)
+            else:
+                # Connect to the engine core started by the first client.
+                assert vllm_config.parallel_config.data_parallel_size == 1
+                self.core_engine = CoreEngine.connect()
+                self.resources.core_engines.append(self.core_engine)
 
             # Wait for engine core process(es) to start.
             self._wait_for_engine_startup()
@@ -409,7 +489,8 @@ class MPClient(EngineCoreClient):
         poller = zmq.Poller()
         poller.register(sync_input_socket, zmq.POLLIN)
         for eng in self.resources.core_engines:
-            poller.register(eng.proc_handle, zmq.POLLIN)
+            if eng.proc_handle is not None:
+                poller.register(eng.proc_handle, zmq.POLLIN)
         while identities:
             events = poller.poll(STARTUP_POLL_PERIOD_MS)
             if not events:
@@ -573,6 +654,18 @@ class SyncMPClient(MPClient):
     def reset_prefix_cache(self) -> None:
         self.call_utility("reset_prefix_cache")
 
+    def pin_prefix(self, prefix_id: str, token_ids: list[int]) -> int:
+        return self.call_utility("pin_prefix", prefix_id, token_ids)
+
+    def unpin_prefix(self, prefix_id: str) -> bool:
+        return self.call_utility("unpin_prefix", prefix_id)
+
+    def list_pinned_prefixes(self) -> dict[str, int]:
+        return self.call_utility("list_pinned_prefixes")
+
+    def precompile_grammars(self, grammars: list[tuple[str, str, str]]) -> int:
+        return self.call_utility("precompile_grammars", grammars)
+
     def add_lora(self, lora_request: LoRARequest) -> bool:
         return self.call_utility("add_lora", lora_request)
 
@@ -615,13 +708,19 @@ class SyncMPClient(MPClient):
 class AsyncMPClient(MPClient):
     """Asyncio-compatible client for multi-proc EngineCore."""
 
-    def __init__(self, vllm_config: VllmConfig, executor_class: type[Executor],
-                 log_stats: bool):
+    def __init__(self,
+                 vllm_config: VllmConfig,
+                 executor_class: type[Executor],
+                 log_stats: bool,
+                 client_addresses: Optional[list[tuple[str, str]]] = None,
+                 client_index: int = 0):
         super().__init__(
             asyncio_mode=True,
             vllm_config=vllm_config,
             executor_class=executor_class,
             log_stats=log_stats,
+            client_addresses=client_addresses,
+            client_index=client_index,
         )
 
         self.outputs_queue = asyncio.Queue[Union[EngineCoreOutputs,
@@ -675,7 +774,7 @@ class AsyncMPClient(MPClient):
                             return
                         await output_handler(_self, outputs)
 
-                    if outputs.outputs or outputs.scheduler_stats:
+                    if outputs.num_outputs or outputs.scheduler_stats:
                         outputs_queue.put_nowait(outputs)
             except Exception as e:
                 outputs_queue.put_nowait(e)
@@ -744,6 +843,21 @@ class AsyncMPClient(MPClient):
     async def reset_prefix_cache_async(self) -> None:
         await self.call_utility_async("reset_prefix_cache")
 
+    async def pin_prefix_async(self, prefix_id: str,
+                               token_ids: list[int]) -> int:
+        return await self.call_utility_async("pin_prefix", prefix_id,
+                                             token_ids)
+
+    async def unpin_prefix_async(self, prefix_id: str) -> bool:
+        return await self.call_utility_async("unpin_prefix", prefix_id)
+
+    async def list_pinned_prefixes_async(self) -> dict[str, int]:
+        return await self.call_utility_async("list_pinned_prefixes")
+
+    async def precompile_grammars_async(
+            self, grammars: list[tuple[str, str, str]]) -> int:
+        return await self.call_utility_async("precompile_grammars", grammars)
+
     async def sleep_async(self, level: int = 1) -> None:
         await self.call_utility_async("sleep", level)
 
@@ -803,6 +917,20 @@ class DPAsyncMPClient(AsyncMPClient):
 
         assert len(self.core_engines) > 1
 
+        # Prefix-aware routing.
+        parallel_config = vllm_config.parallel_config
+        self.prefix_routing = (
+            parallel_config.data_parallel_routing == "prefix"
+            and bool(vllm_config.cache_config.enable_prefix_caching))
+        self.routing_max_imbalance = (
+            parallel_config.data_parallel_routing_max_imbalance)
+        self.block_size = vllm_config.cache_config.block_size
+        # Approximate index of the prefix cache of each engine, built from
+        # the changes they report: {routing key: number of cached blocks}.
+        self.prefix_cache_indexes: list[dict[int, int]] = [
+            {} for _ in self.core_engines
+        ]
+
     def _init_core_engines(
         self,
         vllm_config: VllmConfig,
@@ -825,6 +953,22 @@ class DPAsyncMPClient(AsyncMPClient):
             for engine in self.core_engines
         ]))[0]
 
+    async def precompile_grammars_async(
+            self, grammars: list[tuple[str, str, str]]) -> int:
+        # Compile the grammars in the first engine, so that the other engines
+        # load them from the grammar cache directory (if it is set) instead
+        # of compiling them again.
+        first_engine, *other_engines = self.core_engines
+        num_precompiled = await self._call_utility_async("precompile_grammars",
+                                                         grammars,
+                                                         engine=first_engine)
+        await asyncio.gather(*[
+            self._call_utility_async(
+                "precompile_grammars", grammars, engine=engine)
+            for engine in other_engines
+        ])
+        return num_precompiled
+
     async def add_request_async(self, request: EngineCoreRequest) -> None:
         # NOTE: text prompt is not needed in the core engine as it has been
         # tokenized.
@@ -832,7 +976,7 @@ class DPAsyncMPClient(AsyncMPClient):
 
         msg = (EngineCoreRequestType.ADD.value, *self.encoder.encode(request))
 
-        chosen_engine = self.get_core_engine_for_request()
+        chosen_engine = self.get_core_engine_for_request(request)
         self.reqs_in_flight[request.request_id] = chosen_engine
         chosen_engine.num_reqs_in_flight += 1
         if self.num_engines_running >= len(self.core_engines):
@@ -849,12 +993,59 @@ class DPAsyncMPClient(AsyncMPClient):
 
         self._ensure_output_queue_task()
 
-    def get_core_engine_for_request(self) -> CoreEngine:
-        return min(self.core_engines, key=lambda e: e.num_reqs_in_flight)
+    def get_core_engine_for_request(self,
+                                    request: EngineCoreRequest) -> CoreEngine:
+        least_loaded = min(self.core_engines,
+                           key=lambda e: e.num_reqs_in_flight)
+        if not self.prefix_routing:
+            return least_loaded
+
+        keys = get_block_routing_keys(request.prompt_token_ids,
+                                      self.block_size)
+        if not keys:
+            return least_loaded
+
+        # Pick the engine with the longest expected prefix cache hit among
+        # the engines that are not too loaded, the least loaded on ties.
+        max_in_flight = (least_loaded.num_reqs_in_flight +
+                         self.routing_max_imbalance)
+        chosen_engine, max_num_hits = least_loaded, 0
+        for engine in self.core_engines:
+            if engine.num_reqs_in_flight > max_in_flight:
+                continue
+            index = self.prefix_cache_indexes[engine.index]
+            num_hits = 0
+            for key in keys:
+                if key not in index:
+                    break
+                num_hits += 1
+            if num_hits > max_num_hits or (num_hits == max_num_hits
+                                           and engine.num_reqs_in_flight
+                                           < chosen_engine.num_reqs_in_flight):
+                chosen_engine, max_num_hits = engine, num_hits
+        return chosen_engine
+
+    def _update_prefix_cache_index(self, engine_index: int,
+                                   events: PrefixCacheEvents) -> None:
+        index = self.prefix_cache_indexes[engine_index]
+        if events.reset:
+            index.clear()
+        for key in events.stored:
+            index[key] = index.get(key, 0) + 1
+        for key in events.removed:
+            num_blocks = index.get(key, 0) - 1
+            if num_blocks > 0:
+                index[key] = num_blocks
+            else:
+                index.pop(key, None)
 
     @staticmethod
     async def process_engine_outputs(self: "DPAsyncMPClient",
                                      outputs: EngineCoreOutputs):
+        if outputs.prefix_cache_events is not None:
+            self._update_prefix_cache_index(outputs.engine_index,
+                                            outputs.prefix_cache_events)
+
         if self.reqs_in_flight:
             for req_id in outputs.finished_requests or ():
                 if engine := self.reqs_in_flight.pop(req_id, None):
@@ -9,7 +9,8 @@ from transformers import PreTrainedTokenizerFast
 from vllm.engine.output_processor.stop_checker import StopChecker
 from vllm.logger import init_logger
 from vllm.transformers_utils.detokenizer_utils import (
-    AnyTokenizer, convert_prompt_ids_to_tokens, detokenize_incrementally)
+    AnyTokenizer, convert_prompt_ids_to_tokens, detokenize_incrementally,
+    detokenize_run_incrementally)
 from vllm.v1.engine import EngineCoreRequest
 
 logger = init_logger(__name__)
@@ -94,12 +95,9 @@ class BaseIncrementalDetokenizer(IncrementalDetokenizer, ABC):
             skipped_stop_token_id = None
 
         # 1) Detokenize the new token ids incrementally.
-        # TODO(woosuk): This method becomes very inefficient when the number of
-        # new_token_ids is more than 1. We need to optimize this.
         offset_before = len(self.output_text)
-        for new_token_id in new_token_ids:
-            self.token_ids.append(new_token_id)
-            self.output_text += self.decode_next(new_token_id)
+        if new_token_ids:
+            self.output_text += self.decode_tokens(new_token_ids)
 
         if stop_terminated:
             if skipped_stop_token_id is not None:
@@ -124,6 +122,18 @@ class BaseIncrementalDetokenizer(IncrementalDetokenizer, ABC):
 
         return stop_string
 
+    def decode_tokens(self, new_token_ids: list[int]) -> str:
+        """Append the new token ids, and return their new text.
+
+        Subclasses decode a run of more than one token (e.g., with
+        speculative decoding) at once where they can.
+        """
+        texts = []
+        for new_token_id in new_token_ids:
+            self.token_ids.append(new_token_id)
+            texts.append(self.decode_next(new_token_id))
+        return "".join(texts)
+
     @abstractmethod
     def decode_next(self, next_token_id: int) -> str:
         raise NotImplementedError
@@ -147,6 +157,10 @@ class BaseIncrementalDetokenizer(IncrementalDetokenizer, ABC):
 
 class FastIncrementalDetokenizer(BaseIncrementalDetokenizer):
 
+    # Whether DecodeStream.step takes a list of token ids, which depends on
+    # the version of tokenizers. None until the first run of tokens.
+    _step_takes_runs: Optional[bool] = None
+
     def __init__(self, tokenizer: PreTrainedTokenizerFast,
                  request: EngineCoreRequest):
         super().__init__(request)
@@ -193,6 +207,22 @@ class FastIncrementalDetokenizer(BaseIncrementalDetokenizer):
                 # No added tokens.
                 self.spaces_between_special_tokens = True
 
+    def decode_tokens(self, new_token_ids: list[int]) -> str:
+        # The spaces between the added tokens are handled token by token.
+        if (len(new_token_ids) == 1 or not self.spaces_between_special_tokens
+                or FastIncrementalDetokenizer._step_takes_runs is False):
+            return super().decode_tokens(new_token_ids)
+
+        try:
+            text = self.stream.step(self.tokenizer, new_token_ids)
+        except TypeError:
+            # The stream is left unchanged when the argument is rejected.
+            FastIncrementalDetokenizer._step_takes_runs = False
+            return super().decode_tokens(new_token_ids)
+        FastIncrementalDetokenizer._step_takes_runs = True
+        self.token_ids.extend(new_token_ids)
+        return text or ""
+
     def decode_next(self, next_token_id: int) -> str:
         token = self.stream.step(self.tokenizer, next_token_id)
 
@@ -236,6 +266,29 @@ class SlowIncrementalDetokenizer(BaseIncrementalDetokenizer):
         return self.token_ids if not self.prompt_len else (
             self.token_ids[self.prompt_len:])
 
+    def decode_tokens(self, new_token_ids: list[int]) -> str:
+        if len(new_token_ids) == 1:
+            return super().decode_tokens(new_token_ids)
+
+        self.token_ids.extend(new_token_ids)
+        new_tokens, decoded_text, prefix_offset, read_offset = (
+            detokenize_run_incrementally(
+                tokenizer=self.tokenizer,
+                new_token_ids=new_token_ids,
+                prev_tokens=self.tokens,
+                prefix_offset=self.prefix_offset,
+                read_offset=self.read_offset,
+                skip_special_tokens=self.skip_special_tokens,
+                spaces_between_special_tokens=self.
+                spaces_between_special_tokens,
+            ))
+
+        self.tokens.extend(new_tokens)
+        self.prefix_offset = prefix_offset
+        self.read_offset = read_offset
+
+        return decoded_text
+
     def decode_next(self, next_token_id: int) -> str:
         new_tokens, decoded_text, prefix_offset, read_offset = (
             detokenize_incrementally(
@@ -0,0 +1,296 @@
+# SPDX-License-Identifier: Apache-2.0
+"""Pool of background processes that detokenize the outputs of the requests
+and check their stop strings, off the asyncio event loop of AsyncLLM."""
+
+import enum
+import signal
+from typing import Optional
+
+import zmq
+import zmq.asyncio
+
+from vllm.config import VllmConfig
+from vllm.logger import init_logger
+from vllm.transformers_utils.tokenizer_group import init_tokenizer_from_configs
+from vllm.utils import get_open_zmq_ipc_path, make_zmq_socket, zmq_socket_ctx
+from vllm.v1.engine import EngineCoreRequest
+from vllm.v1.engine.detokenizer import (BaseIncrementalDetokenizer,
+                                        IncrementalDetokenizer)
+from vllm.v1.serial_utils import MsgpackDecoder, MsgpackEncoder
+from vllm.v1.utils import BackgroundProcHandle
+
+logger = init_logger(__name__)
+
+# How long to wait for a worker before checking that it is still alive.
+_POLL_TIMEOUT_MS = 5000
+
+# (request_id, new_token_ids, stop_terminated, finished)
+DetokenizerUpdate = tuple[str, list[int], bool, bool]
+# (text_start, text, stop_string): the output text of the request is now
+# output_text[:text_start] + text.
+DetokenizerResult = tuple[int, str, Optional[str]]
+
+
+class DetokenizerRequestType(enum.Enum):
+    """
+    Request types defined as hex byte strings, so it can be sent over sockets
+    without separate encoding step.
+    """
+    ADD = b'\x00'
+    STEP = b'\x01'
+    FREE = b'\x02'
+
+
+class DetokenizerResultStatus(enum.Enum):
+    OK = b'\x00'
+    FAILED = b'\x01'
+
+
+class PooledIncrementalDetokenizer(BaseIncrementalDetokenizer):
+    """Mirror of the output text of a request that is detokenized by a
+    DetokenizerPool worker.
+
+    The worker returns the changes of the output text in each step, so that
+    the RequestOutputs are made in the same way as with the in-process
+    detokenizers.
+    """
+
+    def apply(self, new_token_ids: list[int], text_start: int, text: str,
+              stop_string: Optional[str]) -> Optional[str]:
+        """Apply the result of a worker for new_token_ids, and return the
+        matched stop string or None."""
+        self.token_ids.extend(new_token_ids)
+        if text_start < len(self.output_text):
+            # The output text was truncated to exclude a stop string.
+            self.output_text = self.output_text[:text_start]
+        self.output_text += text
+        return stop_string
+
+    def decode_next(self, next_token_id: int) -> str:
+        raise NotImplementedError(
+            "The request is detokenized by the DetokenizerPool.")
+
+
+class DetokenizerPool:
+    """Shards the detokenization of the requests across background processes.
+
+    Each request is assigned to a worker by its request id. The worker holds
+    the incremental detokenizer of the request, and every step receives the
+    new token ids of all its requests in one batch. The workers of a step run
+    in parallel, and return the text and the stop string of each request in
+    the order of the batch. The messages of a request always go through the
+    same worker socket, so they are handled in order.
+    """
+
+    def __init__(self, vllm_config: VllmConfig, num_workers: int):
+        assert num_workers > 0
+        self.num_workers = num_workers
+        self.encoder = MsgpackEncoder()
+        self.decoder = MsgpackDecoder()
+
+        # Requests are sent from the sync sockets, so that add_request and
+        # abort_requests do not need to be coroutines.
+        self.ctx = zmq.Context()
+        self.async_ctx = zmq.asyncio.Context(self.ctx)
+        self.input_sockets: list[zmq.Socket] = []
+        self.output_sockets: list[zmq.asyncio.Socket] = []
+        self.proc_handles: list[BackgroundProcHandle] = []
+        for index in range(num_workers):
+            input_path = get_open_zmq_ipc_path()
+            output_path = get_open_zmq_ipc_path()
+            self.input_sockets.append(
+                make_zmq_socket(self.ctx, input_path, zmq.PUSH, bind=True))
+            self.output_sockets.append(
+                make_zmq_socket(self.async_ctx, output_path, zmq.PULL))
+            self.proc_handles.append(
+                BackgroundProcHandle(
+                    input_path=input_path,
+                    output_path=output_path,
+                    process_name=f"Detokenizer_{index}",
+                    target_fn=DetokenizerWorker.run_detokenizer_worker,
+                    process_kwargs={"vllm_config": vllm_config},
+                ))
+
+    def _get_worker(self, request_id: str) -> int:
+        return hash(request_id) % self.num_workers
+
+    def _send(self, worker: int, request_type: DetokenizerRequestType,
+              request: object) -> None:
+        msg = (request_type.value, *self.encoder.encode(request))
+        self.input_sockets[worker].send_multipart(msg, copy=False)
+
+    def add_request(self, request: EngineCoreRequest) -> None:
+        # The worker only needs the prompt token ids and the parameters.
+        self._send(
+            self._get_worker(request.request_id), DetokenizerRequestType.ADD,
+            EngineCoreRequest(
+                request_id=request.request_id,
+                prompt=None,
+                prompt_token_ids=request.prompt_token_ids,
+                mm_inputs=None,
+                mm_hashes=None,
+                mm_placeholders=None,
+                sampling_params=request.sampling_params,
+                eos_token_id=request.eos_token_id,
+                arrival_time=request.arrival_time,
+                lora_request=request.lora_request,
+            ))
+
+    def free_requests(self, request_ids: list[str]) -> None:
+        """Free the detokenizers of requests aborted before they finished."""
+        worker_request_ids: list[list[str]] = [[] for _ in self.proc_handles]
+        for request_id in request_ids:
+            worker_request_ids[self._get_worker(request_id)].append(request_id)
+        for worker, ids in enumerate(worker_request_ids):
+            if ids:
+                self._send(worker, DetokenizerRequestType.FREE, ids)
+
+    async def update(
+        self,
+        updates: list[DetokenizerUpdate],
+    ) -> list[DetokenizerResult]:
+        """Detokenize the new token ids of a step and check the stop strings,
+        and return the results in the order of the updates.
+
+        The detokenizer of a request is freed in its worker when the request
+        is finished or a stop string is matched.
+        """
+        if not updates:
+            return []
+
+        worker_indices: list[list[int]] = [[] for _ in range(self.num_workers)]
+        for i, update in enumerate(updates):
+            worker_indices[self._get_worker(update[0])].append(i)
+
+        workers = [
+            worker for worker, indices in enumerate(worker_indices) if indices
+        ]
+        for worker in workers:
+            self._send(worker, DetokenizerRequestType.STEP,
+                       [updates[i] for i in worker_indices[worker]])
+
+        results: list[Optional[DetokenizerResult]] = [None] * len(updates)
+        for worker in workers:
+            socket = self.output_sockets[worker]
+            while not await socket.poll(_POLL_TIMEOUT_MS):
+                if not self.proc_handles[worker].proc.is_alive():
+                    raise RuntimeError(
+                        f"Detokenizer worker {worker} died unexpectedly.")
+            frames = await socket.recv_multipart(copy=False)
+            status_frame, *data_frames = frames
+            if DetokenizerResultStatus(bytes(
+                    status_frame.buffer)) == DetokenizerResultStatus.FAILED:
+                raise RuntimeError(f"Detokenizer worker {worker} failed: "
+                                   f"{self.decoder.decode(data_frames)}")
+            for i, result in zip(worker_indices[worker],
+                                 self.decoder.decode(data_frames)):
+                results[i] = result
+        return results  # type: ignore[return-value]
+
+    def shutdown(self):
+        for proc_handle in self.proc_handles:
+            proc_handle.shutdown()
+        self.ctx.destroy(linger=0)
+
+
+class DetokenizerWorker:
+    """Holds the detokenizers of the requests of one DetokenizerPool worker.
+    """
+
+    def __init__(self, vllm_config: VllmConfig):
+        self.tokenizer = init_tokenizer_from_configs(
+            model_config=vllm_config.model_config,
+            scheduler_config=vllm_config.scheduler_config,
+            parallel_config=vllm_config.parallel_config,
+            lora_config=vllm_config.lora_config)
+        self.detokenizers: dict[str, IncrementalDetokenizer] = {}
+
+    def add_request(self, request: EngineCoreRequest) -> None:
+        self.detokenizers[request.request_id] = (
+            IncrementalDetokenizer.from_new_request(
+                tokenizer=self.tokenizer.get_lora_tokenizer(
+                    request.lora_request),
+                request=request,
+            ))
+
+    def free_requests(self, request_ids: list[str]) -> None:
+        for request_id in request_ids:
+            self.detokenizers.pop(request_id, None)
+
+    def step(self,
+             updates: list[DetokenizerUpdate]) -> list[DetokenizerResult]:
+        results: list[DetokenizerResult] = []
+        for request_id, new_token_ids, stop_terminated, finished in updates:
+            detokenizer = self.detokenizers[request_id]
+            assert isinstance(detokenizer, BaseIncrementalDetokenizer)
+            text_len = len(detokenizer.output_text)
+            stop_string = detokenizer.update(new_token_ids, stop_terminated)
+
+            # Only the new text is sent back, unless the text was truncated
+            # to exclude a stop string.
+            output_text = detokenizer.output_text
+            text_start = min(text_len, len(output_text))
+            results.append((text_start, output_text[text_start:], stop_string))
+
+            if finished or stop_string is not None:
+                del self.detokenizers[request_id]
+        return results
+
+    def run_busy_loop(self, input_path: str, output_path: str):
+        add_request_decoder = MsgpackDecoder(EngineCoreRequest)
+        generic_decoder = MsgpackDecoder()
+        encoder = MsgpackEncoder()
+
+        with zmq_socket_ctx(input_path, zmq.PULL,
+                            bind=False) as input_socket, zmq_socket_ctx(
+                                output_path, zmq.PUSH) as output_socket:
+            while True:
+                # (RequestType, RequestData)
+                type_frame, *data_frames = input_socket.recv_multipart(
+                    copy=False)
+                request_type = DetokenizerRequestType(bytes(type_frame.buffer))
+
+                if request_type == DetokenizerRequestType.ADD:
+                    self.add_request(add_request_decoder.decode(data_frames))
+                elif request_type == DetokenizerRequestType.FREE:
+                    self.free_requests(generic_decoder.decode(data_frames))
+                else:
+                    try:
+                        result = self.step(generic_decoder.decode(data_frames))
+                    except Exception as e:
+                        logger.exception("Detokenizer step failed.")
+                        error = repr(e)
+                        output_socket.send_multipart(
+                            (DetokenizerResultStatus.FAILED.value,
+                             *encoder.encode(error)),
+                            copy=False)
+                    else:
+                        output_socket.send_multipart(
+                            (DetokenizerResultStatus.OK.value,
+                             *encoder.encode(result)),
+                            copy=False)
+
+    @staticmethod
+    def run_detokenizer_worker(vllm_config: VllmConfig, input_path: str,
+                               output_path: str):
+        """Launch the DetokenizerWorker busy loop in a background process."""
+
+        # Signal handler used for graceful termination.
+        shutdown_requested = False
+
+        def signal_handler(signum, frame):
+            nonlocal shutdown_requested
+            if not shutdown_requested:
+                shutdown_requested = True
+                raise SystemExit()
+
+        signal.signal(signal.SIGTERM, signal_handler)
+        signal.signal(signal.SIGINT, signal_handler)
+
+        try:
+            DetokenizerWorker(vllm_config).run_busy_loop(
+                input_path, output_path)
+        except SystemExit:
+            logger.debug("Detokenizer worker exiting.")
+        except Exception:
+            logger.exception("Detokenizer worker encountered a fatal error.")
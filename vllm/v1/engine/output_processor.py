@@ -9,8 +9,12 @@ from vllm.outputs import CompletionOutput, RequestOutput
 from vllm.sampling_params import RequestOutputKind
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 from vllm.transformers_utils.tokenizer_group import BaseTokenizerGroup
-from vllm.v1.engine import EngineCoreOutput, EngineCoreRequest, FinishReason
+from vllm.v1.engine import (EngineCoreOutput, EngineCoreRequest,
+                            EngineCoreTokenOutputs, FinishReason)
 from vllm.v1.engine.detokenizer import IncrementalDetokenizer
+from vllm.v1.engine.detokenizer_pool import (DetokenizerPool,
+                                             DetokenizerUpdate,
+                                             PooledIncrementalDetokenizer)
 from vllm.v1.engine.logprobs import LogprobsProcessor
 from vllm.v1.engine.parallel_sampling import ParentRequest
 from vllm.v1.metrics.stats import (IterationStats, LoRARequestStates,
@@ -89,6 +93,8 @@ class RequestState:
         arrival_time: float,
         queue: Optional[RequestOutputCollector],
         log_stats: bool,
+        ttft_slo: Optional[float] = None,
+        tpot_slo: Optional[float] = None,
     ):
         self.request_id = request_id
         self.parent_req = parent_req
@@ -105,7 +111,10 @@ class RequestState:
         self.queue = queue
 
         self.stats = RequestStateStats(
-            arrival_time=arrival_time) if log_stats else None
+            arrival_time=arrival_time,
+            ttft_slo=ttft_slo,
+            tpot_slo=tpot_slo,
+        ) if log_stats else None
 
     @classmethod
     def from_new_request(
@@ -116,9 +125,19 @@ class RequestState:
         request_index: int,
         queue: Optional[RequestOutputCollector],
         log_stats: bool,
+        detokenizer_pool: Optional[DetokenizerPool] = None,
     ) -> "RequestState":
         if not request.sampling_params.detokenize:
             tokenizer = None
+        detokenizer: IncrementalDetokenizer
+        if tokenizer is not None and detokenizer_pool is not None:
+            detokenizer_pool.add_request(request)
+            detokenizer = PooledIncrementalDetokenizer(request)
+        else:
+            detokenizer = IncrementalDetokenizer.from_new_request(
+                tokenizer=tokenizer,
+                request=request,
+            )
         return cls(
             request_id=request.request_id,
             parent_req=parent_req,
@@ -132,15 +151,14 @@ class RequestState:
                 tokenizer=tokenizer,
                 request=request,
             ),
-            detokenizer=IncrementalDetokenizer.from_new_request(
-                tokenizer=tokenizer,
-                request=request,
-            ),
+            detokenizer=detokenizer,
             max_tokens_param=(request.sampling_params.max_tokens if
                               request.sampling_params is not None else None),
             arrival_time=request.arrival_time,
             queue=queue,
             log_stats=log_stats,
+            ttft_slo=request.sampling_params.ttft_slo,
+            tpot_slo=request.sampling_params.tpot_slo,
         )
 
     def make_request_output(
@@ -230,9 +248,12 @@ class OutputProcessor:
         self,
         tokenizer: BaseTokenizerGroup,
         log_stats: bool,
+        detokenizer_pool: Optional[DetokenizerPool] = None,
     ):
         self.log_stats = log_stats
         self.tokenizer = tokenizer
+        # Detokenizes the requests in background processes, if set.
+        self.detokenizer_pool = detokenizer_pool
         self.request_states: dict[str, RequestState] = {}
         self.parent_requests: dict[str, ParentRequest] = {}
         self.lora_states = LoRARequestStates()
@@ -255,16 +276,23 @@ class OutputProcessor:
         request_ids: Iterable[str],
     ) -> list[str]:
         request_ids_to_abort = []
+        pooled_request_ids = []
         for request_id in request_ids:
             req_state = self.request_states.pop(request_id, None)
             if req_state is not None:
                 self.lora_states.abort_request(req_state)
                 request_ids_to_abort.append(request_id)
+                if isinstance(req_state.detokenizer,
+                              PooledIncrementalDetokenizer):
+                    pooled_request_ids.append(request_id)
             else:
                 parent = self.parent_requests.pop(request_id, None)
                 if parent and parent.child_requests:
                     self.abort_requests(parent.child_requests)
                     request_ids_to_abort.extend(parent.child_requests)
+        if pooled_request_ids:
+            assert self.detokenizer_pool is not None
+            self.detokenizer_pool.free_requests(pooled_request_ids)
         return request_ids_to_abort
 
     def add_request(
@@ -284,7 +312,8 @@ class OutputProcessor:
             parent_req=parent_req,
             request_index=request_index,
             queue=queue,
-            log_stats=self.log_stats)
+            log_stats=self.log_stats,
+            detokenizer_pool=self.detokenizer_pool)
         self.request_states[request_id] = req_state
         self.lora_states.add_request(req_state)
         if parent_req:
@@ -295,6 +324,7 @@ class OutputProcessor:
         engine_core_outputs: list[EngineCoreOutput],
         engine_core_timestamp: Optional[float] = None,
         iteration_stats: Optional[IterationStats] = None,
+        token_outputs: Optional[EngineCoreTokenOutputs] = None,
     ) -> OutputProcessorOutput:
         """
         Process the EngineCoreOutputs:
@@ -308,6 +338,9 @@ class OutputProcessor:
             * If there is no queue (for usage with LLMEngine), 
               return a list of RequestOutput objects.
 
+        The requests that only have new tokens in this step come in the
+        columnar token_outputs instead of engine_core_outputs.
+
         ****************** NOTE FOR DEVELOPERS ******************
 
         vLLM V1 minimizes the number of python loops over the full
@@ -315,7 +348,7 @@ class OutputProcessor:
         only function that should loop over EngineCoreOutputs.
 
         If you need to touch every element of the batch, do it from
-        within the loop below.
+        within the loops below.
         
         **********************************************************
         """
@@ -334,47 +367,148 @@ class OutputProcessor:
                                            engine_core_timestamp,
                                            iteration_stats)
 
-            new_token_ids = engine_core_output.new_token_ids
-            finish_reason = engine_core_output.finish_reason
-            stop_reason = engine_core_output.stop_reason
+            # 2) Compute sample and prompt logprobs for request, if required.
+            req_state.logprobs_processor.update_from_output(engine_core_output)
 
-            req_state.is_prefilling = False
+            # 3) Detokenize and create the RequestOutput.
+            self._process_new_tokens(
+                req_state, engine_core_output.new_token_ids,
+                engine_core_output.finish_reason,
+                engine_core_output.stop_reason, engine_core_output.finished,
+                request_outputs, reqs_to_abort, iteration_stats)
+
+        if token_outputs is not None:
+            # OPTIMIZATION: Convert the columns to lists at once.
+            token_ids = token_outputs.new_token_ids.tolist()
+            offsets = token_outputs.offsets.tolist()
+            for i, req_id in enumerate(token_outputs.request_ids):
+                req_state = self.request_states.get(req_id)
+                if req_state is None:
+                    # Ignore output for already-aborted request.
+                    continue
+                new_token_ids = token_ids[offsets[i]:offsets[i + 1]]
+
+                # 1) Compute stats for this iteration.
+                if iteration_stats is not None:
+                    assert engine_core_timestamp is not None
+                    assert req_state.stats is not None
+                    iteration_stats.update_from_new_tokens(
+                        len(new_token_ids), engine_core_timestamp,
+                        req_state.is_prefilling, req_state.prompt_len,
+                        req_state.stats)
+
+                # 2) Detokenize and create the RequestOutput.
+                self._process_new_tokens(req_state, new_token_ids, None, None,
+                                         False, request_outputs, reqs_to_abort,
+                                         iteration_stats)
+
+        self.lora_states.update_iteration_stats(iteration_stats)
 
-            # 2) Detokenize the token ids into text and perform stop checks.
-            stop_string = req_state.detokenizer.update(
-                new_token_ids, finish_reason == FinishReason.STOP)
-            if stop_string:
-                finish_reason = FinishReason.STOP
-                stop_reason = stop_string
+        return OutputProcessorOutput(
+            request_outputs=request_outputs,
+            reqs_to_abort=reqs_to_abort,
+        )
+
+    async def process_outputs_async(
+        self,
+        engine_core_outputs: list[EngineCoreOutput],
+        engine_core_timestamp: Optional[float] = None,
+        iteration_stats: Optional[IterationStats] = None,
+        token_outputs: Optional[EngineCoreTokenOutputs] = None,
+    ) -> OutputProcessorOutput:
+        """
+        Same as process_outputs, but the requests are detokenized by the
+        DetokenizerPool, if any, while the event loop runs other tasks:
+        1) Compute stats and logprobs, and collect the new tokens
+        2) Detokenize in the DetokenizerPool workers
+        3) Create and handle RequestOutput objects
+
+        Unlike process_outputs, this loops over the batch twice, since the
+        RequestOutputs can only be made once the workers have returned.
+        """
+        detokenizer_pool = self.detokenizer_pool
+        if detokenizer_pool is None:
+            return self.process_outputs(engine_core_outputs,
+                                        engine_core_timestamp, iteration_stats,
+                                        token_outputs)
+
+        # (req_state, new_token_ids, finish_reason, stop_reason,
+        #  finished_in_engine)
+        new_tokens: list[tuple[RequestState, list[int], Optional[FinishReason],
+                               Union[int, str, None], bool]] = []
+        pool_updates: list[DetokenizerUpdate] = []
+        for engine_core_output in engine_core_outputs:
+            req_id = engine_core_output.request_id
+            req_state = self.request_states.get(req_id)
+            if req_state is None:
+                # Ignore output for already-aborted request.
+                continue
 
-            # 3) Compute sample and prompt logprobs for request, if required.
+            # 1) Compute stats and logprobs for this iteration.
+            self._update_stats_from_output(req_state, engine_core_output,
+                                           engine_core_timestamp,
+                                           iteration_stats)
             req_state.logprobs_processor.update_from_output(engine_core_output)
 
-            # 4) Create and handle RequestOutput objects.
-            if request_output := req_state.make_request_output(
-                    new_token_ids, finish_reason, stop_reason):
-                if req_state.queue is not None:
-                    # AsyncLLM: put into queue for handling by generate().
-                    req_state.queue.put(request_output)
-                else:
-                    # LLMEngine: return list of RequestOutputs.
-                    request_outputs.append(request_output)
-
-            # Free completed requests.
-            if finish_reason is not None:
-                self.request_states.pop(req_id)
-                # Remove parent request if applicable.
-                parent_req = req_state.parent_req
-                if parent_req and not parent_req.child_requests:
-                    self.parent_requests.pop(parent_req.request_id, None)
-                if not engine_core_output.finished:
-                    # If req not finished in EngineCore, but Detokenizer
-                    # detected stop string, abort needed in EngineCore.
-                    reqs_to_abort.append(req_id)
-
-                # Track per-request stats
-                self._update_stats_from_finished(req_state, finish_reason,
-                                                 iteration_stats)
+            finish_reason = engine_core_output.finish_reason
+            new_tokens.append(
+                (req_state, engine_core_output.new_token_ids, finish_reason,
+                 engine_core_output.stop_reason, engine_core_output.finished))
+            if isinstance(req_state.detokenizer, PooledIncrementalDetokenizer):
+                pool_updates.append(
+                    (req_id, engine_core_output.new_token_ids,
+                     finish_reason == FinishReason.STOP, finish_reason
+                     is not None))
+
+        if token_outputs is not None:
+            # OPTIMIZATION: Convert the columns to lists at once.
+            token_ids = token_outputs.new_token_ids.tolist()
+            offsets = token_outputs.offsets.tolist()
+            for i, req_id in enumerate(token_outputs.request_ids):
+                req_state = self.request_states.get(req_id)
+                if req_state is None:
+                    # Ignore output for already-aborted request.
+                    continue
+                new_token_ids = token_ids[offsets[i]:offsets[i + 1]]
+
+                # 1) Compute stats for this iteration.
+                if iteration_stats is not None:
+                    assert engine_core_timestamp is not None
+                    assert req_state.stats is not None
+                    iteration_stats.update_from_new_tokens(
+                        len(new_token_ids), engine_core_timestamp,
+                        req_state.is_prefilling, req_state.prompt_len,
+                        req_state.stats)
+
+                new_tokens.append(
+                    (req_state, new_token_ids, None, None, False))
+                if isinstance(req_state.detokenizer,
+                              PooledIncrementalDetokenizer):
+                    pool_updates.append((req_id, new_token_ids, False, False))
+
+        # 2) Detokenize the token ids into text and perform stop checks.
+        results = iter(await detokenizer_pool.update(pool_updates))
+
+        request_outputs: list[RequestOutput] = []
+        reqs_to_abort: list[str] = []
+        for (req_state, new_token_ids, finish_reason, stop_reason,
+             finished_in_engine) in new_tokens:
+            detokenizer = req_state.detokenizer
+            if isinstance(detokenizer, PooledIncrementalDetokenizer):
+                stop_string = detokenizer.apply(new_token_ids, *next(results))
+            else:
+                stop_string = detokenizer.update(
+                    new_token_ids, finish_reason == FinishReason.STOP)
+
+            if self.request_states.get(req_state.request_id) is not req_state:
+                # Request was aborted while it was detokenized.
+                continue
+
+            # 3) Create the RequestOutput.
+            self._handle_new_tokens(req_state, new_token_ids, finish_reason,
+                                    stop_reason, stop_string,
+                                    finished_in_engine, request_outputs,
+                                    reqs_to_abort, iteration_stats)
 
         self.lora_states.update_iteration_stats(iteration_stats)
 
@@ -383,6 +517,71 @@ class OutputProcessor:
             reqs_to_abort=reqs_to_abort,
         )
 
+    def _process_new_tokens(
+        self,
+        req_state: RequestState,
+        new_token_ids: list[int],
+        finish_reason: Optional[FinishReason],
+        stop_reason: Union[int, str, None],
+        finished_in_engine: bool,
+        request_outputs: list[RequestOutput],
+        reqs_to_abort: list[str],
+        iteration_stats: Optional[IterationStats],
+    ) -> None:
+        # Detokenize the token ids into text and perform stop checks.
+        stop_string = req_state.detokenizer.update(
+            new_token_ids, finish_reason == FinishReason.STOP)
+
+        self._handle_new_tokens(req_state, new_token_ids, finish_reason,
+                                stop_reason, stop_string, finished_in_engine,
+                                request_outputs, reqs_to_abort,
+                                iteration_stats)
+
+    def _handle_new_tokens(
+        self,
+        req_state: RequestState,
+        new_token_ids: list[int],
+        finish_reason: Optional[FinishReason],
+        stop_reason: Union[int, str, None],
+        stop_string: Optional[str],
+        finished_in_engine: bool,
+        request_outputs: list[RequestOutput],
+        reqs_to_abort: list[str],
+        iteration_stats: Optional[IterationStats],
+    ) -> None:
+        req_state.is_prefilling = False
+
+        if stop_string:
+            finish_reason = FinishReason.STOP
+            stop_reason = stop_string
+
+        # Create and handle RequestOutput objects.
+        if request_output := req_state.make_request_output(
+                new_token_ids, finish_reason, stop_reason):
+            if req_state.queue is not None:
+                # AsyncLLM: put into queue for handling by generate().
+                req_state.queue.put(request_output)
+            else:
+                # LLMEngine: return list of RequestOutputs.
+                request_outputs.append(request_output)
+
+        # Free completed requests.
+        if finish_reason is not None:
+            req_id = req_state.request_id
+            self.request_states.pop(req_id)
+            # Remove parent request if applicable.
+            parent_req = req_state.parent_req
+            if parent_req and not parent_req.child_requests:
+                self.parent_requests.pop(parent_req.request_id, None)
+            if not finished_in_engine:
+                # If req not finished in EngineCore, but Detokenizer
+                # detected stop string, abort needed in EngineCore.
+                reqs_to_abort.append(req_id)
+
+            # Track per-request stats
+            self._update_stats_from_finished(req_state, finish_reason,
+                                             iteration_stats)
+
     def _update_stats_from_output(self, req_state: RequestState,
                                   engine_core_output: EngineCoreOutput,
                                   engine_core_timestamp: Optional[float],
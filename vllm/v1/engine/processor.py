@@ -2,7 +2,7 @@
 
 import time
 from collections.abc import Mapping, Sequence
-from typing import Literal, Optional, Union
+from typing import Any, Literal, Optional, Union
 
 from vllm.config import VllmConfig
 from vllm.inputs import ProcessorInputs, PromptType, SingletonInputs
@@ -16,7 +16,7 @@ from vllm.multimodal.processing import EncDecMultiModalProcessor
 from vllm.multimodal.utils import merge_and_sort_multimodal_metadata
 from vllm.pooling_params import PoolingParams
 from vllm.prompt_adapter.request import PromptAdapterRequest
-from vllm.sampling_params import SamplingParams
+from vllm.sampling_params import GuidedDecodingParams, SamplingParams
 from vllm.transformers_utils.tokenizer_group import BaseTokenizerGroup
 from vllm.v1.engine import EngineCoreRequest
 from vllm.v1.engine.mm_input_cache import MirroredProcessingCache
@@ -24,6 +24,7 @@ from vllm.v1.structured_output.backend_guidance import (
     validate_guidance_grammar)
 from vllm.v1.structured_output.backend_xgrammar import (
     validate_xgrammar_grammar)
+from vllm.v1.structured_output.request import get_structured_output_key
 
 
 class Processor:
@@ -50,11 +51,6 @@ class Processor:
 
         self.mm_input_cache_client = MirroredProcessingCache(self.model_config)
 
-        # Multi-modal hasher (for images)
-        self.use_hash = (
-            not self.model_config.disable_mm_preprocessor_cache) or \
-            self.cache_config.enable_prefix_caching
-
     def _validate_logprobs(
         self,
         params: SamplingParams,
@@ -191,6 +187,22 @@ class Processor:
                 # are not supported in xgrammar. Fall back to guidance.
                 params.guided_decoding.backend = "guidance"
 
+    def get_json_schema_grammars(
+        self, json_schemas: Sequence[Union[str, dict[str, Any]]]
+    ) -> list[tuple[str, str, str]]:
+        """Validate JSON schemas to precompile, and get the (backend name,
+        request type name, grammar spec) of their grammars."""
+        grammars: list[tuple[str, str, str]] = []
+        for json_schema in json_schemas:
+            params = SamplingParams(guided_decoding=GuidedDecodingParams(
+                json=json_schema))
+            self._validate_structured_output(params)
+            assert params.guided_decoding is not None
+            request_type, grammar_spec = get_structured_output_key(params)
+            grammars.append((params.guided_decoding.backend_name,
+                             request_type.name, grammar_spec))
+        return grammars
+
     def process_inputs(
         self,
         request_id: str,
@@ -207,8 +219,10 @@ class Processor:
         # TODO(woosuk): Support encoder-decoder models.
         self._validate_lora(lora_request)
         self._validate_params(params)
-        if priority != 0:
-            raise ValueError("V1 does not support priority yet.")
+        if (priority != 0
+                and self.vllm_config.scheduler_config.policy == "fcfs"):
+            raise ValueError(f"Got priority {priority} but "
+                             "Priority scheduling is not enabled.")
         if trace_headers is not None:
             raise ValueError("V1 does not support tracing yet.")
         if prompt_adapter_request is not None:
@@ -226,7 +240,9 @@ class Processor:
             prompt,
             lora_request=lora_request,
             prompt_adapter_request=prompt_adapter_request,
-            return_mm_hashes=self.use_hash,
+            # The hashes of the multimodal inputs are always needed, since
+            # they are the keys of the encoder cache.
+            return_mm_hashes=True,
         )
         from vllm.platforms import current_platform
         current_platform.validate_request(
@@ -273,7 +289,7 @@ class Processor:
                 sorted_mm_hashes,
             ) = merge_and_sort_multimodal_metadata(
                 decoder_inputs["mm_placeholders"],
-                decoder_inputs["mm_hashes"] if self.use_hash else None,
+                decoder_inputs["mm_hashes"],
             )
 
             # The output of merged multi-modal processor (`decoder_mm_inputs`)
@@ -316,6 +332,7 @@ class Processor:
             eos_token_id=eos_token_id,
             arrival_time=arrival_time,
             lora_request=lora_request,
+            priority=priority,
         )
 
     def _validate_model_inputs(self,
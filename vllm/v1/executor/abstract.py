@@ -1,7 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
-from concurrent.futures import Future
-from typing import Callable, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
 
 import torch
 import torch.distributed as dist
@@ -12,6 +12,7 @@ from vllm.executor.uniproc_executor import (  # noqa
     ExecutorWithExternalLauncher as ExecutorWithExternalLauncherV0)
 from vllm.executor.uniproc_executor import (  # noqa
     UniProcExecutor as UniProcExecutorV0)
+from vllm.utils import run_method
 from vllm.v1.kv_cache_interface import KVCacheConfig, KVCacheSpec
 from vllm.v1.outputs import ModelRunnerOutput
 
@@ -89,14 +90,51 @@ class Executor(ExecutorBase):
 
     @property
     def max_concurrent_batches(self) -> int:
-        return 1
+        # With async scheduling, the next batch is scheduled while the
+        # current batch is executed.
+        return 2 if self.scheduler_config.async_scheduling else 1
 
     def profile(self, is_start: bool = True):
         self.collective_rpc("profile", args=(is_start, ))
 
 
 class UniProcExecutor(UniProcExecutorV0, Executor):
-    pass
+
+    def _init_executor(self) -> None:
+        # With async scheduling, the worker runs on a dedicated thread, so
+        # that the engine can schedule the next batch while the current
+        # batch is executed. All the calls to the worker run on this thread
+        # since the current device is set per thread.
+        self.worker_thread_pool: Optional[ThreadPoolExecutor] = None
+        if self.scheduler_config.async_scheduling:
+            self.worker_thread_pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="UniProcWorker")
+        super()._init_executor()
+
+    def collective_rpc(self,
+                       method: Union[str, Callable],
+                       timeout: Optional[float] = None,
+                       args: tuple = (),
+                       kwargs: Optional[dict] = None) -> list[Any]:
+        if self.worker_thread_pool is None:
+            return super().collective_rpc(method, timeout, args, kwargs)
+        return self.worker_thread_pool.submit(super().collective_rpc, method,
+                                              timeout, args, kwargs).result()
+
+    def execute_model(
+        self,
+        scheduler_output,
+    ) -> Union[ModelRunnerOutput, Future[ModelRunnerOutput]]:
+        if self.worker_thread_pool is None:
+            return super().execute_model(scheduler_output)
+        return self.worker_thread_pool.submit(run_method, self.driver_worker,
+                                              "execute_model",
+                                              (scheduler_output, ), {})
+
+    def shutdown(self) -> None:
+        worker_thread_pool = getattr(self, "worker_thread_pool", None)
+        if worker_thread_pool is not None:
+            worker_thread_pool.shutdown(wait=False)
 
 
 class ExecutorWithExternalLauncher(ExecutorWithExternalLauncherV0, Executor):
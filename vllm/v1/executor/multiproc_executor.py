@@ -8,7 +8,7 @@ import threading
 import time
 import traceback
 import weakref
-from concurrent.futures import Future
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum, auto
 from functools import partial
@@ -50,6 +50,13 @@ class MultiprocExecutor(Executor):
         self.is_failed = False
         self.shutdown_event = threading.Event()
         self.failure_callback: Optional[FailureCallback] = None
+        # With async scheduling, the responses of the workers are received
+        # by this thread, so that the engine can schedule the next batch
+        # while the current batch is executed.
+        self.io_thread_pool: Optional[ThreadPoolExecutor] = None
+        if self.max_concurrent_batches > 1:
+            self.io_thread_pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="MultiprocExecutorIO")
 
         self.world_size = self.parallel_config.world_size
         tensor_parallel_size = self.parallel_config.tensor_parallel_size
@@ -143,11 +150,27 @@ class MultiprocExecutor(Executor):
         self,
         scheduler_output,
     ) -> Union[ModelRunnerOutput, Future[ModelRunnerOutput]]:
-        (output, ) = self.collective_rpc("execute_model",
-                                         args=(scheduler_output, ),
-                                         rank0_reply_only=True,
-                                         timeout=EXECUTE_MODEL_TIMEOUT_S)
-        return output
+        if self.io_thread_pool is None:
+            (output, ) = self.collective_rpc("execute_model",
+                                             args=(scheduler_output, ),
+                                             rank0_reply_only=True,
+                                             timeout=EXECUTE_MODEL_TIMEOUT_S)
+            return output
+
+        # Do not wait for the outputs: the IO thread receives them, after
+        # the responses of the batches in flight.
+        get_response = self._send_rpc("execute_model", (scheduler_output, ),
+                                      timeout=EXECUTE_MODEL_TIMEOUT_S,
+                                      rank0_reply_only=True)
+
+        def get_output() -> ModelRunnerOutput:
+            try:
+                return get_response()[0]
+            except TimeoutError as e:
+                raise TimeoutError(
+                    "RPC call to execute_model timed out.") from e
+
+        return self.io_thread_pool.submit(get_output)
 
     def collective_rpc(self,
                        method: Union[str, Callable],
@@ -155,6 +178,26 @@ class MultiprocExecutor(Executor):
                        args: tuple = (),
                        kwargs: Optional[dict] = None,
                        rank0_reply_only: bool = False) -> list[Any]:
+        try:
+            get_response = self._send_rpc(method, args, kwargs, timeout,
+                                          rank0_reply_only)
+            if self.io_thread_pool is None:
+                return get_response()
+            # The responses of the batches in flight must be received first.
+            return self.io_thread_pool.submit(get_response).result()
+        except TimeoutError as e:
+            raise TimeoutError(f"RPC call to {method} timed out.") from e
+
+    def _send_rpc(
+        self,
+        method: Union[str, Callable],
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        timeout: Optional[float] = None,
+        rank0_reply_only: bool = False,
+    ) -> Callable[[], list[Any]]:
+        """Broadcast the RPC to the workers and return a function that
+        receives their responses."""
         start_time = time.monotonic()
         kwargs = kwargs or {}
 
@@ -164,33 +207,33 @@ class MultiprocExecutor(Executor):
         # NOTE: If the args are heterogeneous, then we pack them into a list,
         # and unpack them in the method of every worker, because every worker
         # knows their own rank.
-        try:
-            if isinstance(method, str):
-                send_method = method
-            else:
-                send_method = cloudpickle.dumps(
-                    method, protocol=pickle.HIGHEST_PROTOCOL)
-            self.rpc_broadcast_mq.enqueue(
-                (send_method, args, kwargs, rank0_reply_only))
+        if isinstance(method, str):
+            send_method = method
+        else:
+            send_method = cloudpickle.dumps(method,
+                                            protocol=pickle.HIGHEST_PROTOCOL)
+        self.rpc_broadcast_mq.enqueue(
+            (send_method, args, kwargs, rank0_reply_only))
 
-            workers = (self.workers[0], ) if rank0_reply_only else self.workers
+        workers = (self.workers[0], ) if rank0_reply_only else self.workers
+
+        def get_response() -> list[Any]:
             responses = [None] * len(workers)
             for w in workers:
-                dequeue_timeout = timeout - (time.monotonic() - start_time
-                                             ) if timeout is not None else None
+                dequeue_timeout = (timeout - (time.monotonic() - start_time)
+                                   if timeout is not None else None)
                 status, result = w.worker_response_mq.dequeue(
                     timeout=dequeue_timeout, cancel=self.shutdown_event)
 
                 if status != WorkerProc.ResponseStatus.SUCCESS:
                     raise RuntimeError(
-                        f"Worker failed with error '{result}', please check the"
-                        " stack trace above for the root cause")
+                        f"Worker failed with error '{result}', please "
+                        "check the stack trace above for the root cause")
 
                 responses[w.rank] = result
-
             return responses
-        except TimeoutError as e:
-            raise TimeoutError(f"RPC call to {method} timed out.") from e
+
+        return get_response
 
     @staticmethod
     def _ensure_worker_termination(worker_procs: list[BaseProcess]):
@@ -225,6 +268,8 @@ class MultiprocExecutor(Executor):
         if not getattr(self, 'shutting_down', False):
             self.shutting_down = True
             self.shutdown_event.set()
+            if self.io_thread_pool is not None:
+                self.io_thread_pool.shutdown(wait=False)
             for w in self.workers:
                 w.worker_response_mq = None
             self._ensure_worker_termination([w.proc for w in self.workers])
@@ -22,8 +22,11 @@ _LOCAL_LOGGING_INTERVAL_SEC = 5.0
 class StatLoggerBase(ABC):
 
     @abstractmethod
-    def record(self, scheduler_stats: SchedulerStats,
+    def record(self, scheduler_stats: Optional[SchedulerStats],
                iteration_stats: Optional[IterationStats]):
+        """Record the stats of a step. The scheduler stats are None when
+        the outputs come without them, e.g., in the API servers other than
+        the first one when multiple API servers share an engine."""
         ...
 
     def log(self):  # noqa
@@ -60,13 +63,16 @@ class LoggingStatLogger(StatLoggerBase):
         # Compute summary metrics for tracked stats
         return float(np.sum(tracked_stats) / (now - self.last_log_time))
 
-    def record(self, scheduler_stats: SchedulerStats,
+    def record(self, scheduler_stats: Optional[SchedulerStats],
                iteration_stats: Optional[IterationStats]):
         """Log Stats to standard output."""
 
         if iteration_stats:
             self._track_iteration_stats(iteration_stats)
 
+        if scheduler_stats is None:
+            return
+
         self.prefix_caching_metrics.observe(scheduler_stats.prefix_cache_stats)
 
         if scheduler_stats.spec_decoding_stats is not None:
@@ -139,11 +145,33 @@ class PrometheusStatLogger(StatLoggerBase):
         self.gauge_scheduler_running = prometheus_client.Gauge(
             name="vllm:num_requests_running",
             documentation="Number of requests in model execution batches.",
+            multiprocess_mode="mostrecent",
             labelnames=labelnames).labels(*labelvalues)
 
         self.gauge_scheduler_waiting = prometheus_client.Gauge(
             name="vllm:num_requests_waiting",
             documentation="Number of requests waiting to be processed.",
+            multiprocess_mode="mostrecent",
+            labelnames=labelnames).labels(*labelvalues)
+
+        self.gauge_scheduler_token_budget = prometheus_client.Gauge(
+            name="vllm:scheduler_token_budget",
+            documentation="Max number of tokens of the last scheduled step.",
+            multiprocess_mode="mostrecent",
+            labelnames=labelnames).labels(*labelvalues)
+
+        self.gauge_step_time_intercept = prometheus_client.Gauge(
+            name="vllm:step_time_model_intercept_seconds",
+            documentation="Fixed time of a step in the step time model of "
+            "the scheduler.",
+            multiprocess_mode="mostrecent",
+            labelnames=labelnames).labels(*labelvalues)
+
+        self.gauge_step_time_per_token = prometheus_client.Gauge(
+            name="vllm:step_time_model_per_token_seconds",
+            documentation="Time per scheduled token of a step in the step "
+            "time model of the scheduler.",
+            multiprocess_mode="mostrecent",
             labelnames=labelnames).labels(*labelvalues)
 
         #
@@ -152,6 +180,7 @@ class PrometheusStatLogger(StatLoggerBase):
         self.gauge_gpu_cache_usage = prometheus_client.Gauge(
             name="vllm:gpu_cache_usage_perc",
             documentation="GPU KV-cache usage. 1 means 100 percent usage.",
+            multiprocess_mode="mostrecent",
             labelnames=labelnames).labels(*labelvalues)
 
         self.counter_gpu_prefix_cache_queries = prometheus_client.Counter(
@@ -166,6 +195,12 @@ class PrometheusStatLogger(StatLoggerBase):
             "GPU prefix cache hits, in terms of number of cached blocks.",
             labelnames=labelnames).labels(*labelvalues)
 
+        self.counter_gpu_prefix_cache_evictions = prometheus_client.Counter(
+            name="vllm:gpu_prefix_cache_evictions",
+            documentation=
+            "GPU prefix cache evictions, in terms of number of cached blocks.",
+            labelnames=labelnames).labels(*labelvalues)
+
         #
         # Counters
         #
@@ -195,6 +230,27 @@ class PrometheusStatLogger(StatLoggerBase):
                 reason] = counter_request_success_base.labels(*(labelvalues +
                                                                 [str(reason)]))
 
+        self.counter_request_ttft_slo = prometheus_client.Counter(
+            name="vllm:request_ttft_slo_total",
+            documentation="Count of finished requests with a time to first "
+            "token target.",
+            labelnames=labelnames).labels(*labelvalues)
+        self.counter_request_ttft_slo_missed = prometheus_client.Counter(
+            name="vllm:request_ttft_slo_missed_total",
+            documentation="Count of finished requests that missed their time "
+            "to first token target.",
+            labelnames=labelnames).labels(*labelvalues)
+        self.counter_request_tpot_slo = prometheus_client.Counter(
+            name="vllm:request_tpot_slo_total",
+            documentation="Count of finished requests with a time per "
+            "output token target.",
+            labelnames=labelnames).labels(*labelvalues)
+        self.counter_request_tpot_slo_missed = prometheus_client.Counter(
+            name="vllm:request_tpot_slo_missed_total",
+            documentation="Count of finished requests that missed their time "
+            "per output token target on average.",
+            labelnames=labelnames).labels(*labelvalues)
+
         #
         # Histograms of counts
         #
@@ -317,6 +373,7 @@ class PrometheusStatLogger(StatLoggerBase):
                 prometheus_client.Gauge(
                     name="vllm:lora_requests_info",
                     documentation="Running stats on lora requests.",
+                    multiprocess_mode="livemostrecent",
                     labelnames=[
                         self.labelname_max_lora,
                         self.labelname_waiting_lora_adapters,
@@ -361,14 +418,18 @@ class PrometheusStatLogger(StatLoggerBase):
         info_gauge = prometheus_client.Gauge(
             name=name,
             documentation=documentation,
+            multiprocess_mode="mostrecent",
             labelnames=metrics_info.keys()).labels(**metrics_info)
         info_gauge.set(1)
 
-    def record(self, scheduler_stats: SchedulerStats,
-               iteration_stats: Optional[IterationStats]):
-        """Log to prometheus."""
+    def _record_scheduler_stats(self, scheduler_stats: SchedulerStats):
         self.gauge_scheduler_running.set(scheduler_stats.num_running_reqs)
         self.gauge_scheduler_waiting.set(scheduler_stats.num_waiting_reqs)
+        self.gauge_scheduler_token_budget.set(scheduler_stats.token_budget)
+        if scheduler_stats.step_time_model is not None:
+            intercept, per_token = scheduler_stats.step_time_model
+            self.gauge_step_time_intercept.set(intercept)
+            self.gauge_step_time_per_token.set(per_token)
 
         self.gauge_gpu_cache_usage.set(scheduler_stats.gpu_cache_usage)
 
@@ -376,6 +437,8 @@ class PrometheusStatLogger(StatLoggerBase):
             scheduler_stats.prefix_cache_stats.queries)
         self.counter_gpu_prefix_cache_hits.inc(
             scheduler_stats.prefix_cache_stats.hits)
+        self.counter_gpu_prefix_cache_evictions.inc(
+            scheduler_stats.prefix_cache_stats.evictions)
 
         if scheduler_stats.spec_decoding_stats is not None:
             self.counter_spec_decode_num_draft_tokens.inc(
@@ -383,6 +446,12 @@ class PrometheusStatLogger(StatLoggerBase):
             self.counter_spec_decode_num_accepted_tokens.inc(
                 scheduler_stats.spec_decoding_stats.num_accepted_tokens)
 
+    def record(self, scheduler_stats: Optional[SchedulerStats],
+               iteration_stats: Optional[IterationStats]):
+        """Log to prometheus."""
+        if scheduler_stats is not None:
+            self._record_scheduler_stats(scheduler_stats)
+
         if iteration_stats is None:
             return
 
@@ -422,6 +491,14 @@ class PrometheusStatLogger(StatLoggerBase):
                 finished_request.num_generation_tokens)
             self.histogram_max_tokens_request.observe(
                 finished_request.max_tokens_param)
+            if finished_request.ttft_slo_missed is not None:
+                self.counter_request_ttft_slo.inc()
+                if finished_request.ttft_slo_missed:
+                    self.counter_request_ttft_slo_missed.inc()
+            if finished_request.tpot_slo_missed is not None:
+                self.counter_request_tpot_slo.inc()
+                if finished_request.tpot_slo_missed:
+                    self.counter_request_tpot_slo_missed.inc()
 
         if self.gauge_lora_info is not None:
             running_lora_adapters = \
@@ -23,6 +23,8 @@ class PrefixCacheStats:
     queries: int = 0
     # The number of hits in these requests.
     hits: int = 0
+    # The number of cached blocks evicted during this update.
+    evictions: int = 0
 
 
 @dataclass
@@ -39,6 +41,11 @@ class SchedulerStats:
 
     spec_decoding_stats: Optional[SpecDecodingStats] = None
 
+    # The token budget of the last step, and the fitted (intercept,
+    # per-token) parameters of the step time model, in seconds.
+    token_budget: int = 0
+    step_time_model: Optional[tuple[float, float]] = None
+
 
 @dataclass
 class LoRAStats:
@@ -61,6 +68,11 @@ class RequestStateStats:
     first_token_ts: float = 0.0
     last_token_ts: float = 0.0
 
+    # The latency targets of the request in seconds, if any.
+    ttft_slo: Optional[float] = None
+    tpot_slo: Optional[float] = None
+    first_token_latency: float = 0.0
+
 
 @dataclass
 class FinishedRequestStats:
@@ -75,6 +87,10 @@ class FinishedRequestStats:
     prefill_time: float = 0.0
     inference_time: float = 0.0
     decode_time: float = 0.0
+    # Whether the request missed its latency targets, or None if the
+    # request has no target.
+    ttft_slo_missed: Optional[bool] = None
+    tpot_slo_missed: Optional[bool] = None
 
 
 class IterationStats:
@@ -101,8 +117,19 @@ class IterationStats:
                            engine_core_timestamp: float, is_prefilling: bool,
                            prompt_len: int, req_stats: RequestStateStats,
                            lora_stats: Optional[LoRAStats]):
-        num_new_generation_tokens = len(output.new_token_ids)
+        # Process request-level engine core events
+        if output.events is not None:
+            self.update_from_events(output.request_id, output.events,
+                                    is_prefilling, req_stats, lora_stats)
+
+        self.update_from_new_tokens(len(output.new_token_ids),
+                                    engine_core_timestamp, is_prefilling,
+                                    prompt_len, req_stats)
 
+    def update_from_new_tokens(self, num_new_generation_tokens: int,
+                               engine_core_timestamp: float,
+                               is_prefilling: bool, prompt_len: int,
+                               req_stats: RequestStateStats):
         self.num_generation_tokens += num_new_generation_tokens
         if is_prefilling:
             assert num_new_generation_tokens > 0
@@ -110,14 +137,10 @@ class IterationStats:
 
             first_token_latency = self._time_since(req_stats.arrival_time)
             self.time_to_first_tokens_iter.append(first_token_latency)
+            req_stats.first_token_latency = first_token_latency
 
         req_stats.num_generation_tokens += num_new_generation_tokens
 
-        # Process request-level engine core events
-        if output.events is not None:
-            self.update_from_events(output.request_id, output.events,
-                                    is_prefilling, req_stats, lora_stats)
-
         # Process the batch-level "new tokens" engine core event
         if is_prefilling:
             req_stats.first_token_ts = engine_core_timestamp
@@ -166,6 +189,17 @@ class IterationStats:
         # Any preemptions during prefill or decode are included
         inference_time = req_stats.last_token_ts - req_stats.scheduled_ts
 
+        ttft_slo_missed = None
+        if req_stats.ttft_slo is not None:
+            ttft_slo_missed = (req_stats.num_generation_tokens == 0
+                               or req_stats.first_token_latency
+                               > req_stats.ttft_slo)
+        tpot_slo_missed = None
+        if (req_stats.tpot_slo is not None
+                and req_stats.num_generation_tokens > 1):
+            mean_tpot = decode_time / (req_stats.num_generation_tokens - 1)
+            tpot_slo_missed = mean_tpot > req_stats.tpot_slo
+
         finished_req = \
             FinishedRequestStats(finish_reason=finish_reason,
                                  e2e_latency=e2e_latency,
@@ -175,7 +209,9 @@ class IterationStats:
                                  queued_time=queued_time,
                                  prefill_time=prefill_time,
                                  inference_time=inference_time,
-                                 decode_time=decode_time)
+                                 decode_time=decode_time,
+                                 ttft_slo_missed=ttft_slo_missed,
+                                 tpot_slo_missed=tpot_slo_missed)
         self.finished_requests.append(finished_req)
 
 
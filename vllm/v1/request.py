@@ -30,8 +30,13 @@ class Request:
         arrival_time: float,
         lora_request: Optional["LoRARequest"] = None,
         structured_output_request: Optional["StructuredOutputRequest"] = None,
+        priority: int = 0,
     ) -> None:
         self.request_id = request_id
+        self.arrival_time = arrival_time
+        # Lower value means higher priority. Only used by the non-FCFS
+        # scheduling policies.
+        self.priority = priority
         self.sampling_params = sampling_params
         # Because of LoRA, the eos token id can be different for each request.
         self.eos_token_id = eos_token_id
@@ -53,6 +58,10 @@ class Request:
         self._all_token_ids: list[int] = self.prompt_token_ids.copy()
         self.spec_token_ids: list[int] = []
         self.num_computed_tokens = 0
+        # With async scheduling, the number of tokens that the steps in
+        # flight will generate. Their positions are already counted in
+        # num_computed_tokens, but the tokens are not known yet.
+        self.num_output_placeholders = 0
 
         # Multi-modal related
         self.mm_positions = multi_modal_placeholders or []
@@ -92,6 +101,7 @@ class Request:
             lora_request=request.lora_request,
             structured_output_request=StructuredOutputRequest(
                 sampling_params=request.sampling_params),
+            priority=request.priority,
         )
 
     def append_output_token_ids(
@@ -41,3 +41,9 @@ class SamplingMetadata:
 
     # req_index -> bad_words_token_ids
     bad_words_token_ids: dict[int, list[list[int]]]
+
+    # `output_bin_counts` is a 2D int tensor of shape (batch size, vocab size)
+    # with the counts of the output tokens of the requests, if they are
+    # maintained incrementally. Otherwise, the penalties are computed from
+    # `output_token_ids`.
+    output_bin_counts: Optional[torch.Tensor] = None
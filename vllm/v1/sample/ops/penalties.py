@@ -1,8 +1,11 @@
 # SPDX-License-Identifier: Apache-2.0
 
+from typing import Optional
+
 import torch
 
-from vllm.model_executor.layers.utils import apply_penalties
+from vllm.model_executor.layers.utils import (apply_penalties,
+                                              apply_penalties_from_bin_counts)
 from vllm.utils import is_pin_memory_available, make_tensor_with_pad
 
 
@@ -29,10 +32,20 @@ def apply_all_penalties(
     frequency_penalties: torch.Tensor,
     repetition_penalties: torch.Tensor,
     output_token_ids: list[list[int]],
+    output_bin_counts: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
     """
     Applies presence, frequency and repetition penalties to the logits.
+
+    When the counts of the output tokens are maintained by the caller in
+    `output_bin_counts`, they are used instead of the output token ids.
     """
+    if output_bin_counts is not None:
+        return apply_penalties_from_bin_counts(logits, prompt_token_ids,
+                                               output_bin_counts,
+                                               presence_penalties,
+                                               frequency_penalties,
+                                               repetition_penalties)
     _, vocab_size = logits.shape
     output_tokens_t = _convert_to_tensors(output_token_ids, vocab_size,
                                           logits.device)
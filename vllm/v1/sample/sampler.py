@@ -197,6 +197,7 @@ class Sampler(nn.Module):
                 sampling_metadata.frequency_penalties,
                 sampling_metadata.repetition_penalties,
                 sampling_metadata.output_token_ids,
+                sampling_metadata.output_bin_counts,
             )
         return logits
 
@@ -20,10 +20,12 @@ from vllm.multimodal.inputs import (BaseMultiModalField,
                                     MultiModalFlatField, MultiModalKwargs,
                                     MultiModalKwargsItem,
                                     MultiModalSharedField, NestedTensors)
+from vllm.v1.shm_arena import SharedMemoryArena
 
 CUSTOM_TYPE_PICKLE = 1
 CUSTOM_TYPE_CLOUDPICKLE = 2
 CUSTOM_TYPE_RAW_VIEW = 3
+CUSTOM_TYPE_SHM = 4
 
 # MultiModalField class serialization type map.
 # These need to list all possible field types and match them
@@ -45,17 +47,29 @@ class MsgpackEncoder:
 
     By default, arrays below 256B are serialized inline Larger will get sent 
     via dedicated messages. Note that this is a per-tensor limit.
+
+    If a shared memory arena is given, tensors of at least
+    `shm_size_threshold` bytes are copied to the arena, and only their
+    handles are sent. The tensors that do not fit in the arena are sent via
+    dedicated messages.
     """
 
-    def __init__(self, size_threshold: Optional[int] = None):
+    def __init__(self,
+                 size_threshold: Optional[int] = None,
+                 shm_arena: Optional[SharedMemoryArena] = None,
+                 shm_size_threshold: Optional[int] = None):
         if size_threshold is None:
             size_threshold = envs.VLLM_MSGPACK_ZERO_COPY_THRESHOLD
+        if shm_size_threshold is None:
+            shm_size_threshold = envs.VLLM_MM_SHM_ARENA_THRESHOLD
         self.encoder = msgpack.Encoder(enc_hook=self.enc_hook)
         # This is used as a local stash of buffers that we can then access from
         # our custom `msgspec` hook, `enc_hook`. We don't have a way to
         # pass custom data to the hook otherwise.
         self.aux_buffers: Optional[list[bytestr]] = None
         self.size_threshold = size_threshold
+        self.shm_arena = shm_arena
+        self.shm_size_threshold = max(shm_size_threshold, size_threshold)
 
     def encode(self, obj: Any) -> Sequence[bytestr]:
         try:
@@ -144,6 +158,11 @@ class MsgpackEncoder:
         if obj.nbytes < self.size_threshold:
             # Smaller tensors are encoded inline, just like ndarrays.
             data = msgpack.Ext(CUSTOM_TYPE_RAW_VIEW, arr.data)
+        elif (self.shm_arena is not None
+              and obj.nbytes >= self.shm_size_threshold
+              and (handle := self.shm_arena.write(arr.data)) is not None):
+            # Large tensors are passed via shared memory when it has space.
+            data = msgpack.Ext(CUSTOM_TYPE_SHM, handle)
         else:
             # Otherwise encode index of backing buffer to avoid copy.
             data = len(self.aux_buffers)
@@ -185,6 +204,8 @@ class MsgpackDecoder:
                                        ext_hook=self.ext_hook,
                                        dec_hook=self.dec_hook)
         self.aux_buffers: Sequence[bytestr] = ()
+        # The shared memory arenas of the encoders, opened on first use.
+        self.shm_arenas: dict[str, SharedMemoryArena] = {}
 
     def decode(self, bufs: Union[bytestr, Sequence[bytestr]]) -> Any:
         if isinstance(bufs, (bytes, bytearray, memoryview, zmq.Frame)):
@@ -226,9 +247,14 @@ class MsgpackDecoder:
         dtype, shape, data = arr
         # Copy from inline representation, to decouple the memory storage
         # of the message from the original buffer. And also make Torch
-        # not complain about a readonly memoryview.
-        buffer = self.aux_buffers[data] if isinstance(data, int) \
-            else bytearray(data)
+        # not complain about a readonly memoryview. The tensors in shared
+        # memory are not copied.
+        if isinstance(data, int):
+            buffer = self.aux_buffers[data]
+        elif isinstance(data, np.ndarray):
+            buffer = data
+        else:
+            buffer = bytearray(data)
         # Create numpy wrapper around the bytes
         arr = np.ndarray(buffer=buffer, dtype=np.uint8, shape=(len(buffer), ))
         torch_dtype = getattr(torch, dtype)
@@ -236,6 +262,13 @@ class MsgpackDecoder:
         # Convert back to proper shape & type
         return torch.from_numpy(arr).view(torch_dtype).view(shape)
 
+    def _read_shm(self, handle: memoryview) -> np.ndarray:
+        name = SharedMemoryArena.get_name(handle)
+        arena = self.shm_arenas.get(name)
+        if arena is None:
+            arena = self.shm_arenas[name] = SharedMemoryArena(name=name)
+        return arena.read(handle)
+
     def _decode_mm_items(self, obj: list) -> list[MultiModalKwargsItem]:
         decoded_items = []
         for item in obj:
@@ -265,6 +298,8 @@ class MsgpackDecoder:
     def ext_hook(self, code: int, data: memoryview) -> Any:
         if code == CUSTOM_TYPE_RAW_VIEW:
             return data
+        if code == CUSTOM_TYPE_SHM:
+            return self._read_shm(data)
         if code == CUSTOM_TYPE_PICKLE:
             return pickle.loads(data)
         if code == CUSTOM_TYPE_CLOUDPICKLE:
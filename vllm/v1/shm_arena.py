@@ -0,0 +1,130 @@
+# SPDX-License-Identifier: Apache-2.0
+"""Shared memory arena for passing large tensors between the frontend and the
+engine core processes without copying them through the sockets."""
+
+import contextlib
+import struct
+import weakref
+from multiprocessing import shared_memory
+from typing import Optional, Union
+from unittest.mock import patch
+
+import numpy as np
+
+# Each allocation starts with a header that holds its state, and the data
+# that follows is aligned to the header size.
+_HEADER_SIZE = 64
+_FREED = 0
+_ALLOCATED = 1
+
+# offset, nbytes, followed by the name of the shared memory.
+_HANDLE_FORMAT = "<QQ"
+_HANDLE_SIZE = struct.calcsize(_HANDLE_FORMAT)
+
+
+class SharedMemoryArena:
+    """A region of shared memory where one process (the writer) puts tensors
+    that other processes (the readers) map without a copy.
+
+    The writer allocates the space of each tensor with first fit, copies the
+    data in, and sends a small handle to the readers instead of the data.
+    A reader wraps the space of the handle in a numpy array, and marks the
+    space as freed when the array (and every view of it) is garbage
+    collected. The writer reclaims the freed space on the next allocations.
+
+    Allocation memory layout:
+        +--------------------------+--------------------------------+
+        | state (_HEADER_SIZE)     | data (rounded to _HEADER_SIZE) |
+        +--------------------------+--------------------------------+
+
+    The state is set to `_ALLOCATED` by the writer and to `_FREED` by the
+    reader, so that the two never write the same byte concurrently. The
+    writer does not wait for the space: when the arena is full, `write`
+    returns None and the caller sends the data in the usual way.
+
+    During creation, `name` is None and the arena is created by the writer.
+    The readers open it from the name carried by the handles.
+    """
+
+    def __init__(self, size: int = 0, name: Optional[str] = None):
+        if name is None:
+            # we are creating the arena
+            self.is_creator = True
+            self.shared_memory = shared_memory.SharedMemory(create=True,
+                                                            size=size)
+            self.size = size
+        else:
+            # we are opening an existing arena
+            self.is_creator = False
+            # Python incorrectly tracks shared memory even if it is not
+            # created by the process. See `ShmRingBuffer`.
+            with patch("multiprocessing.resource_tracker.register",
+                       lambda *args, **kwargs: None):
+                self.shared_memory = shared_memory.SharedMemory(name=name)
+            self.size = self.shared_memory.size
+        self.name = self.shared_memory.name
+        self._name_bytes = self.name.encode()
+        self.buf = self.shared_memory.buf
+        # The (start, end) of the allocations of the writer, sorted by start.
+        self._allocations: list[tuple[int, int]] = []
+
+    def write(self, data: Union[bytes, memoryview]) -> Optional[bytes]:
+        """Copy the data to the arena, and return the handle of the copy, or
+        None if the arena does not have enough free space."""
+        assert self.is_creator, "Only the creator can write to the arena."
+        data = memoryview(data).cast("B")
+        nbytes = data.nbytes
+        size = _HEADER_SIZE + -(-nbytes // _HEADER_SIZE) * _HEADER_SIZE
+
+        # Reclaim the space freed by the readers.
+        buf = self.buf
+        self._allocations = [
+            allocation for allocation in self._allocations
+            if buf[allocation[0]] != _FREED
+        ]
+        # Find the first gap that fits.
+        start = 0
+        index = 0
+        for index, (alloc_start, alloc_end) in enumerate(self._allocations):
+            if alloc_start - start >= size:
+                break
+            start = alloc_end
+        else:
+            index = len(self._allocations)
+            if self.size - start < size:
+                return None
+        self._allocations.insert(index, (start, start + size))
+
+        buf[start] = _ALLOCATED
+        offset = start + _HEADER_SIZE
+        buf[offset:offset + nbytes] = data
+        return struct.pack(_HANDLE_FORMAT, offset, nbytes) + self._name_bytes
+
+    def read(self, handle: Union[bytes, memoryview]) -> np.ndarray:
+        """Map the data of a handle to a uint8 array without a copy. The space
+        is freed when the array is garbage collected."""
+        offset, nbytes = struct.unpack_from(_HANDLE_FORMAT, handle)
+        arr = np.frombuffer(self.buf,
+                            dtype=np.uint8,
+                            count=nbytes,
+                            offset=offset)
+        weakref.finalize(arr, _free, self.buf, offset - _HEADER_SIZE)
+        return arr
+
+    @staticmethod
+    def get_name(handle: Union[bytes, memoryview]) -> str:
+        """Get the name of the arena that a handle belongs to."""
+        return bytes(handle[_HANDLE_SIZE:]).decode()
+
+    def __del__(self):
+        if hasattr(self, "shared_memory"):
+            # Some arrays may still map the arena. The memory is then
+            # released when the process exits.
+            with contextlib.suppress(BufferError):
+                self.shared_memory.close()
+            if self.is_creator:
+                self.shared_memory.unlink()
+
+
+def _free(buf: memoryview, start: int) -> None:
+    buf[start] = _FREED
@@ -1,4 +1,6 @@
 # SPDX-License-Identifier: Apache-2.0
+from collections import deque
+from collections.abc import Sequence
 from typing import Optional
 
 import numpy as np
@@ -6,118 +8,447 @@ from numba import jit
 
 from vllm.config import VllmConfig
 
+# The number of the last tokens of a request that are matched against the
+# shared corpus again when the corpus changes.
+_CORPUS_RESYNC_TOKENS = 256
+# Separates the outputs of the requests in the shared corpus. It is never
+# part of a context, so the matches never span two outputs.
+_SEPARATOR = -1
+
 
 class NgramProposer:
+    """Proposes the tokens that followed the longest earlier occurrence of
+    the last tokens of the context.
+
+    The context of each request is indexed by a suffix automaton, which is
+    extended with the new tokens of each step, instead of scanning the
+    whole context in every step. If `prompt_lookup_corpus_tokens` is set,
+    the proposer also searches a shared corpus of the recent outputs of the
+    finished requests, and proposes the continuation of the longer match.
+    """
 
     def __init__(self, vllm_config: VllmConfig):
+        speculative_config = vllm_config.speculative_config
         # Minimum length of the n-gram to match.
-        self.min_n = vllm_config.speculative_config.prompt_lookup_min
-        # Maximum length of the n-gram to match.
-        self.max_n = vllm_config.speculative_config.prompt_lookup_max
+        self.min_n = speculative_config.prompt_lookup_min
+        # Maximum length of the n-gram to match. Longer matches are cut to
+        # their last max_n tokens.
+        self.max_n = speculative_config.prompt_lookup_max
         # Number of tokens follow the match. If there are less than k
         # tokens follow the match, we will return the maximum amount of
         # tokens until the end.
-        self.k = vllm_config.speculative_config.num_speculative_tokens
+        self.k = speculative_config.num_speculative_tokens
+        self.requests: dict[str, _RequestState] = {}
+        self.corpus: Optional[_Corpus] = None
+        if speculative_config.prompt_lookup_corpus_tokens > 0:
+            self.corpus = _Corpus(
+                speculative_config.prompt_lookup_corpus_tokens)
+
         # Trigger Numba JIT compilation for N-gram proposer.
         # This usually takes less than 1 second.
-        self.propose(np.zeros(1024, dtype=np.int32))
+        self.propose("", np.zeros(1024, dtype=np.int32))
+        if self.corpus is not None:
+            self.corpus.add(np.zeros(1024, dtype=np.int32))
+            self.propose("", np.zeros(1024, dtype=np.int32))
+            self.corpus = _Corpus(self.corpus.max_tokens)
+        self.requests.clear()
 
     def propose(
         self,
+        req_id: str,
         context_token_ids: np.ndarray,
     ) -> Optional[np.ndarray]:
-        """Proposes the next sequence of tokens based on n-gram pattern 
-        matching in the context. The function finds matches of the last n 
-        tokens in the previous context, and returns k tokens that followed 
-        that match.
-        
+        """Proposes the next sequence of tokens based on n-gram pattern
+        matching in the context. The function finds the longest suffix of
+        the context, of min_n to max_n tokens, that occurred earlier in the
+        context or in the shared corpus, and returns the k tokens that
+        followed its first occurrence.
+
+        The context of a request only grows between the calls, so only its
+        new tokens are indexed, in amortized O(1) time per token.
+
         Args:
-            context_token_ids: Numpy array of token IDs representing the 
+            req_id: The ID of the request.
+            context_token_ids: Numpy array of token IDs representing the
                                context sequence.
 
         Returns:
-            np.ndarray: The sequence of tokens that followed 
+            np.ndarray: The sequence of tokens that followed
                         the matched n-gram in the context.
             None: If no matching n-gram pattern is found.
 
         Example:
-            If context_token_ids = [1,2,3,4,2,3], min_n = 2, max_n = 3, and
-            k = 4:
-            - The last 3 (= max_n) tokens [4,2,3] cannot find a match.
-            - The last 2 tokens [2,3] will be matched against the previous 
-              4 tokens [1,2,3,4].
-            - Finding a match of [2,3] would return the tokens that 
-              followed that pattern. Here we will return [4,2,3] because 
+            If context_token_ids = [1,2,3,4,2,3], min_n = 2, and k = 4:
+            - The longest suffix that occurred earlier is [2,3].
+            - Finding a match of [2,3] would return the tokens that
+              followed that pattern. Here we will return [4,2,3] because
               we only have three tokens after the match.
         """
-        # TODO(woosuk): Optimize this.
-        for n in range(self.max_n, self.min_n - 1, -1):
-            result = _find_subarray_kmp(context_token_ids, n, self.k)
-            if result is not None:
-                return result
-        return None
+        state = self.requests.get(req_id)
+        if (state is None
+                or state.automaton.num_tokens > len(context_token_ids)):
+            state = self.requests[req_id] = _RequestState()
+        new_token_ids = context_token_ids[state.automaton.num_tokens:]
+        state.automaton.extend(new_token_ids)
+
+        result: Optional[np.ndarray] = None
+        match_len, match_end = state.automaton.longest_repeated_suffix(
+            self.max_n)
+        if match_len < self.min_n:
+            match_len = 0
+        else:
+            result = context_token_ids[match_end + 1:match_end + 1 + self.k]
+
+        corpus = self.corpus
+        if corpus is not None:
+            corpus.flush()
+            if state.corpus_version != corpus.version:
+                # The states of the corpus automaton may have been split.
+                state.corpus_version = corpus.version
+                state.corpus_match[:] = 0
+                new_token_ids = context_token_ids[-_CORPUS_RESYNC_TOKENS:]
+            corpus.automaton.match(state.corpus_match, new_token_ids)
+            corpus_match_len = min(int(state.corpus_match[1]), self.max_n)
+            if max(match_len, self.min_n - 1) < corpus_match_len:
+                corpus_state = corpus.automaton.get_suffix_state(
+                    int(state.corpus_match[0]), self.max_n)
+                continuation = corpus.get_continuation(corpus_state, self.k)
+                if len(continuation):
+                    result = continuation
+        return result
+
+    def finish_request(self, req_id: str,
+                       output_token_ids: Sequence[int]) -> None:
+        """Free the state of a finished request, and add its output to the
+        shared corpus."""
+        self.requests.pop(req_id, None)
+        if self.corpus is not None and output_token_ids:
+            self.corpus.add(np.asarray(output_token_ids, dtype=np.int32))
 
     def load_model(self, *args, **kwargs):
         # No model to load.
         pass
 
 
-@jit(nopython=True)
-def _kmp_lps_array(pattern: np.ndarray) -> np.ndarray:
+class _RequestState:
+
+    def __init__(self):
+        self.automaton = SuffixAutomaton()
+        # The (state, length) of the longest suffix of the context that
+        # occurs in the corpus, as of corpus_version.
+        self.corpus_match: np.ndarray = np.zeros(2, dtype=np.int64)
+        self.corpus_version = -1
+
+
+class _Corpus:
+    """The recent outputs of the finished requests, up to `max_tokens`.
+
+    A suffix automaton cannot drop tokens, so it is extended with the new
+    outputs until it holds twice `max_tokens`, and then rebuilt from the
+    outputs that are kept.
     """
-    Build the lps (longest proper prefix which is also suffix) 
-    array for the pattern.
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.outputs: deque[np.ndarray] = deque()
+        self.num_tokens = 0
+        self.pending: list[np.ndarray] = []
+        self.automaton = SuffixAutomaton()
+        # Incremented whenever the automaton changes.
+        self.version = 0
+
+    def add(self, token_ids: np.ndarray) -> None:
+        # The outputs are added to the automaton once per step.
+        start = max(0, len(token_ids) + 1 - self.max_tokens)
+        self.pending.append(token_ids[start:])
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = []
+        for token_ids in pending:
+            self.outputs.append(token_ids)
+            self.num_tokens += len(token_ids) + 1
+        while self.num_tokens > self.max_tokens:
+            self.num_tokens -= len(self.outputs.popleft()) + 1
+
+        num_pending_tokens = sum(len(token_ids) + 1 for token_ids in pending)
+        if (self.automaton.num_tokens + num_pending_tokens
+                > 2 * self.max_tokens):
+            self.automaton = SuffixAutomaton()
+            pending = list(self.outputs)
+        if pending:
+            separator = np.array([_SEPARATOR], dtype=np.int32)
+            self.automaton.extend(
+                np.concatenate([
+                    array for token_ids in pending
+                    for array in (token_ids, separator)
+                ]))
+        self.version += 1
+
+    def get_continuation(self, state: int, k: int) -> np.ndarray:
+        start = self.automaton.get_first_end(state) + 1
+        continuation = self.automaton.token_ids[start:start + k]
+        separators = np.flatnonzero(continuation == _SEPARATOR)
+        if len(separators):
+            continuation = continuation[:separators[0]]
+        return continuation
+
+
+class SuffixAutomaton:
+    """Suffix automaton of a token sequence, extended in amortized O(1) time
+    per token.
+
+    Each state is a class of substrings that end at the same positions of
+    the sequence, and `first_end` is the end of their first occurrence. The
+    transitions are kept in an open addressing hash table keyed by
+    (state, token), and the transitions of each state are also linked in a
+    list, which is walked when the state is cloned.
     """
-    lps = np.zeros(len(pattern), dtype=np.int32)
-    prev_lps = 0  # length of the previous longest prefix suffix
-    i = 1
-
-    while i < len(pattern):
-        if pattern[i] == pattern[prev_lps]:
-            prev_lps += 1
-            lps[i] = prev_lps
-            i += 1
-        else:
-            if prev_lps != 0:
-                prev_lps = lps[prev_lps - 1]
-            else:
-                lps[i] = 0
-                i += 1
-    return lps
+
+    def __init__(self, capacity: int = 256):
+        # num_tokens, num_states, num_transitions, last state
+        self.meta = np.array([0, 1, 0, 0], dtype=np.int64)
+        self._allocate(capacity)
+        self.length[0] = 0
+        self.link[0] = -1
+        self.first_end[0] = -1
+        self.head[0] = -1
+
+    def _allocate(self, capacity: int) -> None:
+        # A sequence of n tokens has at most 2n states and 3n transitions.
+        max_num_states = 2 * capacity + 1
+        max_num_transitions = 3 * capacity + 1
+        table_size = 1 << (2 * max_num_transitions - 1).bit_length()
+        self.capacity = capacity
+        self.token_ids: np.ndarray = np.empty(capacity, dtype=np.int32)
+        self.length: np.ndarray = np.empty(max_num_states, dtype=np.int32)
+        self.link: np.ndarray = np.empty(max_num_states, dtype=np.int32)
+        self.first_end: np.ndarray = np.empty(max_num_states, dtype=np.int32)
+        # The first transition of each state, and the token and the next
+        # transition of each transition.
+        self.head: np.ndarray = np.empty(max_num_states, dtype=np.int32)
+        self.transition_token: np.ndarray = np.empty(max_num_transitions,
+                                                     dtype=np.int32)
+        self.transition_next: np.ndarray = np.empty(max_num_transitions,
+                                                    dtype=np.int32)
+        self.keys: np.ndarray = np.full(table_size, -1, dtype=np.int64)
+        self.targets: np.ndarray = np.empty(table_size, dtype=np.int32)
+
+    def _grow(self, capacity: int) -> None:
+        num_tokens, num_states, num_transitions = self.meta[:3]
+        old = (self.token_ids, self.length, self.link, self.first_end,
+               self.head, self.transition_token, self.transition_next)
+        old_keys, old_targets = self.keys, self.targets
+        self._allocate(capacity)
+        new = (self.token_ids, self.length, self.link, self.first_end,
+               self.head, self.transition_token, self.transition_next)
+        sizes = (num_tokens, num_states, num_states, num_states, num_states,
+                 num_transitions, num_transitions)
+        for old_array, new_array, size in zip(old, new, sizes):
+            new_array[:size] = old_array[:size]
+        _rehash(old_keys, old_targets, self.keys, self.targets)
+
+    @property
+    def num_tokens(self) -> int:
+        return int(self.meta[0])
+
+    def extend(self, token_ids: np.ndarray) -> None:
+        num_tokens = self.num_tokens + len(token_ids)
+        if num_tokens > self.capacity:
+            self._grow(max(num_tokens, 2 * self.capacity))
+        self.token_ids[self.num_tokens:num_tokens] = token_ids
+        _extend(token_ids, self.length, self.link, self.first_end, self.head,
+                self.transition_token, self.transition_next, self.keys,
+                self.targets, self.meta)
+
+    def longest_repeated_suffix(self,
+                                max_len: Optional[int] = None
+                                ) -> tuple[int, int]:
+        """Get the length of the longest suffix of the sequence, of at most
+        max_len tokens, that also occurs earlier, and the end of its first
+        occurrence."""
+        last = int(self.meta[3])
+        if last == 0:
+            return 0, -1
+        # The suffix link of the whole sequence is the longest suffix that
+        # ends at more positions.
+        state = int(self.link[last])
+        if max_len is None:
+            return int(self.length[state]), int(self.first_end[state])
+        state = self.get_suffix_state(state, max_len)
+        return min(int(self.length[state]),
+                   max_len), int(self.first_end[state])
+
+    def match(self, match: np.ndarray, token_ids: np.ndarray) -> None:
+        """Update the (state, length) of the longest suffix of a sequence
+        that occurs in this sequence, with the new tokens of the sequence.
+        """
+        _match(token_ids, self.length, self.link, self.keys, self.targets,
+               match)
+
+    def get_first_end(self, state: int) -> int:
+        return int(self.first_end[state])
+
+    def get_suffix_state(self, state: int, max_len: int) -> int:
+        """Get the state of the suffix of max_len tokens of the substrings
+        of a state, or the state itself if they are not longer."""
+        return _get_suffix_state(self.length, self.link, state, max_len)
+
+
+@jit(nopython=True)
+def _get_slot(keys: np.ndarray, key: int) -> int:
+    mask = keys.shape[0] - 1
+    h = ((key ^ (key >> 32)) & 0x7FFFFFFF) * 0x9E3779B1
+    slot = (h ^ (h >> 29)) & mask
+    while keys[slot] != -1 and keys[slot] != key:
+        slot = (slot + 1) & mask
+    return slot
 
 
 @jit(nopython=True)
-def _find_subarray_kmp(
-    context_token_ids: np.ndarray,
-    n: int,
-    k: int,
-) -> Optional[np.ndarray]:
-    context_len = context_token_ids.shape[0]
-    assert n > 0
-
-    pattern = context_token_ids[-n:]
-    # Precompute lps array for Y
-    lps = _kmp_lps_array(pattern)
-
-    i = 0
-    j = 0
-    # -n because the last n tokens are used as pattern
-    while i < context_len - n:
-        if context_token_ids[i] == pattern[j]:
-            i += 1
-            j += 1
-
-            # If we have matched the entire Y
-            if j == n:
-                # Found pattern in context, gather the next K elements
-                return context_token_ids[i:i + k]
+def _get_key(state: int, token: int) -> int:
+    # The tokens are offset by one for the separator.
+    return int(np.int64(state) * 4294967296 + token + 1)
+
+
+@jit(nopython=True)
+def _get_transition(keys: np.ndarray, targets: np.ndarray, state: int,
+                    token: int) -> int:
+    key = _get_key(state, token)
+    slot = _get_slot(keys, key)
+    if keys[slot] == key:
+        return int(targets[slot])
+    return -1
+
+
+@jit(nopython=True)
+def _set_transition(keys: np.ndarray, targets: np.ndarray, state: int,
+                    token: int, target: int) -> None:
+    key = _get_key(state, token)
+    slot = _get_slot(keys, key)
+    keys[slot] = key
+    targets[slot] = target
+
+
+@jit(nopython=True)
+def _get_suffix_state(length: np.ndarray, link: np.ndarray, state: int,
+                      max_len: int) -> int:
+    # The substrings of a state are the suffixes of its longest one that are
+    # longer than the longest one of its suffix link.
+    while state > 0 and length[link[state]] >= max_len:
+        state = int(link[state])
+    return state
+
+
+@jit(nopython=True)
+def _rehash(old_keys: np.ndarray, old_targets: np.ndarray, keys: np.ndarray,
+            targets: np.ndarray) -> None:
+    for i in range(old_keys.shape[0]):
+        key = old_keys[i]
+        if key != -1:
+            slot = _get_slot(keys, key)
+            keys[slot] = key
+            targets[slot] = old_targets[i]
+
+
+@jit(nopython=True)
+def _extend(
+    token_ids: np.ndarray,
+    length: np.ndarray,
+    link: np.ndarray,
+    first_end: np.ndarray,
+    head: np.ndarray,
+    transition_token: np.ndarray,
+    transition_next: np.ndarray,
+    keys: np.ndarray,
+    targets: np.ndarray,
+    meta: np.ndarray,
+) -> None:
+    pos = meta[0]
+    num_states = meta[1]
+    num_transitions = meta[2]
+    last = meta[3]
+    for i in range(token_ids.shape[0]):
+        token = token_ids[i]
+        cur = num_states
+        num_states += 1
+        length[cur] = length[last] + 1
+        first_end[cur] = pos
+        head[cur] = -1
+
+        p = last
+        while p != -1 and _get_transition(keys, targets, p, token) == -1:
+            _set_transition(keys, targets, p, token, cur)
+            transition_token[num_transitions] = token
+            transition_next[num_transitions] = head[p]
+            head[p] = num_transitions
+            num_transitions += 1
+            p = link[p]
+
+        if p == -1:
+            link[cur] = 0
         else:
-            # Mismatch
-            if j != 0:
-                # Use the lps array to avoid re-checking elements
-                j = lps[j - 1]
+            q = _get_transition(keys, targets, p, token)
+            if length[p] + 1 == length[q]:
+                link[cur] = q
             else:
-                i += 1
+                # Split the state q, whose shorter substrings now also end
+                # at pos.
+                clone = num_states
+                num_states += 1
+                length[clone] = length[p] + 1
+                link[clone] = link[q]
+                first_end[clone] = first_end[q]
+                head[clone] = -1
+                t = head[q]
+                while t != -1:
+                    t_token = transition_token[t]
+                    _set_transition(keys, targets, clone, t_token,
+                                    _get_transition(keys, targets, q, t_token))
+                    transition_token[num_transitions] = t_token
+                    transition_next[num_transitions] = head[clone]
+                    head[clone] = num_transitions
+                    num_transitions += 1
+                    t = transition_next[t]
+                while p != -1 and _get_transition(keys, targets, p,
+                                                  token) == q:
+                    _set_transition(keys, targets, p, token, clone)
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        last = cur
+        pos += 1
+
+    meta[0] = pos
+    meta[1] = num_states
+    meta[2] = num_transitions
+    meta[3] = last
 
-    # Y not found
-    return None
+
+@jit(nopython=True)
+def _match(
+    token_ids: np.ndarray,
+    length: np.ndarray,
+    link: np.ndarray,
+    keys: np.ndarray,
+    targets: np.ndarray,
+    match: np.ndarray,
+) -> None:
+    state = int(match[0])
+    match_len = int(match[1])
+    for i in range(token_ids.shape[0]):
+        token = token_ids[i]
+        target = _get_transition(keys, targets, state, token)
+        while target == -1 and state != 0:
+            state = int(link[state])
+            match_len = int(length[state])
+            target = _get_transition(keys, targets, state, token)
+        if target == -1:
+            match_len = 0
+        else:
+            state = target
+            match_len += 1
+    match[0] = state
+    match[1] = match_len
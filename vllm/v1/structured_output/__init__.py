@@ -5,27 +5,38 @@ import multiprocessing
 from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Optional
 
+import torch
+
+import vllm.envs as envs
 from vllm.config import VllmConfig
 from vllm.logger import init_logger
 from vllm.v1.structured_output.backend_guidance import GuidanceBackend
 from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
-                                                     StructuredOutputGrammar)
+                                                     StructuredOutputGrammar,
+                                                     StructuredOutputOptions)
+from vllm.v1.structured_output.grammar_cache import GrammarCache
+from vllm.v1.structured_output.request import StructuredOutputRequest
 
 if TYPE_CHECKING:
     import numpy as np
     import numpy.typing as npt
-    import torch
 
     from vllm.v1.request import Request
 
 logger = init_logger(__name__)
 
+# The number of requests whose bitmasks are filled by one task of the
+# bitmask executor.
+_FILL_BITMASK_BATCH_SIZE = 16
+
 
 class StructuredOutputManager:
     """Engine-level manager for structured output requests."""
 
     def __init__(self, vllm_config: VllmConfig):
         self.backend: Optional[StructuredOutputBackend] = None
+        self.backend_name: Optional[str] = None
+        self.grammar_cache: Optional[GrammarCache] = None
         self.vllm_config = vllm_config
         self._grammar_bitmask: Optional[torch.Tensor] = None
 
@@ -35,6 +46,21 @@ class StructuredOutputManager:
         # compilation, so we set it to half the number of CPUs.
         max_workers = max(1, (multiprocessing.cpu_count() + 1) // 2)
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # The bitmasks are filled by a separate executor, so that they are
+        # not delayed by the compilation of grammars. The backends release
+        # the GIL while filling a bitmask, so they are filled in parallel.
+        self.fill_bitmask_executor = ThreadPoolExecutor(
+            max_workers=min(8, max_workers))
+
+        # Jump-forward decoding: the tokens forced by the grammars are
+        # accepted along with the bitmasks filled ahead, and appended to the
+        # requests by the scheduler, so that the model processes them in one
+        # step like a prefill chunk.
+        self.max_jump_forward_tokens = (
+            envs.VLLM_STRUCTURED_OUTPUT_JUMP_FORWARD_TOKENS)
+        # Whether some bitmasks filled ahead may have forced tokens that are
+        # not yet taken by the scheduler.
+        self.has_pending_forced_tokens = False
 
     def grammar_init(self, request: Request) -> None:
         if request.structured_output_request is None:
@@ -45,21 +71,30 @@ class StructuredOutputManager:
         # NOTE: We only support a single backend. We do NOT support different
         # backends on a per-request basis in V1 (for now, anyway...).
         if self.backend is None:
-            backend_name = request.sampling_params.guided_decoding.backend_name
-            if backend_name == "xgrammar":
-                from vllm.v1.structured_output.backend_xgrammar import (
-                    XgrammarBackend)
-
-                self.backend = XgrammarBackend(self.vllm_config)
-            elif backend_name == "guidance":
-                self.backend = GuidanceBackend(self.vllm_config)
-            else:
-                raise ValueError(
-                    f"Unsupported structured output backend: {backend_name}")
+            self._init_backend(
+                request.sampling_params.guided_decoding.backend_name)
 
         grammar = self.executor.submit(self._async_create_grammar, request)
         request.structured_output_request.grammar = grammar  # type: ignore[assignment]
 
+    def _init_backend(self, backend_name: str) -> None:
+        if backend_name == "xgrammar":
+            from vllm.v1.structured_output.backend_xgrammar import (
+                XgrammarBackend)
+
+            self.backend = XgrammarBackend(self.vllm_config)
+        elif backend_name == "guidance":
+            self.backend = GuidanceBackend(self.vllm_config)
+        else:
+            raise ValueError(
+                f"Unsupported structured output backend: {backend_name}")
+        self.backend_name = backend_name
+
+        if self.backend.get_cache_fingerprint() is not None:
+            self.grammar_cache = GrammarCache(
+                backend_name, self.backend,
+                envs.VLLM_STRUCTURED_OUTPUT_CACHE_DIR)
+
     def _async_create_grammar(
         self,
         request: Request,
@@ -73,9 +108,111 @@ class StructuredOutputManager:
         # though it should be unlikely as we test that up front as well.
         request_type, grammar_spec = key
 
+        if self.grammar_cache is not None:
+            return self.grammar_cache.compile_grammar(request_type,
+                                                      grammar_spec)
         assert self.backend is not None
         return self.backend.compile_grammar(request_type, grammar_spec)
 
+    def precompile_grammars(self, grammars: list[tuple[str, str, str]]) -> int:
+        """Compile grammars into the grammar cache ahead of the requests that
+        use them, in parallel.
+
+        Args:
+            grammars: The (backend name, request type name, grammar spec) of
+                each grammar.
+
+        Returns:
+            The number of precompiled grammars. The grammars of a backend
+            other than the backend of the engine are skipped, since the
+            requests of the engine never use them.
+        """
+        futures = []
+        for backend_name, request_type, grammar_spec in grammars:
+            if self.backend is None:
+                self._init_backend(backend_name)
+            if backend_name != self.backend_name:
+                logger.warning(
+                    "Skipping the precompilation of a %s grammar, since the "
+                    "engine uses the %s backend.", backend_name,
+                    self.backend_name)
+                continue
+            if self.grammar_cache is None:
+                # The backend does not support caching.
+                return 0
+            futures.append(
+                self.executor.submit(self.grammar_cache.get_precompiled,
+                                     StructuredOutputOptions[request_type],
+                                     grammar_spec))
+        for future in futures:
+            future.result()
+        return len(futures)
+
+    def fill_bitmasks_ahead(self, requests: list[Request]) -> None:
+        """Start filling the bitmasks of the next step of the requests in the
+        background, right after their new tokens are accepted, so that the
+        bitmasks are ready by the time the requests are scheduled again.
+
+        With jump-forward decoding, the tokens forced by the grammars are
+        accepted first, see `take_forced_token_ids`.
+        """
+        so_requests: list[tuple[str, StructuredOutputRequest]] = []
+        for request in requests:
+            so_request = request.structured_output_request
+            assert so_request is not None and so_request.grammar is not None
+            if (self.max_jump_forward_tokens > 0
+                    and request.sampling_params.logprobs is None
+                    and not request.spec_token_ids):
+                # Leave room for at least one sampled token after the run,
+                # so that the forced tokens never stop the request.
+                max_model_len = self.vllm_config.model_config.max_model_len
+                so_request.max_forced_tokens = max(
+                    0,
+                    min(self.max_jump_forward_tokens,
+                        request.max_tokens - request.num_output_tokens - 1,
+                        max_model_len - request.num_tokens - 1))
+                self.has_pending_forced_tokens = True
+            else:
+                so_request.max_forced_tokens = 0
+            so_requests.append((request.request_id, so_request))
+        self._submit_fill_bitmasks(so_requests)
+
+    def take_forced_token_ids(self, request: Request) -> list[int]:
+        """Take the tokens forced by the grammar of a request, which were
+        accepted ahead along with the fill of its bitmask, so that the
+        scheduler appends them to the request before scheduling it.
+
+        The tokens are kept in `unreported_token_ids` until they are output
+        along with the next sampled tokens of the request.
+        """
+        so_request = request.structured_output_request
+        if (so_request is None or so_request.max_forced_tokens == 0
+                or so_request.bitmask_future is None):
+            return []
+        so_request.bitmask_future.result()
+        so_request.max_forced_tokens = 0
+        forced_token_ids = so_request.forced_token_ids
+        if forced_token_ids:
+            so_request.forced_token_ids = []
+            so_request.unreported_token_ids.extend(forced_token_ids)
+        return forced_token_ids
+
+    def _submit_fill_bitmasks(
+            self, requests: list[tuple[str, StructuredOutputRequest]]) -> None:
+        assert self.backend is not None
+        requests = [
+            (request_id, request) for request_id, request in requests
+            if not request.grammar.is_terminated()  # type: ignore[union-attr]
+        ]
+        for _, request in requests:
+            if request.bitmask is None:
+                request.bitmask = self.backend.allocate_token_bitmask(1)
+        for start in range(0, len(requests), _FILL_BITMASK_BATCH_SIZE):
+            batch = requests[start:start + _FILL_BITMASK_BATCH_SIZE]
+            future = self.fill_bitmask_executor.submit(_fill_bitmasks, batch)
+            for _, request in batch:
+                request.bitmask_future = future
+
     def grammar_bitmask(
         self,
         requests: dict[str, Request],
@@ -91,15 +228,38 @@ class StructuredOutputManager:
             self._grammar_bitmask = self.backend.allocate_token_bitmask(
                 self.vllm_config.scheduler_config.max_num_seqs)
 
-        # Fill the bitmask using the index of each request equal to its
+        so_requests: list[StructuredOutputRequest] = []
+        requests_to_fill: list[tuple[str, StructuredOutputRequest]] = []
+        for req_id in structured_output_request_ids:
+            request = requests[req_id].structured_output_request
+            assert request is not None and request.grammar is not None
+            so_requests.append(request)
+            if request.bitmask_future is None:
+                # Too late to append forced tokens to the request.
+                request.max_forced_tokens = 0
+                requests_to_fill.append((req_id, request))
+        # Fill the bitmasks that were not filled ahead, e.g. of the new
+        # requests.
+        self._submit_fill_bitmasks(requests_to_fill)
+
+        # Copy the bitmask of each request to the index equal to its
         # position in the batch. Resize the bitmask down to the size of
         # the batch.
         bitmask_tensor = self._grammar_bitmask
-        for req_id, batch_index in structured_output_request_ids.items():
-            request = requests[req_id].structured_output_request
-            assert request is not None and request.grammar is not None
-            if not request.grammar.is_terminated():
-                request.grammar.fill_bitmask(bitmask_tensor, batch_index)
+        batch_indices: list[int] = []
+        bitmasks: list[torch.Tensor] = []
+        for request, batch_index in zip(
+                so_requests, structured_output_request_ids.values()):
+            if request.bitmask_future is None:
+                # The grammar is terminated.
+                continue
+            request.bitmask_future.result()
+            request.bitmask_future = None
+            assert request.bitmask is not None
+            batch_indices.append(batch_index)
+            bitmasks.append(request.bitmask)
+        if bitmasks:
+            bitmask_tensor[batch_indices] = torch.cat(bitmasks)
         if batch_len < self._grammar_bitmask.shape[0]:
             bitmask_tensor = self._grammar_bitmask[:batch_len]
 
@@ -107,3 +267,16 @@ class StructuredOutputManager:
         # np.ndarray, because that is much more efficient for serialization
         # and deserialization when sending this to the GPU workers.
         return bitmask_tensor.numpy()
+
+
+def _fill_bitmasks(
+        requests: list[tuple[str, StructuredOutputRequest]]) -> None:
+    for request_id, request in requests:
+        grammar = request.grammar
+        assert grammar is not None and request.bitmask is not None
+        if request.max_forced_tokens > 0:
+            request.forced_token_ids = grammar.accept_forced_tokens(
+                request_id, request.bitmask, request.max_forced_tokens,
+                request.sampling_params.all_stop_token_ids)
+        else:
+            grammar.fill_bitmask(request.bitmask, 0)
@@ -1,5 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+import importlib.metadata
 import os
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Optional
@@ -14,6 +16,7 @@ from vllm.utils import LazyLoader
 from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
                                                      StructuredOutputGrammar,
                                                      StructuredOutputOptions)
+from vllm.v1.structured_output.grammar_cache import get_tokenizer_fingerprint
 from vllm.v1.structured_output.request import get_structured_output_key
 
 if TYPE_CHECKING:
@@ -46,17 +49,31 @@ class GuidanceBackend(StructuredOutputBackend):
             in vllm_config.decoding_config.guided_decoding_backend)
 
         tokenizer = tokenizer_group.get_lora_tokenizer(None)
+        self.tokenizer = tokenizer
         self.ll_tokenizer = llguidance_hf.from_tokenizer(
             tokenizer, self.vocab_size)
 
     def compile_grammar(self, request_type: StructuredOutputOptions,
                         grammar_spec: str) -> StructuredOutputGrammar:
-        self.serialized_grammar = serialize_guidance_grammar(
-            request_type, grammar_spec, self.disable_any_whitespace)
-
+        return self.grammar_from_precompiled(
+            self.precompile_grammar(request_type, grammar_spec))
+
+    def get_cache_fingerprint(self) -> Optional[str]:
+        fingerprint = (importlib.metadata.version("llguidance"),
+                       self.vocab_size, self.disable_any_whitespace,
+                       get_tokenizer_fingerprint(self.tokenizer))
+        return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+    def precompile_grammar(self, request_type: StructuredOutputOptions,
+                           grammar_spec: str) -> str:
+        return serialize_guidance_grammar(request_type, grammar_spec,
+                                          self.disable_any_whitespace)
+
+    def grammar_from_precompiled(
+            self, serialized_grammar: str) -> StructuredOutputGrammar:
         ll_matcher = llguidance.LLMatcher(
             self.ll_tokenizer,
-            self.serialized_grammar,
+            serialized_grammar,
             log_level=int(os.environ.get("LLGUIDANCE_LOG_LEVEL", "1")),
         )
 
@@ -69,6 +86,12 @@ class GuidanceBackend(StructuredOutputBackend):
         r.check_error()
         return r
 
+    def serialize_precompiled(self, serialized_grammar: str) -> bytes:
+        return serialized_grammar.encode()
+
+    def deserialize_precompiled(self, data: bytes) -> str:
+        return data.decode()
+
     def allocate_token_bitmask(self, max_num_seqs: int):
         return llguidance_torch.allocate_token_bitmask(
             max_num_seqs, self.ll_tokenizer.vocab_size)
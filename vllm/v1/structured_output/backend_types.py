@@ -2,6 +2,8 @@
 
 import enum
 from abc import ABC, abstractmethod
+from collections.abc import Container
+from typing import Any, Optional
 
 import torch
 
@@ -59,6 +61,51 @@ class StructuredOutputGrammar(ABC):
         Resets the state of the structured output grammar.
         """
 
+    def accept_forced_tokens(self, request_id: str, bitmask: torch.Tensor,
+                             max_num_tokens: int,
+                             stop_token_ids: Container[int]) -> list[int]:
+        """
+        Accepts the run of tokens that the grammar forces from its current
+        state, i.e., the tokens that are each the only token allowed after
+        the previous ones. The run ends before a stop token, so that the
+        request is stopped by a sampled token.
+
+        Args:
+            request_id (str): The unique identifier for the request.
+            bitmask (torch.Tensor): A bitmask of one row, which is left
+                filled for the state after the run.
+            max_num_tokens (int): The maximum number of tokens to accept.
+            stop_token_ids (Container[int]): The stop tokens of the request.
+
+        Returns:
+            list[int]: The accepted tokens.
+        """
+        forced_token_ids: list[int] = []
+        while True:
+            self.fill_bitmask(bitmask, 0)
+            if len(forced_token_ids) >= max_num_tokens:
+                break
+            token_id = get_forced_token_id(bitmask[0])
+            if (token_id is None or token_id in stop_token_ids
+                    or not self.accept_tokens(request_id, [token_id])):
+                break
+            forced_token_ids.append(token_id)
+        return forced_token_ids
+
+
+def get_forced_token_id(bitmask: torch.Tensor) -> Optional[int]:
+    """Get the only token allowed by a row of a token bitmask, or None if
+    the row allows no token or several tokens."""
+    nonzero = bitmask.nonzero()
+    if nonzero.shape[0] != 1:
+        return None
+    index = int(nonzero[0, 0])
+    # The bitmask is int32, with the 32 tokens of a word in its bits.
+    word = int(bitmask[index]) & 0xFFFFFFFF
+    if word & (word - 1):
+        return None
+    return index * 32 + word.bit_length() - 1
+
 
 class StructuredOutputBackend(ABC):
     """Engine-level backend for structured output requests."""
@@ -87,3 +134,55 @@ class StructuredOutputBackend(ABC):
             max_num_seqs (int): The maximum number of sequences for which
               to allocate the bitmask.
         """
+
+    def get_cache_fingerprint(self) -> Optional[str]:
+        """
+        Returns a fingerprint of the configuration of the backend (e.g. its
+        version and tokenizer) that the compiled grammars depend on. It is
+        part of the keys of the grammar cache.
+
+        Returns:
+            Optional[str]: The fingerprint, or None if the compiled grammars
+              of the backend can not be cached.
+        """
+        return None
+
+    def precompile_grammar(self, request_type: StructuredOutputOptions,
+                           grammar_spec: str) -> Any:
+        """
+        Compiles the part of a grammar specification that can be shared by
+        all the requests with this specification.
+
+        Args:
+            request_type (StructuredOutputOptions): The type of structured
+              output request.
+            grammar_spec (str): The grammar specification to compile.
+
+        Returns:
+            Any: The precompiled grammar.
+        """
+        raise NotImplementedError
+
+    def grammar_from_precompiled(self,
+                                 precompiled: Any) -> StructuredOutputGrammar:
+        """
+        Creates the structured output grammar of a request from a grammar
+        returned by `precompile_grammar`.
+        """
+        raise NotImplementedError
+
+    def serialize_precompiled(self, precompiled: Any) -> Optional[bytes]:
+        """
+        Serializes a precompiled grammar, to store it on disk.
+
+        Returns:
+            Optional[bytes]: The serialized grammar, or None if the grammar
+              can not be serialized.
+        """
+        return None
+
+    def deserialize_precompiled(self, data: bytes) -> Any:
+        """
+        Deserializes a grammar serialized by `serialize_precompiled`.
+        """
+        raise NotImplementedError
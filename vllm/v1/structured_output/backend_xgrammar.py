@@ -1,8 +1,10 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+import importlib.metadata
 import json
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Optional
 
 import torch
 
@@ -16,6 +18,7 @@ from vllm.utils import LazyLoader
 from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
                                                      StructuredOutputGrammar,
                                                      StructuredOutputOptions)
+from vllm.v1.structured_output.grammar_cache import get_tokenizer_fingerprint
 from vllm.v1.structured_output.utils import (choice_as_grammar,
                                              convert_lark_to_ebnf,
                                              grammar_is_likely_lark)
@@ -43,6 +46,7 @@ class XgrammarBackend(StructuredOutputBackend):
         tokenizer_group.ping()
 
         tokenizer = tokenizer_group.get_lora_tokenizer(None)
+        self.tokenizer = tokenizer
         self.vocab_size = vllm_config.model_config.get_vocab_size()
         if isinstance(tokenizer, MistralTokenizer):
             # NOTE: ideally, xgrammar should handle this accordingly.
@@ -82,6 +86,7 @@ class XgrammarBackend(StructuredOutputBackend):
                 tokenizer,
                 vocab_size=self.vocab_size,
             )
+        self.tokenizer_info = tokenizer_info
         self.compiler = xgr.GrammarCompiler(
             tokenizer_info,
             max_threads=8,
@@ -91,6 +96,17 @@ class XgrammarBackend(StructuredOutputBackend):
 
     def compile_grammar(self, request_type: StructuredOutputOptions,
                         grammar_spec: str) -> StructuredOutputGrammar:
+        return self.grammar_from_precompiled(
+            self.precompile_grammar(request_type, grammar_spec))
+
+    def get_cache_fingerprint(self) -> Optional[str]:
+        fingerprint = (importlib.metadata.version("xgrammar"), self.vocab_size,
+                       self.disable_any_whitespace,
+                       get_tokenizer_fingerprint(self.tokenizer))
+        return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+    def precompile_grammar(self, request_type: StructuredOutputOptions,
+                           grammar_spec: str) -> xgr.CompiledGrammar:
         if request_type == StructuredOutputOptions.JSON:
             ctx = self.compiler.compile_json_schema(
                 grammar_spec, any_whitespace=not self.disable_any_whitespace)
@@ -108,13 +124,27 @@ class XgrammarBackend(StructuredOutputBackend):
             )
             raise ValueError(
                 f"grammar is not of valid supported types. ({request_type!s})")
+        return ctx
 
+    def grammar_from_precompiled(
+            self, ctx: xgr.CompiledGrammar) -> StructuredOutputGrammar:
         return XgrammarGrammar(
             matcher=xgr.GrammarMatcher(ctx),
             vocab_size=self.vocab_size,
             ctx=ctx,
         )
 
+    def serialize_precompiled(self,
+                              ctx: xgr.CompiledGrammar) -> Optional[bytes]:
+        # Compiled grammars can be serialized since xgrammar 0.1.19.
+        if not hasattr(ctx, "serialize_json"):
+            return None
+        return ctx.serialize_json().encode()
+
+    def deserialize_precompiled(self, data: bytes) -> xgr.CompiledGrammar:
+        return xgr.CompiledGrammar.deserialize_json(data.decode(),
+                                                    self.tokenizer_info)
+
     def allocate_token_bitmask(self, max_num_seqs: int):
         return xgr.allocate_token_bitmask(max_num_seqs, self.vocab_size)
 
@@ -0,0 +1,169 @@
+# SPDX-License-Identifier: Apache-2.0
+"""Cache of the compiled structured output grammars, shared by the requests
+of an engine and, through a directory on disk, by the engines of all the
+data parallel ranks and across restarts."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Optional
+
+from vllm.logger import init_logger
+from vllm.v1.structured_output.backend_types import (StructuredOutputBackend,
+                                                     StructuredOutputGrammar,
+                                                     StructuredOutputOptions)
+
+if TYPE_CHECKING:
+    from vllm.transformers_utils.tokenizer import AnyTokenizer
+
+logger = init_logger(__name__)
+
+# The maximum number of precompiled grammars kept in memory.
+_MAX_CACHED_GRAMMARS = 1024
+
+
+def get_tokenizer_fingerprint(tokenizer: AnyTokenizer) -> str:
+    """Get a hash of the vocabulary of a tokenizer."""
+    vocab = sorted(tokenizer.get_vocab().items(), key=lambda x: x[1])
+    return hashlib.sha256(repr(vocab).encode()).hexdigest()
+
+
+def canonicalize_grammar_spec(request_type: StructuredOutputOptions,
+                              grammar_spec: str) -> str:
+    """Normalize the formatting of a grammar specification, so that the
+    specifications that only differ in whitespace share a cache entry.
+
+    NOTE: The keys of the JSON objects are not sorted, since the order of
+    the properties of a JSON schema is the order of the generated output.
+    """
+    if request_type in (StructuredOutputOptions.JSON,
+                        StructuredOutputOptions.CHOICE):
+        try:
+            return json.dumps(json.loads(grammar_spec), separators=(",", ":"))
+        except json.JSONDecodeError:
+            return grammar_spec
+    return grammar_spec
+
+
+class GrammarCache:
+    """Caches the grammars precompiled by a structured output backend.
+
+    The grammars are keyed by the backend, the request type, the
+    canonicalized grammar specification and the fingerprint of the backend
+    (which includes its tokenizer). They are kept in memory in LRU order,
+    and if `cache_dir` is set, also stored there so that other engines can
+    load them instead of compiling them again. The files are written
+    atomically, so the directory can be shared by concurrent engines.
+
+    Concurrent requests for a grammar that is being compiled wait for the
+    same compilation.
+    """
+
+    def __init__(self,
+                 backend_name: str,
+                 backend: StructuredOutputBackend,
+                 cache_dir: Optional[str] = None):
+        fingerprint = backend.get_cache_fingerprint()
+        assert fingerprint is not None
+        self.backend_name = backend_name
+        self.backend = backend
+        self.fingerprint = fingerprint
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._grammars: OrderedDict[str, Future[Any]] = OrderedDict()
+
+    def get_key(self, request_type: StructuredOutputOptions,
+                grammar_spec: str) -> str:
+        key = (self.backend_name, request_type.name,
+               canonicalize_grammar_spec(request_type,
+                                         grammar_spec), self.fingerprint)
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+    def compile_grammar(self, request_type: StructuredOutputOptions,
+                        grammar_spec: str) -> StructuredOutputGrammar:
+        precompiled = self.get_precompiled(request_type, grammar_spec)
+        return self.backend.grammar_from_precompiled(precompiled)
+
+    def get_precompiled(self, request_type: StructuredOutputOptions,
+                        grammar_spec: str) -> Any:
+        """Get the precompiled grammar of a specification from the cache, or
+        compile it."""
+        key = self.get_key(request_type, grammar_spec)
+        with self._lock:
+            cached = self._grammars.get(key)
+            if cached is not None:
+                self._grammars.move_to_end(key)
+            else:
+                future: Future[Any] = Future()
+                self._grammars[key] = future
+                if len(self._grammars) > _MAX_CACHED_GRAMMARS:
+                    self._grammars.popitem(last=False)
+        if cached is not None:
+            # Compiled, or being compiled by another thread.
+            return cached.result()
+
+        try:
+            precompiled = self._load(key)
+            if precompiled is None:
+                precompiled = self.backend.precompile_grammar(
+                    request_type, grammar_spec)
+                self._store(key, precompiled)
+        except BaseException as e:
+            with self._lock:
+                if self._grammars.get(key) is future:
+                    del self._grammars[key]
+            future.set_exception(e)
+            raise
+        future.set_result(precompiled)
+        return precompiled
+
+    def _get_path(self, key: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, f"{key}.{self.backend_name}")
+
+    def _load(self, key: str) -> Optional[Any]:
+        if self.cache_dir is None:
+            return None
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            return self.backend.deserialize_precompiled(data)
+        except Exception:
+            logger.warning(
+                "Failed to load the cached grammar %s, compiling "
+                "it again.",
+                path,
+                exc_info=True)
+            return None
+
+    def _store(self, key: str, precompiled: Any) -> None:
+        if self.cache_dir is None:
+            return
+        data = self.backend.serialize_precompiled(precompiled)
+        if data is None:
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Readers never see a partially written file.
+            os.replace(tmp_path, self._get_path(key))
+        except OSError:
+            logger.warning("Failed to store the compiled grammar in %s.",
+                           self.cache_dir,
+                           exc_info=True)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -6,13 +6,16 @@ import functools
 import json
 from concurrent.futures import Future
 from concurrent.futures._base import TimeoutError
-from typing import Optional, Union, cast
+from typing import TYPE_CHECKING, Optional, Union, cast
 
 from vllm.sampling_params import SamplingParams
 from vllm.v1.structured_output.backend_types import (StructuredOutputGrammar,
                                                      StructuredOutputKey,
                                                      StructuredOutputOptions)
 
+if TYPE_CHECKING:
+    import torch
+
 
 @dataclasses.dataclass
 class StructuredOutputRequest:
@@ -20,6 +23,18 @@ class StructuredOutputRequest:
     sampling_params: SamplingParams
     _grammar: Optional[Union[Future[StructuredOutputGrammar],
                              StructuredOutputGrammar]] = None
+    # The bitmask of the next step of the request, and the future of its
+    # fill by the StructuredOutputManager. The future is set from the time
+    # the bitmask is requested until it is copied to the batch bitmask.
+    bitmask: Optional[torch.Tensor] = None
+    bitmask_future: Optional[Future[None]] = None
+    # Jump-forward decoding: the maximum number of tokens forced by the
+    # grammar that are accepted along with the fill of the bitmask, the
+    # tokens that are accepted but not yet appended to the request by the
+    # scheduler, and the tokens that are appended but not yet output.
+    max_forced_tokens: int = 0
+    forced_token_ids: list[int] = dataclasses.field(default_factory=list)
+    unreported_token_ids: list[int] = dataclasses.field(default_factory=list)
 
     def _check_grammar_completion(self) -> bool:
         # NOTE: We have to lazy import to gate circular imports
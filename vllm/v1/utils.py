@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import itertools
 import os
 import weakref
 from collections import defaultdict
@@ -8,6 +9,7 @@ from multiprocessing import Process
 from typing import (TYPE_CHECKING, Any, Callable, Generic, Optional, TypeVar,
                     Union, overload)
 
+import numpy as np
 import torch
 
 from vllm.logger import init_logger
@@ -201,3 +203,19 @@ def copy_slice(from_tensor: torch.Tensor, to_tensor: torch.Tensor,
     Returns the sliced target tensor.
     """
     return to_tensor[:length].copy_(from_tensor[:length], non_blocking=True)
+
+
+def flatten_int_lists(
+        lists: Sequence[Sequence[int]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Flatten lists of ints into a single int32 array.
+
+    Returns the flat array and the int32 offsets array of length
+    len(lists) + 1, so that lists[i] is flat[offsets[i]:offsets[i + 1]].
+    """
+    offsets: np.ndarray = np.zeros(len(lists) + 1, dtype=np.int32)
+    np.cumsum([len(x) for x in lists], out=offsets[1:])
+    flat = np.fromiter(itertools.chain.from_iterable(lists),
+                       dtype=np.int32,
+                       count=int(offsets[-1]))
+    return flat, offsets
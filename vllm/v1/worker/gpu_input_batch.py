@@ -27,6 +27,7 @@ class CachedRequestState:
     prompt: Optional[str]
     mm_inputs: list[MultiModalKwargs]
     mm_positions: list[PlaceholderRange]
+    mm_hashes: list[str]
     sampling_params: SamplingParams
     generator: Optional[torch.Generator]
 
@@ -218,6 +219,14 @@ class InputBatch:
         # req_index -> bad_words_token_ids
         self.bad_words_token_ids: dict[int, list[list[int]]] = {}
 
+        # The counts of the output tokens of the requests with penalties,
+        # updated with the new tokens of each step instead of recounting all
+        # the output tokens.
+        self.output_bin_counts: Optional[torch.Tensor] = None
+        # The number of output tokens already in `output_bin_counts`.
+        self.num_counted_output_tokens: np.ndarray = np.zeros(max_num_reqs,
+                                                              dtype=np.int32)
+
         self.req_output_token_ids: list[Optional[list[int]]] = []
 
         # This is updated each time the batch constituents change.
@@ -299,6 +308,14 @@ class InputBatch:
             req_index] = sampling_params.repetition_penalty
         if sampling_params.repetition_penalty != 1.0:
             self.repetition_penalties_reqs.add(req_id)
+        if (sampling_params.frequency_penalty != 0.0
+                or sampling_params.presence_penalty != 0.0
+                or sampling_params.repetition_penalty != 1.0):
+            output_bin_counts = self.allocate_output_bin_counts()
+            # The output tokens of the request (if resumed) are counted in
+            # the next update_output_bin_counts().
+            output_bin_counts[req_index].zero_()
+            self.num_counted_output_tokens[req_index] = 0
         if sampling_params.min_tokens:
             self.min_tokens[req_index] = (sampling_params.min_tokens,
                                           sampling_params.all_stop_token_ids)
@@ -423,6 +440,10 @@ class InputBatch:
             self.repetition_penalties_cpu[i2], self.repetition_penalties_cpu[i1]
         self.min_p_cpu[i1], self.min_p_cpu[i2] =\
             self.min_p_cpu[i2], self.min_p_cpu[i1]
+        self.num_counted_output_tokens[i1], \
+            self.num_counted_output_tokens[i2] =\
+            self.num_counted_output_tokens[i2], \
+                self.num_counted_output_tokens[i1]
 
         # NOTE: the following is unsafe
         # self.token_ids_cpu[i1, ...], self.token_ids_cpu[i2, ...], =\
@@ -447,6 +468,8 @@ class InputBatch:
                 self.allowed_token_ids_mask_cpu_tensor[i2] =\
                 self.allowed_token_ids_mask_cpu_tensor[i2], \
                     self.allowed_token_ids_mask_cpu_tensor[i1]
+        if self.output_bin_counts is not None:
+            self.output_bin_counts[[i1, i2]] = self.output_bin_counts[[i2, i1]]
         self.block_table.swap_row(i1, i2)
 
     def condense(self, empty_req_indices: list[int]) -> None:
@@ -460,6 +483,9 @@ class InputBatch:
         # NOTE(woosuk): This function assumes that the empty_req_indices
         # is sorted in descending order.
         last_req_index = num_reqs + len(empty_req_indices) - 1
+        # The rows of the output bin counts are moved at once at the end.
+        bin_counts_src: list[int] = []
+        bin_counts_dst: list[int] = []
         while empty_req_indices:
             # Find the largest non-empty index.
             while last_req_index in empty_req_indices:
@@ -502,6 +528,11 @@ class InputBatch:
             self.repetition_penalties_cpu[
                 empty_index] = self.repetition_penalties_cpu[last_req_index]
             self.min_p_cpu[empty_index] = self.min_p_cpu[last_req_index]
+            self.num_counted_output_tokens[
+                empty_index] = self.num_counted_output_tokens[last_req_index]
+            if self.output_bin_counts is not None:
+                bin_counts_src.append(last_req_index)
+                bin_counts_dst.append(empty_index)
             generator = self.generators.pop(last_req_index, None)
             if generator is not None:
                 self.generators[empty_index] = generator
@@ -527,6 +558,11 @@ class InputBatch:
             # Decrement last_req_index since it is now empty.
             last_req_index -= 1
 
+        if bin_counts_src:
+            assert self.output_bin_counts is not None
+            self.output_bin_counts[bin_counts_dst] = self.output_bin_counts[
+                bin_counts_src]
+
         # Trim lists to the batch size.
         del self._req_ids[self.num_reqs:]
         del self.req_output_token_ids[self.num_reqs:]
@@ -534,6 +570,63 @@ class InputBatch:
     def refresh_sampling_metadata(self):
         self.sampling_metadata = self._make_sampling_metadata()
 
+    def allocate_output_bin_counts(self) -> torch.Tensor:
+        """Allocate `output_bin_counts` if needed and return it.
+
+        The tensor holds max_num_reqs x vocab_size counts, so the model
+        runner allocates it during the memory profiling for it to be
+        accounted for when sizing the KV cache.
+        """
+        if self.output_bin_counts is None:
+            self.output_bin_counts = torch.zeros(self.max_num_reqs,
+                                                 self.vocab_size,
+                                                 dtype=torch.int32,
+                                                 device=self.device)
+        return self.output_bin_counts
+
+    def update_output_bin_counts(self) -> None:
+        """Add the output tokens generated since the last update to the
+        output bin counts of the requests with penalties.
+
+        This must be called before sampling, after the output token ids of
+        the previous steps are added to the requests.
+        """
+        if self.no_penalties:
+            return
+        assert self.output_bin_counts is not None
+        rows: list[int] = []
+        token_ids: list[int] = []
+        for req_id in (self.frequency_penalties_reqs
+                       | self.presence_penalties_reqs
+                       | self.repetition_penalties_reqs):
+            req_index = self.req_id_to_index[req_id]
+            output_token_ids = self.req_output_token_ids[req_index]
+            assert output_token_ids is not None
+            num_counted = int(self.num_counted_output_tokens[req_index])
+            num_output_tokens = len(output_token_ids)
+            if num_output_tokens < num_counted:
+                # Some output tokens were dropped (e.g. the request was
+                # preempted with async scheduling), so count them again.
+                self.output_bin_counts[req_index].zero_()
+                num_counted = 0
+            if num_output_tokens > num_counted:
+                rows.extend([req_index] * (num_output_tokens - num_counted))
+                token_ids.extend(output_token_ids[num_counted:])
+                self.num_counted_output_tokens[req_index] = num_output_tokens
+        if not rows:
+            return
+
+        indices = torch.tensor([rows, token_ids],
+                               dtype=torch.int64,
+                               device="cpu",
+                               pin_memory=self.pin_memory).to(
+                                   self.device, non_blocking=True)
+        self.output_bin_counts.index_put_((indices[0], indices[1]),
+                                          torch.ones(len(rows),
+                                                     dtype=torch.int32,
+                                                     device=self.device),
+                                          accumulate=True)
+
     def _make_sampling_metadata(self) -> SamplingMetadata:
         num_reqs = self.num_reqs
         if not self.all_greedy:
@@ -548,6 +641,7 @@ class InputBatch:
         if not self.no_min_p:
             copy_slice(self.min_p_cpu_tensor, self.min_p, num_reqs)
 
+        output_bin_counts: Optional[torch.Tensor] = None
         if not self.no_penalties:
             # Since syncing these tensors is expensive only copy them
             # if necessary i.e. if there are requests which require
@@ -563,6 +657,9 @@ class InputBatch:
             # the sampling process. Hence copy these tensors only when
             # there are requests which need penalties to be applied.
             prompt_token_ids = self._make_prompt_token_ids_tensor()
+
+            assert self.output_bin_counts is not None
+            output_bin_counts = self.output_bin_counts[:num_reqs]
         else:
             prompt_token_ids = None
 
@@ -592,6 +689,7 @@ class InputBatch:
             logit_bias=self.logit_bias[:num_reqs],
             allowed_token_ids_mask=allowed_token_ids_mask,
             bad_words_token_ids=self.bad_words_token_ids,
+            output_bin_counts=output_bin_counts,
         )
 
     def _make_prompt_token_ids_tensor(self) -> torch.Tensor:
@@ -10,6 +10,7 @@ import torch
 import torch.distributed
 import torch.nn as nn
 
+from vllm import _custom_ops as ops
 from vllm.attention import AttentionType, get_attn_backend
 from vllm.attention.layer import Attention
 from vllm.config import CompilationLevel, VllmConfig
@@ -31,6 +32,7 @@ from vllm.utils import (STR_DTYPE_TO_TORCH_DTYPE, DeviceMemoryProfiler,
                         check_use_alibi, is_pin_memory_available)
 from vllm.v1.attention.backends.flash_attn import FlashAttentionMetadata
 from vllm.v1.core.encoder_cache_manager import compute_encoder_budget
+from vllm.v1.core.swap_manager import get_num_swap_blocks
 from vllm.v1.kv_cache_interface import (AttentionSpec, FullAttentionSpec,
                                         KVCacheConfig, KVCacheSpec,
                                         SlidingWindowSpec)
@@ -156,16 +158,21 @@ class GPUModelRunner(LoRAModelRunnerMixin):
         # Lazy initialization
         # self.model: nn.Module  # Set after load_model
         self.kv_caches: list[torch.Tensor] = []
-        # req_id -> (input_id -> encoder_output)
-        self.encoder_cache: dict[str, dict[int, torch.Tensor]] = {}
+        # The host memory copies of the KV caches used by swap preemption.
+        self.cpu_kv_caches: list[torch.Tensor] = []
+        # mm_hash -> encoder_output
+        self.encoder_cache: dict[str, torch.Tensor] = {}
 
         # Set up speculative decoding.
         self.use_spec_decode = False
+        # The n-gram drafter, which is told when the requests finish.
+        self.ngram_drafter: Optional[NgramProposer] = None
         if self.speculative_config:
             self.use_spec_decode = True
             if get_pp_group().is_last_rank:
                 if self.speculative_config.method == "ngram":
                     self.drafter = NgramProposer(self.vllm_config)
+                    self.ngram_drafter = self.drafter
                 elif self.speculative_config.method == "eagle":
                     self.drafter = EagleProposer(self.vllm_config,
                                                  self.device)  # type: ignore
@@ -286,8 +293,10 @@ class GPUModelRunner(LoRAModelRunnerMixin):
         """
         # Remove finished requests from the cached states.
         for req_id in scheduler_output.finished_req_ids:
-            self.requests.pop(req_id, None)
-            self.encoder_cache.pop(req_id, None)
+            req_state = self.requests.pop(req_id, None)
+            if self.ngram_drafter is not None and req_state is not None:
+                self.ngram_drafter.finish_request(req_id,
+                                                  req_state.output_token_ids)
         # Remove the finished requests from the persistent batch.
         # NOTE(woosuk): There could be an edge case where finished_req_ids and
         # scheduled_req_ids overlap. This happens when a request is aborted and
@@ -301,12 +310,8 @@ class GPUModelRunner(LoRAModelRunnerMixin):
                 removed_req_indices.append(req_index)
 
         # Free the cached encoder outputs.
-        for req_id, input_id in scheduler_output.free_encoder_input_ids:
-            encoder_outputs = self.encoder_cache.get(req_id)
-            if encoder_outputs is not None:
-                encoder_outputs.pop(input_id, None)
-                if not encoder_outputs:
-                    self.encoder_cache.pop(req_id, None)
+        for mm_hash in scheduler_output.free_encoder_mm_hashes:
+            self.encoder_cache.pop(mm_hash, None)
 
         # Remove the unscheduled requests from the persistent batch.
         # NOTE(woosuk): The unscheduled requests are either preempted requests
@@ -342,6 +347,7 @@ class GPUModelRunner(LoRAModelRunnerMixin):
                 prompt=new_req_data.prompt,
                 mm_inputs=new_req_data.mm_inputs,
                 mm_positions=new_req_data.mm_positions,
+                mm_hashes=new_req_data.mm_hashes,
                 sampling_params=sampling_params,
                 generator=generator,
                 block_ids=new_req_data.block_ids,
@@ -390,32 +396,42 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             req_ids_to_add.append(req_id)
 
         # Update the states of the running/resumed requests.
-        for req_data in scheduler_output.scheduled_cached_reqs:
-            req_id = req_data.req_id
+        req_data = scheduler_output.scheduled_cached_reqs
+        num_computed_tokens_list = req_data.num_computed_tokens.tolist()
+        resumed_list = req_data.resumed_from_preemption.tolist()
+        token_offsets = req_data.new_token_ids_offsets.tolist()
+        for i, req_id in enumerate(req_data.req_ids):
             req_state = self.requests[req_id]
+            new_token_ids = req_data.new_token_ids[
+                token_offsets[i]:token_offsets[i + 1]]
+            new_block_ids = req_data.get_new_block_ids(i)
 
             # Update the cached states.
-            num_computed_tokens = req_data.num_computed_tokens
+            num_computed_tokens = num_computed_tokens_list[i]
             req_state.num_computed_tokens = num_computed_tokens
             # Add the sampled token(s) from the previous step (if any).
             # This doesn't include "unverified" tokens like spec decode tokens.
-            num_new_tokens = (num_computed_tokens +
-                              len(req_data.new_token_ids) -
+            num_new_tokens = (num_computed_tokens + len(new_token_ids) -
                               req_state.num_tokens)
-            if num_new_tokens == 1:
+            if num_new_tokens < 0 and resumed_list[i]:
+                # Async scheduling: the request was preempted while some of
+                # its steps were in flight, and the tokens cached from these
+                # steps are dropped.
+                del req_state.output_token_ids[num_new_tokens:]
+            elif num_new_tokens == 1:
                 # Avoid slicing list in most common case.
-                req_state.output_token_ids.append(req_data.new_token_ids[-1])
+                req_state.output_token_ids.append(int(new_token_ids[-1]))
             elif num_new_tokens > 0:
                 req_state.output_token_ids.extend(
-                    req_data.new_token_ids[-num_new_tokens:])
+                    new_token_ids[-num_new_tokens:].tolist())
             # Update the block IDs.
-            if not req_data.resumed_from_preemption:
+            if not resumed_list[i]:
                 # Append the new blocks to the existing block IDs.
-                req_state.block_ids.extend(req_data.new_block_ids)
+                req_state.block_ids.extend(new_block_ids)
             else:
                 # The request is resumed from preemption.
                 # Replace the existing block IDs with the new ones.
-                req_state.block_ids = req_data.new_block_ids
+                req_state.block_ids = new_block_ids
 
             req_index = self.input_batch.req_id_to_index.get(req_id)
             if req_index is None:
@@ -428,14 +444,18 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             # Update the persistent batch.
             self.input_batch.num_computed_tokens_cpu[req_index] = (
                 num_computed_tokens)
-            self.input_batch.block_table.append_row(req_data.new_block_ids,
-                                                    req_index)
+            self.input_batch.block_table.append_row(new_block_ids, req_index)
             # Add new_token_ids to token_ids_cpu.
             start_token_index = num_computed_tokens
-            end_token_index = num_computed_tokens + len(req_data.new_token_ids)
+            end_token_index = num_computed_tokens + len(new_token_ids)
             self.input_batch.token_ids_cpu[
-                req_index,
-                start_token_index:end_token_index] = req_data.new_token_ids
+                req_index, start_token_index:end_token_index] = new_token_ids
+            # NOTE: With async scheduling, token_ids_cpu may already hold the
+            # tokens sampled in the previous steps, which the scheduler does
+            # not know yet.
+            end_token_index = max(
+                end_token_index,
+                self.input_batch.num_tokens_no_spec[req_index])
             self.input_batch.num_tokens_no_spec[req_index] = end_token_index
             # Add spec_token_ids to token_ids_cpu.
             spec_token_ids = scheduler_output.scheduled_spec_decode_tokens.get(
@@ -841,14 +861,14 @@ class GPUModelRunner(LoRAModelRunnerMixin):
 
         # Batch the multi-modal inputs.
         mm_inputs = list[MultiModalKwargs]()
-        req_ids_pos = list[tuple[str, int, PlaceholderRange]]()
+        mm_hashes_pos = list[tuple[str, PlaceholderRange]]()
         for req_id, encoder_input_ids in scheduled_encoder_inputs.items():
             req_state = self.requests[req_id]
 
             for mm_input_id in encoder_input_ids:
                 mm_inputs.append(req_state.mm_inputs[mm_input_id])
-                req_ids_pos.append(
-                    (req_id, mm_input_id, req_state.mm_positions[mm_input_id]))
+                mm_hashes_pos.append((req_state.mm_hashes[mm_input_id],
+                                      req_state.mm_positions[mm_input_id]))
 
         # Batch mm inputs as much as we can: if a request in the batch has
         # multiple modalities or a different modality than the previous one,
@@ -884,14 +904,11 @@ class GPUModelRunner(LoRAModelRunnerMixin):
                 encoder_outputs.append(output)
 
         # Cache the encoder outputs.
-        for (req_id, input_id, pos_info), output in zip(
-                req_ids_pos,
+        for (mm_hash, pos_info), output in zip(
+                mm_hashes_pos,
                 encoder_outputs,
         ):
-            if req_id not in self.encoder_cache:
-                self.encoder_cache[req_id] = {}
-
-            self.encoder_cache[req_id][input_id] = scatter_mm_placeholders(
+            self.encoder_cache[mm_hash] = scatter_mm_placeholders(
                 output,
                 is_embed=pos_info.is_embed,
             )
@@ -928,9 +945,10 @@ class GPUModelRunner(LoRAModelRunnerMixin):
                     num_computed_tokens - start_pos + num_scheduled_tokens,
                     num_encoder_tokens)
                 assert start_idx < end_idx
-                assert req_id in self.encoder_cache
-                assert i in self.encoder_cache[req_id]
-                encoder_output = self.encoder_cache[req_id][i]
+                mm_hash = req_state.mm_hashes[i]
+                encoder_output = self.encoder_cache.get(mm_hash)
+                assert encoder_output is not None, (
+                    f"Encoder cache miss for {mm_hash}.")
 
                 if (is_embed := pos_info.is_embed) is not None:
                     is_embed = is_embed[start_idx:end_idx]
@@ -1003,6 +1021,13 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             get_kv_transfer_group().bind_connector_metadata(
                 scheduler_output.kv_connector_metadata)
 
+        # Swap the KV caches before the forward pass, which may overwrite the
+        # blocks swapped out in this step.
+        if (scheduler_output.blocks_to_swap_out
+                or scheduler_output.blocks_to_swap_in):
+            self._swap_kv_blocks(scheduler_output.blocks_to_swap_out,
+                                 scheduler_output.blocks_to_swap_in)
+
         self._update_states(scheduler_output)
         if not scheduler_output.total_num_scheduled_tokens:
             # Return empty ModelRunnerOutput if there's no work to do.
@@ -1093,6 +1118,7 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             self.apply_grammar_bitmask(scheduler_output, logits)
 
         # Sample the next token and get logprobs if needed.
+        self.input_batch.update_output_bin_counts()
         sampling_metadata = self.input_batch.sampling_metadata
         if spec_decode_metadata is None:
             sampler_output = self.model.sample(
@@ -1170,6 +1196,12 @@ class GPUModelRunner(LoRAModelRunnerMixin):
         for i in discard_sampled_tokens_req_indices:
             valid_sampled_token_ids[i].clear()
 
+        if self.scheduler_config.async_scheduling:
+            # The next step is scheduled before the scheduler receives the
+            # sampled tokens, so the model runner keeps them as the inputs
+            # of the next step.
+            self._cache_sampled_token_ids(valid_sampled_token_ids)
+
         if not self.use_spec_decode:
             # Speculative decoding is not enabled.
             spec_token_ids = None
@@ -1257,6 +1289,22 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             prompt_logprobs_dict=prompt_logprobs_dict,
         )
 
+    def _cache_sampled_token_ids(
+        self,
+        sampled_token_ids: list[list[int]],
+    ) -> None:
+        for req_index, token_ids in enumerate(sampled_token_ids):
+            if not token_ids:
+                continue
+            start_idx = int(self.input_batch.num_tokens_no_spec[req_index])
+            end_idx = start_idx + len(token_ids)
+            self.input_batch.token_ids_cpu[req_index,
+                                           start_idx:end_idx] = token_ids
+            self.input_batch.num_tokens_no_spec[req_index] = end_idx
+            self.input_batch.num_tokens[req_index] = end_idx
+            req_id = self.input_batch.req_ids[req_index]
+            self.requests[req_id].output_token_ids.extend(token_ids)
+
     def generate_draft_token_ids(
         self,
         sampled_token_ids: list[list[int]],
@@ -1282,7 +1330,7 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             end_idx = start_idx + num_sampled_ids
             self.input_batch.token_ids_cpu[i, start_idx:end_idx] = sampled_ids
             drafter_output = self.drafter.propose(
-                self.input_batch.token_ids_cpu[i, :end_idx])
+                req_id, self.input_batch.token_ids_cpu[i, :end_idx])
             if drafter_output is None or len(drafter_output) == 0:
                 draft_token_ids.append([])
             else:
@@ -1603,7 +1651,14 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             )
 
             # Cache the dummy encoder outputs.
-            self.encoder_cache["tmp"] = dict(enumerate(dummy_encoder_outputs))
+            for i, output in enumerate(dummy_encoder_outputs):
+                self.encoder_cache[f"tmp_{i}"] = output
+
+        # The output token counts used by the penalties would otherwise be
+        # allocated with the first request that needs them, after the KV
+        # cache is sized, so allocate them here to include them in the
+        # memory profile.
+        self.input_batch.allocate_output_bin_counts()
 
         hidden_states = self._dummy_run(self.max_num_tokens)
         if get_pp_group().is_last_rank:
@@ -1689,6 +1744,60 @@ class GPUModelRunner(LoRAModelRunnerMixin):
             self.vllm_config.compilation_config.static_forward_context,
             self.kv_caches)
 
+        num_swap_blocks = get_num_swap_blocks(self.vllm_config)
+        if num_swap_blocks > 0:
+            block_dim = self._get_kv_cache_block_dim()
+            for kv_cache in self.kv_caches:
+                shape = list(kv_cache.shape)
+                shape[block_dim] = num_swap_blocks
+                self.cpu_kv_caches.append(
+                    torch.empty(shape,
+                                dtype=kv_cache.dtype,
+                                device="cpu",
+                                pin_memory=self.pin_memory))
+
+    def _get_kv_cache_block_dim(self) -> int:
+        # The block dimension is 0 for MLA ([num_pages, page_size, xxx]) and
+        # 1 otherwise ([2, num_pages, page_size, xxx]).
+        return 0 if self.model_config.use_mla else 1
+
+    def _swap_kv_blocks(self, blocks_to_swap_out: list[tuple[int, int]],
+                        blocks_to_swap_in: list[tuple[int, int]]) -> None:
+        """Copy the KV cache blocks of the requests preempted by swapping to
+        the host memory, and those of the resumed ones back to the device.
+        The swap outs are done first since a block swapped out in this step
+        may be the destination of a swap in of the same step.
+
+        The copies are issued on the current stream between the pinned host
+        buffers and the device, so they are ordered with the forward pass
+        without blocking the host."""
+        # The block mappings of the swap_blocks op are CPU tensors.
+        if blocks_to_swap_out:
+            src_to_dst = torch.tensor(blocks_to_swap_out,
+                                      device="cpu",
+                                      dtype=torch.int64).view(-1, 2)
+            for kv_cache, cpu_kv_cache in zip(self.kv_caches,
+                                              self.cpu_kv_caches):
+                self._swap_blocks(kv_cache, cpu_kv_cache, src_to_dst)
+        if blocks_to_swap_in:
+            src_to_dst = torch.tensor(blocks_to_swap_in,
+                                      device="cpu",
+                                      dtype=torch.int64).view(-1, 2)
+            for kv_cache, cpu_kv_cache in zip(self.kv_caches,
+                                              self.cpu_kv_caches):
+                self._swap_blocks(cpu_kv_cache, kv_cache, src_to_dst)
+
+    def _swap_blocks(self, src_kv_cache: torch.Tensor,
+                     dst_kv_cache: torch.Tensor,
+                     src_to_dst: torch.Tensor) -> None:
+        if self.model_config.use_mla:
+            ops.swap_blocks(src_kv_cache, dst_kv_cache, src_to_dst)
+            return
+        # The swap_blocks op copies along the first dimension, so the key
+        # and value caches are swapped separately.
+        ops.swap_blocks(src_kv_cache[0], dst_kv_cache[0], src_to_dst)
+        ops.swap_blocks(src_kv_cache[1], dst_kv_cache[1], src_to_dst)
+
     def get_kv_cache_spec(self) -> dict[str, KVCacheSpec]:
         """
         Generates the KVCacheSpec by parsing the kv cache format from each